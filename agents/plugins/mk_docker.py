@@ -31,6 +31,7 @@ import struct
 import argparse
 import functools
 import multiprocessing
+import multiprocessing.pool
 import logging
 
 
@@ -77,6 +78,7 @@ DEFAULT_CFG_SECTION = {
     "base_url": "unix://var/run/docker.sock",
     "skip_sections": "",
     "container_id": "short",
+    "max_workers": "32",
 }
 
 LOGGER = logging.getLogger(__name__)
@@ -127,10 +129,28 @@ def get_config(cfg_file):
 
     skip_list = conf_dict.get("skip_sections", "").split(',')
     conf_dict["skip_sections"] = tuple(n.strip() for n in skip_list)
+    conf_dict["max_workers"] = max(1, int(conf_dict["max_workers"]))
 
     return conf_dict
 
 
+def map_bounded(function, items, max_workers):
+    '''call function for all items in at most max_workers threads
+
+    The calls mostly wait for the docker API, which is why threads are sufficient.
+    The results are returned in the order of the items.
+    '''
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        return [function(item) for item in items]
+    pool = multiprocessing.pool.ThreadPool(min(max_workers, len(items)))
+    try:
+        return pool.map(function, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
 class Section(list):
     '''a very basic agent section class'''
     _OUTPUT_LOCK = multiprocessing.Lock()
@@ -170,13 +190,21 @@ def report_exception_to_server(exc, location):
 
 
 class MKDockerClient(docker.DockerClient):
-    '''a docker.DockerClient that caches containers and node info'''
+    '''a docker.DockerClient that caches containers, images and node info'''
     API_VERSION = "auto"
     _DEVICE_MAP_LOCK = multiprocessing.Lock()
+    _IMAGE_TAGS_LOCK = multiprocessing.Lock()
 
     def __init__(self, config):
-        super(MKDockerClient, self).__init__(config['base_url'], version=MKDockerClient.API_VERSION)
-        all_containers = self.containers.list(all=True)
+        kwargs = {}
+        if hasattr(docker.constants, "DEFAULT_MAX_POOL_SIZE"):
+            # One connection per worker, otherwise the connections are closed after each call
+            kwargs["max_pool_size"] = config['max_workers']
+        super(MKDockerClient, self).__init__(config['base_url'],
+                                             version=MKDockerClient.API_VERSION,
+                                             **kwargs)
+        self.max_workers = config['max_workers']
+        all_containers = self._inspect_all_containers()
         if config['container_id'] == "name":
             self.all_containers = dict([(c.attrs["Name"].lstrip('/'), c) for c in all_containers])
         elif config['container_id'] == "long":
@@ -186,8 +214,30 @@ class MKDockerClient(docker.DockerClient):
         self._env = {"REMOTE": os.getenv("REMOTE", "")}
         self._container_stats = {}
         self._device_map = None
+        self._image_tags = None
         self.node_info = self.info()
 
+    def _inspect_all_containers(self):
+        '''inspect the containers listed by a single call of the API concurrently'''
+        def inspect(container_id):
+            try:
+                return self.containers.prepare_model(self.api.inspect_container(container_id))
+            except docker.errors.NotFound:
+                return None  # removed in the meantime
+
+        container_ids = [c["Id"] for c in self.api.containers(all=True)]
+        return [c for c in map_bounded(inspect, container_ids, self.max_workers) if c is not None]
+
+    def image_tags(self, image_id):
+        '''return the tags of an image, all images are listed by a single call of the API'''
+        with self._IMAGE_TAGS_LOCK:
+            if self._image_tags is None:
+                self._image_tags = {}
+                for image in self.api.images(all=True):
+                    tags = image.get("RepoTags") or []
+                    self._image_tags[image["Id"]] = [t for t in tags if t != '<none>:<none>']
+        return self._image_tags[image_id]
+
     def device_map(self):
         with self._DEVICE_MAP_LOCK:
             if self._device_map is not None:
@@ -392,8 +442,8 @@ def section_container_status(client, container_id):
         status["RestartPolicy"] = restart_policy
 
     try:
-        status["ImageTags"] = container.image.tags
-    except docker.errors.ImageNotFound:
+        status["ImageTags"] = client.image_tags(container.attrs["Image"])
+    except KeyError:
         # image has been removed while container is still running
         pass
     status["NodeName"] = client.node_info.get("Name")
@@ -497,15 +547,8 @@ def call_node_sections(client, config):
 
 
 def call_container_sections(client, config):
-    jobs = []
-    for container_id in client.all_containers:
-        job = multiprocessing.Process(target=_call_single_containers_sections,
-                                      args=(client, config, container_id))
-        job.start()
-        jobs.append(job)
-
-    for job in jobs:
-        job.join()
+    map_bounded(functools.partial(_call_single_containers_sections, client, config),
+                client.all_containers, client.max_workers)
 
 
 def _call_single_containers_sections(client, config, container_id):
@@ -43,7 +43,9 @@ described by the following four phases:
     * ``filter_regex: regular_expression''
       Only further process a file, if its full path matches the given regular
       expression. Everything following the characters 'filter_regex: ' will
-      considered one single regular expression.
+      considered one single regular expression. Directories which cannot
+      contain matching files according to the literal beginning of the
+      expression are not searched.
     * ``filter_regex_inverse: regular_expression''
       Only further process a file, if its full path *does not* match the given
       regular expression.
@@ -85,6 +87,7 @@ You should find an example configuration file at
 __version__ = "2.1.0i1"
 
 import errno
+import fnmatch
 import glob
 import logging
 import operator
@@ -134,6 +137,8 @@ DEFAULT_CFG_SECTION = {"output": "file_stats"}
 
 FILTER_SPEC_PATTERN = re.compile('(?P<operator>[<>=]+)(?P<value>.+)')
 
+GLOB_MAGIC_PATTERN = re.compile('[*?[]')
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -168,43 +173,79 @@ def parse_arguments(argv=None):
 class FileStat(object):
     """Wrapper arount os.stat
 
-    Only call os.stat once.
+    Only call os.stat once, and not before the data is needed: Files may be
+    filtered by their path. If the file was found by os.scandir, the stat data
+    of its DirEntry is used.
     """
-    def __init__(self, path):
+    def __init__(self, path, stat_function=None):
         super(FileStat, self).__init__()
         LOGGER.debug("Creating FileStat(%r)", path)
         self.path = ensure_text(path)
-        self.stat_status = 'ok'
-        self.size = None
-        self.age = None
+        self._stat_function = stat_function
+        self._stat_done = False
+        self._stat_status = 'ok'
+        self._size = None
+        self._age = None
         self._m_time = None
         # report on errors, regard failure as 'file'
-        self.isfile = True
-        self.isdir = False
+        self._isfile = True
+        self._isdir = False
+
+    def _stat(self):
+        if self._stat_done:
+            return
+        self._stat_done = True
 
         LOGGER.debug("os.stat(%r)", self.path)
-        path = self.path.encode('utf8')
         try:
-            stat = os.stat(path)
+            if self._stat_function is None:
+                stat = os.stat(self.path.encode('utf8'))
+            else:
+                stat = self._stat_function()
         except OSError as exc:
-            self.stat_status = "file vanished" if exc.errno == errno.ENOENT else str(exc)
+            self._stat_status = "file vanished" if exc.errno == errno.ENOENT else str(exc)
             return
 
         try:
-            self.size = int(stat.st_size)
+            self._size = int(stat.st_size)
         except ValueError as exc:
-            self.stat_status = str(exc)
+            self._stat_status = str(exc)
             return
 
         try:
             self._m_time = int(stat.st_mtime)
-            self.age = int(time.time()) - self._m_time
+            self._age = int(time.time()) - self._m_time
         except ValueError as exc:
-            self.stat_status = str(exc)
+            self._stat_status = str(exc)
             return
 
-        self.isfile = S_ISREG(stat.st_mode)
-        self.isdir = S_ISDIR(stat.st_mode)
+        self._isfile = S_ISREG(stat.st_mode)
+        self._isdir = S_ISDIR(stat.st_mode)
+
+    @property
+    def stat_status(self):
+        self._stat()
+        return self._stat_status
+
+    @property
+    def size(self):
+        self._stat()
+        return self._size
+
+    @property
+    def age(self):
+        self._stat()
+        return self._age
+
+    @property
+    def isfile(self):
+        self._stat()
+        return self._isfile
+
+    @property
+    def isdir(self):
+        self._stat()
+        return self._isdir
 
     def __repr__(self):
         return "FileStat(%r)" % self.path
@@ -235,28 +276,89 @@ class FileStat(object):
 
 
 class PatternIterator(object):
-    """Recursively iterate over all files"""
-    def __init__(self, pattern_list):
+    """Recursively iterate over all files
+
+    Directories no file of which can pass the filters are not descended into.
+    If available, directories are read using os.scandir, which tells files from
+    directories without stat calls.
+    """
+    def __init__(self, pattern_list, file_filters=()):
         super(PatternIterator, self).__init__()
         self._patterns = [os.path.abspath(os.path.expanduser(p)) for p in pattern_list]
+        self._filters = file_filters
+
+    def _descend(self, dir_path):
+        if all(f.may_match_within(dir_path) for f in self._filters):
+            return True
+        LOGGER.debug("skipping directory: %r", dir_path)
+        return False
 
     def _iter_files(self, pattern):
         for item in glob.iglob(pattern):
             filestat = FileStat(item)
             if filestat.isfile:
                 yield filestat
-            elif filestat.isdir:
-                for filestat in self._iter_files(os.path.join(item, '*')):
+            elif filestat.isdir and self._descend(ensure_text(item)):
+                for filestat in self._iter_dir(item):
+                    yield filestat
+
+    def _iter_dir(self, dir_path):
+        if hasattr(os, "scandir"):
+            return self._iter_tree(dir_path, '*')
+        # Python < 3.5
+        return self._iter_files(os.path.join(dir_path, '*'))
+
+    def _iter_tree(self, top, name_pattern):
+        """Recursively iterate over the matching entries of the directory top
+
+        Files are told from directories without a stat call. As by glob, hidden
+        entries are skipped unless the pattern starts with a dot.
+        """
+        dir_paths = [top]
+        while dir_paths:
+            dir_path = dir_paths.pop()
+            try:
+                entries = os.scandir(dir_path)
+            except OSError as exc:
+                LOGGER.info("cannot read directory %r: %s", dir_path, exc)
+                continue
+
+            for entry in entries:
+                if entry.name.startswith('.') and not name_pattern.startswith('.'):
+                    continue
+                if name_pattern != '*' and not fnmatch.fnmatch(entry.name, name_pattern):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if self._descend(ensure_text(entry.path)):
+                        dir_paths.append(entry.path)
+                    continue
+                filestat = FileStat(entry.path, entry.stat)
+                # Only stat what is neither a file nor a directory, e.g. a broken symlink
+                if entry.is_file() or filestat.isfile:
                     yield filestat
 
+            # everything below a matching directory is processed
+            name_pattern = '*'
+
     def __iter__(self):
         for pat in self._patterns:
             LOGGER.info("processing pattern: %r", pat)
-            for filestat in self._iter_files(pat):
+            dir_path, name_pattern = os.path.split(pat)
+            if (hasattr(os, "scandir") and GLOB_MAGIC_PATTERN.search(name_pattern) and
+                    not GLOB_MAGIC_PATTERN.search(dir_path)):
+                # no need to stat all matches of e.g. "/var/spool/app/*.tmp"
+                filestats = self._iter_tree(dir_path, name_pattern)
+            else:
+                filestats = self._iter_files(pat)
+            for filestat in filestats:
                 yield filestat
 
 
-def get_file_iterator(config):
+def get_file_iterator(config, file_filters=()):
     """get a FileStat iterator"""
     input_specs = [(k[6:], v) for k, v in config.items() if k.startswith('input_')]
     if not input_specs:
@@ -267,7 +369,7 @@ def get_file_iterator(config):
     if variety != "patterns":
         raise ValueError("unknown input type: %r" % variety)
     patterns = shlex.split(spec_string)
-    return PatternIterator(patterns)
+    return PatternIterator(patterns, file_filters)
 
 
 #.
@@ -289,6 +391,10 @@ class AbstractFilter(object):
         """return a boolean"""
         raise NotImplementedError()
 
+    def may_match_within(self, dir_path):  # pylint: disable=unused-argument
+        """return False if no file in the directory can match"""
+        return True
+
 
 COMPARATORS = {
     '<': operator.lt,
@@ -339,20 +445,60 @@ class AgeFilter(AbstractNumericFilter):
         return filestat.stat_status != "file vanished"
 
 
+def literal_prefix(regex_pattern):
+    """return the text every match of the regular expression starts with
+
+    Only simple cases are handled, the prefix may be shorter than possible.
+    """
+    if '|' in regex_pattern:
+        return u''
+
+    prefix = []
+    idx = 1 if regex_pattern.startswith('^') else 0
+    while idx < len(regex_pattern):
+        char = regex_pattern[idx]
+        if char == '\\':
+            char = regex_pattern[idx + 1:idx + 2]
+            if not char or char.isalnum() or char == '_':
+                break  # a character class, anchor or backreference
+            idx += 2
+        elif char in '.^$*+?{}[]()':
+            break
+        else:
+            idx += 1
+
+        repetition = regex_pattern[idx:idx + 1]
+        if repetition and repetition in '*?{':
+            break
+        prefix.append(char)
+        if repetition == '+':
+            break
+    return u''.join(prefix)
+
+
 class RegexFilter(AbstractFilter):
     def __init__(self, regex_pattern):
         super(RegexFilter, self).__init__()
         LOGGER.debug("initializing with pattern: %r", regex_pattern)
         self._regex = re.compile(ensure_text(regex_pattern), re.UNICODE)
+        self._prefix = literal_prefix(ensure_text(regex_pattern))
 
     def matches(self, filestat):
         return bool(self._regex.match(filestat.path))
 
+    def may_match_within(self, dir_path):
+        """the paths of the files within the directory must be able to start with the prefix"""
+        dir_prefix = dir_path.rstrip('/') + '/'
+        return dir_prefix.startswith(self._prefix) or self._prefix.startswith(dir_prefix)
+
 
 class InverseRegexFilter(RegexFilter):
     def matches(self, filestat):
         return not bool(self._regex.match(filestat.path))
 
+    def may_match_within(self, dir_path):  # pylint: disable=unused-argument
+        return True
+
 
 def get_file_filters(config):
     filter_specs = ((k[7:], v) for k, v in config.items() if k.startswith('filter_'))
@@ -517,10 +663,10 @@ def main():
     for section_name, config in iter_config_section_dicts(args['cfg_file']):
 
         #1 input
-        files_iter = get_file_iterator(config)
+        filters = get_file_filters(config)
+        files_iter = get_file_iterator(config, filters)
 
         #2 filtering
-        filters = get_file_filters(config)
         filtered_files = iter_filtered_files(filters, files_iter)
 
         #3 grouping
@@ -55,6 +55,9 @@ except ImportError:
                      " Please install it on the monitored system.\n")
     sys.exit(1)
 
+# Maximum number of requests sent in one bulk request
+MAX_BULK_REQUESTS = 100
+
 VERBOSE = sys.argv.count('--verbose') + sys.argv.count('-v') + 2 * sys.argv.count('-vv')
 DEBUG = sys.argv.count('--debug')
 
@@ -166,6 +169,8 @@ DEFAULT_CONFIG_TUPLES = (
      " we try to detect the product from the jolokia info section." %
      ", ".join(AVAILABLE_PRODUCTS)),
     ("timeout", 1.0, "Connection/read timeout for requests."),
+    # Send all reads and searches of an instance in a few bulk requests
+    ("bulk", False),
     ("custom_vars", []),
     # List of instances to monitor. Each instance is a dict where
     # the global configuration values can be overridden.
@@ -263,11 +268,13 @@ class JolokiaInstance(object):
         self.name = self._config["instance"]
         self.product = self._config.get("product")
         self.custom_vars = self._config.get("custom_vars", [])
+        self.bulk = bool(self._config.get("bulk"))
 
         self.base_url = self._get_base_url()
         self.target = self._get_target()
         self.post_config = {"ignoreErrors": "true"}
         self._session = self._initialize_http_session()
+        self._bulk_responses = {}  # type: Dict[str, Dict[str, Any]]
 
     def _get_base_url(self):
         return "%s://%s:%d/%s/" % (
@@ -335,7 +342,43 @@ class JolokiaInstance(object):
         data["config"] = self.post_config
         return data
 
+    @staticmethod
+    def _bulk_key(data):
+        return json.dumps(data, sort_keys=True)
+
+    def prefetch(self, data_list):
+        '''post the requests in bulk requests and keep the responses for post()
+
+        The responses of a bulk request are in the order of its requests. In case a
+        bulk request fails as a whole, the requests are posted one by one later on.
+        '''
+        pending = {}  # type: Dict[str, Dict[str, Any]]
+        for data in data_list:
+            key = self._bulk_key(data)
+            if key not in self._bulk_responses:
+                pending.setdefault(key, data)
+        pending_items = sorted(pending.items())
+
+        for start in range(0, len(pending_items), MAX_BULK_REQUESTS):
+            chunk = pending_items[start:start + MAX_BULK_REQUESTS]
+            try:
+                responses = validate_http_response(self._post([data for _key, data in chunk]))
+            except (SkipMBean, ValueError):
+                # e.g. the HTTP status of an unsupported bulk request or a body not being JSON
+                continue
+            if not isinstance(responses, list) or len(responses) != len(chunk):
+                continue
+            for (key, _data), response in zip(chunk, responses):
+                self._bulk_responses[key] = response
+
     def post(self, data):
+        if self._bulk_responses:
+            response = self._bulk_responses.get(self._bulk_key(data))
+            if response is not None:
+                return validate_jolokia_response(response)
+        return validate_response(self._post(data))
+
+    def _post(self, data):
         post_data = json.dumps(data)
         if VERBOSE:
             sys.stderr.write("\nDEBUG: POST data: %r\n" % post_data)
@@ -355,11 +398,16 @@ class JolokiaInstance(object):
             sys.stderr.write("ERROR: %s\n" % exc)
             raise SkipMBean(exc)
 
-        return validate_response(raw_response)
+        return raw_response
 
 
 def validate_response(raw):
     '''return loaded response or raise exception'''
+    return validate_jolokia_response(validate_http_response(raw))
+
+
+def validate_http_response(raw):
+    '''return loaded content of the http response or raise exception'''
     if VERBOSE > 1:
         sys.stderr.write("DEBUG: %r:\n"
                          "DEBUG:   headers: %r\n"
@@ -373,7 +421,11 @@ def validate_response(raw):
             raise SkipInstance("HTTP STATUS", raw.status_code)
         raise SkipMBean("HTTP STATUS", raw.status_code)
 
-    response = raw.json()
+    return raw.json()
+
+
+def validate_jolokia_response(response):
+    '''return a single jolokia response or raise exception'''
     # check the status of the jolokia response
     if response.get("status") != 200:
         errmsg = response.get("error", "unkown error")
@@ -510,15 +562,39 @@ def _process_queries(inst, queries):
             continue
 
 
+def prefetch_bulk(inst, var_lists, mbean_lists):
+    '''fetch the searches and then the reads of all vars and mbeans by bulk requests'''
+    all_vars = [var for var_list in var_lists for var in var_list]
+    inst.prefetch(
+        [inst.get_post_data(var[0], "search", use_target=False) for var in all_vars if var[4]])
+
+    reads = []
+    for var in all_vars:
+        mbean, path, title, itemspec, do_search = var[:5]
+        for mbean_path, _title, _itemspec in _get_queries(do_search, inst, itemspec, title, path,
+                                                          mbean):
+            reads.append(inst.get_post_data(mbean_path, "read", use_target=True))
+    for mbeans in mbean_lists:
+        reads.extend(inst.get_post_data(mbean, "read", use_target=True) for mbean in mbeans)
+    inst.prefetch(reads)
+
+
 def query_instance(inst):
     write_section('jolokia_info', generate_jolokia_info(inst))
 
     # now (after jolokia_info) we're sure about the product
     specs_specific = QUERY_SPECS_SPECIFIC_LEGACY.get(inst.product, [])
+    sections_specific = MBEAN_SECTIONS_SPECIFIC.get(inst.product, {})
+    if inst.bulk:
+        prefetch_bulk(
+            inst,
+            [specs_specific, QUERY_SPECS_LEGACY, inst.custom_vars],
+            list(sections_specific.values()) + list(MBEAN_SECTIONS.values()),
+        )
+
     write_section('jolokia_metrics', generate_values(inst, specs_specific))
     write_section('jolokia_metrics', generate_values(inst, QUERY_SPECS_LEGACY))
 
-    sections_specific = MBEAN_SECTIONS_SPECIFIC.get(inst.product, {})
     for section_name, mbeans in sections_specific.items():
         write_section('jolokia_%s' % section_name, generate_json(inst, mbeans))
     for section_name, mbeans_tups in MBEAN_SECTIONS.items():
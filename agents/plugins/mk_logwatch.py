@@ -13,6 +13,8 @@ Options:
     -h               Show help.
     --no_state       No state
     -v               Verbose output for debugging purposes (no debug mode).
+    --processes NUM  Process up to NUM logfiles in parallel (not on Windows). The default
+                     is taken from the environment variable LOGWATCH_PROCESSES, otherwise 1.
 
 You should find an example configuration file at
 '../cfg_examples/logwatch.cfg' relative to this file.
@@ -28,6 +30,7 @@ if sys.version_info < (2, 6):
     sys.exit(1)
 
 import io
+import functools
 import glob
 import logging
 import os
@@ -120,6 +123,15 @@ def init_logging(verbosity):
         logging.basicConfig(level=logging.DEBUG, format="%(levelname)s: %(lineno)s: %(message)s")
 
 
+def parse_processes(raw_processes):
+    """Return the number of worker processes, invalid values fall back to one process"""
+    try:
+        return max(int(raw_processes or 1), 1)
+    except ValueError:
+        LOGGER.debug("Invalid number of processes %r, using 1", raw_processes)
+        return 1
+
+
 class ArgsParser(object):  # pylint: disable=too-few-public-methods
     """
     Custom argument parsing.
@@ -137,6 +149,9 @@ class ArgsParser(object):  # pylint: disable=too-few-public-methods
         self.config = argv[argv.index('-c') + 1] if '-c' in argv else None
         self.debug = '-d' in argv or '--debug' in argv
         self.no_state = '--no_state' in argv
+        self.processes = os.getenv("LOGWATCH_PROCESSES")
+        if '--processes' in argv:
+            self.processes = argv[argv.index('--processes') + 1]
 
 
 #   .--MEI-Cleanup---------------------------------------------------------.
@@ -661,43 +676,40 @@ def process_logfile(section, filestate, debug):
             break
 
         level = "."
-        for lev, pattern, cont_patterns, replacements in section.compiled_patterns:
-
-            matches = pattern.search(line[:-1])
-            if matches:
-                level = lev
-                levelint = {'C': 2, 'W': 1, 'O': 0, 'I': -1, '.': -1}[lev]
-                worst = max(levelint, worst)
-
-                # TODO: the following for block should be a method of the iterator
-                # Check for continuation lines
-                for cont_pattern in cont_patterns:
-                    if isinstance(cont_pattern, int):  # add that many lines
-                        for _unused_x in range(cont_pattern):
-                            cont_line = log_iter.next_line()
-                            if cont_line is None:  # end of file
-                                break
+        found = section.pattern_matcher.match(line[:-1])
+        if found is not None:
+            (lev, _pattern, cont_patterns, replacements), matches = found
+            level = lev
+            levelint = {'C': 2, 'W': 1, 'O': 0, 'I': -1, '.': -1}[lev]
+            worst = max(levelint, worst)
+
+            # TODO: the following for block should be a method of the iterator
+            # Check for continuation lines
+            for cont_pattern in cont_patterns:
+                if isinstance(cont_pattern, int):  # add that many lines
+                    for _unused_x in range(cont_pattern):
+                        cont_line = log_iter.next_line()
+                        if cont_line is None:  # end of file
+                            break
+                        line = line[:-1] + "\1" + cont_line
+
+                else:  # pattern is regex
+                    while True:
+                        cont_line = log_iter.next_line()
+                        if cont_line is None:  # end of file
+                            break
+                        elif cont_pattern.search(cont_line[:-1]):
                             line = line[:-1] + "\1" + cont_line
+                        else:
+                            log_iter.push_back_line(cont_line)  # sorry for stealing this line
+                            break
 
-                    else:  # pattern is regex
-                        while True:
-                            cont_line = log_iter.next_line()
-                            if cont_line is None:  # end of file
-                                break
-                            elif cont_pattern.search(cont_line[:-1]):
-                                line = line[:-1] + "\1" + cont_line
-                            else:
-                                log_iter.push_back_line(cont_line)  # sorry for stealing this line
-                                break
-
-                # Replacement
-                for replace in replacements:
-                    line = replace.replace('\\0', line.rstrip()) + "\n"
-                    for num, group in enumerate(matches.groups()):
-                        if group is not None:
-                            line = line.replace('\\%d' % (num + 1), group)
-
-                break  # matching rule found and executed
+            # Replacement
+            for replace in replacements:
+                line = replace.replace('\\0', line.rstrip()) + "\n"
+                for num, group in enumerate(matches.groups()):
+                    if group is not None:
+                        line = line.replace('\\%d' % (num + 1), group)
 
         if level == "I":
             level = "."
@@ -730,6 +742,59 @@ def process_logfile(section, filestate, debug):
     return header, []
 
 
+def _process_logfile_in_worker(args):
+    """Process a logfile in a worker process
+
+    The changed file state is returned together with the result or the error message.
+    """
+    section, filestate, debug = args
+    try:
+        return filestate, process_logfile(section, filestate, debug), None
+    except Exception as exc:
+        return filestate, None, str(exc)
+
+
+def _processed_in_worker(processed, error):
+    if error is not None:
+        raise Exception(error)
+    return processed
+
+
+def process_logfiles(sections, state, debug, processes):
+    """Yield the logfile sections together with a function processing them
+
+    The function returns the header and the lines of the logfile like process_logfile().
+    With multiple processes, the logfiles are already processed in parallel and the
+    functions only return the result. The file states are changed the same way as when
+    processing the logfiles one after another.
+    """
+    # The frozen binary on Windows can not start worker processes. Exceptions are raised
+    # where they occur in debug mode.
+    if processes > 1 and len(sections) > 1 and not debug and platform.system() != "Windows":
+        try:
+            import multiprocessing
+            pool = multiprocessing.Pool(min(processes, len(sections)))
+        except (ImportError, OSError) as exc:
+            LOGGER.info("Cannot start worker processes: %s", exc)
+        else:
+            try:
+                results = pool.imap(
+                    _process_logfile_in_worker,
+                    [(section, state.get(section.name_fs), debug) for section in sections])
+                for section in sections:
+                    filestate, processed, error = next(results)
+                    state.get(section.name_fs).update(filestate)
+                    yield section, functools.partial(_processed_in_worker, processed, error)
+            finally:
+                pool.close()
+                pool.join()
+            return
+
+    for section in sections:
+        yield section, functools.partial(process_logfile, section, state.get(section.name_fs),
+                                         debug)
+
+
 class Options(object):
     """Options w.r.t. logfile patterns (not w.r.t. cluster mapping)."""
     MAP_OVERFLOW = {'C': 2, 'W': 1, 'I': 0, 'O': 0}
@@ -930,6 +995,104 @@ def _compile_continuation_pattern(raw_pattern):
         return re.compile(_search_optimize_raw_pattern(raw_pattern), re.UNICODE)
 
 
+_QUANTIFIER_REGEX = re.compile(r"\{\d*(,\d*)?\}")
+
+
+def _required_literal(pattern):
+    """Return a text contained in every line matched by the compiled pattern or None
+
+    Only the top level of the pattern is looked at: The longest run of literal characters
+    which are not made optional by a quantifier is taken.
+    """
+    if pattern.flags & ~re.UNICODE:
+        return None  # e.g. case insensitive
+
+    raw_pattern = pattern.pattern
+    runs = []
+    run = []
+    depth = 0
+    idx = 0
+    while idx < len(raw_pattern):
+        char = raw_pattern[idx]
+        idx += 1
+
+        if char == "\\":
+            escaped = raw_pattern[idx:idx + 1]
+            idx += 1
+            if depth == 0 and escaped and not escaped.isalnum():
+                run.append(escaped)
+                continue
+        elif char == "[":
+            # Skip the character class, a leading "]" belongs to it
+            if raw_pattern[idx:idx + 1] == "^":
+                idx += 1
+            if raw_pattern[idx:idx + 1] == "]":
+                idx += 1
+            while idx < len(raw_pattern) and raw_pattern[idx] != "]":
+                idx += 2 if raw_pattern[idx] == "\\" else 1
+            idx += 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None  # Alternatives on the top level
+        elif char in "*?":
+            if run:
+                run.pop()  # The last character is optional
+        elif char == "{":
+            # Only e.g. "{2,3}" is a quantifier, any other "{" just ends the run
+            quantifier = _QUANTIFIER_REGEX.match(raw_pattern, idx - 1)
+            if quantifier:
+                if run:
+                    run.pop()
+                idx = quantifier.end()
+        elif depth == 0 and char not in ".^$+":
+            run.append(char)
+            continue
+
+        # Everything else ends the run, e.g. the last character may be repeated with "+"
+        runs.append(u"".join(run))
+        run = []
+
+    runs.append(u"".join(run))
+    return max(runs, key=len) or None
+
+
+class PatternMatcher(object):  # pylint: disable=too-few-public-methods
+    """Find the first of the compiled patterns matching a line
+
+    Most patterns can only match lines containing a certain text. These texts are combined
+    to one alternation, so the lines matching none of the patterns, which are the vast
+    majority in most logfiles, are dismissed by a single search. For the other lines, only
+    the patterns whose text is contained in the line are searched, in their order.
+    """
+    def __init__(self, compiled_patterns):
+        super(PatternMatcher, self).__init__()
+        self._patterns = compiled_patterns
+        self._literals = [
+            _required_literal(pattern) for _level, pattern, _cont, _replace in compiled_patterns
+        ]
+        if self._literals and None not in self._literals:
+            self._literals_regex = re.compile(
+                u"|".join(re.escape(literal) for literal in set(self._literals)), re.UNICODE)
+        else:
+            self._literals_regex = None
+
+    def match(self, text):
+        """Return the first matching compiled pattern and its match or None"""
+        if self._literals_regex is not None and self._literals_regex.search(text) is None:
+            return None
+
+        for compiled_pattern, literal in zip(self._patterns, self._literals):
+            if literal is not None and literal not in text:
+                continue
+            matches = compiled_pattern[1].search(text)
+            if matches:
+                return compiled_pattern, matches
+        return None
+
+
 class LogfileSection(object):
     def __init__(self, logfile_ref):
         super(LogfileSection, self).__init__()
@@ -938,6 +1101,7 @@ class LogfileSection(object):
         self.options = Options()
         self.patterns = []
         self._compiled_patterns = None
+        self._pattern_matcher = None
 
     @property
     def compiled_patterns(self):
@@ -956,6 +1120,12 @@ class LogfileSection(object):
         self._compiled_patterns = compiled_patterns
         return self._compiled_patterns
 
+    @property
+    def pattern_matcher(self):
+        if self._pattern_matcher is None:
+            self._pattern_matcher = PatternMatcher(self.compiled_patterns)
+        return self._pattern_matcher
+
 
 def parse_sections(logfiles_config):
     """
@@ -1146,10 +1316,10 @@ def main(argv=None):
         # lose a message in the extreme case of a corrupted status file.
         LOGGER.warning("Exception reading status file: %s", str(exc))
 
-    for section in found_sections:
-        filestate = state.get(section.name_fs)
+    for section, process in process_logfiles(found_sections, state, args.debug,
+                                             parse_processes(args.processes)):
         try:
-            header, output = process_logfile(section, filestate, args.debug)
+            header, output = process()
             write_output(header, output, section.options)
         except Exception as exc:
             if args.debug:
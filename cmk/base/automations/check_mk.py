@@ -20,6 +20,7 @@ from contextlib import redirect_stdout, redirect_stderr
 from six import ensure_binary, ensure_str
 
 import cmk.utils.debug
+import cmk.utils.inventory_index as inventory_index
 import cmk.utils.log as log
 import cmk.utils.man_pages as man_pages
 import cmk.utils.paths
@@ -371,10 +372,13 @@ class AutomationRenameHosts(Automation):
         if self._rename_host_file(cmk.utils.paths.var_dir + "/inventory", oldname, newname):
             self._rename_host_file(cmk.utils.paths.var_dir + "/inventory", oldname + ".gz",
                                    newname + ".gz")
+            self._rename_host_file(cmk.utils.paths.var_dir + "/inventory", oldname + ".bin",
+                                   newname + ".bin")
             actions.append("inv")
 
         if self._rename_host_dir(cmk.utils.paths.var_dir + "/inventory_archive", oldname, newname):
             actions.append("invarch")
+            self._rename_host_dir(cmk.utils.paths.inventory_delta_cache_dir, oldname, newname)
 
         # Baked agents
         baked_agents_dir = cmk.utils.paths.var_dir + "/agents/"
@@ -753,6 +757,7 @@ class AutomationDeleteHosts(Automation):
                 "%s/persisted/%s" % (cmk.utils.paths.var_dir, hostname),
                 "%s/inventory/%s" % (cmk.utils.paths.var_dir, hostname),
                 "%s/inventory/%s.gz" % (cmk.utils.paths.var_dir, hostname),
+                "%s/inventory/%s.bin" % (cmk.utils.paths.var_dir, hostname),
                 "%s/agent_deployment/%s" % (cmk.utils.paths.var_dir, hostname),
         ]:
             self._delete_if_exists(path)
@@ -765,6 +770,8 @@ class AutomationDeleteHosts(Automation):
             else:
                 raise
 
+        inventory_index.remove_host(hostname)
+
         for data_source_name in ds_directories:
             filename = "%s/%s/%s" % (cmk.utils.paths.data_source_cache_dir, data_source_name,
                                      hostname)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Pool of pre-forked check helpers for the Nagios core
+
+With the Nagios core every "Check_MK" service is executed by a precompiled host check which
+is started as a fresh Python process. It spends most of its time with importing the Checkmk
+modules, loading the plugins and the packed configuration before doing the actual checking.
+
+The pool does this once: The master process loads all plugins and the latest helper config
+and then forks the helper processes which accept check requests on a UNIX socket. The
+precompiled host checks hand over the host to the pool and only print the result. In case
+the pool is not running they execute the check on their own as before.
+
+Protocol: The client sends a single line containing the repr() of a dict with the keys
+"host_name", "serial", "ipaddresses" and "ipv6addresses". The helper answers with the exit
+code of the check in the first line, followed by the output of the check. In case the
+helper uses another configuration than the client, it answers with RETRY_LOCALLY only.
+"""
+
+import ast
+import contextlib
+import errno
+import io
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, NoReturn, Optional, Set, Tuple
+
+import cmk.utils.daemon as daemon
+import cmk.utils.debug
+import cmk.utils.log as log
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.caching import runtime_cache
+from cmk.utils.exceptions import MKGeneralException, MKTimeout
+from cmk.utils.type_defs import ConfigSerial, HostName, LATEST_SERIAL
+
+import cmk.base.check_api as check_api
+import cmk.base.checking as checking
+import cmk.base.config as config
+
+logger = logging.getLogger("cmk.base.check_helper_pool")
+
+# Answer of a helper telling the client to execute the check on it's own
+RETRY_LOCALLY = -1
+
+# Tells a master that has been restarted after a config change to stay in the foreground
+_RESTART_ENV = "CMK_CHECK_HELPER_POOL_RESTART"
+
+_REQUEST_KEYS = {"host_name", "serial", "ipaddresses", "ipv6addresses"}
+_MAX_REQUEST_SIZE = 1024 * 1024
+
+
+def current_serial() -> Optional[str]:
+    """The serial of the latest helper config, None in case there is none yet"""
+    try:
+        return os.readlink(str(cmk.utils.paths.make_helper_config_path(LATEST_SERIAL)))
+    except OSError:
+        return None
+
+
+def make_request(host_name: HostName, serial: str, ipaddresses: Dict[HostName, str],
+                 ipv6addresses: Dict[HostName, str]) -> bytes:
+    """Create the request line sent by the precompiled host checks"""
+    return repr({
+        "host_name": host_name,
+        "serial": serial,
+        "ipaddresses": ipaddresses,
+        "ipv6addresses": ipv6addresses,
+    }).encode("utf-8") + b"\n"
+
+
+def _raise_check_timeout(signum: int, stackframe: Optional[FrameType]) -> NoReturn:
+    raise MKTimeout("Check timed out")
+
+
+class CheckHelperPool:
+    def __init__(self, *, serial: str, num_helpers: int, timeout: int, max_requests: int) -> None:
+        super().__init__()
+        self.serial = serial
+        self._num_helpers = num_helpers
+        self._timeout = timeout
+        self._max_requests = max_requests
+        self._helper_pids: Set[int] = set()
+        self._master_pid: Optional[int] = None
+        self._terminate = False
+        self._restart = False
+
+    #
+    # Master
+    #
+
+    def run(self, listener: socket.socket) -> None:
+        """Keep the helpers running until the pool is terminated or the config has changed"""
+        self._master_pid = os.getpid()
+        signal.signal(signal.SIGTERM, self._handle_terminate)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+
+        try:
+            while not self._terminate and not self._restart:
+                self._reap_helpers()
+                while len(self._helper_pids) < self._num_helpers:
+                    self._spawn_helper(listener)
+
+                time.sleep(1)
+
+                if current_serial() != self.serial:
+                    logger.info("Configuration has changed")
+                    self._restart = True
+        finally:
+            self._stop_helpers()
+
+    def restart_requested(self) -> bool:
+        return self._restart
+
+    def _handle_terminate(self, signum: int, stackframe: Optional[FrameType]) -> None:
+        self._terminate = True
+
+    def _handle_restart(self, signum: int, stackframe: Optional[FrameType]) -> None:
+        self._restart = True
+
+    def _spawn_helper(self, listener: socket.socket) -> None:
+        pid = os.fork()
+        if pid:
+            self._helper_pids.add(pid)
+            return
+
+        exit_code = 0
+        try:
+            self._serve(listener)
+        except Exception:
+            logger.exception("Helper %d crashed", os.getpid())
+            exit_code = 1
+        finally:
+            # Never return to the code of the master process
+            os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _reap_helpers(self) -> None:
+        while self._helper_pids:
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.ECHILD:
+                    self._helper_pids.clear()
+                    return
+                raise
+
+            if not pid:
+                return
+
+            self._helper_pids.discard(pid)
+
+    def _stop_helpers(self) -> None:
+        for pid in self._helper_pids:
+            with contextlib.suppress(OSError):
+                os.kill(pid, signal.SIGTERM)
+
+        for pid in self._helper_pids:
+            with contextlib.suppress(OSError):
+                os.waitpid(pid, 0)
+        self._helper_pids.clear()
+
+    #
+    # Helper
+    #
+
+    def _serve(self, listener: socket.socket) -> None:
+        self._terminate = False
+        signal.signal(signal.SIGTERM, self._handle_terminate)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        listener.settimeout(1.0)
+
+        for _unused_num_requests in range(self._max_requests):
+            conn = self._accept(listener)
+            if conn is None:
+                return
+
+            with conn:
+                if not self.handle_connection(conn):
+                    return
+
+    def _accept(self, listener: socket.socket) -> Optional[socket.socket]:
+        """Wait for the next client, regularly checking whether or not the helper is needed"""
+        while not self._terminate and os.getppid() == self._master_pid:
+            try:
+                conn, _addr = listener.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(None)
+            return conn
+        return None
+
+    def handle_connection(self, conn: socket.socket) -> bool:
+        """Process a single request and tell whether or not the helper may process more"""
+        request = _parse_request(_receive_line(conn))
+        if request is None:
+            return True
+
+        if request["serial"] != self.serial:
+            # The helper works with another config. Let the client do the work until the
+            # master has restarted the pool with the current configuration.
+            conn.sendall(b"%d\n" % RETRY_LOCALLY)
+            return False
+
+        status, output = self.execute_check(request)
+        with contextlib.suppress(socket.error):
+            conn.sendall(b"%d\n" % status + output.encode("utf-8"))
+        return True
+
+    def execute_check(self, request: Dict[str, Any]) -> Tuple[int, str]:
+        """Run the check in the same way the precompiled host check would do"""
+        host_name = request["host_name"]
+        orig_ipaddresses, orig_ipv6addresses = config.ipaddresses, config.ipv6addresses
+        config.ipaddresses = request["ipaddresses"]
+        config.ipv6addresses = request["ipv6addresses"]
+
+        stdout = io.StringIO()
+        try:
+            signal.signal(signal.SIGALRM, _raise_check_timeout)
+            signal.alarm(self._timeout)
+            with contextlib.redirect_stdout(stdout):
+                status = checking.do_check(host_name, None)
+        except Exception as e:
+            if cmk.utils.debug.enabled():
+                raise
+            logger.exception("Exception while checking %s", host_name)
+            stdout.write("UNKNOWN - Exception in precompiled check: %s\n" % e)
+            status = 3
+        finally:
+            signal.alarm(0)
+            config.ipaddresses = orig_ipaddresses
+            config.ipv6addresses = orig_ipv6addresses
+            runtime_cache.clear_all()
+            # An interrupted check may have left locks behind, e.g. on the item states
+            store.release_all_locks()
+
+        return status, stdout.getvalue()
+
+
+def _receive_line(conn: socket.socket) -> bytes:
+    data = b""
+    while not data.endswith(b"\n") and len(data) < _MAX_REQUEST_SIZE:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _parse_request(data: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        request = ast.literal_eval(data.decode("utf-8"))
+    except (ValueError, SyntaxError, UnicodeDecodeError):
+        logger.error("Invalid request: %r", data)
+        return None
+
+    if not isinstance(request, dict) or not _REQUEST_KEYS <= set(request):
+        logger.error("Invalid request: %r", data)
+        return None
+    return request
+
+
+def _open_listener(path: str) -> socket.socket:
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o660)
+    listener.listen(128)
+    return listener
+
+
+def _restart_master() -> NoReturn:
+    """Load the new configuration and plugins by restarting from scratch"""
+    os.putenv(_RESTART_ENV, "1")
+    daemon.closefrom(3)
+    os.execvp("cmk", sys.argv)
+
+
+def run(*, num_helpers: int, timeout: int, max_requests: int, foreground: bool) -> None:
+    """Entry point of the "cmk --check-helper-pool" mode"""
+    serial = current_serial()
+    if serial is None:
+        raise MKGeneralException("No helper config found. Please execute \"cmk -U\" first.")
+
+    if not foreground and os.getenv(_RESTART_ENV) != "1":
+        daemon.daemonize()
+
+    if not foreground:
+        log.open_log(cmk.utils.paths.log_dir + "/check-helper-pool.log")
+
+    daemon.set_procname(b"cmk-check-helper-pool")
+
+    with daemon.pid_file_lock(Path(cmk.utils.paths.check_helper_pool_pid_file)):
+        config.load_all_agent_based_plugins(check_api.get_check_api_context)
+        # Not the latest config, it may already be newer than the serial the pool reports
+        config.load_packed_config(serial=ConfigSerial(serial))
+
+        listener = _open_listener(cmk.utils.paths.check_helper_pool_socket)
+        pool = CheckHelperPool(
+            serial=serial,
+            num_helpers=num_helpers,
+            timeout=timeout,
+            max_requests=max_requests,
+        )
+        logger.info("Started %d helpers with config serial %s (PID %d)", num_helpers, serial,
+                    os.getpid())
+
+        try:
+            pool.run(listener)
+        finally:
+            listener.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(cmk.utils.paths.check_helper_pool_socket)
+
+        if pool.restart_requested():
+            logger.info("Restarting to load the current configuration")
+            _restart_master()
+
+    logger.info("Terminated")
@@ -45,6 +45,7 @@ import cmk.base.config as config
 import cmk.base.core_config as core_config
 import cmk.base.sources as sources
 import cmk.base.ip_lookup as ip_lookup
+import cmk.base.check_helper_pool as check_helper_pool
 
 from cmk.base.check_utils import ServiceID
 from cmk.base.config import ConfigCache, HostConfig, ObjectAttributes
@@ -1007,6 +1008,8 @@ def _dump_precompiled_hostcheck(config_cache: ConfigCache,
     )):
         return None
 
+    needed_ipaddresses, needed_ipv6addresses = _get_needed_ip_addresses(config_cache, host_config)
+
     output = StringIO()
     output.write("#!/usr/bin/env python3\n")
     output.write("# encoding: utf-8\n\n")
@@ -1041,6 +1044,37 @@ if os.path.islink(%(dst)r):
     # to python module names like "random"
     output.write("sys.path.pop(0)\n")
 
+    # Hand over the check to the check helper pool in case it is running. Once the pool has
+    # accepted the request, the check must not be executed again locally.
+    output.write(
+        """
+if len(sys.argv) == 1:
+    import socket
+    _pool = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        _pool.connect(%(socket)r)
+    except socket.error:
+        pass
+    else:
+        try:
+            _pool.sendall(%(request)r)
+            _status, _output = b"".join(iter(lambda: _pool.recv(65536), b"")).split(b"\\n", 1)
+            _status = int(_status)
+        except (socket.error, ValueError):
+            sys.stdout.write("UNKNOWN - Got no valid answer from the check helper pool\\n")
+            sys.exit(3)
+        if _status != %(retry_locally)d:
+            sys.stdout.buffer.write(_output)
+            sys.exit(_status)
+    _pool.close()
+
+""" % {
+            "socket": cmk.utils.paths.check_helper_pool_socket,
+            "request": check_helper_pool.make_request(hostname, serial, needed_ipaddresses,
+                                                      needed_ipv6addresses),
+            "retry_locally": check_helper_pool.RETRY_LOCALLY,
+        })
+
     output.write("import cmk.utils.log\n")
     output.write("import cmk.utils.debug\n")
     output.write("from cmk.utils.exceptions import MKTerminate\n")
@@ -1048,10 +1082,8 @@ if os.path.islink(%(dst)r):
     output.write("\n")
     output.write("import cmk.base.utils\n")
     output.write("import cmk.base.config as config\n")
-    output.write("from cmk.utils.log import console\n")
     output.write("import cmk.base.checking as checking\n")
     output.write("import cmk.base.check_api as check_api\n")
-    output.write("import cmk.base.ip_lookup as ip_lookup\n")
     output.write("\n")
     for module in _get_needed_agent_based_modules(
             needed_agent_based_check_plugin_names,
@@ -1091,8 +1123,48 @@ if '-d' in sys.argv:
 
     output.write("config.load_packed_config(serial=LATEST_SERIAL)\n")
 
-    # IP addresses
-    needed_ipaddresses, needed_ipv6addresses, = {}, {}
+    # Only the checked host (and its nodes or clusters) are processed. This makes the ruleset
+    # optimizer match the rules against these hosts instead of all hosts of the site.
+    output.write(
+        "config.get_config_cache().ruleset_matcher.ruleset_optimizer.set_all_processed_hosts({%r})\n"
+        % hostname)
+
+    output.write("config.ipaddresses = %r\n\n" % needed_ipaddresses)
+    output.write("config.ipv6addresses = %r\n\n" % needed_ipv6addresses)
+
+    # perform actual check with a general exception handler
+    output.write("try:\n")
+    output.write("    sys.exit(checking.do_check(%r, None))\n" % hostname)
+    output.write("except MKTerminate:\n")
+    output.write("    import cmk.base.obsolete_output as out\n")
+    output.write("    out.output('<Interrupted>\\n', stream=sys.stderr)\n")
+    output.write("    sys.exit(1)\n")
+    output.write("except SystemExit as e:\n")
+    output.write("    sys.exit(e.code)\n")
+    output.write("except Exception as e:\n")
+    output.write("    import traceback, pprint\n")
+
+    # status output message
+    output.write(
+        "    sys.stdout.write(\"UNKNOWN - Exception in precompiled check: %s (details in long output)\\n\" % e)\n"
+    )
+
+    # generate traceback for long output
+    output.write("    sys.stdout.write(\"Traceback: %s\\n\" % traceback.format_exc())\n")
+
+    output.write("\n")
+    output.write("    sys.exit(3)\n")
+
+    return output.getvalue()
+
+
+def _get_needed_ip_addresses(
+    config_cache: ConfigCache,
+    host_config: HostConfig,
+) -> Tuple[Dict[HostName, Optional[HostAddress]], Dict[HostName, Optional[HostAddress]]]:
+    hostname = host_config.hostname
+    needed_ipaddresses: Dict[HostName, Optional[HostAddress]] = {}
+    needed_ipv6addresses: Dict[HostName, Optional[HostAddress]] = {}
     if host_config.is_cluster:
         if host_config.nodes is None:
             raise TypeError()
@@ -1123,32 +1195,7 @@ if '-d' in sys.argv:
         if host_config.is_ipv6_host:
             needed_ipv6addresses[hostname] = ip_lookup.lookup_ipv6_address(host_config)
 
-    output.write("config.ipaddresses = %r\n\n" % needed_ipaddresses)
-    output.write("config.ipv6addresses = %r\n\n" % needed_ipv6addresses)
-
-    # perform actual check with a general exception handler
-    output.write("try:\n")
-    output.write("    sys.exit(checking.do_check(%r, None))\n" % hostname)
-    output.write("except MKTerminate:\n")
-    output.write("    out.output('<Interrupted>\\n', stream=sys.stderr)\n")
-    output.write("    sys.exit(1)\n")
-    output.write("except SystemExit as e:\n")
-    output.write("    sys.exit(e.code)\n")
-    output.write("except Exception as e:\n")
-    output.write("    import traceback, pprint\n")
-
-    # status output message
-    output.write(
-        "    sys.stdout.write(\"UNKNOWN - Exception in precompiled check: %s (details in long output)\\n\" % e)\n"
-    )
-
-    # generate traceback for long output
-    output.write("    sys.stdout.write(\"Traceback: %s\\n\" % traceback.format_exc())\n")
-
-    output.write("\n")
-    output.write("    sys.exit(3)\n")
-
-    return output.getvalue()
+    return needed_ipaddresses, needed_ipv6addresses
 
 
 def _get_needed_plugin_names(
@@ -23,6 +23,10 @@ notification_rules: _List[_Dict[str, _Any]] = []
 # Check every 10 seconds for ripe bulks
 notification_bulk_interval = 10
 notification_plugin_timeout = 60
+# Plugin name -> timeout, overrides notification_plugin_timeout
+notification_plugin_timeouts: _Dict[str, int] = {}
+# Plugin name -> number of parallel executions of the plugin (default 1)
+notification_plugin_concurrency: _Dict[str, int] = {}
 
 # Notification Spooling.
 
@@ -14,7 +14,7 @@ import select
 import socket
 import time
 from urllib.parse import quote
-from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from six import ensure_str
 
@@ -22,6 +22,7 @@ import livestatus
 import cmk.utils.version as cmk_version
 from cmk.utils.regex import regex
 import cmk.utils.debug
+import cmk.utils.rulesets.tuple_rulesets as tuple_rulesets
 import cmk.utils.daemon
 from cmk.utils.type_defs import EventRule
 
@@ -407,26 +408,7 @@ def apply_matchers(matchers: Iterable[Matcher], rule: EventRule,
 
 
 def event_match_rule(rule: EventRule, context: EventContext) -> Optional[str]:
-    return apply_matchers([
-        event_match_site,
-        event_match_folder,
-        event_match_hosttags,
-        event_match_hostgroups,
-        event_match_servicegroups_fixed,
-        event_match_exclude_servicegroups_fixed,
-        event_match_servicegroups_regex,
-        event_match_exclude_servicegroups_regex,
-        event_match_contacts,
-        event_match_contactgroups,
-        event_match_hosts,
-        event_match_exclude_hosts,
-        event_match_services,
-        event_match_exclude_services,
-        event_match_plugin_output,
-        event_match_checktype,
-        event_match_timeperiod,
-        event_match_servicelevel,
-    ], rule, context)
+    return apply_matchers([matcher for _key, matcher in _EVENT_RULE_CONDITIONS], rule, context)
 
 
 def event_match_site(rule: EventRule, context: EventContext) -> Optional[str]:
@@ -739,6 +721,111 @@ def event_match_servicelevel(rule: EventRule, context: EventContext) -> Optional
     return None
 
 
+# The conditions of event_match_rule() in the order they are checked, together with the key
+# of the rule configuring them. Each matcher accepts all events in case the key is missing.
+_EVENT_RULE_CONDITIONS: List[Tuple[str, Matcher]] = [
+    ("match_site", event_match_site),
+    ("match_folder", event_match_folder),
+    ("match_hosttags", event_match_hosttags),
+    ("match_hostgroups", event_match_hostgroups),
+    ("match_servicegroups", event_match_servicegroups_fixed),
+    ("match_exclude_servicegroups", event_match_exclude_servicegroups_fixed),
+    ("match_servicegroups_regex", event_match_servicegroups_regex),
+    ("match_exclude_servicegroups_regex", event_match_exclude_servicegroups_regex),
+    ("match_contacts", event_match_contacts),
+    ("match_contactgroups", event_match_contactgroups),
+    ("match_hosts", event_match_hosts),
+    ("match_exclude_hosts", event_match_exclude_hosts),
+    ("match_services", event_match_services),
+    ("match_exclude_services", event_match_exclude_services),
+    ("match_plugin_output", event_match_plugin_output),
+    ("match_checktype", event_match_checktype),
+    ("match_timeperiod", event_match_timeperiod),
+    ("match_sl", event_match_servicelevel),
+]
+
+
+def compile_matchers(conditions: Iterable[Tuple[str, Matcher]], rule: EventRule) -> List[Matcher]:
+    """The matchers of the conditions configured by the rule
+
+    Applying them gives the same result and reason as applying all matchers, but rules
+    matched against many events only pay for the conditions they actually have. Some
+    matchers are replaced by ones with precomputed host sets and service patterns."""
+    matchers = []
+    for key, matcher in conditions:
+        if key not in rule:
+            continue
+        compile_matcher = _MATCHER_COMPILERS.get(matcher)
+        matchers.append(matcher if compile_matcher is None else compile_matcher(rule))
+    return matchers
+
+
+def compile_event_rule_matchers(rule: EventRule) -> List[Matcher]:
+    return compile_matchers(_EVENT_RULE_CONDITIONS, rule)
+
+
+def _compile_match_hosts(rule: EventRule) -> Matcher:
+    hostlist = rule["match_hosts"]
+    hosts = set(hostlist)
+
+    def match_hosts(_rule: EventRule, context: EventContext) -> Optional[str]:
+        if context["HOSTNAME"] not in hosts:
+            return "The host's name '%s' is not on the list of allowed hosts (%s)" % (
+                context["HOSTNAME"], ", ".join(hostlist))
+        return None
+
+    return match_hosts
+
+
+def _compile_match_exclude_hosts(rule: EventRule) -> Matcher:
+    hosts = set(rule["match_exclude_hosts"])
+
+    def match_exclude_hosts(_rule: EventRule, context: EventContext) -> Optional[str]:
+        if context["HOSTNAME"] in hosts:
+            return "The host's name '%s' is on the list of excluded hosts" % context["HOSTNAME"]
+        return None
+
+    return match_exclude_hosts
+
+
+def _compile_match_services(rule: EventRule) -> Matcher:
+    servicelist = rule["match_services"]
+    pattern = tuple_rulesets.convert_pattern_list(servicelist)
+
+    def match_services(_rule: EventRule, context: EventContext) -> Optional[str]:
+        if context["WHAT"] != "SERVICE":
+            return "The rule specifies a list of services, but this is a host notification."
+        service = context["SERVICEDESC"]
+        if pattern is None or pattern.match(service) is None:
+            return "The service's description '%s' does not match by the list of " \
+                   "allowed services (%s)" % (service, ", ".join(servicelist))
+        return None
+
+    return match_services
+
+
+def _compile_match_exclude_services(rule: EventRule) -> Matcher:
+    pattern = tuple_rulesets.convert_pattern_list(rule["match_exclude_services"])
+
+    def match_exclude_services(_rule: EventRule, context: EventContext) -> Optional[str]:
+        if context["WHAT"] != "SERVICE":
+            return None
+        if pattern is not None and pattern.match(context["SERVICEDESC"]) is not None:
+            return ("The service's description '%s' matches the list of excluded services" %
+                    context["SERVICEDESC"])
+        return None
+
+    return match_exclude_services
+
+
+_MATCHER_COMPILERS: Dict[Matcher, Callable[[EventRule], Matcher]] = {
+    event_match_hosts: _compile_match_hosts,
+    event_match_exclude_hosts: _compile_match_exclude_hosts,
+    event_match_services: _compile_match_services,
+    event_match_exclude_services: _compile_match_exclude_services,
+}
+
+
 def add_context_to_environment(plugin_context: EventContext, prefix: str) -> None:
     for key in plugin_context:
         os.putenv(prefix + key, plugin_context[key].encode('utf-8'))
@@ -26,6 +26,8 @@ from typing import (
 
 import cmk.utils.cleanup
 import cmk.utils.debug
+import cmk.utils.inventory_history as inventory_history
+import cmk.utils.inventory_index as inventory_index
 import cmk.utils.misc
 import cmk.utils.paths
 import cmk.utils.store as store
@@ -323,6 +325,8 @@ def _cleanup_status_data(hostname: HostName) -> None:
         os.remove(filepath)
     with suppress(OSError):
         os.remove(filepath + ".gz")
+    with suppress(OSError):
+        os.remove(filepath + ".bin")
 
 
 def _do_inv_for_cluster(host_config: config.HostConfig) -> InventoryTrees:
@@ -529,26 +533,68 @@ def _save_inventory_tree(
             os.remove(filepath)
         if os.path.exists(filepath + ".gz"):
             os.remove(filepath + ".gz")
+        if os.path.exists(filepath + ".bin"):
+            os.remove(filepath + ".bin")
+        _update_inventory_index(hostname, None)
         return None
 
     old_tree = StructuredDataTree().load_from(filepath)
     old_tree.normalize_nodes()
     if old_tree.is_equal(inventory_tree):
         console.verbose("Inventory was unchanged\n")
+        # Index the tree in case the index has been removed or the file has been replaced
+        _update_inventory_index(hostname, inventory_tree)
         return None
 
+    arcdir = "%s/%s" % (cmk.utils.paths.inventory_archive_dir, hostname)
+    previous_timestamp: Optional[str] = None
     if old_tree.is_empty():
         console.verbose("New inventory tree\n")
     else:
         console.verbose("Inventory tree has changed\n")
-        old_time = os.stat(filepath).st_mtime
-        arcdir = "%s/%s" % (cmk.utils.paths.inventory_archive_dir, hostname)
+        previous_timestamp = "%d" % os.stat(filepath).st_mtime
         store.makedirs(arcdir)
-        os.rename(filepath, arcdir + ("/%d" % old_time))
+        os.rename(filepath, arcdir + "/" + previous_timestamp)
     inventory_tree.save_to(cmk.utils.paths.inventory_output_dir, hostname)
+    _update_inventory_index(hostname, inventory_tree)
+
+    if previous_timestamp is None and os.path.isdir(arcdir) and os.listdir(arcdir):
+        # After an empty inventory tree the history continues with the latest archived tree.
+        # Leave this rare case to the GUI instead of loading this tree here.
+        return old_tree
+    _save_inventory_delta(hostname, previous_timestamp, inventory_tree, old_tree)
     return old_tree
 
 
+def _save_inventory_delta(hostname: HostName, previous_timestamp: Optional[str],
+                          inventory_tree: StructuredDataTree, old_tree: StructuredDataTree) -> None:
+    """The delta is only an optimization for the GUI history, don't fail the inventory because
+    of it"""
+    try:
+        timestamp = "%d" % os.stat(cmk.utils.paths.inventory_output_dir + "/" + hostname).st_mtime
+        inventory_history.save_delta(hostname,
+                                     inventory_history.delta_name(previous_timestamp, timestamp),
+                                     inventory_tree.compare_with(old_tree))
+    except Exception as e:
+        if cmk.utils.debug.enabled():
+            raise
+        console.warning("Failed to save the inventory history delta: %s", e)
+
+
+def _update_inventory_index(hostname: HostName,
+                            inventory_tree: Optional[StructuredDataTree]) -> None:
+    """The index is only an optimization for the GUI, don't fail the inventory because of it"""
+    try:
+        if inventory_tree is None:
+            inventory_index.remove_host(hostname)
+        else:
+            inventory_index.update_host(hostname, inventory_tree.get_raw_tree())
+    except Exception as e:
+        if cmk.utils.debug.enabled():
+            raise
+        console.warning("Failed to update the inventory index: %s", e)
+
+
 def _save_status_data_tree(hostname: HostName, status_data_tree: StructuredDataTree) -> None:
     if status_data_tree and not status_data_tree.is_empty():
         store.makedirs(cmk.utils.paths.status_data_dir)
@@ -1671,6 +1671,72 @@ modes.register(
              ),
          ]))
 
+#.
+#   .--helper-pool---------------------------------------------------------.
+#   |        _          _                                        _         |
+#   |       | |__   ___| |_ __   ___ _ __      _ __   ___   ___ | |        |
+#   |       | '_ \ / _ \ | '_ \ / _ \ '__|____| '_ \ / _ \ / _ \| |        |
+#   |       | | | |  __/ | |_) |  __/ | |_____| |_) | (_) | (_) | |        |
+#   |       |_| |_|\___|_| .__/ \___|_|       | .__/ \___/ \___/|_|        |
+#   |                    |_|                  |_|                          |
+#   '----------------------------------------------------------------------'
+
+
+def mode_check_helper_pool(options: Dict) -> None:
+    import cmk.base.check_helper_pool as check_helper_pool  # pylint: disable=import-outside-toplevel
+    check_helper_pool.run(
+        num_helpers=options.get("helpers", 4),
+        timeout=options.get("timeout", 60),
+        max_requests=options.get("max-requests", 1000),
+        foreground="foreground" in options,
+    )
+
+
+modes.register(
+    Mode(
+        long_option="check-helper-pool",
+        handler_function=mode_check_helper_pool,
+        needs_config=False,
+        needs_checks=False,
+        short_help="Start the pool of check helpers for the Nagios core",
+        long_help=[
+            "Starts a pool of pre-forked processes which execute the checks of the "
+            "precompiled host checks. The helpers load the plugins and the latest "
+            "helper configuration only once instead of once per check execution. "
+            "The precompiled host checks execute the check on their own in case the "
+            "pool is not running. The pool restarts itself once a new helper "
+            "configuration has been created. It is started by the OMD init script "
+            "in case the site option CHECK_HELPER_POOL is enabled.",
+        ],
+        sub_options=[
+            Option(
+                long_option="helpers",
+                argument=True,
+                argument_descr="N",
+                argument_conv=int,
+                short_help="Number of helper processes (defaults to 4)",
+            ),
+            Option(
+                long_option="timeout",
+                argument=True,
+                argument_descr="S",
+                argument_conv=int,
+                short_help="Abort a single check after S seconds (defaults to 60)",
+            ),
+            Option(
+                long_option="max-requests",
+                argument=True,
+                argument_descr="N",
+                argument_conv=int,
+                short_help="Replace a helper after N checks (defaults to 1000)",
+            ),
+            Option(
+                long_option="foreground",
+                short_help="Do not daemonize and log to the console",
+            ),
+        ],
+    ))
+
 #.
 #   .--inventory-----------------------------------------------------------.
 #   |             _                      _                                 |
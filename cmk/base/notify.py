@@ -20,11 +20,13 @@ import io
 import logging
 import os
 import re
+import select
 import signal
 import subprocess
 import sys
+import threading
 import time
-from typing import Dict, Tuple, List, Any, Optional, FrozenSet, Set, Union, cast
+from typing import Callable, Dict, Tuple, List, Any, Optional, FrozenSet, Set, Union, cast
 import traceback
 import uuid
 
@@ -83,6 +85,8 @@ NotifyAnalysisInfo = Tuple[List[NotifyRuleInfo], List[NotifyPluginInfo]]
 UUIDs = List[Tuple[float, str]]
 NotifyBulk = Tuple[str, float, Union[None, str, int], Union[None, str, int], int, UUIDs]
 NotifyBulks = List[NotifyBulk]
+# Bulk directory -> (number of notifications, mtime of the oldest one, mtime_ns of the directory)
+BulkIndex = Dict[str, Tuple[int, float, int]]
 
 NotificationPluginNameStr = str
 PluginContext = Dict[str, str]
@@ -102,6 +106,8 @@ NotificationKey = Tuple[ContactNames, NotificationPluginNameStr]
 NotificationValue = Tuple[bool, NotifyPluginParams, Optional[NotifyBulkParameters]]
 Notifications = Dict[NotificationKey, NotificationValue]
 
+ContactGroupMembers = Dict[str, Set[ContactName]]
+
 #   .--Configuration-------------------------------------------------------.
 #   |    ____             __ _                       _   _                 |
 #   |   / ___|___  _ __  / _(_) __ _ _   _ _ __ __ _| |_(_) ___  _ __      |
@@ -430,11 +436,17 @@ def notification_analyse_backlog(nr: int) -> Optional[NotifyAnalysisInfo]:
 
 # TODO: Make use of the generic do_keepalive() mechanism?
 def notify_keepalive() -> None:
+    global _compiled_rules, _dispatcher
     cmk.base.utils.register_sigint_handler()
+    # The rules are compiled only once. The helper restarts itself when the configuration has
+    # changed, see events.event_keepalive().
+    _compiled_rules = compile_notification_rules()
+    _dispatcher = NotificationDispatcher()
     events.event_keepalive(
         event_function=notify_notify,
         call_every_loop=send_ripe_bulks,
         loop_interval=config.notification_bulk_interval,
+        shutdown_function=_dispatcher.wait,
     )
 
 
@@ -467,10 +479,11 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
     num_rule_matches = 0
     rule_info = []
 
-    for rule in config.notification_rules + user_notification_rules():
+    compiled_rules = _compiled_rules or compile_notification_rules()
+    for rule, matchers in compiled_rules.rules:
         contact_info = _get_contact_info_text(rule)
 
-        why_not = rbn_match_rule(rule, raw_context)
+        why_not = events.apply_matchers(matchers, rule, raw_context)
         if why_not:
             logger.log(log.VERBOSE, contact_info)
             logger.log(log.VERBOSE, " -> does not match: %s", why_not)
@@ -481,7 +494,7 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
             num_rule_matches += 1
 
             notifications, rule_info = _create_notifications(raw_context, rule, notifications,
-                                                             rule_info)
+                                                             rule_info, compiled_rules)
 
     plugin_info = _process_notifications(raw_context, notifications, num_rule_matches, analyse)
 
@@ -495,9 +508,13 @@ def _get_contact_info_text(rule: EventRule) -> str:
 
 
 def _create_notifications(
-        raw_context: EventContext, rule: EventRule, notifications: Notifications,
-        rule_info: List[NotifyRuleInfo]) -> Tuple[Notifications, List[NotifyRuleInfo]]:
-    contacts = rbn_rule_contacts(rule, raw_context)
+    raw_context: EventContext,
+    rule: EventRule,
+    notifications: Notifications,
+    rule_info: List[NotifyRuleInfo],
+    compiled_rules: Optional["CompiledNotificationRules"] = None,
+) -> Tuple[Notifications, List[NotifyRuleInfo]]:
+    contacts = rbn_rule_contacts(rule, raw_context, compiled_rules)
     contactstxt = ", ".join(contacts)
 
     # Handle old-style and new-style rules
@@ -595,7 +612,9 @@ def _process_notifications(raw_context: EventContext, notifications: Notificatio
             else:
                 logger.info("No rule matched, would notify fallback contacts, but none configured")
     else:
-        # Now do the actual notifications
+        # Now do the actual notifications. The keepalive mode keeps on processing the next
+        # events while the plugins are executed.
+        dispatcher = _dispatcher or NotificationDispatcher()
         logger.info("Executing %d notifications:", len(notifications))
         for (contacts, plugin_name), (_locked, params, bulk) in sorted(notifications.items()):
             verb = "would notify" if analyse else "notifying"
@@ -629,13 +648,16 @@ def _process_notifications(raw_context: EventContext, notifications: Notificatio
                     elif config.notification_spooling in ("local", "both"):
                         create_spoolfile({"context": context, "plugin": plugin_name})
                     else:
-                        call_notification_script(plugin_name, context)
+                        dispatcher.submit(plugin_name, context)
 
             except Exception:
                 if cmk.utils.debug.enabled():
                     raise
                 logger.exception("    ERROR:")
 
+        if dispatcher is not _dispatcher:
+            dispatcher.wait()
+
     return plugin_info
 
 
@@ -796,15 +818,7 @@ def rbn_match_rule(rule: EventRule, context: EventContext) -> Optional[str]:
     return events.apply_matchers([
         rbn_match_rule_disabled,
         events.event_match_rule,
-        rbn_match_escalation,
-        rbn_match_escalation_throtte,
-        rbn_match_host_event,
-        rbn_match_service_event,
-        rbn_match_notification_comment,
-        rbn_match_hostlabels,
-        rbn_match_servicelabels,
-        rbn_match_event_console,
-    ], rule, context)
+    ] + [matcher for _key, matcher in _RBN_RULE_CONDITIONS], rule, context)
 
 
 def rbn_match_rule_disabled(rule: EventRule, _context: EventContext) -> Optional[str]:
@@ -905,7 +919,9 @@ def rbn_match_event(context: EventContext, state: str, last_state: str, event_ma
                                                                           ", ".join(allowed_events))
 
 
-def rbn_rule_contacts(rule: EventRule, context: EventContext) -> ContactNames:
+def rbn_rule_contacts(rule: EventRule,
+                      context: EventContext,
+                      compiled_rules: Optional["CompiledNotificationRules"] = None) -> ContactNames:
     the_contacts = set()
     if rule.get("contact_object"):
         the_contacts.update(rbn_object_contact_names(context))
@@ -916,7 +932,10 @@ def rbn_rule_contacts(rule: EventRule, context: EventContext) -> ContactNames:
     if "contact_users" in rule:
         the_contacts.update(rule["contact_users"])
     if "contact_groups" in rule:
-        the_contacts.update(rbn_groups_contacts(rule["contact_groups"]))
+        the_contacts.update(
+            rbn_groups_contacts(
+                rule["contact_groups"],
+                None if compiled_rules is None else compiled_rules.contactgroup_members()))
     if "contact_emails" in rule:
         the_contacts.update(rbn_emails_contacts(rule["contact_emails"]))
 
@@ -1075,6 +1094,28 @@ def rbn_match_event_console(rule: EventRule, context: EventContext) -> Optional[
     return None
 
 
+# The conditions of rbn_match_rule() checked after the ones of events.event_match_rule(),
+# see also events.compile_matchers()
+_RBN_RULE_CONDITIONS: List[Tuple[str, events.Matcher]] = [
+    ("match_escalation", rbn_match_escalation),
+    ("match_escalation_throttle", rbn_match_escalation_throtte),
+    ("match_host_event", rbn_match_host_event),
+    ("match_service_event", rbn_match_service_event),
+    ("match_notification_comment", rbn_match_notification_comment),
+    ("match_hostlabels", rbn_match_hostlabels),
+    ("match_servicelabels", rbn_match_servicelabels),
+    ("match_ec", rbn_match_event_console),
+]
+
+
+def compile_rbn_rule_matchers(rule: EventRule) -> List[events.Matcher]:
+    """The matchers giving the same result as rbn_match_rule() for this rule"""
+    matchers: List[events.Matcher] = [rbn_match_rule_disabled] if rule.get("disabled") else []
+    matchers += events.compile_event_rule_matchers(rule)
+    matchers += events.compile_matchers(_RBN_RULE_CONDITIONS, rule)
+    return matchers
+
+
 def rbn_object_contact_names(context: EventContext) -> List[ContactName]:
     commasepped = context.get("CONTACTS")
     if commasepped == "?":
@@ -1095,17 +1136,24 @@ def rbn_all_contacts(with_email: bool = False) -> List[ContactId]:
     return [contact_id for (contact_id, contact) in config.contacts.items() if contact.get("email")]
 
 
-def rbn_groups_contacts(groups: List[str]) -> Set[str]:
+def rbn_groups_contacts(groups: List[str],
+                        contactgroup_members: Optional[ContactGroupMembers] = None) -> Set[str]:
     if not groups:
         return set()
 
+    if contactgroup_members is not None:
+        contacts: Set[ContactName] = set()
+        for group in groups:
+            contacts.update(contactgroup_members.get(group, ()))
+        return contacts
+
     query = "GET contactgroups\nColumns: members\n"
     for group in groups:
         query += "Filter: name = %s\n" % group
     query += "Or: %d\n" % len(groups)
 
     try:
-        contacts: Set[ContactName] = set()
+        contacts = set()
         for contact_list in livestatus.LocalConnection().query_column(query):
             contacts.update(contact_list)
         return contacts
@@ -1123,6 +1171,47 @@ def rbn_emails_contacts(emails: List[str]) -> List[str]:
     return ["mailto:" + e for e in emails]
 
 
+def rbn_all_contactgroup_members() -> Optional[ContactGroupMembers]:
+    """The members of all contact groups, None in case they cannot be fetched"""
+    try:
+        return {
+            name: set(members) for name, members in livestatus.LocalConnection().query(
+                "GET contactgroups\nColumns: name members\n")
+        }
+    except livestatus.MKLivestatusNotFoundError:
+        return None
+    except Exception:
+        if cmk.utils.debug.enabled():
+            raise
+        return None
+
+
+class CompiledNotificationRules:
+    """The global and user notification rules prepared for matching many events
+
+    Each rule only checks the conditions it has, see events.compile_matchers(). The members
+    of the contact groups are fetched once instead of once per matching rule and event."""
+    def __init__(self, rules: List[EventRule]) -> None:
+        super().__init__()
+        self.rules: List[Tuple[EventRule, List[events.Matcher]]] = [
+            (rule, compile_rbn_rule_matchers(rule)) for rule in rules
+        ]
+        self._contactgroup_members: Optional[ContactGroupMembers] = None
+
+    def contactgroup_members(self) -> Optional[ContactGroupMembers]:
+        if self._contactgroup_members is None:
+            # Not remembered in case of an error, try again with the next event
+            self._contactgroup_members = rbn_all_contactgroup_members()
+        return self._contactgroup_members
+
+
+def compile_notification_rules() -> CompiledNotificationRules:
+    return CompiledNotificationRules(config.notification_rules + user_notification_rules())
+
+
+# Only set in keepalive mode, see notify_keepalive()
+_compiled_rules: Optional[CompiledNotificationRules] = None
+
 #.
 #   .--Flexible-Notifications----------------------------------------------.
 #   |                  _____ _           _ _     _                         |
@@ -1467,47 +1556,85 @@ def call_notification_script(plugin_name: NotificationPluginNameStr,
     def plugin_log(s: str) -> None:
         logger.info("     %s", s)
 
+    def plugin_output(line: str) -> None:
+        if _log_to_stdout:
+            out.output(ensure_str(line))
+
     # The "Pseudo"-Plugin None means builtin plain email
     if not plugin_name:
         return notify_via_email(plugin_context)
 
+    return _execute_notification_script(plugin_name, plugin_context, plugin_log, plugin_output)
+
+
+def notification_plugin_timeout(plugin_name: NotificationPluginNameStr) -> int:
+    return config.notification_plugin_timeouts.get(plugin_name, config.notification_plugin_timeout)
+
+
+# Seconds a notification plugin has to exit after SIGTERM, then it is killed
+_plugin_terminate_timeout = 5
+
+
+def _execute_notification_script(plugin_name: NotificationPluginNameStr,
+                                 plugin_context: PluginContext, plugin_log: Callable[[str], None],
+                                 plugin_output: Callable[[str], None]) -> int:
+    """Execute the notification plugin, may be called from any thread"""
     # Call actual script without any arguments
     path = path_to_notification_script(plugin_name)
     if not path:
         return 2
 
     plugin_log("executing %s" % path)
+    exitcode = 1
+    timeout = notification_plugin_timeout(plugin_name)
+    deadline = time.time() + timeout
+    p = subprocess.Popen([path],
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT,
+                         env=notification_script_env(plugin_context),
+                         close_fds=True)
+    stdout = p.stdout
+    assert stdout is not None
     try:
-        set_notification_timeout()
-        p = subprocess.Popen([path],
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.STDOUT,
-                             env=notification_script_env(plugin_context),
-                             encoding="utf-8",
-                             close_fds=True)
-
-        stdout = p.stdout
-        assert stdout is not None
+        # read and output stdout linewise to ensure we don't force python to produce
+        # one - potentially huge - memory buffer. The SIGALRM based timeout can not be used
+        # here, it only works in the main thread.
+        finished = False
+        buf = b""
         while True:
-            # read and output stdout linewise to ensure we don't force python to produce
-            # one - potentially huge - memory buffer
-            line = stdout.readline()
-            if line != '':
-                plugin_log("Output: %s" % line.rstrip())
-                if _log_to_stdout:
-                    out.output(ensure_str(line))
-            else:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
                 break
-        # the stdout is closed but the return code may not be available just yet - wait for the
-        # process to actually finish
-        exitcode = p.wait()
-        clear_notification_timeout()
-    except NotificationTimeout:
-        plugin_log("Notification plugin did not finish within %d seconds. Terminating." %
-                   config.notification_plugin_timeout)
-        # p.kill() requires python 2.6!
+
+            chunk = os.read(stdout.fileno(), 32768)
+            if not chunk:
+                # the stdout is closed but the return code may not be available just yet -
+                # wait for the process to actually finish
+                exitcode = p.wait(timeout=max(0, deadline - time.time()))
+                finished = True
+                break
+
+            *lines, buf = (buf + chunk).split(b"\n")
+            for line in lines:
+                plugin_log("Output: %s" % line.decode("utf-8").rstrip())
+                plugin_output(line.decode("utf-8") + "\n")
+        if buf:
+            plugin_log("Output: %s" % buf.decode("utf-8").rstrip())
+            plugin_output(buf.decode("utf-8"))
+    except subprocess.TimeoutExpired:
+        pass
+    finally:
+        stdout.close()
+
+    if not finished:
+        plugin_log("Notification plugin did not finish within %d seconds. Terminating." % timeout)
         os.kill(p.pid, signal.SIGTERM)
-        exitcode = 1
+        # Reap the plugin, the process may live on for many notifications
+        try:
+            p.wait(timeout=_plugin_terminate_timeout)
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.wait()
 
     if exitcode != 0:
         plugin_log("Plugin exited with code %d" % exitcode)
@@ -1515,6 +1642,99 @@ def call_notification_script(plugin_name: NotificationPluginNameStr,
     return exitcode
 
 
+class _NotificationJob:
+    def __init__(self, plugin_name: NotificationPluginNameStr,
+                 plugin_context: PluginContext) -> None:
+        super().__init__()
+        self.plugin_name = plugin_name
+        self.plugin_context = plugin_context
+        # The notifications of a contact about an object are sent in order
+        self.keys = {(contact, plugin_context.get("HOSTNAME",
+                                                  ""), plugin_context.get("SERVICEDESC", ""))
+                     for contact in plugin_context.get("CONTACTNAME", "").split(",")}
+        self.log_lines: List[str] = []
+        self.output_lines: List[str] = []
+        self.exc_info: Any = None
+
+
+class NotificationDispatcher:
+    """Executes the notification plugins in parallel
+
+    Each plugin is executed at most notification_plugin_concurrency[plugin] (default 1) times
+    in parallel. The notifications of a contact about a host or service are executed in the
+    order they have been submitted. The log lines of a plugin are collected and logged
+    together once it has finished.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Condition()
+        self._waiting: List[_NotificationJob] = []
+        self._running: List[_NotificationJob] = []
+
+    def submit(self, plugin_name: NotificationPluginNameStr, plugin_context: PluginContext) -> None:
+        job = _NotificationJob(plugin_name, plugin_context)
+        if not plugin_name:
+            # The plain email changes the environment of the process, see notify_via_email()
+            self._wait(job.keys)
+            call_notification_script(plugin_name, plugin_context)
+            return
+
+        _log_to_history(
+            notification_message(NotificationPluginName(plugin_name),
+                                 NotificationContext(plugin_context)))
+        with self._lock:
+            self._waiting.append(job)
+            self._start_jobs()
+
+    def wait(self) -> None:
+        """Wait for all submitted notifications to be finished"""
+        self._wait(None)
+
+    def _wait(self, keys: Optional[Set[Tuple[str, str, str]]]) -> None:
+        with self._lock:
+            self._lock.wait_for(lambda: not any(keys is None or not job.keys.isdisjoint(keys)
+                                                for job in self._waiting + self._running))
+
+    def _start_jobs(self) -> None:
+        busy_keys: Set[Tuple[str, str, str]] = set()
+        for job in self._running:
+            busy_keys.update(job.keys)
+
+        for job in list(self._waiting):
+            running = sum(1 for other in self._running if other.plugin_name == job.plugin_name)
+            if (job.keys.isdisjoint(busy_keys) and
+                    running < config.notification_plugin_concurrency.get(job.plugin_name, 1)):
+                self._waiting.remove(job)
+                self._running.append(job)
+                threading.Thread(target=self._execute, args=(job,)).start()
+            # Later notifications of the same contact and object have to wait for this one
+            busy_keys.update(job.keys)
+
+    def _execute(self, job: _NotificationJob) -> None:
+        try:
+            _execute_notification_script(job.plugin_name, job.plugin_context, job.log_lines.append,
+                                         job.output_lines.append)
+        except Exception:
+            job.exc_info = sys.exc_info()
+
+        with self._lock:
+            for line in job.log_lines:
+                logger.info("     %s", line)
+            if job.exc_info:
+                logger.error("    ERROR:", exc_info=job.exc_info)
+            if _log_to_stdout:
+                for line in job.output_lines:
+                    out.output(ensure_str(line))
+
+            self._running.remove(job)
+            self._start_jobs()
+            self._lock.notify_all()
+
+
+# Only set in keepalive mode, see notify_keepalive()
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
 # Construct the environment for the notification script
 def notification_script_env(plugin_context: PluginContext) -> PluginContext:
     # Use half of the maximum allowed string length MAX_ARG_STRLEN
@@ -1713,12 +1933,21 @@ def do_bulk_notify(plugin_name: NotificationPluginNameStr, params: NotifyPluginP
 
     logger.info("    --> storing for bulk notification %s", "|".join(bulk_path))
     bulk_dirname = create_bulk_dirname(bulk_path)
+    dir_mtime = _dir_mtime(bulk_dirname)
     notify_uuid = fresh_uuid()
     filename = bulk_dirname + "/" + notify_uuid
     open(filename + ".new", "w").write("%r\n" % ((params, plugin_context),))
     os.rename(filename + ".new", filename)  # We need an atomic creation!
     logger.info("        - stored in %s", filename)
 
+    try:
+        _add_to_bulk_index(bulk_dirname, dir_mtime, os.stat(filename).st_mtime)
+    except Exception as e:
+        # The directory is rescanned by the next find_bulks() in this case
+        if cmk.utils.debug.enabled():
+            raise
+        logger.info("        - cannot update the bulk index: %s", e)
+
 
 def create_bulk_dirname(bulk_path: List[str]) -> str:
     dirname = os.path.join(notification_bulkdir, bulk_path[0], bulk_path[1],
@@ -1795,79 +2024,193 @@ def remove_if_orphaned(bulk_dir: str, max_age: float, ref_time: Optional[float]
             logger.info("    -> Error removing it: %s", e)
 
 
-def find_bulks(only_ripe: bool) -> NotifyBulks:
-    if not os.path.exists(notification_bulkdir):
-        return []
+# The bulk index maps the bulk directories to the number of their notifications, the
+# modification time of the oldest one and the modification time of the directory when it has
+# been indexed. It is updated when a notification is spooled, so the ripeness of the bulks can
+# be checked without listing the bulk directories. Directories changed otherwise, e.g. by
+# sending a bulk or by older versions, are detected by their modification time and rescanned.
+# Bulk directories unknown to the index are found by a complete scan every now and then.
+_BULK_INDEX_FILE = ".index"
+_BULK_SPOOL_SCAN_INTERVAL = 600
+_last_bulk_spool_scan = 0.0
+
+
+def _bulk_index_file() -> str:
+    return os.path.join(notification_bulkdir, _BULK_INDEX_FILE)
+
+
+def _dir_mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
 
+def load_bulk_index() -> BulkIndex:
+    try:
+        index = store.load_object_from_file(_bulk_index_file(), default={})
+    except MKGeneralException:
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _index_bulk_dir(index: BulkIndex, bulk_dir: str) -> None:
+    # Stat the directory first: changes made while listing it are detected next time
+    mtime = _dir_mtime(bulk_dir)
+    if mtime is None:
+        index.pop(bulk_dir, None)
+        return
+    uuids, oldest = bulk_uuids(bulk_dir)
+    index[bulk_dir] = (len(uuids), oldest, mtime)
+
+
+def _add_to_bulk_index(bulk_dir: str, dir_mtime: Optional[int], file_mtime: float) -> None:
+    """Count a notification just spooled to the bulk directory
+
+    dir_mtime is the modification time of the directory before the notification has been
+    written. If it does not match the index, the directory has been changed by someone else in
+    the meantime and is rescanned."""
+    with store.locked(_bulk_index_file()):
+        index = load_bulk_index()
+        entry = index.get(bulk_dir)
+        new_dir_mtime = _dir_mtime(bulk_dir)
+        if entry is None or dir_mtime is None or new_dir_mtime is None or entry[2] != dir_mtime:
+            _index_bulk_dir(index, bulk_dir)
+        else:
+            count, oldest, _mtime = entry
+            index[bulk_dir] = (count + 1, min(oldest, file_mtime), new_dir_mtime)
+        store.save_object_to_file(_bulk_index_file(), index)
+
+
+def _scan_bulk_dirs() -> List[str]:
     def listdir_visible(path: str) -> List[str]:
         return [x for x in os.listdir(path) if not x.startswith(".")]
 
-    bulks: NotifyBulks = []
-    now = time.time()
+    bulk_dirs = []
     for contact in listdir_visible(notification_bulkdir):
         contact_dir = os.path.join(notification_bulkdir, contact)
         for method in listdir_visible(contact_dir):
             method_dir = os.path.join(contact_dir, method)
             for bulk in listdir_visible(method_dir):
-                bulk_dir = os.path.join(method_dir, bulk)
+                bulk_dirs.append(os.path.join(method_dir, bulk))
+    return bulk_dirs
+
+
+def _refresh_bulk_index(full_scan: bool) -> BulkIndex:
+    """Rescan the bulk directories changed without updating the index"""
+    with store.locked(_bulk_index_file()):
+        old_index = load_bulk_index()
+        index = dict(old_index)
+        if full_scan:
+            bulk_dirs = _scan_bulk_dirs()
+            for bulk_dir in set(index).difference(bulk_dirs):
+                del index[bulk_dir]
+        else:
+            bulk_dirs = list(index)
+
+        for bulk_dir in bulk_dirs:
+            entry = index.get(bulk_dir)
+            if entry is None or entry[2] != _dir_mtime(bulk_dir):
+                _index_bulk_dir(index, bulk_dir)
+
+        if index != old_index:
+            store.save_object_to_file(_bulk_index_file(), index)
+    return index
 
-                uuids, oldest = bulk_uuids(bulk_dir)
-                if not uuids:
-                    remove_if_orphaned(bulk_dir, max_age=60, ref_time=now)
-                    continue
-                age = now - oldest
 
-                # e.g. 60,10,host,localhost OR timeperiod:late_night,1000,host,localhost
-                parts = bulk_parts(method_dir, bulk)
-                if parts is None:
+def _timeperiods_active(timeperiods: Set[str]) -> Dict[str, Optional[bool]]:
+    """The activity of the timeperiods, fetched from the core with a single query
+
+    Timeperiods which could not be checked, e.g. due to a livestatus connection error, are
+    missing in the result."""
+    active: Dict[str, Optional[bool]] = {}
+    for timeperiod in sorted(timeperiods):
+        try:
+            active[timeperiod] = cmk.base.core.timeperiod_active(timeperiod)
+        except Exception:
+            break  # The first call fetches all timeperiods, no need to try again
+    return active
+
+
+def find_bulks(only_ripe: bool) -> NotifyBulks:
+    global _last_bulk_spool_scan
+
+    if not os.path.exists(notification_bulkdir):
+        return []
+
+    now = time.time()
+    # Listing all bulks, e.g. for the GUI, needs to look into all directories anyways
+    full_scan = not only_ripe or now - _last_bulk_spool_scan >= _BULK_SPOOL_SCAN_INTERVAL
+    index = _refresh_bulk_index(full_scan)
+    if full_scan:
+        _last_bulk_spool_scan = now
+
+    candidates = []
+    for bulk_dir, (num_uuids, oldest, _mtime) in sorted(index.items()):
+        if not num_uuids:
+            remove_if_orphaned(bulk_dir, max_age=60, ref_time=now)
+            continue
+
+        # e.g. 60,10,host,localhost OR timeperiod:late_night,1000,host,localhost
+        method_dir, bulk = os.path.split(bulk_dir)
+        parts = bulk_parts(method_dir, bulk)
+        if parts is None:
+            continue
+        candidates.append((bulk_dir, now - oldest, num_uuids, parts))
+
+    timeperiods_active = _timeperiods_active(
+        {parts[1] for _bulk_dir, _age, _num_uuids, parts in candidates if parts[1] is not None})
+
+    bulks: NotifyBulks = []
+    for bulk_dir, age, num_uuids, (interval, timeperiod, count) in candidates:
+        if interval is not None:
+            if age >= interval:
+                logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
+            elif num_uuids >= count:
+                logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, num_uuids, count)
+            else:
+                logger.info("Bulk %s is not ripe yet (age: %d, count: %d)!", bulk_dir, age,
+                            num_uuids)
+                if only_ripe:
                     continue
-                interval, timeperiod, count = parts
+        else:
+            timeperiod = str(timeperiod)
+            if timeperiod in timeperiods_active:
+                active = timeperiods_active[timeperiod]
+            else:
+                # This prevents sending bulk notifications if a
+                # livestatus connection error appears. It also implies
+                # that an ongoing connection error will hold back bulk
+                # notifications.
+                logger.info("Error while checking activity of timeperiod %s: assuming active",
+                            timeperiod)
+                active = True
 
-                if interval is not None:
-                    if age >= interval:
-                        logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info("Bulk %s is not ripe yet (age: %d, count: %d)!", bulk_dir, age,
-                                    len(uuids))
-                        if only_ripe:
-                            continue
+            if active is True and num_uuids < count:
+                # Only add a log entry every 10 minutes since timeperiods
+                # can be very long (The default would be 10s).
+                if now % 600 <= config.notification_bulk_interval:
+                    logger.info("Bulk %s is not ripe yet (timeperiod %s: active, count: %d)",
+                                bulk_dir, timeperiod, num_uuids)
 
-                    bulks.append((bulk_dir, age, interval, 'n.a.', count, uuids))
-                else:
-                    try:
-                        active = cmk.base.core.timeperiod_active(str(timeperiod))
-                    except Exception:
-                        # This prevents sending bulk notifications if a
-                        # livestatus connection error appears. It also implies
-                        # that an ongoing connection error will hold back bulk
-                        # notifications.
-                        logger.info(
-                            "Error while checking activity of timeperiod %s: assuming active",
+                if only_ripe:
+                    continue
+            elif active is False:
+                logger.info("Bulk %s is ripe: timeperiod %s has ended", bulk_dir, timeperiod)
+            elif num_uuids >= count:
+                logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, num_uuids, count)
+            else:
+                logger.info("Bulk %s is ripe: timeperiod %s is not known anymore", bulk_dir,
                             timeperiod)
-                        active = True
-
-                    if active is True and len(uuids) < count:
-                        # Only add a log entry every 10 minutes since timeperiods
-                        # can be very long (The default would be 10s).
-                        if now % 600 <= config.notification_bulk_interval:
-                            logger.info(
-                                "Bulk %s is not ripe yet (timeperiod %s: active, count: %d)",
-                                bulk_dir, timeperiod, len(uuids))
-
-                        if only_ripe:
-                            continue
-                    elif active is False:
-                        logger.info("Bulk %s is ripe: timeperiod %s has ended", bulk_dir,
-                                    timeperiod)
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info("Bulk %s is ripe: timeperiod %s is not known anymore", bulk_dir,
-                                    timeperiod)
 
-                    bulks.append((bulk_dir, age, 'n.a.', timeperiod, count, uuids))
+        # Only the bulks to be sent or listed need their notifications
+        uuids, _oldest = bulk_uuids(bulk_dir)
+        if not uuids:
+            continue  # Sent in the meantime
+        if interval is not None:
+            bulks.append((bulk_dir, age, interval, 'n.a.', count, uuids))
+        else:
+            bulks.append((bulk_dir, age, 'n.a.', timeperiod, count, uuids))
     return bulks
 
 
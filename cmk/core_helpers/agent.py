@@ -7,11 +7,13 @@
 import abc
 import logging
 import time
+from functools import partial
 from typing import (
     cast,
     Dict,
     Final,
     Iterable,
+    Iterator,
     List,
     MutableMapping,
     NamedTuple,
@@ -47,7 +49,7 @@ from cmk.utils.werks import parse_check_mk_version
 
 from ._base import Fetcher, Parser, Summarizer
 from .cache import FileCache, FileCacheFactory, SectionStore
-from .host_sections import HostSections
+from .host_sections import HostSections, LazySections
 from .type_defs import Mode, SectionNameCollection
 
 AgentHostSections = HostSections[AgentRawDataSection]
@@ -143,6 +145,7 @@ class ParserState(abc.ABC):
         host_sections: AgentHostSections,
         *,
         section_info: MutableMapping[SectionName, "HostSectionParser.Header"],
+        raw_sections: MutableMapping[SectionName, List["HostSectionParser.RawChunk"]],
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
@@ -150,6 +153,7 @@ class ParserState(abc.ABC):
         self.hostname: Final = hostname
         self.host_sections = host_sections
         self.section_info = section_info
+        self.raw_sections = raw_sections
         self.translation: Final = translation
         self.encoding_fallback: Final = encoding_fallback
         self._logger: Final = logger
@@ -159,6 +163,7 @@ class ParserState(abc.ABC):
             self.hostname,
             self.host_sections,
             section_info=self.section_info,
+            raw_sections=self.raw_sections,
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
@@ -173,6 +178,7 @@ class ParserState(abc.ABC):
             self.host_sections,
             section_header,
             section_info=self.section_info,
+            raw_sections=self.raw_sections,
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
@@ -187,6 +193,7 @@ class ParserState(abc.ABC):
             self.host_sections,
             piggybacked_hostname,
             section_info=self.section_info,
+            raw_sections=self.raw_sections,
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
@@ -195,8 +202,19 @@ class ParserState(abc.ABC):
     def __call__(self, line: bytes) -> "ParserState":
         raise NotImplementedError()
 
+    def add_lines(self, lines: bytes) -> "ParserState":
+        """Process several lines at once, none of which looks like a section header"""
+        parser = self
+        for line in lines.split(b"\n"):
+            parser = parser(line)
+        return parser
+
 
 class NOOPParser(ParserState):
+    def add_lines(self, lines: bytes) -> ParserState:
+        # Only section headers change the state
+        return self
+
     def __call__(self, line: bytes) -> ParserState:
         if not line.strip():
             return self
@@ -228,6 +246,7 @@ class PiggybackSectionParser(ParserState):
         piggybacked_hostname: HostName,
         *,
         section_info: MutableMapping[SectionName, "HostSectionParser.Header"],
+        raw_sections: MutableMapping[SectionName, List["HostSectionParser.RawChunk"]],
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
@@ -236,6 +255,7 @@ class PiggybackSectionParser(ParserState):
             hostname,
             host_sections,
             section_info=section_info,
+            raw_sections=raw_sections,
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
@@ -363,6 +383,11 @@ class HostSectionParser(ParserState):
                 return cached_at, self.persist - cached_at
             return None
 
+    class RawChunk(NamedTuple):
+        """Lines of a section below one of its headers, not parsed yet"""
+        header: "HostSectionParser.Header"
+        lines: List[bytes]
+
     def __init__(
         self,
         hostname: HostName,
@@ -370,16 +395,20 @@ class HostSectionParser(ParserState):
         section_header: Header,
         *,
         section_info: MutableMapping[SectionName, "HostSectionParser.Header"],
+        raw_sections: MutableMapping[SectionName, List["HostSectionParser.RawChunk"]],
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
     ) -> None:
-        host_sections.sections.setdefault(section_header.name, [])
         section_info[section_header.name] = section_header
+        self._lines: List[bytes] = []
+        raw_sections.setdefault(section_header.name,
+                                []).append(HostSectionParser.RawChunk(section_header, self._lines))
         super().__init__(
             hostname,
             host_sections,
             section_info=section_info,
+            raw_sections=raw_sections,
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
@@ -407,20 +436,45 @@ class HostSectionParser(ParserState):
                 # Footer is optional.
                 return self.to_host_section_parser(HostSectionParser.parse_header(line))
 
-            if not self.section_header.nostrip:
-                line = line.strip()
-
-            self.host_sections.sections[self.section_header.name].append(
-                ensure_str_with_fallback(
-                    line,
-                    encoding=self.section_header.encoding,
-                    fallback="latin-1",
-                ).split(self.section_header.separator))
+            self._lines.append(line)
         except Exception:
             self._logger.warning("Ignoring invalid raw section: %r" % line, exc_info=True)
             return self.to_noop_parser()
         return self
 
+    def add_lines(self, lines: bytes) -> ParserState:
+        # The lines are split and decoded when the section is accessed, see parse_raw_section().
+        self._lines.append(lines)
+        return self
+
+    @staticmethod
+    def parse_raw_section(
+        raw_chunks: Iterable["HostSectionParser.RawChunk"],
+        *,
+        logger: logging.Logger,
+    ) -> AgentRawDataSection:
+        section_content: AgentRawDataSection = []
+        for section_header, raw_lines in raw_chunks:
+            try:
+                for lines in raw_lines:
+                    for line in lines.split(b"\n"):
+                        if not line.strip():
+                            continue
+
+                        if not section_header.nostrip:
+                            line = line.strip()
+
+                        section_content.append(
+                            ensure_str_with_fallback(
+                                line,
+                                encoding=section_header.encoding,
+                                fallback="latin-1",
+                            ).split(section_header.separator))
+            except Exception:
+                # The remaining lines below this header are dropped.
+                logger.warning("Ignoring invalid raw section: %r" % line, exc_info=True)
+        return section_content
+
     @staticmethod
     def is_header(line: bytes) -> bool:
         line = line.strip()
@@ -504,20 +558,57 @@ class AgentParser(Parser[AgentRawData, AgentHostSections]):
         return host_sections.filter(selection)
 
     def _parse_host_section(self, raw_data: AgentRawData) -> ParserState:
-        """Split agent output in chunks, splits lines by whitespaces."""
+        """Split agent output in chunks, splits lines by whitespaces.
+
+        Only the section headers are processed right away.  The host sections
+        are split into lines and decoded when they are accessed first.
+
+        """
+        host_sections = AgentHostSections(LazySections[AgentRawDataSection]())
         parser: ParserState = NOOPParser(
             self.hostname,
-            AgentHostSections(),
+            host_sections,
             section_info={},
+            raw_sections={},
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
         )
-        for line in raw_data.split(b"\n"):
-            parser = parser(line.rstrip(b"\n"))
-
+        offset = 0
+        for start, end in self._find_header_lines(raw_data):
+            if start > offset:
+                parser = parser.add_lines(raw_data[offset:start])
+            parser = parser(raw_data[start:end])
+            offset = end + 1
+        if offset < len(raw_data):
+            parser = parser.add_lines(raw_data[offset:])
+
+        for section_name, raw_chunks in parser.raw_sections.items():
+            cast(LazySections[AgentRawDataSection], host_sections.sections).set_loader(
+                section_name,
+                partial(HostSectionParser.parse_raw_section, raw_chunks, logger=self._logger),
+            )
         return parser
 
+    @staticmethod
+    def _find_header_lines(raw_data: AgentRawData) -> Iterator[Tuple[int, int]]:
+        """Yield start and end of the lines that look like section headers or footers
+
+        Searching for the markers is much faster than splitting the whole agent
+        output into lines.
+
+        """
+        pos = raw_data.find(b"<<<")
+        while pos != -1:
+            start = raw_data.rfind(b"\n", 0, pos) + 1
+            end = raw_data.find(b"\n", pos)
+            if end == -1:
+                end = len(raw_data)
+            line = raw_data[start:end].strip()
+            if line.startswith(b"<<<") and line.endswith(b">>>"):
+                yield start, end
+            pos = raw_data.find(b"<<<", end)
+
     @staticmethod
     def _make_updated_piggyback_section_header(
         piggybacked_raw_data: Dict[HostName, List[bytes]],
@@ -6,7 +6,19 @@
 
 import abc
 import logging
-from typing import Callable, cast, Dict, Generic, List, Mapping, MutableMapping, Optional, TypeVar
+from functools import partial
+from typing import (
+    Callable,
+    cast,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    TypeVar,
+)
 
 from cmk.utils.type_defs import HostName, SectionName
 
@@ -17,6 +29,54 @@ from .type_defs import NO_SELECTION, SectionCacheInfo, SectionNameCollection
 THostSections = TypeVar("THostSections", bound="HostSections")
 
 
+class LazySections(MutableMapping[SectionName, TRawDataSection]):
+    """Mapping of the sections, the content of which is computed when it is accessed first
+
+    This allows the parsers to postpone the parsing of sections until they are
+    actually needed. Sections that are never accessed are never parsed.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._sections: Dict[SectionName, Optional[TRawDataSection]] = {}
+        self._loaders: Dict[SectionName, Callable[[], TRawDataSection]] = {}
+
+    def __repr__(self) -> str:
+        return "%s(%r)" % (type(self).__name__, dict(self.items()))
+
+    def __getitem__(self, key: SectionName) -> TRawDataSection:
+        content = self._sections[key]
+        if content is None:
+            content = self._sections[key] = self._loaders.pop(key)()
+        return content
+
+    def __setitem__(self, key: SectionName, value: TRawDataSection) -> None:
+        self._sections[key] = value
+        self._loaders.pop(key, None)
+
+    def __delitem__(self, key: SectionName) -> None:
+        del self._sections[key]
+        self._loaders.pop(key, None)
+
+    def __iter__(self) -> Iterator[SectionName]:
+        return self._sections.__iter__()
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def set_loader(self, key: SectionName, loader: Callable[[], TRawDataSection]) -> None:
+        """Add the section `key`, `loader` computes its content on first access"""
+        self._sections[key] = None
+        self._loaders[key] = loader
+
+    def is_loaded(self, key: SectionName) -> bool:
+        return key in self._sections and key not in self._loaders
+
+
+def _copy_section(sections: Mapping[SectionName, TRawDataSection],
+                  section_name: SectionName) -> TRawDataSection:
+    return cast(TRawDataSection, list(sections[section_name]))
+
+
 class HostSections(Generic[TRawDataSection], metaclass=abc.ABCMeta):
     """A wrapper class for the host information read by the data sources
 
@@ -37,7 +97,7 @@ class HostSections(Generic[TRawDataSection], metaclass=abc.ABCMeta):
         piggybacked_raw_data: Optional[Dict[HostName, List[bytes]]] = None,
     ) -> None:
         super().__init__()
-        self.sections = sections if sections else {}
+        self.sections = sections if sections else LazySections[TRawDataSection]()
         self.cache_info = cache_info if cache_info else {}
         self.piggybacked_raw_data = piggybacked_raw_data if piggybacked_raw_data else {}
 
@@ -60,8 +120,13 @@ class HostSections(Generic[TRawDataSection], metaclass=abc.ABCMeta):
         # HostSections with the final data.
         if selection is NO_SELECTION:
             return self
+        # Only the selected sections are parsed, and only when they are accessed.
+        sections = LazySections[TRawDataSection]()
+        for section_name in self.sections:
+            if section_name in selection:
+                sections.set_loader(section_name, partial(self.sections.__getitem__, section_name))
         return HostSections(
-            {k: v for k, v in self.sections.items() if k in selection},
+            sections,
             cache_info={k: v for k, v in self.cache_info.items() if k in selection},
             piggybacked_raw_data={
                 k: v for k, v in self.piggybacked_raw_data.items() if SectionName(k) in selection
@@ -75,11 +140,17 @@ class HostSections(Generic[TRawDataSection], metaclass=abc.ABCMeta):
     #       Would this be correct here?
     def add(self, host_sections: "HostSections") -> None:
         """Add the content of `host_sections` to this HostSection."""
-        for section_name, section_content in host_sections.sections.items():
-            self.sections.setdefault(
-                section_name,
-                cast(TRawDataSection, []),
-            ).extend(section_content)
+        for section_name in host_sections.sections:
+            if section_name in self.sections:
+                self.sections[section_name].extend(host_sections.sections[section_name])
+            elif isinstance(self.sections, LazySections):
+                # Don't parse the section before it is needed
+                self.sections.set_loader(
+                    section_name,
+                    partial(_copy_section, host_sections.sections, section_name),
+                )
+            else:
+                self.sections[section_name] = _copy_section(host_sections.sections, section_name)
 
         for hostname, raw_lines in host_sections.piggybacked_raw_data.items():
             self.piggybacked_raw_data.setdefault(hostname, []).extend(raw_lines)
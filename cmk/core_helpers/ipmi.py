@@ -5,12 +5,8 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import logging
-from typing import Any, Dict, Final, List, Optional
+from typing import Any, Dict, Final, List, Optional, TYPE_CHECKING
 
-import pyghmi.constants as ipmi_const  # type: ignore[import]
-import pyghmi.ipmi.command as ipmi_cmd  # type: ignore[import]
-import pyghmi.ipmi.private.session as ipmi_session  # type: ignore[import]
-import pyghmi.ipmi.sdr as ipmi_sdr  # type: ignore[import]
 from six import ensure_binary
 
 from cmk.utils.exceptions import MKFetcherError
@@ -26,6 +22,12 @@ from cmk.utils.type_defs import (
 from .agent import AgentFetcher, AgentHostSections, AgentSummarizer, DefaultAgentFileCache
 from .type_defs import Mode
 
+if TYPE_CHECKING:
+    # pyghmi pulls in a lot of crypto modules. It is only imported when an IPMI fetcher is
+    # actually used, which keeps it out of the startup of all other check helpers.
+    import pyghmi.ipmi.command as ipmi_cmd  # type: ignore[import]
+    import pyghmi.ipmi.sdr as ipmi_sdr  # type: ignore[import]
+
 
 class IPMIFetcher(AgentFetcher):
     def __init__(
@@ -40,7 +42,7 @@ class IPMIFetcher(AgentFetcher):
         self.address: Final = address
         self.username: Final = username
         self.password: Final = password
-        self._command: Optional[ipmi_cmd.Command] = None
+        self._command: Optional["ipmi_cmd.Command"] = None
 
     @classmethod
     def _from_json(cls, serialized: Dict[str, Any]) -> "IPMIFetcher":
@@ -70,6 +72,8 @@ class IPMIFetcher(AgentFetcher):
         return AgentRawData(b"" + self._sensors_section() + self._firmware_section())
 
     def open(self) -> None:
+        import pyghmi.ipmi.command as ipmi_cmd  # type: ignore[import] # pylint: disable=import-outside-toplevel
+
         self._logger.debug(
             "Connecting to %s:623 (User: %s, Privlevel: 2)",
             self.address,
@@ -87,6 +91,8 @@ class IPMIFetcher(AgentFetcher):
         if self._command is None:
             return
 
+        import pyghmi.ipmi.private.session as ipmi_session  # type: ignore[import] # pylint: disable=import-outside-toplevel
+
         self._logger.debug("Closing connection to %s:623", self._command.bmc)
 
         # This should not be our task, but seems pyghmi is not cleaning up good enough.
@@ -121,6 +127,8 @@ class IPMIFetcher(AgentFetcher):
         if self._command is None:
             raise MKFetcherError("Not connected")
 
+        import pyghmi.ipmi.sdr as ipmi_sdr  # type: ignore[import] # pylint: disable=import-outside-toplevel
+
         self._logger.debug("Fetching sensor data via UDP from %s:623", self._command.bmc)
 
         try:
@@ -190,10 +198,12 @@ class IPMIFetcher(AgentFetcher):
         return any("GPU" in line for line in inventory_entries)
 
     @staticmethod
-    def _parse_sensor_reading(number: int, reading: ipmi_sdr.SensorReading) -> List[AgentRawData]:
+    def _parse_sensor_reading(number: int, reading: "ipmi_sdr.SensorReading") -> List[AgentRawData]:
         # {'states': [], 'health': 0, 'name': 'CPU1 Temp', 'imprecision': 0.5,
         #  'units': '\xc2\xb0C', 'state_ids': [], 'type': 'Temperature',
         #  'value': 25.0, 'unavailable': 0}]]
+        import pyghmi.constants as ipmi_const  # type: ignore[import] # pylint: disable=import-outside-toplevel
+
         health_txt = b"N/A"
         if reading.health >= ipmi_const.Health.Failed:
             health_txt = b"FAILED"
@@ -217,7 +227,7 @@ class IPMIFetcher(AgentFetcher):
         ]
 
     @staticmethod
-    def _handle_false_positive_warnings(reading: ipmi_sdr.SensorReading) -> AgentRawData:
+    def _handle_false_positive_warnings(reading: "ipmi_sdr.SensorReading") -> AgentRawData:
         """This is a workaround for a pyghmi bug
         (bug report: https://bugs.launchpad.net/pyghmi/+bug/1790120)
 
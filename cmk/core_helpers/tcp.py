@@ -9,8 +9,6 @@ import socket
 from hashlib import md5, sha256
 from typing import Any, Dict, Final, List, Mapping, Optional, Tuple
 
-from Cryptodome.Cipher import AES
-
 import cmk.utils.debug
 from cmk.utils.exceptions import MKFetcherError
 from cmk.utils.type_defs import AgentRawData, HostAddress
@@ -162,6 +160,9 @@ class TCPFetcher(AgentFetcher):
 
     # TODO: Sync with real_type_checks._decrypt_rtc_package
     def _real_decrypt(self, output: AgentRawData) -> AgentRawData:
+        # Only few agents use encryption, keep it out of the startup of the check helpers
+        from Cryptodome.Cipher import AES  # pylint: disable=import-outside-toplevel
+
         try:
             # simply check if the protocol is an actual number
             protocol = int(output[:2])
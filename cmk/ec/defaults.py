@@ -34,6 +34,7 @@ def default_config() -> Dict[str, Any]:
         "actions": [],
         "debug_rules": False,
         "rule_optimizer": True,
+        "event_processing_workers": 0,
         "log_level": {
             "cmk.mkeventd": logging.INFO,
             "cmk.mkeventd.EventServer": logging.INFO,
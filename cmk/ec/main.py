@@ -13,9 +13,12 @@
 
 import abc
 import ast
+from collections import deque
 import errno
 import json
 from logging import Logger, getLogger
+import multiprocessing
+from multiprocessing.pool import AsyncResult
 import os
 from pathlib import Path
 import pprint
@@ -23,12 +26,14 @@ import re
 import select
 import signal
 import socket
+import struct
 import sys
 import threading
 import time
 import traceback
 from types import FrameType
-from typing import Any, AnyStr, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+from typing import (Any, AnyStr, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple,
+                    Type, Union)
 
 from six import ensure_binary
 
@@ -52,8 +57,10 @@ from .crash_reporting import ECCrashReport, CrashReportStore
 from .history import ActiveHistoryPeriod, History, scrub_string, quote_tab, get_logfile
 from .query import MKClientError, Query, QueryGET
 from .rule_packs import load_config as load_config_using
+from .rule_prefilter import RulePrefilter
 from .settings import FileDescriptor, PortNumber, Settings, settings as create_settings
 from .snmp import SNMPTrapEngine
+from .spool import SpoolWatcher
 
 
 class SyslogPriority:
@@ -489,6 +496,9 @@ class Perfcounters:
         "overflows",
         "events",
         "connects",
+        "datagrams",  # received by the builtin syslog server
+        "datagram_reads",  # wakeups reading datagrams, for the average batch size
+        "datagram_drops",  # dropped by the kernel due to a full receive buffer
     ]
 
     # Average processing times
@@ -513,9 +523,9 @@ class Perfcounters:
 
         self._logger = logger.getChild("Perfcounters")
 
-    def count(self, counter: str) -> None:
+    def count(self, counter: str, value: int = 1) -> None:
         with self._lock:
-            self._counters[counter] += 1
+            self._counters[counter] += value
 
     def count_time(self, counter: str, ptime: float) -> None:
         with self._lock:
@@ -574,6 +584,132 @@ class Perfcounters:
             return row
 
 
+#.
+#   .--Pipeline------------------------------------------------------------.
+#   |                ____  _            _ _                                |
+#   |               |  _ \(_)_ __   ___| (_)_ __   ___                     |
+#   |               | |_) | | '_ \ / _ \ | | '_ \ / _ \                    |
+#   |               |  __/| | |_) |  __/ | | | | |  __/                    |
+#   |               |_|   |_| .__/ \___|_|_|_| |_|\___|                    |
+#   |                       |_|                                            |
+#   +----------------------------------------------------------------------+
+#   |  Worker processes decoding, parsing and matching incoming messages   |
+#   '----------------------------------------------------------------------'
+
+# A rule matching an event: the rule, cancelling and the match groups
+RuleHit = Tuple[Dict[str, Any], bool, Dict[str, Any]]
+# The same for the pipeline, which identifies the rule by its rule pack and rule ID
+PipelineHit = Tuple[str, str, bool, Dict[str, Any]]
+
+# The outcome of a message line processed by a worker: the translated event, the number of
+# rules tried, the matching rules and the error message in case the line could not be handled
+MatchedLine = NamedTuple('MatchedLine', [
+    ('event', Optional[Dict[str, Any]]),
+    ('tries', int),
+    ('hits', List[PipelineHit]),
+    ('error', str),
+])
+
+# Lines handed to a worker at once
+_PIPELINE_BATCH_SIZE = 500
+# Seconds between looking for the results of the workers
+_PIPELINE_POLL_INTERVAL = 0.01
+# Seconds to wait for the results of a batch when the pipeline is drained
+_PIPELINE_TIMEOUT = 60
+
+# The EventServer of a worker process, it only has the compiled rules
+_pipeline_worker: Optional['EventServer'] = None
+
+
+def _init_pipeline_worker(settings: Settings, config: Dict[str, Any],
+                          slave_status: Dict[str, Any]) -> None:
+    global _pipeline_worker
+    logger = getLogger("cmk.mkeventd.EventServer.pipeline")
+    perfcounters = Perfcounters(logger)
+    history = History(settings, config, logger, StatusTableEvents.columns,
+                      StatusTableHistory.columns)
+    _pipeline_worker = EventServer(logger,
+                                   settings,
+                                   config,
+                                   slave_status,
+                                   perfcounters,
+                                   ECLock(logger),
+                                   history,
+                                   EventStatus(settings, config, perfcounters, history, logger),
+                                   StatusTableEvents.columns,
+                                   create_pipes_and_sockets=False)
+    _pipeline_worker.compile_rules(config["rules"], config["rule_packs"])
+
+
+def _match_pipeline_lines(lines: List[Tuple[bytes, Any]]) -> List[MatchedLine]:
+    assert _pipeline_worker is not None
+    matched_lines = []
+    for line_bytes, address in lines:
+        line = scrub_and_decode(line_bytes.rstrip())
+        if line:
+            matched_lines.append(_pipeline_worker.match_line(line, address))
+    return matched_lines
+
+
+class EventPipeline:
+    """Worker processes doing the stateless part of the message processing
+
+    The worker processes decode and parse the incoming messages and match them against their
+    own copy of the compiled rules. The EventServer collects the results in the order the
+    messages have been received and does all the rest, e.g. counting, cancelling or
+    creating events, exactly like it does for the messages it processes itself."""
+    def __init__(self, settings: Settings, config: Dict[str, Any], slave_status: Dict[str, Any],
+                 num_workers: int) -> None:
+        super().__init__()
+        self.config = config
+        self._num_workers = num_workers
+        # The workers are started from scratch, the EventServer runs several threads
+        self._pool = multiprocessing.get_context("spawn").Pool(num_workers,
+                                                               initializer=_init_pipeline_worker,
+                                                               initargs=(settings, config,
+                                                                         slave_status))
+        self._batch: List[Tuple[bytes, Any]] = []
+        self._pending: Deque[AsyncResult] = deque()
+
+    def add(self, data: bytes, address: Optional[Any]) -> None:
+        for line in data.splitlines():
+            self._batch.append((line, address))
+            if len(self._batch) >= _PIPELINE_BATCH_SIZE:
+                self.flush()
+
+    def flush(self, wait_for_workers: bool = False) -> None:
+        """Hands the added lines to the workers
+
+        With wait_for_workers, the lines are kept while all workers are busy. This way, the
+        batches get larger when the messages arrive faster than they are processed."""
+        if not self._batch or (wait_for_workers and len(self._pending) >= self._num_workers):
+            return
+        self._pending.append(self._pool.apply_async(_match_pipeline_lines, (self._batch,)))
+        self._batch = []
+
+    def has_pending(self) -> bool:
+        return bool(self._pending or self._batch)
+
+    def results(self, wait: bool = False) -> Iterator[MatchedLine]:
+        """The lines processed by the workers in the order they have been added
+
+        The results of a batch are only returned when all batches added before have been
+        processed. Unless waiting for all of them, processing stops at the first batch
+        which is not done yet."""
+        while self._pending and (wait or self._pending[0].ready()):
+            result = self._pending.popleft()
+            try:
+                yield from result.get(_PIPELINE_TIMEOUT)
+            except multiprocessing.TimeoutError:
+                yield MatchedLine(None, 0, [], "Timeout while processing a batch of lines")
+            except Exception as e:
+                yield MatchedLine(None, 0, [], str(e))
+
+    def close(self) -> None:
+        self._pool.terminate()
+        self._pool.join()
+
+
 #.
 #   .--EventServer---------------------------------------------------------.
 #   |      _____                 _   ____                                  |
@@ -586,6 +722,19 @@ class Perfcounters:
 #   |  Verarbeitung und Klassifizierung von eingehenden Events.            |
 #   '----------------------------------------------------------------------'
 
+# Syslog datagrams can be as large as UDP allows, longer lines are truncated
+_DATAGRAM_BUFFER_SIZE = 65535
+# Receive buffer of the syslog socket absorbing bursts, the kernel limits it to rmem_max
+_DATAGRAM_RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+# Maximum number of datagrams read per wakeup, the other inputs must not starve
+_MAX_DATAGRAMS_PER_READ = 1000
+# Read size for the pipe and the stream sockets
+_STREAM_BUFFER_SIZE = 65536
+# The socket option of the dropped datagram counter, not exported by the socket module on
+# all Python versions
+_SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)
+_DROP_COUNTER_SIZE = struct.calcsize("=I")
+
 
 class EventServer(ECServerThread):
     month_names = {
@@ -624,9 +773,12 @@ class EventServer(ECServerThread):
         self._syslog: Optional[socket.socket] = None
         self._syslog_tcp: Optional[socket.socket] = None
         self._snmptrap: Optional[socket.socket] = None
+        self._datagram_drops = 0
 
         # TODO: Improve type!
         self._rules: List[Any] = []
+        self._rule_prefilter: Optional[RulePrefilter] = None
+        self._pipeline: Optional[EventPipeline] = None
         self._hash_stats = []
         for _unused_facility in range(32):
             self._hash_stats.append([0] * 8)
@@ -758,6 +910,12 @@ class EventServer(ECServerThread):
                 self._syslog.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 self._syslog.bind(("0.0.0.0", endpoint.value))
                 self._logger.info("Opened builtin syslog server on UDP port %d" % endpoint.value)
+            if self._syslog is not None:
+                # The pending datagrams are read at once until no more are left
+                self._syslog.setblocking(False)
+                self._syslog.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                        _DATAGRAM_RECEIVE_BUFFER_SIZE)
+                self._syslog.setsockopt(socket.SOL_SOCKET, _SO_RXQ_OVFL, 1)
         except Exception as e:
             raise Exception("Cannot start builtin syslog server: %s" % e)
 
@@ -822,143 +980,227 @@ class EventServer(ECServerThread):
     def serve(self) -> None:
         pipe_fragment = b''
         pipe = self.open_pipe()
-        listen_list = [pipe]
-
-        # Wait for incoming syslog packets via UDP
-        if self._syslog is not None:
-            listen_list.append(self._syslog.fileno())
-
-        # Wait for new connections for events via TCP socket
-        if self._syslog_tcp is not None:
-            listen_list.append(self._syslog_tcp)
-
-        # Wait for new connections for events via unix socket
-        if self._eventsocket:
-            listen_list.append(self._eventsocket)
-
-        # Wait for incomding SNMP traps
-        if self._snmptrap is not None:
-            listen_list.append(self._snmptrap.fileno())
+        spool = SpoolWatcher(self.settings.paths.spool_dir.value, self._logger)
+        poller = select.epoll()
+
+        # Wait for incoming events on the pipe, incoming syslog packets via UDP, new
+        # connections for events via TCP socket or unix socket, incoming SNMP traps and
+        # new files in the spool directory
+        listen_fds = [pipe, spool.fileno()] + [
+            listening.fileno()
+            for listening in [self._syslog, self._syslog_tcp, self._eventsocket, self._snmptrap]
+            if listening is not None
+        ]
+        for fd in listen_fds:
+            if fd is not None:
+                poller.register(fd, select.EPOLLIN)
 
         # Keep list of client connections via UNIX socket and
         # read data that is not yet processed. Map from
         # fd to (fileobject, data)
         client_sockets: Dict[int, Tuple[socket.socket, Any, bytes]] = {}
         select_timeout = 1
-        while not self._terminate_event.is_set():
-            try:
-                readable = select.select(listen_list + list(client_sockets.keys()), [], [],
-                                         select_timeout)[0]
-            except select.error as e:
-                if e.args[0] != errno.EINTR:
-                    raise
-                continue
-            data: Optional[bytes] = None
+        try:
+            while not self._terminate_event.is_set():
+                self._update_pipeline()
+                if self._pipeline is not None and self._pipeline.has_pending():
+                    # The results of the workers are not selectable, look for them soon
+                    timeout = min(select_timeout, _PIPELINE_POLL_INTERVAL)
+                else:
+                    timeout = select_timeout
+                try:
+                    readable = {fd for fd, _event in poller.poll(timeout)}
+                except OSError as e:
+                    if e.errno != errno.EINTR:
+                        raise
+                    continue
+                data: Optional[bytes] = None
+
+                # Accept new connection on event unix socket
+                if self._eventsocket.fileno() in readable:
+                    client_socket, address = self._eventsocket.accept()
+                    poller.register(client_socket, select.EPOLLIN)
+                    client_sockets[client_socket.fileno()] = (client_socket, address, b"")
+
+                # Same for the TCP syslog socket
+                if self._syslog_tcp and self._syslog_tcp.fileno() in readable:
+                    client_socket, address = self._syslog_tcp.accept()
+                    poller.register(client_socket, select.EPOLLIN)
+                    client_sockets[client_socket.fileno()] = (client_socket, address, b"")
+
+                # Read data from existing event unix socket connections
+                # NOTE: We modify client_socket in the loop, so we need to copy below!
+                for fd, (cs, address, previous_data) in list(client_sockets.items()):
+                    if fd in readable:
+                        # Receive next part of data
+                        try:
+                            new_data = cs.recv(_STREAM_BUFFER_SIZE)
+                        except Exception:
+                            new_data = b""
+                            address = None
+
+                        # Put together with incomplete messages from last time
+                        data = previous_data + new_data
+
+                        # Do we have incomplete data? (if the socket has been
+                        # closed then we consider the pending message always
+                        # as complete, even if there was no trailing \n)
+                        if new_data and not data.endswith(b"\n"):  # keep fragment
+                            # Do we have any complete messages?
+                            if b'\n' in data:
+                                complete, rest = data.rsplit(b"\n", 1)
+                                self.process_raw_lines(complete + b"\n", address)
+                            else:
+                                rest = data  # keep for next time
 
-            # Accept new connection on event unix socket
-            if self._eventsocket in readable:
-                client_socket, address = self._eventsocket.accept()
+                        # Only complete messages
+                        else:
+                            if data:
+                                self.process_raw_lines(data, address)
+                            rest = b""
 
-                client_sockets[client_socket.fileno()] = (client_socket, address, b"")
+                        # Connection still open?
+                        if new_data:
+                            client_sockets[fd] = (cs, address, rest)
+                        else:
+                            poller.unregister(cs)
+                            cs.close()
+                            del client_sockets[fd]
 
-            # Same for the TCP syslog socket
-            if self._syslog_tcp and self._syslog_tcp in readable:
-                client_socket, address = self._syslog_tcp.accept()
+                # Read data from pipe
+                if pipe in readable:
+                    try:
+                        data = os.read(pipe, _STREAM_BUFFER_SIZE)
+                        if data:
+                            # Prepend previous beginning of message to read data
+                            data = pipe_fragment + data
+                            pipe_fragment = b""
 
-                client_sockets[client_socket.fileno()] = (client_socket, address, b"")
+                            # Last message still incomplete?
+                            if data[-1:] != b'\n':
+                                if b'\n' in data:  # at least one complete message contained
+                                    messages, pipe_fragment = data.rsplit(b'\n', 1)
+                                    self.process_raw_lines(messages + b'\n')  # got lost in split
+                                else:
+                                    pipe_fragment = data  # keep beginning of message, wait for \n
+                            else:
+                                self.process_raw_lines(data)
+                        else:  # EOF
+                            poller.unregister(pipe)
+                            os.close(pipe)
+                            pipe = self.open_pipe()
+                            poller.register(pipe, select.EPOLLIN)
+                            # Pending fragments from previos reads that are not terminated
+                            # by a \n are ignored.
+                            if pipe_fragment:
+                                self._logger.warning("Ignoring incomplete message '%r' from pipe" %
+                                                     pipe_fragment)
+                                pipe_fragment = b""
+                    except Exception:
+                        pass
 
-            # Read data from existing event unix socket connections
-            # NOTE: We modify client_socket in the loop, so we need to copy below!
-            for fd, (cs, address, previous_data) in list(client_sockets.items()):
-                if fd in readable:
-                    # Receive next part of data
+                # Read events from builtin syslog server
+                if self._syslog is not None and self._syslog.fileno() in readable:
+                    self.read_syslog_datagrams()
+
+                # Read events from builtin snmptrap server
+                if self._snmptrap is not None and self._snmptrap.fileno() in readable:
                     try:
-                        new_data = cs.recv(4096)
+                        message, sender_address = self._snmptrap.recvfrom(65535)
+                        self.process_raw_data(lambda: self._snmp_trap_engine.process_snmptrap(
+                            message, sender_address))
                     except Exception:
-                        new_data = b""
-                        address = None
-
-                    # Put together with incomplete messages from last time
-                    data = previous_data + new_data
-
-                    # Do we have incomplete data? (if the socket has been
-                    # closed then we consider the pending message always
-                    # as complete, even if there was no trailing \n)
-                    if new_data and not data.endswith(b"\n"):  # keep fragment
-                        # Do we have any complete messages?
-                        if b'\n' in data:
-                            complete, rest = data.rsplit(b"\n", 1)
-                            self.process_raw_lines(complete + b"\n", address)
-                        else:
-                            rest = data  # keep for next time
+                        self._logger.exception(
+                            'Exception handling a SNMP trap from "%s". Skipping this one' %
+                            sender_address[0])
 
-                    # Only complete messages
-                    else:
-                        if data:
-                            self.process_raw_lines(data, address)
-                        rest = b""
+                if spool.fileno() in readable:
+                    spool.handle_readable()
 
-                    # Connection still open?
-                    if new_data:
-                        client_sockets[fd] = (cs, address, rest)
-                    else:
-                        cs.close()
-                        del client_sockets[fd]
+                # process the first spool file we get
+                spool_file = spool.next_file()
+                if spool_file is not None:
+                    self.process_raw_lines(spool_file.read_bytes())
+                    spool_file.unlink()
+                    select_timeout = 0  # enable fast processing to process further files
+                else:
+                    select_timeout = 1  # restore default select timeout
 
-            # Read data from pipe
-            if pipe in readable:
-                try:
-                    data = os.read(pipe, 4096)
-                    if data:
-                        # Prepend previous beginning of message to read data
-                        data = pipe_fragment + data
-                        pipe_fragment = b""
-
-                        # Last message still incomplete?
-                        if data[-1:] != b'\n':
-                            if b'\n' in data:  # at least one complete message contained
-                                messages, pipe_fragment = data.rsplit(b'\n', 1)
-                                self.process_raw_lines(messages + b'\n')  # got lost in split
-                            else:
-                                pipe_fragment = data  # keep beginning of message, wait for \n
-                        else:
-                            self.process_raw_lines(data)
-                    else:  # EOF
-                        os.close(pipe)
-                        pipe = self.open_pipe()
-                        listen_list[0] = pipe
-                        # Pending fragments from previos reads that are not terminated
-                        # by a \n are ignored.
-                        if pipe_fragment:
-                            self._logger.warning("Ignoring incomplete message '%r' from pipe" %
-                                                 pipe_fragment)
-                            pipe_fragment = b""
-                except Exception:
-                    pass
+                if self._pipeline is not None:
+                    self._pipeline.flush(wait_for_workers=True)
+                    self.process_pipeline_results()
+        finally:
+            poller.close()
+            spool.close()
 
-            # Read events from builtin syslog server
-            if self._syslog is not None and self._syslog.fileno() in readable:
-                self.process_raw_lines(*self._syslog.recvfrom(4096))
+        self._stop_pipeline()
 
-            # Read events from builtin snmptrap server
-            if self._snmptrap is not None and self._snmptrap.fileno() in readable:
-                try:
-                    message, sender_address = self._snmptrap.recvfrom(65535)
-                    self.process_raw_data(
-                        lambda: self._snmp_trap_engine.process_snmptrap(message, sender_address))
-                except Exception:
-                    self._logger.exception(
-                        'Exception handling a SNMP trap from "%s". Skipping this one' %
-                        sender_address[0])
+    def read_syslog_datagrams(self) -> None:
+        """Reads the pending datagrams of the builtin syslog server
 
+        The number of datagrams read at once is limited to not delay the other inputs."""
+        assert self._syslog is not None
+        num_datagrams = 0
+        while num_datagrams < _MAX_DATAGRAMS_PER_READ:
             try:
-                # process the first spool file we get
-                spool_file = next(self.settings.paths.spool_dir.value.glob('[!.]*'))
-                self.process_raw_lines(spool_file.read_bytes())
-                spool_file.unlink()
-                select_timeout = 0  # enable fast processing to process further files
-            except StopIteration:
-                select_timeout = 1  # restore default select timeout
+                data, ancdata, _flags, address = self._syslog.recvmsg(
+                    _DATAGRAM_BUFFER_SIZE, socket.CMSG_SPACE(_DROP_COUNTER_SIZE))
+            except (BlockingIOError, InterruptedError):
+                break
+            num_datagrams += 1
+            self._count_datagram_drops(ancdata)
+            self.process_raw_lines(data, address)
+
+        self._perfcounters.count("datagram_reads")
+        self._perfcounters.count("datagrams", num_datagrams)
+
+    def _count_datagram_drops(self, ancdata: List[Tuple[int, int, bytes]]) -> None:
+        # The kernel reports the total number of datagrams dropped due to a full receive
+        # buffer of the socket in case there were any
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == _SO_RXQ_OVFL and len(
+                    data) >= _DROP_COUNTER_SIZE:
+                dropped = struct.unpack("=I", data[:_DROP_COUNTER_SIZE])[0]
+                self._perfcounters.count("datagram_drops", (dropped - self._datagram_drops) % 2**32)
+                self._datagram_drops = dropped
+
+    def _update_pipeline(self) -> None:
+        """Starts, stops or restarts the pipeline when the configuration has changed"""
+        if self._pipeline is not None and self._pipeline.config is self._config:
+            return
+
+        self._stop_pipeline()
+        # The rules are tried by the EC itself while debugging them to log in order
+        if self._config["event_processing_workers"] and not self._config["debug_rules"]:
+            self._logger.info("Starting %d event processing workers" %
+                              self._config["event_processing_workers"])
+            self._pipeline = EventPipeline(self.settings, self._config, self._slave_status,
+                                           self._config["event_processing_workers"])
+
+    def _stop_pipeline(self) -> None:
+        if self._pipeline is None:
+            return
+        self._pipeline.flush()
+        self.process_pipeline_results(wait=True)
+        self._pipeline.close()
+        self._pipeline = None
+
+    def process_pipeline_results(self, wait: bool = False) -> None:
+        assert self._pipeline is not None
+        for matched_line in self._pipeline.results(wait):
+            if matched_line.error:
+                self._logger.error('Exception handling a log line (skipping this one): %s' %
+                                   matched_line.error)
+                continue
+
+            try:
+
+                def handler(matched_line=matched_line):
+                    self.process_matched_line(matched_line)
+
+                self.process_raw_data(handler)
+            except Exception as e:
+                self._logger.exception('Exception handling a log line (skipping this one): %s' % e)
 
     # Processes incoming data, just a wrapper between the real data and the
     # handler function to record some statistics etc.
@@ -975,6 +1217,10 @@ class EventServer(ECServerThread):
 
     # Takes several lines of messages, handles encoding and processes them separated
     def process_raw_lines(self, data: bytes, address: Optional[Any] = None) -> None:
+        if self._pipeline is not None:
+            self._pipeline.add(data, address)
+            return
+
         lines = data.splitlines()
         for line_bytes in lines:
             line = scrub_and_decode(line_bytes.rstrip())
@@ -1346,6 +1592,9 @@ class EventServer(ECServerThread):
                     for prio, entries in self._rule_hash[facility].items():
                         stats.append("%s(%d)" % (SyslogPriority(prio), len(entries)))
                     self._logger.info(" %-12s: %s" % (SyslogFacility(facility), " ".join(stats)))
+            self._rule_prefilter = RulePrefilter(self._rules)
+        else:
+            self._rule_prefilter = None
 
     @staticmethod
     def _compile_matching_value(key, val):
@@ -1421,26 +1670,59 @@ class EventServer(ECServerThread):
         event = self._event_creator.create_event_from_line(line, address)
         self.process_event(event)
 
+    def match_line(self, line: str, address: Optional[Any]) -> MatchedLine:
+        """Parses and matches a message line in a worker process of the pipeline"""
+        try:
+            event = self._event_creator.create_event_from_line(line.rstrip(), address)
+            self.do_translate_hostname(event)
+            tries, hits = self.match_event(event)
+        except Exception as e:
+            return MatchedLine(None, 0, [], str(e))
+        return MatchedLine(event, tries, [(rule["pack"], rule["id"], cancelling, match_groups)
+                                          for rule, cancelling, match_groups in hits], "")
+
+    def process_matched_line(self, matched_line: MatchedLine) -> None:
+        event = matched_line.event
+        assert event is not None
+        hits = []
+        for pack, rule_id, cancelling, match_groups in matched_line.hits:
+            rule = self._rule_by_id.get(rule_id)
+            if rule is None or rule["pack"] != pack:
+                # The rules have been reloaded in the meantime
+                self.process_matched_event(event, *self.match_event(event))
+                return
+            hits.append((rule, cancelling, match_groups))
+        self.process_matched_event(event, matched_line.tries, hits)
+
     def process_event(self, event):
         self.do_translate_hostname(event)
+        self.process_matched_event(event, *self.match_event(event))
 
-        # Log all incoming messages into a syslog-like text file if that is enabled
-        if self._config["log_messages"]:
-            self.log_message(event)
+    def match_event(self, event: Dict[str, Any]) -> Tuple[int, List[RuleHit]]:
+        """Tries the rules until one matches which does not skip the rest of its rule pack
 
-        # Rule optimizer
+        Returns the number of rules tried and the matching rules. Nothing else is changed, so
+        this can be done by the workers of the pipeline."""
         if self._config["rule_optimizer"]:
-            self._hash_stats[event["facility"]][event["priority"]] += 1
             rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
         else:
             rule_candidates = self._rules
 
+        # Skip the rules which can not match because their literals do not occur in the event.
+        # All rules are tried when debugging the rules, to log why they do not match.
+        rule_prefilter = self._rule_prefilter
+        if rule_prefilter is not None and not self._config["debug_rules"]:
+            rule_candidates = rule_prefilter.candidates(rule_candidates, event)
+
+        tries = 0
+        hits: List[RuleHit] = []
         skip_pack = None
         for rule in rule_candidates:
             if skip_pack and rule["pack"] == skip_pack:
                 continue  # still in the rule pack that we want to skip
             skip_pack = None  # new pack, reset skipping
 
+            tries += 1
             try:
                 result = self.event_rule_matches(rule, event)
             except Exception as e:
@@ -1448,105 +1730,121 @@ class EventServer(ECServerThread):
                 result = False
 
             if result:  # A tuple with (True/False, {match_info}).. O.o
-                self._perfcounters.count("rule_hits")
                 cancelling, match_groups = result
+                hits.append((rule, cancelling, match_groups))
+                if rule.get("drop") == "skip_pack":
+                    skip_pack = rule["pack"]
+                    continue
+                break
+        return tries, hits
 
-                if self._config["debug_rules"]:
-                    self._logger.info("  matching groups:\n%s" % pprint.pformat(match_groups))
+    def process_matched_event(self, event: Dict[str, Any], tries: int, hits: List[RuleHit]) -> None:
+        # Log all incoming messages into a syslog-like text file if that is enabled
+        if self._config["log_messages"]:
+            self.log_message(event)
 
-                self._event_status.count_rule_match(rule["id"])
-                if self._config["log_rulehits"]:
-                    self._logger.info("Rule '%s/%s' hit by message %s/%s - '%s'." %
-                                      (rule["pack"], rule["id"], SyslogFacility(event["facility"]),
-                                       SyslogPriority(event["priority"]), event["text"]))
+        # Rule optimizer
+        if self._config["rule_optimizer"]:
+            self._hash_stats[event["facility"]][event["priority"]] += 1
 
-                if rule.get("drop"):
-                    if rule["drop"] == "skip_pack":
-                        skip_pack = rule["pack"]
-                        if self._config["debug_rules"]:
-                            self._logger.info("  skipping this rule pack (%s)" % skip_pack)
-                        continue
-                    self._perfcounters.count("drops")
-                    return
-
-                if cancelling:
-                    self._event_status.cancel_events(self, self._event_columns, event, match_groups,
-                                                     rule)
-                    return
-
-                # Remember the rule id that this event originated from
-                event["rule_id"] = rule["id"]
-
-                # Attach optional contact group information for visibility
-                # and eventually for notifications
-                self._add_rule_contact_groups_to_event(rule, event)
-
-                # Store groups from matching this event. In order to make
-                # persistence easier, we do not safe them as list but join
-                # them on ASCII-1.
-                event["match_groups"] = match_groups.get("match_groups_message", ())
-                event["match_groups_syslog_application"] = match_groups.get(
-                    "match_groups_syslog_application", ())
-                self.rewrite_event(rule, event, match_groups)
-
-                # Lookup the monitoring core hosts and add the core host
-                # name to the event when one can be matched.
-                #
-                # Needs to be done AFTER event rewriting, because the rewriting
-                # may change the "host" field.
-                #
-                # For the moment we have no rule/condition matching on this
-                # field. So we only add the core host info for matched events.
-                self._add_core_host_to_new_event(event)
-
-                if "count" in rule:
-                    count = rule["count"]
-                    # Check if a matching event already exists that we need to
-                    # count up. If the count reaches the limit, the event will
-                    # be opened and its rule actions performed.
-                    existing_event = \
-                        self._event_status.count_event(self, event, rule, count)
-                    if existing_event:
-                        if "delay" in rule:
-                            if self._config["debug_rules"]:
-                                self._logger.info("Event opening will be delayed for %d seconds" %
-                                                  rule["delay"])
-                            existing_event["delay_until"] = time.time() + rule["delay"]
-                            existing_event["phase"] = "delayed"
-                        else:
-                            event_has_opened(self._history, self.settings, self._config,
-                                             self._logger, self, self._event_columns, rule,
-                                             existing_event)
+        self._perfcounters.count("rule_tries", tries)
+        for rule, cancelling, match_groups in hits:
+            self._perfcounters.count("rule_hits")
+
+            if self._config["debug_rules"]:
+                self._logger.info("  matching groups:\n%s" % pprint.pformat(match_groups))
 
-                        self._history.add(existing_event, "COUNTREACHED")
+            self._event_status.count_rule_match(rule["id"])
+            if self._config["log_rulehits"]:
+                self._logger.info("Rule '%s/%s' hit by message %s/%s - '%s'." %
+                                  (rule["pack"], rule["id"], SyslogFacility(event["facility"]),
+                                   SyslogPriority(event["priority"]), event["text"]))
 
-                        if "delay" not in rule and rule.get("autodelete"):
-                            existing_event["phase"] = "closed"
-                            self._history.add(existing_event, "AUTODELETE")
-                            with self._event_status.lock:
-                                self._event_status.remove_event(existing_event)
-                elif "expect" in rule:
-                    self._event_status.count_expected_event(self, event)
-                else:
+            if rule.get("drop"):
+                if rule["drop"] == "skip_pack":
+                    if self._config["debug_rules"]:
+                        self._logger.info("  skipping this rule pack (%s)" % rule["pack"])
+                    continue
+                self._perfcounters.count("drops")
+                return
+
+            if cancelling:
+                self._event_status.cancel_events(self, self._event_columns, event, match_groups,
+                                                 rule)
+                return
+
+            # Remember the rule id that this event originated from
+            event["rule_id"] = rule["id"]
+
+            # Attach optional contact group information for visibility
+            # and eventually for notifications
+            self._add_rule_contact_groups_to_event(rule, event)
+
+            # Store groups from matching this event. In order to make
+            # persistence easier, we do not safe them as list but join
+            # them on ASCII-1.
+            event["match_groups"] = match_groups.get("match_groups_message", ())
+            event["match_groups_syslog_application"] = match_groups.get(
+                "match_groups_syslog_application", ())
+            self.rewrite_event(rule, event, match_groups)
+
+            # Lookup the monitoring core hosts and add the core host
+            # name to the event when one can be matched.
+            #
+            # Needs to be done AFTER event rewriting, because the rewriting
+            # may change the "host" field.
+            #
+            # For the moment we have no rule/condition matching on this
+            # field. So we only add the core host info for matched events.
+            self._add_core_host_to_new_event(event)
+
+            if "count" in rule:
+                count = rule["count"]
+                # Check if a matching event already exists that we need to
+                # count up. If the count reaches the limit, the event will
+                # be opened and its rule actions performed.
+                existing_event = \
+                    self._event_status.count_event(self, event, rule, count)
+                if existing_event:
                     if "delay" in rule:
                         if self._config["debug_rules"]:
                             self._logger.info("Event opening will be delayed for %d seconds" %
                                               rule["delay"])
-                        event["delay_until"] = time.time() + rule["delay"]
-                        event["phase"] = "delayed"
+                        existing_event["delay_until"] = time.time() + rule["delay"]
+                        existing_event["phase"] = "delayed"
                     else:
-                        event["phase"] = "open"
+                        event_has_opened(self._history, self.settings, self._config, self._logger,
+                                         self, self._event_columns, rule, existing_event)
 
-                    if self.new_event_respecting_limits(event):
-                        if event["phase"] == "open":
-                            event_has_opened(self._history, self.settings, self._config,
-                                             self._logger, self, self._event_columns, rule, event)
-                            if rule.get("autodelete"):
-                                event["phase"] = "closed"
-                                self._history.add(event, "AUTODELETE")
-                                with self._event_status.lock:
-                                    self._event_status.remove_event(event)
-                return
+                    self._history.add(existing_event, "COUNTREACHED")
+
+                    if "delay" not in rule and rule.get("autodelete"):
+                        existing_event["phase"] = "closed"
+                        self._history.add(existing_event, "AUTODELETE")
+                        with self._event_status.lock:
+                            self._event_status.remove_event(existing_event)
+            elif "expect" in rule:
+                self._event_status.count_expected_event(self, event)
+            else:
+                if "delay" in rule:
+                    if self._config["debug_rules"]:
+                        self._logger.info("Event opening will be delayed for %d seconds" %
+                                          rule["delay"])
+                    event["delay_until"] = time.time() + rule["delay"]
+                    event["phase"] = "delayed"
+                else:
+                    event["phase"] = "open"
+
+                if self.new_event_respecting_limits(event):
+                    if event["phase"] == "open":
+                        event_has_opened(self._history, self.settings, self._config, self._logger,
+                                         self, self._event_columns, rule, event)
+                        if rule.get("autodelete"):
+                            event["phase"] = "closed"
+                            self._history.add(event, "AUTODELETE")
+                            with self._event_status.lock:
+                                self._event_status.remove_event(event)
+            return
 
         # End of loop over rules.
         if self._config["archive_orphans"]:
@@ -1600,7 +1898,6 @@ class EventServer(ECServerThread):
     # if matched regex groups in either text (normal) or match_ok (cancelling)
     # match.
     def event_rule_matches(self, rule, event):
-        self._perfcounters.count("rule_tries")
         with self._lock_configuration:
             result = self._rule_matcher.event_rule_matches_non_inverted(rule, event)
             if rule.get("invert_matching"):
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Literal prefilter for the rules of the Event Console
+
+Most rules can only match an event if the message text, the host name or the syslog
+application contains a certain literal, e.g. "disk failure" for the pattern
+"disk failure on (sd[a-z])". These literals are extracted from the patterns when compiling
+the rules. For each event, the literals occurring in these fields are searched at once by
+an Aho-Corasick automaton. Only the rules whose literals occur in the event have to be
+evaluated, all others can not match.
+
+The patterns are matched case insensitive. The literals are only compared with the lower
+case event fields in case they consist of ASCII characters only, where this is
+unambiguous. Events with other characters are checked against all rules.
+"""
+
+import sre_constants
+import sre_parse
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Event field, rule key of the pattern creating events and the one cancelling them
+_FIELDS = [
+    ("text", "match", "match_ok"),
+    ("host", "match_host", None),
+    ("application", "match_application", "cancel_application"),
+]
+_FIELD_NAMES = [field for field, _key, _cancel_key in _FIELDS]
+
+# A rule having one of these cancels events independent of the other cancel patterns
+_CANCELING_KEYS = ["match_ok", "cancel_application", "cancel_priority"]
+
+# Shorter literals are not worth it, they occur in almost all events
+_MIN_LITERAL_LENGTH = 3
+
+# Event field and the literals of which one needs to occur in the field
+Condition = Tuple[str, FrozenSet[str]]
+Rule = Dict[str, Any]
+# Rule list, positions of the rules without conditions, (field, literal) -> rule positions
+Index = Tuple[List[Rule], List[int], Dict[Tuple[str, str], List[int]]]
+
+
+class LiteralMatcher:
+    """Aho-Corasick automaton finding all occurrences of a set of literals at once"""
+    def __init__(self, literals: Iterable[str]) -> None:
+        super().__init__()
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[FrozenSet[str]] = [frozenset()]
+
+        for literal in set(literals):
+            state = 0
+            for char in literal:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(frozenset())
+                state = next_state
+            self._output[state] = frozenset([literal])
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] = self._output[next_state] | self._output[fail]
+
+    def find(self, text: str) -> Set[str]:
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def required_literals(pattern: Any) -> Optional[FrozenSet[str]]:
+    """Lower case literals of which one occurs in every text matched by the compiled pattern
+
+    None is returned in case no such literals are known."""
+    if pattern is None:
+        return None
+
+    if isinstance(pattern, str):
+        # Plain texts are already lower case and compared with the lower case event fields
+        literals: Optional[FrozenSet[str]] = frozenset([pattern])
+    else:
+        try:
+            literals = _sequence_literals(sre_parse.parse(pattern.pattern, pattern.flags))
+        except (sre_constants.error, TypeError, RecursionError):
+            return None
+
+    if literals is None or not all(literal.isascii() and len(literal) >= _MIN_LITERAL_LENGTH
+                                   for literal in literals):
+        return None
+    return literals
+
+
+def _sequence_literals(items: Iterable[Tuple[Any, Any]]) -> Optional[FrozenSet[str]]:
+    """The most selective literals of a sequence of regex items, all of which have to match"""
+    candidates: List[FrozenSet[str]] = []
+    run: List[str] = []
+    for op, av in items:
+        if op is sre_constants.LITERAL and av < 128:
+            run.append(chr(av).lower())
+            continue
+
+        if run:
+            candidates.append(frozenset(["".join(run)]))
+            run = []
+
+        literals: Optional[FrozenSet[str]] = None
+        if op is sre_constants.SUBPATTERN:
+            literals = _sequence_literals(av[-1])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            literals = _sequence_literals(av[2])
+        elif op is sre_constants.BRANCH:
+            literals = frozenset()
+            for branch in av[1]:
+                branch_literals = _sequence_literals(branch)
+                if branch_literals is None:
+                    literals = None
+                    break
+                literals |= branch_literals
+
+        if literals:
+            candidates.append(literals)
+
+    if run:
+        candidates.append(frozenset(["".join(run)]))
+
+    if not candidates:
+        return None
+    return max(candidates, key=lambda literals: min(len(literal) for literal in literals))
+
+
+def rule_conditions(rule: Rule) -> List[Condition]:
+    """The literal conditions of a compiled rule, all of which have to be met by an event"""
+    if rule.get("invert_matching"):
+        return []  # Matches when the patterns do not match
+
+    # A rule matches in case an event is created or cancelled, the host applies to both. The
+    # field is not restricted in case one of the relevant patterns has no literals.
+    canceling = any(key in rule for key in _CANCELING_KEYS)
+    conditions = []
+    for field, key, cancel_key in _FIELDS:
+        keys = [key, cancel_key] if canceling and cancel_key is not None else [key]
+        patterns_literals = [required_literals(rule.get(key)) for key in keys]
+        if all(literals is not None for literals in patterns_literals):
+            conditions.append((field, frozenset().union(*patterns_literals)))
+    return conditions
+
+
+class RulePrefilter:
+    """Selects the rules which may match an event"""
+    def __init__(self, rules: List[Rule]) -> None:
+        super().__init__()
+        self._conditions = {id(rule): rule_conditions(rule) for rule in rules}
+        self._matchers = {
+            field: LiteralMatcher(literal for conditions in self._conditions.values()
+                                  for condition_field, literals in conditions
+                                  if condition_field == field
+                                  for literal in literals)
+            for field in _FIELD_NAMES
+        }
+        self._indexes: Dict[int, Index] = {}
+
+    def candidates(self, rules: List[Rule], event: Dict[str, Any]) -> List[Rule]:
+        """The rules of the given list which may match the event, in their original order"""
+        values = [(field, event.get(field, "")) for field in _FIELD_NAMES]
+        if not all(isinstance(value, str) and value.isascii() for _field, value in values):
+            return rules
+
+        found = {field: self._matchers[field].find(value.lower()) for field, value in values}
+
+        _rules, unconditional, by_literal = self._get_index(rules)
+        positions = set(unconditional)
+        for field, literals in found.items():
+            for literal in literals:
+                positions.update(by_literal.get((field, literal), ()))
+
+        return [
+            rules[position]
+            for position in sorted(positions)
+            if all(not found[field].isdisjoint(literals)
+                   for field, literals in self._conditions.get(id(rules[position]), []))
+        ]
+
+    def _get_index(self, rules: List[Rule]) -> Index:
+        # The index of a rule list is built when it is used for the first time
+        index = self._indexes.get(id(rules))
+        if index is not None and index[0] is rules:
+            return index
+
+        unconditional: List[int] = []
+        by_literal: Dict[Tuple[str, str], List[int]] = {}
+        for position, rule in enumerate(rules):
+            conditions = self._conditions.get(id(rule))
+            if not conditions:
+                unconditional.append(position)
+                continue
+            # Indexed by the first condition, the others are checked for the candidates
+            field, literals = conditions[0]
+            for literal in literals:
+                by_literal.setdefault((field, literal), []).append(position)
+
+        index = rules, unconditional, by_literal
+        self._indexes[id(rules)] = index
+        return index
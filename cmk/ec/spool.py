@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Watching the spool directory of the Event Console
+
+Messages can be handed over to the Event Console by files in the spool directory, e.g. by
+the logwatch forwarding. These files are written under a hidden name first and moved to
+their final name when complete. Instead of looking into the directory on every iteration
+of the event server, the directory is watched with inotify. The event server waits for the
+inotify file descriptor together with its sockets and only looks into the directory after
+a file has been put there. In case inotify is not available, the directory is looked into
+every time.
+"""
+
+import ctypes
+import ctypes.util
+from logging import Logger
+import os
+from pathlib import Path
+from typing import Optional
+
+# See inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+
+
+def _inotify_watch(path: Path) -> Optional[int]:
+    """Creates a non blocking inotify file descriptor watching for new files in the directory"""
+    lib = ctypes.util.find_library('c')
+    if not lib:
+        return None
+    libc = ctypes.CDLL(lib, use_errno=True)
+
+    try:
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except AttributeError:
+        return None  # Not a Linux libc
+    if fd < 0:
+        return None
+
+    if libc.inotify_add_watch(fd, bytes(path), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class SpoolWatcher:
+    def __init__(self, path: Path, logger: Logger) -> None:
+        super().__init__()
+        self._path = path
+        self._logger = logger
+
+        try:
+            self._path.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            pass
+        self._fd = _inotify_watch(self._path)
+        if self._fd is None:
+            self._logger.warning("Cannot watch the spool directory '%s', looking into it "
+                                 "periodically" % self._path)
+
+        # Files may have been spooled while the Event Console was not running
+        self._check = True
+
+    def fileno(self) -> Optional[int]:
+        """The file descriptor becoming readable when files have been put into the directory"""
+        return self._fd
+
+    def handle_readable(self) -> None:
+        """Consumes the inotify events, the directory is looked into by next_file()"""
+        assert self._fd is not None
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        self._check = True
+
+    def next_file(self) -> Optional[Path]:
+        """The next file to process or None in case the directory is empty"""
+        if not self._check:
+            return None
+
+        try:
+            return next(self._path.glob('[!.]*'))
+        except StopIteration:
+            # Files put into the directory from now on are reported by inotify. Without it we
+            # have to look again next time.
+            self._check = self._fd is None
+            return None
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
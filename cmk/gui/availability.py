@@ -7,10 +7,22 @@
 import time
 import os
 
-from typing import Callable, Set, Dict, Any, Union, List, NamedTuple, Tuple as _Tuple, Optional as _Optional
+from typing import (
+    Callable,
+    Set,
+    Dict,
+    Any,
+    Union,
+    List,
+    NamedTuple,
+    Tuple as _Tuple,
+    Optional as _Optional,
+    Iterable,
+    Iterator,
+)
 from six import ensure_str
 
-from livestatus import SiteId
+from livestatus import SiteId, LivestatusResponse
 
 import cmk.utils.version as cmk_version
 import cmk.utils.defines as defines
@@ -691,6 +703,71 @@ def get_availability_rawdata(what,
         return get_bi_availability_rawdata(filterheaders, only_sites, av_object, include_output,
                                            avoptions)
 
+    columns, data, exceeded_log_row_limit = _query_availability_rows(
+        what, filterheaders, only_sites, av_object, include_output, include_long_output,
+        avoptions, view_process_tracking)
+
+    with CPUTracker() as filter_rows_tracker:
+        av_rawdata = spans_by_object(_iter_availability_spans(columns, data, context, avoptions))
+
+    if view_process_tracking:
+        view_process_tracking.duration_filter_rows = filter_rows_tracker.duration
+
+    return av_rawdata, exceeded_log_row_limit
+
+
+def get_availability_data(what: AVObjectType,
+                          context,
+                          filterheaders,
+                          only_sites,
+                          av_object,
+                          include_output,
+                          include_long_output,
+                          avoptions: AVOptions,
+                          with_timelines: bool = True,
+                          view_process_tracking=None) -> _Tuple[AVRawData, AVData, bool]:
+    """ Fetches the raw data and computes the availability table
+
+    In case no timelines are needed, the spans are aggregated per object while they are
+    read and are not kept afterwards. The raw data then only lists the objects."""
+    if not with_timelines and _availability_can_be_streamed(what, av_object, avoptions):
+        columns, data, exceeded_log_row_limit = _query_availability_rows(
+            what, filterheaders, only_sites, av_object, include_output, include_long_output,
+            avoptions, view_process_tracking)
+
+        with CPUTracker() as filter_rows_tracker:
+            av_rawdata, av_data = compute_availability_of_spans(
+                what, _iter_availability_spans(columns, data, context, avoptions), avoptions)
+
+        if view_process_tracking:
+            view_process_tracking.duration_filter_rows = filter_rows_tracker.duration
+
+        return av_rawdata, av_data, exceeded_log_row_limit
+
+    av_rawdata, exceeded_log_row_limit = get_availability_rawdata(
+        what,
+        context,
+        filterheaders,
+        only_sites,
+        av_object,
+        include_output,
+        include_long_output,
+        avoptions,
+        view_process_tracking=view_process_tracking)
+    return av_rawdata, compute_availability(what, av_rawdata, avoptions), exceeded_log_row_limit
+
+
+def _availability_can_be_streamed(what: AVObjectType, av_object: AVObjectSpec,
+                                  avoptions: AVOptions) -> bool:
+    # Melting short intervals needs to look at the whole timeline of an object
+    return (what != "bi" and not av_object and not avoptions["show_timeline"] and
+            not avoptions["short_intervals"])
+
+
+def _query_availability_rows(
+        what: AVObjectType, filterheaders, only_sites, av_object, include_output,
+        include_long_output, avoptions: AVOptions,
+        view_process_tracking) -> _Tuple[List[str], LivestatusResponse, bool]:
     time_range: AVTimeRange = avoptions["range"][0]
 
     av_filter = "Filter: time >= %d\nFilter: time < %d\n" % time_range
@@ -744,58 +821,70 @@ def get_availability_rawdata(what,
             logrow_limit), CPUTracker() as fetch_rows_tracker:
         data = sites.live().query(query)
 
-    columns = ["site"] + columns
-    spans: List[AVSpan] = [dict(zip(columns, span)) for span in data]
-    amount_filtered_rows = len(spans)
-
-    # When a group filter is set, only care about these groups in the group fields
-    with CPUTracker() as filter_rows_tracker:
-        if avoptions["grouping"] not in [None, "host"]:
-            filter_groups_of_entries(context, avoptions, spans)
+    amount_rows = len(data)
 
     # Now we find out if the log row limit was exceeded or
     # if the log's length is the limit by accident.
     # If this limit was exceeded then we cut off the last element
     # because it might be incomplete.
     exceeded_log_row_limit: bool = False
-    if logrow_limit and len(data) > logrow_limit:
+    if logrow_limit and amount_rows > logrow_limit:
         exceeded_log_row_limit = True
-        spans = spans[:-1]
+        del data[-1]
 
     if view_process_tracking:
-        view_process_tracking.amount_unfiltered_rows = len(data)
-        view_process_tracking.amount_filtered_rows = amount_filtered_rows
-        view_process_tracking.rows_after_limit = len(spans)
+        view_process_tracking.amount_unfiltered_rows = amount_rows
+        view_process_tracking.amount_filtered_rows = amount_rows
+        view_process_tracking.rows_after_limit = len(data)
         view_process_tracking.duration_fetch_rows = fetch_rows_tracker.duration
-        view_process_tracking.duration_filter_rows = filter_rows_tracker.duration
 
-    return spans_by_object(spans), exceeded_log_row_limit
+    return ["site"] + columns, data, exceeded_log_row_limit
+
+
+def _iter_availability_spans(columns: List[str], data: LivestatusResponse, context,
+                             avoptions: AVOptions) -> Iterator[AVSpan]:
+    """ Converts the livestatus rows to spans while consuming them
+
+    Each row is released as soon as its span has been created, so the rows and the
+    spans never need to be kept in memory at the same time."""
+    group_by = avoptions["grouping"]
+    # When a group filter is set, only care about these groups in the group fields
+    only_groups = None
+    if group_by not in [None, "host"]:
+        only_groups = _get_only_groups(context, avoptions)
+
+    data.reverse()
+    while data:
+        span = dict(zip(columns, data.pop()))
+        if only_groups is not None:
+            span[group_by] = list(set(span[group_by]).intersection(only_groups))
+        yield span
 
 
-def filter_groups_of_entries(context, avoptions, spans):
+def _get_only_groups(context, avoptions) -> _Optional[Set[str]]:
     group_by = avoptions["grouping"]
 
-    only_groups = set()
+    only_groups: Set[str] = set()
     # TODO: This is a dirty hack. The logic of the filters needs to be moved to the filters.
     # They need to be able to filter the list of all groups.
     # TODO: Negated filters are not handled here. :(
     if group_by == "service_groups":
         if "servicegroups" not in context and "optservicegroup" not in context:
-            return
+            return None
 
         # Extract from context:
         # 'servicegroups': {'servicegroups': 'cpu|disk', 'neg_servicegroups': 'off'},
         # 'optservicegroup': {'optservice_group': '', 'neg_optservice_group': 'off'},
         negated = context.get("servicegroups", {}).get("neg_servicegroups") == "on"
         if negated:
-            return
+            return None
 
         only_groups.update(
             [e for e in context.get("servicegroups", {}).get("servicegroups", "").split("|") if e])
 
         negated = context.get("optservicegroup", {}).get("neg_optservice_group") == "on"
         if negated:
-            return
+            return None
 
         group_name = context.get("optservicegroup", {}).get("optservice_group")
         if group_name and not negated:
@@ -803,18 +892,18 @@ def filter_groups_of_entries(context, avoptions, spans):
 
     elif group_by == "host_groups":
         if "hostgroups" not in context and "opthostgroup" not in context:
-            return
+            return None
 
         negated = context.get("hostgroups", {}).get("neg_hostgroups") == "on"
         if negated:
-            return
+            return None
 
         only_groups.update(
             [e for e in context.get("hostgroups", {}).get("hostgroups", "").split("|") if e])
 
         negated = context.get("opthostgroup", {}).get("neg_opthost_group") == "on"
         if negated:
-            return
+            return None
 
         group_name = context.get("opthostgroup", {}).get("opthost_group")
         if group_name and not negated:
@@ -823,14 +912,12 @@ def filter_groups_of_entries(context, avoptions, spans):
     else:
         raise NotImplementedError()
 
-    for span in spans:
-        filtered_groups = list(set(span[group_by]).intersection(only_groups))
-        span[group_by] = filtered_groups
+    return only_groups
 
 
 # Sort the raw spans into a tree of dicts, so that we
 # have easy access to the timeline of each object
-def spans_by_object(spans: List[AVSpan]) -> AVRawData:
+def spans_by_object(spans: Iterable[AVSpan]) -> AVRawData:
     # Sort by site/host and service, while keeping native order
     av_rawdata: AVRawData = {}
     for span in spans:
@@ -889,56 +976,8 @@ def compute_availability(what: AVObjectType, av_rawdata: AVRawData, avoptions: A
                     group_ids.update(span[grouping])  # List of host/service groups
 
                 display_name = span.get("service_display_name", service)
-                state = span["state"]
                 host_alias = span.get("host_alias", site_host[1])
-                consider = True
-
-                if avoptions["service_period"] != "ignore" and (
-                    (span["in_service_period"] and avoptions["service_period"] != "honor") or
-                    (not span["in_service_period"] and avoptions["service_period"] == "honor")):
-                    s = "outof_service_period"
-                    consider = False
-                elif state == -1:
-                    s = "unmonitored"
-                    if not avoptions["consider"]["unmonitored"]:
-                        consider = False
-                elif state is None:
-                    # state is None means that this element was not known at this given time
-                    # So there is no reason for creating a fake pending state
-                    consider = False
-                elif span["in_notification_period"] == 0 and avoptions[
-                        "notification_period"] == "exclude":
-                    consider = False
-
-                elif span["in_notification_period"] == 0 and avoptions[
-                        "notification_period"] == "honor":
-                    s = "outof_notification_period"
-
-                elif (span["in_downtime"] or span["in_host_downtime"]
-                     ) and not (avoptions["downtimes"]["exclude_ok"] and
-                                state == 0) and not avoptions["downtimes"]["include"] == "ignore":
-                    if avoptions["downtimes"]["include"] == "exclude":
-                        consider = False
-                    else:
-                        s = "in_downtime"
-                elif what != "host" and span["host_down"] and avoptions["consider"]["host_down"]:
-                    # Reclassification due to state grouping
-                    s = avoptions["state_grouping"].get("host_down", "host_down")
-
-                elif span["is_flapping"] and avoptions["consider"]["flapping"]:
-                    s = "flapping"
-                else:
-                    if what in ["service", "bi"]:
-                        s = {0: "ok", 1: "warn", 2: "crit", 3: "unknown"}.get(state, "unmonitored")
-                    else:
-                        s = {0: "up", 1: "down", 2: "unreach"}.get(state, "unmonitored")
-
-                    # Reclassification due to state grouping
-                    if s in avoptions["state_grouping"]:
-                        s = avoptions["state_grouping"][s]
-
-                    elif s in avoptions["host_state_grouping"]:
-                        s = avoptions["host_state_grouping"][s]
+                consider, s = _classify_span(what, span, avoptions)
 
                 total_duration += span["duration"]
                 if consider:
@@ -993,6 +1032,199 @@ def compute_availability(what: AVObjectType, av_rawdata: AVRawData, avoptions: A
     return filtered_table
 
 
+def _classify_span(what: AVObjectType, span: AVSpan,
+                   avoptions: AVOptions) -> _Tuple[bool, AVTimelineStateName]:
+    state = span["state"]
+    consider = True
+    s = ""
+    if avoptions["service_period"] != "ignore" and (
+        (span["in_service_period"] and avoptions["service_period"] != "honor") or
+        (not span["in_service_period"] and avoptions["service_period"] == "honor")):
+        s = "outof_service_period"
+        consider = False
+    elif state == -1:
+        s = "unmonitored"
+        if not avoptions["consider"]["unmonitored"]:
+            consider = False
+    elif state is None:
+        # state is None means that this element was not known at this given time
+        # So there is no reason for creating a fake pending state
+        consider = False
+    elif span["in_notification_period"] == 0 and avoptions[
+            "notification_period"] == "exclude":
+        consider = False
+
+    elif span["in_notification_period"] == 0 and avoptions[
+            "notification_period"] == "honor":
+        s = "outof_notification_period"
+
+    elif (span["in_downtime"] or span["in_host_downtime"]
+         ) and not (avoptions["downtimes"]["exclude_ok"] and
+                    state == 0) and not avoptions["downtimes"]["include"] == "ignore":
+        if avoptions["downtimes"]["include"] == "exclude":
+            consider = False
+        else:
+            s = "in_downtime"
+    elif what != "host" and span["host_down"] and avoptions["consider"]["host_down"]:
+        # Reclassification due to state grouping
+        s = avoptions["state_grouping"].get("host_down", "host_down")
+
+    elif span["is_flapping"] and avoptions["consider"]["flapping"]:
+        s = "flapping"
+    else:
+        if what in ["service", "bi"]:
+            s = {0: "ok", 1: "warn", 2: "crit", 3: "unknown"}.get(state, "unmonitored")
+        else:
+            s = {0: "up", 1: "down", 2: "unreach"}.get(state, "unmonitored")
+
+        # Reclassification due to state grouping
+        if s in avoptions["state_grouping"]:
+            s = avoptions["state_grouping"][s]
+
+        elif s in avoptions["host_state_grouping"]:
+            s = avoptions["host_state_grouping"][s]
+
+    return consider, s
+
+
+def compute_availability_of_spans(what: AVObjectType, spans: Iterable[AVSpan],
+                                  avoptions: AVOptions) -> _Tuple[AVRawData, AVData]:
+    """ Computes an availability table without timelines while consuming the spans
+
+    Only running aggregates are kept for each object. The returned raw data lists the
+    objects, but not their spans."""
+    annotations = load_annotations()
+    os_aggrs, os_states = get_outage_statistic_options(avoptions)
+    need_statistics = bool(os_aggrs and os_states)
+
+    aggregates: Dict[_Tuple[SiteHost, ServiceName], _AVAggregate] = {}
+    for span in spans:
+        site_host = span["site"], span["host_name"]
+        service = span["service_description"]
+        aggregate = aggregates.get((site_host, service))
+        if aggregate is None:
+            aggregate = aggregates[(site_host, service)] = _AVAggregate(
+                what, site_host, service, avoptions, need_statistics)
+
+        for reclassified_span in _reclassify_span_by_annotations(what, span, annotations):
+            aggregate.add(reclassified_span)
+
+    av_rawdata: AVRawData = {}
+    availability_table: AVData = []
+    for (site_host, service), aggregate in aggregates.items():
+        av_rawdata.setdefault(site_host, {})[service] = []
+        availability_table.append(aggregate.entry())
+
+    return av_rawdata, [
+        row for row in sorted(availability_table, key=key_av_entry)
+        if pass_availability_filter(row, avoptions)
+    ]
+
+
+def _reclassify_span_by_annotations(what: AVObjectType, span: AVSpan,
+                                    annotations: AVAnnotations) -> List[AVSpan]:
+    if not annotations:
+        return [span]
+
+    site_host_svc = (span["site"], span["host_name"], span["service_description"] or None)
+    cycles: List[AVAnnotationKey] = [site_host_svc]
+    if what == "service":
+        cycles.insert(0, (site_host_svc[0], site_host_svc[1], None))
+
+    history = [span]
+    for anno_key in cycles:
+        if anno_key in annotations:
+            history = reclassify_history_by_annotations(history, annotations[anno_key])
+    return history
+
+
+class _AVAggregate:
+    """ Running aggregate of the spans of one object, in the order of the spans
+
+    It results in the same entry as compute_availability(), only without the timeline."""
+    def __init__(self, what: AVObjectType, site_host: SiteHost, service: ServiceName,
+                 avoptions: AVOptions, need_statistics: bool) -> None:
+        self._what = what
+        self._site_host = site_host
+        self._service = service
+        self._avoptions = avoptions
+        self._need_statistics = need_statistics
+
+        grouping = avoptions["grouping"]
+        self._group_ids: AVGroupIds
+        if grouping == "host":
+            self._group_ids = [site_host]
+        elif grouping in ["host_groups", "service_groups"]:
+            self._group_ids = set()
+        else:
+            self._group_ids = None
+
+        self._display_name = service
+        self._host_alias = site_host[1]
+        self._total_duration = 0
+        self._considered_duration = 0
+        self._states: AVTimelineStates = {}
+        self._statistics: AVTimelineStatistics = {}
+        # The last considered span: state, end and duration. It is kept open, because
+        # following spans with the same state are merged into it
+        self._last: _Optional[_Tuple[AVTimelineStateName, AVTimeStamp, int]] = None
+
+    def add(self, span: AVSpan) -> None:
+        grouping = self._avoptions["grouping"]
+        if grouping in ["host_groups", "service_groups"] and self._what != "bi":
+            assert isinstance(self._group_ids, set)
+            self._group_ids.update(span[grouping])  # List of host/service groups
+
+        self._display_name = span.get("service_display_name", self._service)
+        self._host_alias = span.get("host_alias", self._site_host[1])
+        consider, s = _classify_span(self._what, span, self._avoptions)
+
+        duration = span["duration"]
+        self._total_duration += duration
+        if not consider:
+            return
+        self._considered_duration += duration
+
+        if self._last is not None:
+            last_s, last_until, last_duration = self._last
+            if (not self._avoptions["dont_merge"] and last_s == s and
+                    last_until == span["from"]):
+                self._last = s, span["until"], last_duration + duration
+                return
+            self._condense(last_s, last_duration)
+        self._last = s, span["until"], duration
+
+    def _condense(self, s: AVTimelineStateName, duration: int) -> None:
+        self._states[s] = self._states.get(s, 0) + duration
+        if self._need_statistics:
+            entry = self._statistics.get(s)
+            if entry:
+                self._statistics[s] = (entry[0] + 1, min(entry[1], duration),
+                                       max(entry[2], duration))
+            else:
+                self._statistics[s] = (1, duration, duration)  # count, min, max
+
+    def entry(self) -> AVEntry:
+        if self._last is not None:
+            last_s, _last_until, last_duration = self._last
+            self._condense(last_s, last_duration)
+            self._last = None
+
+        return {
+            "site": self._site_host[0],
+            "host": self._site_host[1],
+            "alias": self._host_alias,
+            "service": self._service,
+            "display_name": self._display_name,
+            "states": self._states,
+            "considered_duration": self._considered_duration,
+            "total_duration": self._total_duration,
+            "statistics": self._statistics,
+            "groups": self._group_ids,
+            "timeline": [],
+        }
+
+
 # Note: Reclassifications of host/service periods do currently *not* have
 # any impact on BI aggregations.
 def reclassify_by_annotations(what: AVObjectType, av_rawdata: AVRawData) -> AVRawData:
@@ -1491,8 +1723,8 @@ def layout_availability_table(what: AVObjectType, group_title: _Optional[str],
                         else:
                             cells.append((u"", ""))
 
-            # If timeline == [] and states == {} then this objects has complete unmonitored state
-            if entry["timeline"] == [] and entry["states"] == {}:
+            # If states == {} then this objects has complete unmonitored state (and no timeline)
+            if entry["states"] == {}:
                 unmonitored_objects += 1
 
     # Summary line. It has the same format as each entry in cells
@@ -27,6 +27,8 @@ from cmk.gui.permissions import (
     Permission,
 )
 from cmk.gui.utils.urls import makeuri_contextless
+from cmk.gui.background_job import BackgroundJobAlreadyRunning, BackgroundProcessInterface
+from cmk.gui.gui_background_job import GUIBackgroundJob, job_registry
 
 from cmk.utils.bi.bi_packs import BIAggregationPacks
 from cmk.utils.bi.bi_data_fetcher import BIStatusFetcher
@@ -927,7 +929,8 @@ class BIManager:
     def __init__(self):
         sites_callback = SitesCallback(cmk.gui.sites.states, bi_livestatus_query)
         self.compiler = BICompiler(self.bi_configuration_file(), sites_callback)
-        self.compiler.load_compiled_aggregations()
+        self.compiler.load_compiled_aggregations(
+            compile_in_background=start_bi_compilation_background_job)
         self.status_fetcher = BIStatusFetcher(sites_callback)
         self.computer = BIComputer(self.compiler.compiled_aggregations, self.status_fetcher)
 
@@ -936,6 +939,40 @@ class BIManager:
         return str(Path(watolib.multisite_dir()) / "bi_config.mk")
 
 
+@job_registry.register
+class BICompilationBackgroundJob(GUIBackgroundJob):
+    job_prefix = "bi_compilation"
+
+    @classmethod
+    def gui_title(cls) -> str:
+        return _("BI aggregation compilation")
+
+    def __init__(self) -> None:
+        last_job_status = GUIBackgroundJob(self.job_prefix).get_status()
+        super().__init__(
+            self.job_prefix,
+            title=self.gui_title(),
+            stoppable=False,
+            estimated_duration=last_job_status.get("duration"),
+        )
+
+
+def _compile_bi_aggregations_background(job_interface: BackgroundProcessInterface) -> None:
+    job_interface.send_progress_update(_("Compilation of outdated aggregations started..."))
+    sites_callback = SitesCallback(cmk.gui.sites.states, bi_livestatus_query)
+    BICompiler(BIManager.bi_configuration_file(), sites_callback).update_compiled_aggregations()
+    job_interface.send_result_message(_("BI aggregations successfully compiled"))
+
+
+def start_bi_compilation_background_job() -> None:
+    job = BICompilationBackgroundJob()
+    job.set_function(_compile_bi_aggregations_background)
+    try:
+        job.start()
+    except BackgroundJobAlreadyRunning:
+        pass
+
+
 def get_cached_bi_packs() -> BIAggregationPacks:
     if "bi_packs" not in g:
         g.bi_packs = BIAggregationPacks(BIManager.bi_configuration_file())
@@ -10,7 +10,7 @@ import os
 import shutil
 import time
 import xml.dom.minidom  # type: ignore[import]
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 from pathlib import Path
 
 import dicttoxml  # type: ignore[import]
@@ -18,6 +18,8 @@ import dicttoxml  # type: ignore[import]
 import livestatus
 
 import cmk.utils.paths
+import cmk.utils.inventory_history as inventory_history
+from cmk.utils.inventory_index import InventoryIndex, is_indexable_path, table_name
 from cmk.utils.structured_data import StructuredDataTree, Container, Numeration, Attributes
 from cmk.utils.exceptions import (
     MKException,
@@ -108,16 +110,39 @@ def load_filtered_inventory_tree(hostname: Optional[HostName]) -> Optional[Struc
     return _filter_tree(_load_inventory_tree(hostname))
 
 
-def load_filtered_and_merged_tree(row):
+def load_filtered_and_merged_tree(row,
+                                  inventory_index: Optional[InventoryIndex] = None,
+                                  tree_path: Optional[List] = None):
     """Load inventory tree from file, status data tree from row,
-    merge these trees and returns the filtered tree"""
-    inventory_tree = _load_inventory_tree(row.get("host_name"))
+    merge these trees and returns the filtered tree
+
+    With an inventory index only the indexed parts of the inventory tree are loaded
+    as long as the index is up to date for the host. With a tree path only the
+    subtree below this path is loaded."""
+    if inventory_index is None:
+        inventory_tree = _load_inventory_tree(row.get("host_name"), tree_path)
+    else:
+        inventory_tree = _load_indexed_inventory_tree(row.get("host_name"), inventory_index)
     status_data_tree = _create_tree_from_raw_tree(row.get("host_structured_status"))
 
     merged_tree = _merge_inventory_and_status_data_tree(inventory_tree, status_data_tree)
     return _filter_tree(merged_tree)
 
 
+def get_inventory_index(inventory_paths: Optional[Iterable[str]]) -> Optional[InventoryIndex]:
+    """The index answering the given leaf paths, None in case the whole trees are needed"""
+    if inventory_paths is None:
+        return None
+
+    table_names = set()
+    for invpath in inventory_paths:
+        parsed_path, attribute_keys = parse_tree_path(invpath)
+        if not attribute_keys or not is_indexable_path(parsed_path):
+            return None
+        table_names.add(table_name(parsed_path))
+    return InventoryIndex(table_names)
+
+
 def get_status_data_via_livestatus(site, hostname):
     query = "GET hosts\nColumns: host_structured_status\nFilter: host_name = %s\n" % livestatus.lqencode(
         hostname)
@@ -145,7 +170,10 @@ def load_delta_tree(hostname, timestamp):
     return delta_history[0][1][3], corrupted_history_files
 
 
-def get_history_deltas(hostname, search_timestamp=None):
+def get_history_deltas(hostname, search_timestamp=None, limit=None):
+    """Deltas between the consecutive inventory trees of a host, only the newest ones with limit
+
+    The deltas computed by the inventory are used, missing ones are computed and saved."""
     if '/' in hostname:
         return None, []  # just for security reasons
 
@@ -161,75 +189,58 @@ def get_history_deltas(hostname, search_timestamp=None):
         return [], []
 
     all_timestamps = archived_timestamps + [latest_timestamp]
-    previous_timestamp = None
-
-    if not search_timestamp:
-        required_timestamps = all_timestamps
-    else:
-        new_timestamp_idx = all_timestamps.index(search_timestamp)
-        if new_timestamp_idx == 0:
-            required_timestamps = [search_timestamp]
-        else:
-            previous_timestamp = all_timestamps[new_timestamp_idx - 1]
-            required_timestamps = [search_timestamp]
+    timestamp_pairs = list(zip([None] + all_timestamps[:-1], all_timestamps))
+    if search_timestamp:
+        timestamp_pairs = [pair for pair in timestamp_pairs if pair[1] == search_timestamp]
 
+    # The saved deltas have been computed from the unfiltered trees. Users who may only see
+    # parts of the trees need the deltas between the filtered trees.
+    use_saved_deltas = _get_permitted_inventory_paths() is None
     tree_lookup: Dict[str, Any] = {}
 
     def get_tree(timestamp):
         if timestamp is None:
             return StructuredDataTree()
 
-        if timestamp in tree_lookup:
-            return tree_lookup[timestamp]
-
-        if timestamp == latest_timestamp:
-            inventory_tree = load_filtered_inventory_tree(hostname)
-            if inventory_tree is None:
-                return
-            tree_lookup[timestamp] = inventory_tree
-        else:
-            inventory_archive_path = "%s/%s" % (inventory_archive_dir, timestamp)
-            tree_lookup[timestamp] = _filter_tree(
-                StructuredDataTree().load_from(inventory_archive_path))
+        if timestamp not in tree_lookup:
+            if timestamp == latest_timestamp:
+                inventory_tree = _load_inventory_tree(hostname) or StructuredDataTree()
+            else:
+                inventory_archive_path = "%s/%s" % (inventory_archive_dir, timestamp)
+                inventory_tree = StructuredDataTree().load_from(inventory_archive_path)
+            tree_lookup[timestamp] = _filter_tree(inventory_tree)
         return tree_lookup[timestamp]
 
+    manifest = inventory_history.load_manifest(hostname) if use_saved_deltas else {}
     corrupted_history_files = []
     delta_history = []
-    for _idx, timestamp in enumerate(required_timestamps):
-        cached_delta_path = os.path.join(cmk.utils.paths.var_dir, "inventory_delta_cache", hostname,
-                                         "%s_%s" % (previous_timestamp, timestamp))
-
-        cached_data = None
-        try:
-            cached_data = store.load_object_from_file(cached_delta_path)
-        except MKGeneralException:
-            pass
+    for previous_timestamp, timestamp in reversed(timestamp_pairs):
+        if limit is not None and len(delta_history) >= limit:
+            break
+
+        name = inventory_history.delta_name(previous_timestamp, timestamp)
+        delta_data = None
+        if name in manifest:
+            if not any(manifest[name]):
+                continue
+            delta_data = inventory_history.load_delta(hostname, name)
 
-        if cached_data:
-            new, changed, removed, delta_tree_data = cached_data
-            delta_tree = StructuredDataTree()
-            delta_tree.create_tree_from_raw_tree(delta_tree_data)
-            delta_history.append((timestamp, (new, changed, removed, delta_tree)))
-            previous_timestamp = timestamp
-            continue
+        if delta_data is None:
+            try:
+                delta_data = get_tree(timestamp).compare_with(get_tree(previous_timestamp))
+            except LoadStructuredDataError:
+                corrupted_history_files.append(
+                    str(get_short_inventory_history_filepath(hostname, timestamp)))
+                continue
+            if use_saved_deltas:
+                inventory_history.save_delta(hostname, name, delta_data)
 
-        try:
-            previous_tree = get_tree(previous_timestamp)
-            current_tree = get_tree(timestamp)
-            delta_data = current_tree.compare_with(previous_tree)
-            new, changed, removed, delta_tree = delta_data
-            if new or changed or removed:
-                store.save_file(
-                    cached_delta_path,
-                    repr((new, changed, removed, delta_tree.get_raw_tree())),
-                )
-                delta_history.append((timestamp, delta_data))
-        except LoadStructuredDataError:
-            corrupted_history_files.append(
-                str(get_short_inventory_history_filepath(hostname, timestamp)))
-
-        previous_timestamp = timestamp
+        new, changed, removed, _delta_tree = delta_data
+        if new or changed or removed:
+            delta_history.append((timestamp, delta_data))
 
+    delta_history.reverse()
+    corrupted_history_files.reverse()
     return delta_history, corrupted_history_files
 
 
@@ -270,29 +281,53 @@ class LoadStructuredDataError(MKException):
     pass
 
 
-def _load_inventory_tree(hostname: Optional[HostName]) -> Optional[StructuredDataTree]:
-    """Load data of a host, cache it in the current HTTP request"""
+def _load_inventory_tree(hostname: Optional[HostName],
+                         tree_path: Optional[List] = None) -> Optional[StructuredDataTree]:
+    """Load data of a host, cache it in the current HTTP request
+
+    With a tree path (list of edges) only the subtree below this path is loaded."""
     if not hostname:
         return None
 
     inventory_tree_cache = g.setdefault("inventory", {})
     if hostname in inventory_tree_cache:
-        inventory_tree = inventory_tree_cache[hostname]
+        return inventory_tree_cache[hostname]
+
+    if tree_path:
+        cache_key: Any = (hostname, tuple(tree_path))
+        inventory_tree_cache = g.setdefault("inventory_subtrees", {})
+    else:
+        cache_key = hostname
+
+    if cache_key in inventory_tree_cache:
+        inventory_tree = inventory_tree_cache[cache_key]
     else:
         if '/' in hostname:
             # just for security reasons
             return None
         cache_path = "%s/inventory/%s" % (cmk.utils.paths.var_dir, hostname)
         try:
-            inventory_tree = StructuredDataTree().load_from(cache_path)
+            inventory_tree = StructuredDataTree().load_from(cache_path, tree_path)
         except Exception as e:
             if config.debug:
                 html.show_warning("%s" % e)
             raise LoadStructuredDataError()
-        inventory_tree_cache[hostname] = inventory_tree
+        inventory_tree_cache[cache_key] = inventory_tree
     return inventory_tree
 
 
+def _load_indexed_inventory_tree(hostname: Optional[HostName],
+                                 inventory_index: InventoryIndex) -> Optional[StructuredDataTree]:
+    if not hostname or '/' in hostname or hostname in g.get("inventory", {}):
+        return _load_inventory_tree(hostname)
+
+    raw_tree = inventory_index.get_raw_tree(hostname)
+    if raw_tree is None:
+        return _load_inventory_tree(hostname)
+    # Not added to the cache of _load_inventory_tree(): This is only a part of the tree
+    return StructuredDataTree().create_tree_from_raw_tree(raw_tree)
+
+
 def _create_tree_from_raw_tree(raw_tree: bytes) -> Optional[StructuredDataTree]:
     if raw_tree:
         return StructuredDataTree().create_tree_from_raw_tree(
@@ -514,7 +549,7 @@ class InventoryHousekeeping:
             for filename in [
                     x.name
                     for x in (self._inventory_delta_cache_path / hostname).iterdir()
-                    if not x.is_dir()
+                    if not x.is_dir() and not inventory_history.is_manifest_file(x.name)
             ]:
                 delete = False
                 try:
@@ -37,7 +37,7 @@ import shutil
 import sys
 import time
 from pathlib import Path
-from typing import Optional, IO, Union, Dict, List, Set, Type
+from typing import Any, Optional, IO, Union, Dict, List, Set, Type
 
 # docs: http://www.python-ldap.org/doc/html/index.html
 import ldap  # type: ignore[import]
@@ -146,6 +146,20 @@ class MKLDAPException(MKGeneralException):
 
 DistinguishedName = str
 GroupMemberships = Dict[DistinguishedName, Dict[str, Union[str, List[str]]]]
+# Normalized DN of a group -> common name, direct user members and direct sub groups
+NestedGroupGraph = Dict[DistinguishedName, Dict[str, Any]]
+
+# Number of groups looked up with a single LDAP query when resolving nested groups
+_NESTED_GROUPS_PER_QUERY = 100
+
+
+def _normalize_dn(dn: DistinguishedName) -> DistinguishedName:
+    """Compare DNs independent of their case and the spaces between their components"""
+    try:
+        return ldap.dn.dn2str(ldap.dn.str2dn(dn)).lower()
+    except ldap.DECODING_ERROR:
+        return dn.lower()
+
 
 #.
 #   .--UserConnector-------------------------------------------------------.
@@ -212,6 +226,7 @@ class LDAPUserConnector(UserConnector):
         self._user_cache = {}
         self._group_cache = {}
         self._group_search_cache = {}
+        self._nested_group_graph: NestedGroupGraph = {}
 
         # File for storing the time of the last success event
         self._sync_time_file = Path(cmk.utils.paths.var_dir).joinpath('web/ldap_%s_sync_time.mk' %
@@ -901,90 +916,132 @@ class LDAPUserConnector(UserConnector):
 
     # Nested querying is more complicated. We have no option to simply do a query for group objects
     # to make them resolve the memberships here. So we need to query all users with the nested
-    # memberof filter to get all group memberships of that group. We need one query for each group.
+    # memberof filter to get all group memberships of that group. The group graph is resolved level
+    # by level, each level with as few queries as possible, and kept until the caches are flushed.
     def _get_nested_group_memberships(self, filters: List[str], filt_attr: str) -> GroupMemberships:
         groups: GroupMemberships = {}
 
+        # The memberof query below is only possible when knowing the DN of groups. We need
+        # to look for the DN when the caller gives us CNs (e.g. when using the the groups
+        # to contact groups plugin).
+        if filt_attr == 'cn':
+            matched_groups = self._get_group_dns_by_cn(filters)
+        else:
+            # in case of asking with DNs in nested mode, the resulting objects have the
+            # cn set to None for all objects. We do not need it in that case.
+            matched_groups = {dn: None for dn in filters}
+
+        # Now lookup the memberships. Previously we used the filter "memberOf:1.2.840.113556.1.4.1941:"
+        # here which seemed to be a performance problem. Resolving the nesting involves more single
+        # queries but performs much better.
+        self._resolve_nested_groups(
+            [dn for dn in matched_groups if dn not in self._group_cache[True]])
+
+        for dn, cn in matched_groups.items():
+            # Try to get members from group cache
+            try:
+                groups[dn] = self._group_cache[True][dn]
+                continue
+            except KeyError:
+                pass
+
+            # In case we don't have the cn we need to fetch it. It may be needed, e.g. by the contact group
+            # sync plugin
+            if cn is None:
+                cn = self._nested_group_graph[_normalize_dn(dn)]["cn"]
+            if cn is None:
+                group = self._ldap_search(dn,
+                                          filt="(objectclass=group)",
+                                          columns=['cn'],
+                                          scope='base')
+                if group:
+                    cn = group[0][1]["cn"][0]
+
+            groups[dn] = {
+                'members': self._get_nested_group_members(dn),
+                'cn': cn,
+            }
+            self._group_cache[True][dn] = groups[dn]
+
+        return groups
+
+    def _get_group_dns_by_cn(self, cns: List[str]) -> Dict[DistinguishedName, Optional[str]]:
+        matched_groups: Dict[DistinguishedName, Optional[str]] = {}
+        for index in range(0, len(cns), _NESTED_GROUPS_PER_QUERY):
+            add_filt = ''.join('(cn=%s)' % cn for cn in cns[index:index + _NESTED_GROUPS_PER_QUERY])
+            for dn, attrs in self._ldap_search(
+                    self.get_group_dn(), '(&%s(|%s))' % (self.ldap_filter('groups'), add_filt),
+                ['dn', 'cn'], self._config['group_scope']):
+                matched_groups[dn] = attrs["cn"][0]
+        return matched_groups
+
+    def _resolve_nested_groups(self, group_dns: List[DistinguishedName]) -> None:
+        """Add the given groups and all their sub groups to the nested group graph
+
+        The direct members of all groups of a nesting level are searched together, using
+        memberof filters of up to _NESTED_GROUPS_PER_QUERY groups per query."""
         # Search group members in common ancestor of group and user base DN to be able to use a single
         # query instead of one for groups and one for users below when searching for the members.
         base_dn = self._group_and_user_base_dn()
+        graph = self._nested_group_graph
+
+        level: List[DistinguishedName] = []
+        for dn in group_dns:
+            if _normalize_dn(dn) not in graph:
+                graph[_normalize_dn(dn)] = {"cn": None, "users": [], "groups": []}
+                level.append(dn)
+
+        while level:
+            next_level: List[DistinguishedName] = []
+            for index in range(0, len(level), _NESTED_GROUPS_PER_QUERY):
+                chunk = level[index:index + _NESTED_GROUPS_PER_QUERY]
+                chunk_dns = {_normalize_dn(dn) for dn in chunk}
+                filt = '(|%s)' % ''.join(
+                    '(memberof=%s)' % ldap.filter.escape_filter_chars(dn) for dn in chunk)
+
+                for obj_dn, obj in self._ldap_search(base_dn, filt,
+                                                     ['dn', 'objectclass', 'cn', 'memberof'],
+                                                     'sub'):
+                    parent_dns = chunk_dns.intersection(
+                        _normalize_dn(parent_dn) for parent_dn in obj.get('memberof', []))
 
-        for filter_val in filters:
-            matched_groups = {}
-
-            # The memberof query below is only possible when knowing the DN of groups. We need
-            # to look for the DN when the caller gives us CNs (e.g. when using the the groups
-            # to contact groups plugin).
-            if filt_attr == 'cn':
-                result = self._ldap_search(
-                    self.get_group_dn(), '(&%s(cn=%s))' % (self.ldap_filter('groups'), filter_val),
-                    ['dn', 'cn'], self._config['group_scope'])
-                if not result:
-                    continue  # Skip groups which can not be found
-
-                for dn, attrs in result:
-                    matched_groups[dn] = attrs["cn"][0]
-            else:
-                # in case of asking with DNs in nested mode, the resulting objects have the
-                # cn set to None for all objects. We do not need it in that case.
-                dn = filter_val
-                matched_groups[dn] = None
-
-            # Now lookup the memberships. Previously we used the filter "memberOf:1.2.840.113556.1.4.1941:"
-            # here which seemed to be a performance problem. Resolving the nesting involves more single
-            # queries but performs much better.
-            for dn, cn in matched_groups.items():
-                # Try to get members from group cache
-                try:
-                    groups[dn] = self._group_cache[True][dn]
-                    continue
-                except KeyError:
-                    pass
-
-                # In case we don't have the cn we need to fetch it. It may be needed, e.g. by the contact group
-                # sync plugin
-                if cn is None:
-                    group = self._ldap_search(dn,
-                                              filt="(objectclass=group)",
-                                              columns=['cn'],
-                                              scope='base')
-                    if group:
-                        cn = group[0][1]["cn"][0]
-
-                filt = '(memberof=%s)' % dn
-                groups[dn] = {
-                    'members': [],
-                    'cn': cn,
-                }
-
-                members = groups[dn]['members']
-                assert isinstance(members, list)
-
-                # Register the group construct, collect the members later. This way we can also
-                # catch the case where a group refers to itself, which is prevented by some LDAP
-                # editing tools, like "Active Directory Users & Computers", but can somehow be
-                # configured, e.g. when configuring universal distribution lists using ADSIEdit
-                # it was possible to configure something like this at least in older directories.
-                self._group_cache[True][dn] = groups[dn]
-
-                sub_group_filters = []
-                for obj_dn, obj in self._ldap_search(base_dn, filt, ['dn', 'objectclass'], 'sub'):
                     if "user" in obj['objectclass']:
-                        members.append(obj_dn)
+                        for parent_dn in parent_dns:
+                            graph[parent_dn]["users"].append(obj_dn)
 
                     elif "group" in obj['objectclass']:
-                        sub_group_filters.append(obj_dn)
-
-                # TODO: This could be optimized by first collecting all sub groups of all searched
-                # groups, then collecting them all together
-                for _sub_group_dn, sub_group in self.get_group_memberships(sub_group_filters,
-                                                                           filt_attr='dn',
-                                                                           nested=True).items():
-                    members += sub_group["members"]
-
-                members.sort()
-
-        return groups
+                        for parent_dn in parent_dns:
+                            graph[parent_dn]["groups"].append(obj_dn)
+
+                        # Register the sub group before collecting its members. This way we also
+                        # catch the case where a group refers to itself, which is prevented by
+                        # some LDAP editing tools, like "Active Directory Users & Computers", but
+                        # can somehow be configured, e.g. when configuring universal distribution
+                        # lists using ADSIEdit it was possible to configure something like this at
+                        # least in older directories.
+                        if _normalize_dn(obj_dn) not in graph:
+                            graph[_normalize_dn(obj_dn)] = {
+                                "cn": obj.get('cn', [None])[0],
+                                "users": [],
+                                "groups": [],
+                            }
+                            next_level.append(obj_dn)
+            level = next_level
+
+    def _get_nested_group_members(self, group_dn: DistinguishedName) -> List[DistinguishedName]:
+        members: Set[DistinguishedName] = set()
+        seen: Set[DistinguishedName] = set()
+        todo = [_normalize_dn(group_dn)]
+        while todo:
+            dn = todo.pop()
+            if dn in seen or dn not in self._nested_group_graph:
+                continue
+            seen.add(dn)
+            members.update(self._nested_group_graph[dn]["users"])
+            todo.extend(
+                _normalize_dn(sub_group_dn)
+                for sub_group_dn in self._nested_group_graph[dn]["groups"])
+        return sorted(members)
 
     def _group_and_user_base_dn(self):
         user_dn = ldap.dn.str2dn(self._get_user_dn())
@@ -1312,6 +1369,7 @@ class LDAPUserConnector(UserConnector):
         self._user_cache.clear()
         self._group_cache.clear()
         self._group_search_cache.clear()
+        self._nested_group_graph.clear()
 
     def _set_last_sync_time(self) -> None:
         with self._sync_time_file.open('w', encoding="utf-8") as f:
@@ -279,7 +279,7 @@ def show_availability_page(view: 'View', filterheaders: 'FilterHeaders') -> None
     if not html.has_user_errors():
         include_long_output = av_mode == "timeline" \
                 and "timeline_long_output" in avoptions["labelling"]
-        av_rawdata, has_reached_logrow_limit = availability.get_availability_rawdata(
+        av_rawdata, av_data, has_reached_logrow_limit = availability.get_availability_data(
             what,
             view.context,
             filterheaders,
@@ -288,8 +288,8 @@ def show_availability_page(view: 'View', filterheaders: 'FilterHeaders') -> None
             include_output=av_mode == "timeline",
             include_long_output=include_long_output,
             avoptions=avoptions,
+            with_timelines=av_mode == "timeline",
             view_process_tracking=view.process_tracking)
-        av_data = availability.compute_availability(what, av_rawdata, avoptions)
 
     # Do CSV ouput
     if html.output_format == "csv_export" and config.user.may("general.csv_export"):
@@ -26,6 +26,7 @@ from cmk.gui.htmllib import HTML
 from cmk.gui.valuespec import Dictionary, Checkbox
 from cmk.gui.escaping import escape_text
 from cmk.gui.plugins.visuals import (
+    Filter,
     filter_registry,
     VisualInfo,
     visual_info_registry,
@@ -177,6 +178,7 @@ def _declare_inv_column(invpath, datatype, title, short=None, is_show_more: bool
         # not look good for the HW/SW inventory tree
         "printable": is_leaf_node,
         "load_inv": True,
+        "inventory_paths": [invpath] if is_leaf_node else None,
         "paint": lambda row: paint_host_inventory_tree(row, invpath),
         "sorter": name,
     }
@@ -193,6 +195,7 @@ def _declare_inv_column(invpath, datatype, title, short=None, is_show_more: bool
                 "title": _("Inventory") + ": " + title,
                 "columns": ["host_inventory", "host_structured_status"],
                 "load_inv": True,
+                "inventory_paths": [invpath],
                 "cmp": lambda self, a, b: _cmp_inventory_node(a, b, self._spec["_inv_path"]),
             })
 
@@ -809,7 +812,8 @@ class RowTableInventory(ABCRowTable):
 
     def _get_inv_data(self, hostrow):
         try:
-            merged_tree = inventory.load_filtered_and_merged_tree(hostrow)
+            merged_tree = inventory.load_filtered_and_merged_tree(
+                hostrow, tree_path=inventory.parse_tree_path(self._inventory_path)[0])
         except inventory.LoadStructuredDataError:
             html.add_user_error(
                 "load_inventory_tree",
@@ -887,7 +891,10 @@ class RowMultiTableInventory(ABCRowTable):
 
     def _get_inv_data(self, hostrow):
         try:
-            merged_tree = inventory.load_filtered_and_merged_tree(hostrow)
+            merged_tree = inventory.load_filtered_and_merged_tree(
+                hostrow,
+                tree_path=_common_tree_path(
+                    [inventory.parse_tree_path(path)[0] for _info_name, path in self._sources]))
         except inventory.LoadStructuredDataError:
             html.add_user_error(
                 "load_inventory_tree",
@@ -919,6 +926,16 @@ class RowMultiTableInventory(ABCRowTable):
             html.add_user_error("declare_invtable_view", ", ".join(self._errors))
 
 
+def _common_tree_path(tree_paths: List[List]) -> List:
+    """The longest path all given paths start with"""
+    common: List = []
+    for edges in zip(*tree_paths):
+        if any(edge != edges[0] for edge in edges):
+            break
+        common.append(edges[0])
+    return common
+
+
 def declare_joined_inventory_table_view(tablename, title_singular, title_plural, tables, match_by):
 
     _register_info_class(tablename, title_singular, title_plural)
@@ -1395,10 +1412,32 @@ class RowTableInventoryHistory(ABCRowTable):
     def __init__(self):
         super(RowTableInventoryHistory, self).__init__(["invhist"], [])
         self._inventory_path = None
+        self._limit = None
+
+    def query(self, view, columns, headers, only_sites, limit, all_active_filters):
+        # Only load the newest deltas if the view shows nothing else. One more than the limit
+        # lets the view notice that the limit has been exceeded.
+        if limit is not None and self._shows_newest_deltas(view, all_active_filters):
+            self._limit = limit + 1
+        else:
+            self._limit = None
+        return super(RowTableInventoryHistory, self).query(view, columns, headers, only_sites,
+                                                           limit, all_active_filters)
+
+    @staticmethod
+    def _shows_newest_deltas(view, all_active_filters):
+        """Whether the rows are sorted by time, newest first, and no filter drops fetched rows"""
+        if view is None:
+            return False
+        sorters = [(entry.sorter.ident, bool(entry.negate)) for entry in view.sorters]
+        if sorters != [("invhist_time", False)]:
+            return False
+        return all(type(filt).filter_table is Filter.filter_table for filt in all_active_filters)
 
     def _get_inv_data(self, hostrow):
         hostname = hostrow.get("host_name")
-        history_deltas, corrupted_history_files = inventory.get_history_deltas(hostname)
+        history_deltas, corrupted_history_files = inventory.get_history_deltas(hostname,
+                                                                               limit=self._limit)
         if corrupted_history_files:
             html.add_user_error(
                 "load_inventory_delta_tree",
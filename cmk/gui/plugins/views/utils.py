@@ -918,6 +918,11 @@ class Painter(metaclass=abc.ABCMeta):
         """Whether or not to load the HW/SW inventory for this column"""
         return False
 
+    @property
+    def inventory_paths(self) -> Optional[List[str]]:
+        """The inventory paths needed by this column, None in case it needs the whole tree"""
+        return None
+
 
 class PainterRegistry(cmk.utils.plugin_registry.Registry[Type[Painter]]):
     def plugin_name(self, instance: Type[Painter]) -> str:
@@ -945,6 +950,7 @@ def register_painter(ident: str, spec: Dict[str, Any]) -> None:
             "printable": property(lambda s: s._spec.get("printable", True)),
             "sorter": property(lambda s: s._spec.get("sorter", None)),
             "load_inv": property(lambda s: s._spec.get("load_inv", False)),
+            "inventory_paths": property(lambda s: s._spec.get("inventory_paths")),
         })
     painter_registry.register(cls)
 
@@ -993,6 +999,11 @@ class Sorter(metaclass=abc.ABCMeta):
         """Whether or not to load the HW/SW inventory for this column"""
         return False
 
+    @property
+    def inventory_paths(self) -> Optional[List[str]]:
+        """The inventory paths needed by this column, None in case it needs the whole tree"""
+        return None
+
 
 class DerivedColumnsSorter(Sorter):
     @abc.abstractmethod
@@ -1019,6 +1030,7 @@ def register_sorter(ident: str, spec: Dict[str, Any]) -> None:
             "title": property(lambda s: s._spec["title"]),
             "columns": property(lambda s: s._spec["columns"]),
             "load_inv": property(lambda s: s._spec.get("load_inv", False)),
+            "inventory_paths": property(lambda s: s._spec.get("inventory_paths")),
             "cmp": spec["cmp"],
         })
     sorter_registry.register(cls)
@@ -361,6 +361,9 @@ class FilterInvText(Filter):
     def need_inventory(self) -> bool:
         return bool(self.filtertext)
 
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [self._invpath]
+
     def display(self) -> None:
         htmlvar = self.htmlvars[0]
         value = html.request.var(htmlvar)
@@ -439,6 +442,9 @@ class FilterInvFloat(Filter):
     def need_inventory(self) -> bool:
         return any(self.filter_configs())
 
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [self._invpath]
+
     def filter_table(self, rows: Rows) -> Rows:
         lower, upper = self.filter_configs()
         if not any((lower, upper)):
@@ -468,6 +474,9 @@ class FilterInvBool(FilterTristate):
     def need_inventory(self) -> bool:
         return self.tristate_value() != -1
 
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [self._invpath]
+
     def filter(self, infoname):
         return ""  # No Livestatus filtering right now
 
@@ -264,6 +264,10 @@ class Filter(metaclass=abc.ABCMeta):
         """Whether this filter needs to load host inventory data"""
         return False
 
+    def inventory_paths(self) -> Optional[List[str]]:
+        """The inventory paths needed by this filter, None in case it needs the whole tree"""
+        return None
+
     def validate_value(self, value: Dict) -> None:
         return
 
@@ -885,9 +885,28 @@ def _valuespec_generic_metrics_prometheus():
                  title=_("Service creation using PromQL queries"),
                  add_label=_("Add new Service"),
              )),
+            ("max_workers",
+             Integer(
+                 title=_("Concurrent PromQL queries"),
+                 help=_("By default, the PromQL queries are sent to the Prometheus server one "
+                        "after another. Here you can configure the maximum number of queries "
+                        "which are sent at the same time. Identical queries are only sent once "
+                        "per run of the special agent in any case."),
+                 default_value=4,
+                 minvalue=1,
+             )),
+            ("cache_interval",
+             Age(
+                 title=_("Cache slowly changing PromQL query results"),
+                 help=_("The results of queries which only change when the cluster is "
+                        "reconfigured, such as the memory of the machines and the storage "
+                        "classes, are kept for the configured time instead of being queried "
+                        "in every run of the special agent."),
+                 default_value=600,
+             )),
         ],
         title=_("Prometheus"),
-        optional_keys=["auth_basic"],
+        optional_keys=["auth_basic", "max_workers", "cache_interval"],
     )
 
 
@@ -992,6 +1011,17 @@ def _valuespec_special_agents_vsphere():
                  minvalue=1,
                  unit=_("seconds"),
              )),
+            ("max_sessions",
+             Integer(
+                 title=_("Concurrent queries of performance counters"),
+                 help=_("By default, the performance counters of the ESX host systems are queried "
+                        "one host system after another. When monitoring a vCenter with many host "
+                        "systems, this may take longer than the check interval. Here you can "
+                        "configure the maximum number of host systems whose performance counters "
+                        "are queried at the same time."),
+                 default_value=4,
+                 minvalue=1,
+             )),
             ("infos",
              Transform(
                  ListChoice(
@@ -1079,6 +1109,7 @@ def _valuespec_special_agents_vsphere():
         optional_keys=[
             "tcp_port",
             "timeout",
+            "max_sessions",
             "vm_pwr_display",
             "host_pwr_display",
             "vm_piggyname",
@@ -2032,6 +2063,15 @@ def _special_agents_jolokia_mk_jolokia_elements():
              ("http", "HTTP"),
              ("https", "HTTPS"),
          ])),
+        ("bulk",
+         FixedValue(
+             True,
+             title=_("Use bulk requests"),
+             totext=_("Query all MBeans with a few bulk requests"),
+             help=_("Instead of one HTTP request per MBean, all reads and searches are sent "
+                    "in a few bulk requests. This reduces the number of round trips to the "
+                    "Jolokia agent considerably."),
+         )),
     ]
 
 
@@ -2793,8 +2833,35 @@ def _valuespec_special_agents_aws():
              )),
             ("overall_tags",
              _vs_aws_tags(_("Restrict monitoring services by one of these AWS tags"))),
+            ("concurrency",
+             Dictionary(
+                 title=_("Concurrent queries"),
+                 help=_("By default, the services of one region are queried one after another "
+                        "and the regions are processed one after another. When monitoring many "
+                        "regions and services, the agent may take longer than the check interval. "
+                        "Here you can let the agent query several services and regions at the "
+                        "same time, while services depending on each other, e.g. limits and "
+                        "summaries, are still queried in the correct order."),
+                 elements=[
+                     ("max_workers",
+                      Integer(
+                          title=_("Maximum number of concurrent queries"),
+                          minvalue=1,
+                          default_value=4,
+                      )),
+                     ("max_requests_per_second",
+                      Float(
+                          title=_("Maximum number of API requests per second"),
+                          help=_("Limit the rate of the requests to the AWS API in order to "
+                                 "avoid throttling by AWS."),
+                          minvalue=0.1,
+                          default_value=10.0,
+                      )),
+                 ],
+                 optional_keys=["max_requests_per_second"],
+             )),
         ],
-        optional_keys=["overall_tags", "proxy_details"],
+        optional_keys=["overall_tags", "proxy_details", "concurrency"],
     ),
                      forth=_transform_aws)
 
@@ -31,6 +31,7 @@ from cmk.gui.plugins.wato import (
     ConfigDomainCore,
     ConfigDomainGUI,
     site_neutral_path,
+    user_script_choices,
 )
 
 
@@ -164,6 +165,70 @@ class ConfigVariableNotificationPluginTimeout(ConfigVariable):
         )
 
 
+def _vs_notification_plugin_settings(value_spec, title, help_text):
+    return Transform(
+        ListOf(
+            Tuple(
+                elements=[
+                    DropdownChoice(
+                        title=_("Notification plugin"),
+                        choices=lambda: user_script_choices("notifications"),
+                    ),
+                    value_spec,
+                ],
+                orientation="horizontal",
+            ),
+            title=title,
+            help=help_text,
+        ),
+        forth=lambda settings: sorted(settings.items()),
+        back=dict,
+    )
+
+
+@config_variable_registry.register
+class ConfigVariableNotificationPluginTimeouts(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_plugin_timeouts"
+
+    def valuespec(self):
+        return _vs_notification_plugin_settings(
+            Age(title=_("Timeout"), minvalue=1),
+            _("Notification plugin timeouts per plugin"),
+            _("Overrides the notification plugin timeout for single notification plugins."),
+        )
+
+
+@config_variable_registry.register
+class ConfigVariableNotificationPluginConcurrency(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupNotifications
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "notification_plugin_concurrency"
+
+    def valuespec(self):
+        return _vs_notification_plugin_settings(
+            Integer(title=_("Parallel executions"), minvalue=1, default_value=1),
+            _("Parallel executions of notification plugins"),
+            _("Notification plugins are executed in parallel, so a slow plugin does not hold "
+              "back the notifications of the other plugins. Each plugin is executed once at a "
+              "time by default. Plugins talking to services able to handle more requests at a "
+              "time can be executed several times in parallel. The notifications of a contact "
+              "about a host or service are always sent in the order they have been created. "
+              "This does not apply to bulk notifications."),
+        )
+
+
 @config_variable_registry.register
 class ConfigVariableNotificationLogging(ConfigVariable):
     def group(self):
@@ -6,8 +6,9 @@
 
 # TODO: Rework connection management and multiplexing
 
-from typing import cast, Union, Any, Callable, Dict, List, Optional, Tuple, Literal
+from typing import cast, Union, Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Literal
 import time
+import marshal
 import os
 import traceback
 import copy
@@ -621,13 +622,158 @@ def load_users(lock: bool = False) -> Users:
     if 'users' in g:
         return g.users
 
+    result, htpasswd_only_users = _load_merged_users()
+
+    # Users *only* appearing in htpasswd are assigned to the role they are
+    # getting according to the multisite old-style configuration variables.
+    # These depend on the configuration, so they are not part of the cache.
+    for uid in htpasswd_only_users:
+        result[uid]["roles"] = config.roles_of_user(uid)
+
+    # Now read the user specific files
+    directory = cmk.utils.paths.var_dir + "/web/"
+    for d in os.listdir(directory):
+        if d[0] != '.':
+            uid = ensure_str(d)
+
+            user_files = _load_user_files(directory + d, with_attributes=uid in result)
+
+            # read special values from own files
+            if uid in result:
+                assert user_files.attributes is not None
+                for attr, conv_func in _USER_FILE_ATTRIBUTES:
+                    text = user_files.attributes[attr]
+                    if not text:
+                        continue
+                    val = conv_func(text.strip())
+                    if val is not None:
+                        result[uid][attr] = val
+
+            # read automation secrets and add them to existing
+            # users or create new users automatically
+            secret = user_files.automation_secret
+            if secret:
+                if uid in result:
+                    result[uid]["automation_secret"] = secret
+                else:
+                    result[uid] = {
+                        "roles": ["guest"],
+                        "automation_secret": secret,
+                    }
+
+    # populate the users cache
+    g.users = result
+
+    return result
+
+
+# Files written with store.save_*() get a new inode on every change. Together with the size and
+# the modification time this identifies a version of a file without reading it.
+_FileStamp = Optional[Tuple[int, int, int]]
+
+# Files modified less than this amount of time ago may be changed again without a visible change of
+# their modification time (coarse file system timestamps). Don't cache them yet.
+_MIN_CACHE_AGE_NS = 2 * 10**9
+
+# Process wide cache of the merged user profiles: (stamps of the sources, marshaled profiles)
+_merged_users: Optional[Tuple[List[_FileStamp], bytes]] = None
+
+
+def _file_stamp(path: str) -> _FileStamp:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _is_stable(stamps: List[_FileStamp]) -> bool:
+    now = time.time_ns()
+    return all(stamp is None or now - stamp[2] > _MIN_CACHE_AGE_NS for stamp in stamps)
+
+
+def _user_source_files() -> List[str]:
+    return [
+        _root_dir() + "contacts.mk",
+        _multisite_dir() + "users.mk",
+        cmk.utils.paths.htpasswd_file,
+        _auth_serials_file(),
+    ]
+
+
+def _auth_serials_file() -> str:
+    return '%s/auth.serials' % os.path.dirname(cmk.utils.paths.htpasswd_file)
+
+
+def _users_cache_file() -> Path:
+    return Path(cmk.utils.paths.tmp_dir, "users.cache")
+
+
+def _load_merged_users() -> Tuple[Users, List[UserId]]:
+    """Returns the profiles merged from contacts.mk, users.mk, htpasswd and auth.serials
+
+    Merging these files is expensive with many users. The merged profiles are kept in marshaled
+    form in this process and in a cache file written by save_users(). Both are only used while
+    none of the source files has changed. Every call returns new objects, so the callers may
+    modify the result."""
+    global _merged_users
+
+    stamps = [_file_stamp(path) for path in _user_source_files()]
+    if _merged_users is not None and _merged_users[0] == stamps:
+        return marshal.loads(_merged_users[1])
+
+    serialized = _load_users_cache(stamps)
+    if serialized is None:
+        merged = _merge_user_sources()
+        # Only keep the result when no source has been changed while reading it
+        if stamps != [_file_stamp(path) for path in _user_source_files()]:
+            return merged
+        serialized = _serialize_merged_users(merged)
+        if serialized is None:
+            return merged
+
+    _merged_users = (stamps, serialized) if _is_stable(stamps) else None
+    return marshal.loads(serialized)
+
+
+def _serialize_merged_users(merged: Tuple[Users, List[UserId]]) -> Optional[bytes]:
+    try:
+        return marshal.dumps(merged)
+    except ValueError:
+        # Some profile contains an object marshal can not handle. Don't cache these profiles.
+        return None
+
+
+def _load_users_cache(stamps: List[_FileStamp]) -> Optional[bytes]:
+    try:
+        cached_stamps, serialized = marshal.loads(store.load_bytes_from_file(_users_cache_file()))
+    except (ValueError, EOFError, TypeError):
+        return None
+    return serialized if cached_stamps == stamps else None
+
+
+def _save_users_cache() -> None:
+    """Writes the merged profiles to the cache file used by _load_merged_users()"""
+    stamps = [_file_stamp(path) for path in _user_source_files()]
+    serialized = _serialize_merged_users(_merge_user_sources())
+    if serialized is None:
+        return
+    path = _users_cache_file()
+    with store.locked(path):
+        store.save_bytes_to_file(path, marshal.dumps((stamps, serialized)))
+
+
+def _merge_user_sources() -> Tuple[Users, List[UserId]]:
+    """Merges the users of contacts.mk, users.mk, htpasswd and auth.serials
+
+    Returns the profiles and the IDs of the users only known to htpasswd. These still need to be
+    assigned to their roles."""
     # First load monitoring contacts from Checkmk's world. If this is
     # the first time, then the file will be empty, which is no problem.
     # Execfile will the simply leave contacts = {} unchanged.
-    contacts = store.load_from_mk_file(filename, "contacts", {})
+    contacts = store.load_from_mk_file(_root_dir() + "contacts.mk", "contacts", {})
 
     # Now load information about users from the GUI config world
-    filename = _multisite_dir() + "users.mk"
     users = store.load_from_mk_file(_multisite_dir() + "users.mk", "multisite_users", {})
 
     # Merge them together. Monitoring users not known to Multisite
@@ -661,9 +807,8 @@ def load_users(lock: bool = False) -> Users:
     # Passwords are read directly from the apache htpasswd-file.
     # That way heroes of the command line will still be able to
     # change passwords with htpasswd. Users *only* appearing
-    # in htpasswd will also be loaded and assigned to the role
-    # they are getting according to the multisite old-style
-    # configuration variables.
+    # in htpasswd will also be loaded. Their roles are assigned
+    # by load_users().
 
     def readlines(f):
         try:
@@ -672,8 +817,8 @@ def load_users(lock: bool = False) -> Users:
             return []
 
     # FIXME TODO: Consolidate with htpasswd user connector
-    filename = cmk.utils.paths.htpasswd_file
-    for line in readlines(filename):
+    htpasswd_only_users = []
+    for line in readlines(cmk.utils.paths.htpasswd_file):
         line = line.strip()
         if ':' in line:
             uid, password = line.strip().split(":")[:2]
@@ -689,7 +834,6 @@ def load_users(lock: bool = False) -> Users:
             else:
                 # Create entry if this is an admin user
                 new_user = {
-                    "roles": config.roles_of_user(uid),
                     "password": password,
                     "locked": False,
                 }
@@ -697,13 +841,13 @@ def load_users(lock: bool = False) -> Users:
                 add_internal_attributes(new_user)
 
                 result[uid] = new_user
+                htpasswd_only_users.append(uid)
             # Make sure that the user has an alias
             result[uid].setdefault("alias", uid)
         # Other unknown entries will silently be dropped. Sorry...
 
     # Now read the serials, only process for existing users
-    serials_file = '%s/auth.serials' % os.path.dirname(cmk.utils.paths.htpasswd_file)
-    for line in readlines(serials_file):
+    for line in readlines(_auth_serials_file()):
         line = line.strip()
         if ':' in line:
             user_id, serial = line.split(':')[:2]
@@ -711,49 +855,58 @@ def load_users(lock: bool = False) -> Users:
             if user_id in result:
                 result[user_id]['serial'] = utils.saveint(serial)
 
-    # Now read the user specific files
-    directory = cmk.utils.paths.var_dir + "/web/"
-    for d in os.listdir(directory):
-        if d[0] != '.':
-            uid = ensure_str(d)
+    return result, htpasswd_only_users
 
-            # read special values from own files
-            if uid in result:
-                for attr, conv_func in [
-                    ('num_failed_logins', utils.saveint),
-                    ('last_pw_change', utils.saveint),
-                    ('enforce_pw_change', lambda x: bool(utils.saveint(x))),
-                    ('idle_timeout', _convert_idle_timeout),
-                    ('session_info', _convert_session_info),
-                    ('ui_theme', lambda x: x),
-                    ('ui_sidebar_position', lambda x: None if x == "None" else x),
-                ]:
-                    val = load_custom_attr(uid, attr, conv_func)
-                    if val is not None:
-                        result[uid][attr] = val
 
-            # read automation secrets and add them to existing
-            # users or create new users automatically
-            try:
-                user_secret_path = Path(directory) / d / "automation.secret"
-                with user_secret_path.open(encoding="utf-8") as f:
-                    secret: Optional[str] = ensure_str(f.read().strip())
-            except IOError:
-                secret = None
+_USER_FILE_ATTRIBUTES: List[Tuple[str, Callable[[str], Any]]] = [
+    ('num_failed_logins', utils.saveint),
+    ('last_pw_change', utils.saveint),
+    ('enforce_pw_change', lambda x: bool(utils.saveint(x))),
+    ('idle_timeout', lambda x: _convert_idle_timeout(x)),
+    ('session_info', _convert_session_info),
+    ('ui_theme', lambda x: x),
+    ('ui_sidebar_position', lambda x: None if x == "None" else x),
+]
 
-            if secret:
-                if uid in result:
-                    result[uid]["automation_secret"] = secret
-                else:
-                    result[uid] = {
-                        "roles": ["guest"],
-                        "automation_secret": secret,
-                    }
 
-    # populate the users cache
-    g.users = result
+class _UserFiles(NamedTuple):
+    stamp: _FileStamp
+    # Raw content of the _USER_FILE_ATTRIBUTES files, None when not read
+    attributes: Optional[Dict[str, str]]
+    automation_secret: Optional[str]
 
-    return result
+
+# Process wide cache of the user specific files, indexed by the path of the user directory.
+# All of these files are replaced with store.save_*(), which changes the directory.
+_user_files_cache: Dict[str, _UserFiles] = {}
+
+
+def _load_user_files(user_dir: str, with_attributes: bool) -> _UserFiles:
+    stamp = _file_stamp(user_dir)
+    cached = _user_files_cache.get(user_dir)
+    if (cached is not None and cached.stamp == stamp and
+        (cached.attributes is not None or not with_attributes)):
+        return cached
+
+    attributes = None
+    if with_attributes:
+        attributes = {
+            attr: store.load_text_from_file(user_dir + "/" + attr + ".mk")
+            for attr, _conv_func in _USER_FILE_ATTRIBUTES
+        }
+
+    try:
+        with Path(user_dir, "automation.secret").open(encoding="utf-8") as f:
+            secret: Optional[str] = ensure_str(f.read().strip())
+    except IOError:
+        secret = None
+
+    user_files = _UserFiles(stamp, attributes, secret)
+    if stamp is not None and _is_stable([stamp]):
+        _user_files_cache[user_dir] = user_files
+    else:
+        _user_files_cache.pop(user_dir, None)
+    return user_files
 
 
 def custom_attr_path(userid: UserId, key: str) -> str:
@@ -813,6 +966,7 @@ def save_users(profiles: Users) -> None:
     _save_auth_serials(updated_profiles)
     _save_user_profiles(updated_profiles)
     _cleanup_old_user_profiles(updated_profiles)
+    _save_users_cache()
 
     # Release the lock to make other threads access possible again asap
     # This lock is set by load_users() only in the case something is expected
@@ -1014,7 +1168,7 @@ def _save_auth_serials(updated_profiles: Users) -> None:
     serials = u""
     for user_id, user in updated_profiles.items():
         serials += u'%s:%d\n' % (user_id, user.get('serial', 0))
-    store.save_file('%s/auth.serials' % os.path.dirname(cmk.utils.paths.htpasswd_file), serials)
+    store.save_file(_auth_serials_file(), serials)
 
 
 def rewrite_users() -> None:
@@ -1982,7 +1982,10 @@ def _fetch_view_rows(view: View, all_active_filters: List[Filter], only_count: b
         # inventory, then we load it and attach it as column "host_inventory"
         if _is_inventory_data_needed(view.group_cells, view.row_cells, view.sorters,
                                      all_active_filters):
-            _add_inventory_data(rows)
+            _add_inventory_data(
+                rows,
+                _get_needed_inventory_paths(view.group_cells, view.row_cells, view.sorters,
+                                            all_active_filters))
 
         if not cmk_version.is_raw_edition():
             _add_sla_data(view, rows)
@@ -2168,14 +2171,41 @@ def _is_inventory_data_needed(group_cells: List[Cell], cells: List[Cell],
     return False
 
 
-def _add_inventory_data(rows: Rows) -> None:
+def _get_needed_inventory_paths(group_cells: List[Cell], cells: List[Cell],
+                                sorters: List[SorterEntry],
+                                all_active_filters: 'List[Filter]') -> Optional[Set[str]]:
+    """The inventory paths needed by the view, None in case the whole trees are needed"""
+    needed: List[Optional[List[str]]] = []
+    for cell in cells:
+        if cell.has_tooltip() and cell.tooltip_painter_name().startswith("inv_"):
+            painter_class = painter_registry.get(cell.tooltip_painter_name())
+            needed.append(None if painter_class is None else painter_class().inventory_paths)
+
+    needed += [entry.sorter.inventory_paths for entry in sorters if entry.sorter.load_inv]
+    needed += [
+        cell.painter().inventory_paths for cell in group_cells + cells if cell.painter().load_inv
+    ]
+    needed += [filt.inventory_paths() for filt in all_active_filters if filt.need_inventory()]
+
+    inventory_paths: Set[str] = set()
+    for paths in needed:
+        if paths is None:
+            return None
+        inventory_paths.update(paths)
+    return inventory_paths
+
+
+def _add_inventory_data(rows: Rows, inventory_paths: Optional[Set[str]] = None) -> None:
+    # Views only showing some attributes of many hosts are answered from the inventory index
+    inventory_index = inventory.get_inventory_index(inventory_paths)
+
     corrupted_inventory_files = []
     for row in rows:
         if "host_name" not in row:
             continue
 
         try:
-            row["host_inventory"] = inventory.load_filtered_and_merged_tree(row)
+            row["host_inventory"] = inventory.load_filtered_and_merged_tree(row, inventory_index)
         except inventory.LoadStructuredDataError:
             # The inventory row may be joined with other rows (perf-o-meter, ...).
             # Therefore we initialize the corrupt inventory tree with an empty tree
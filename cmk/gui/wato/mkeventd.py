@@ -3357,6 +3357,33 @@ class ConfigVariableEventConsoleRuleOptimizer(ConfigVariable):
         )
 
 
+@config_variable_registry.register
+class ConfigVariableEventConsoleEventProcessingWorkers(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupEventConsoleGeneric
+
+    def domain(self):
+        return ConfigDomainEventConsole
+
+    def ident(self):
+        return "event_processing_workers"
+
+    def valuespec(self):
+        return Integer(
+            title=_("Event processing workers"),
+            help=_("Number of worker processes decoding, parsing and matching the incoming "
+                   "messages against the rules. This distributes the most expensive part of "
+                   "the message processing to several CPU cores, which helps with high message "
+                   "rates. The resulting events are still handled one after the other by the "
+                   "Event Console, exactly like without the worker processes. Set this to 0 to "
+                   "process all messages in the Event Console itself. No workers are used while "
+                   "debugging the rules."),
+            minvalue=0,
+            maxvalue=64,
+            unit=_("processes"),
+        )
+
+
 @config_variable_registry.register
 class ConfigVariableEventConsoleActions(ConfigVariable):
     def group(self):
@@ -9,12 +9,15 @@ Special agent for monitoring Amazon web services (AWS) with Check_MK.
 
 import abc
 import argparse
+import concurrent.futures
 import errno
 import hashlib
 import json
 import logging
 from pathlib import Path
 import sys
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, NamedTuple, Set, Tuple, Union, Callable, Optional
 
@@ -303,6 +306,10 @@ class ResultDistributor:
     def __init__(self):
         self._colleagues = []
 
+    @property
+    def colleagues(self):
+        return list(self._colleagues)
+
     def add(self, colleague):
         self._colleagues.append(colleague)
 
@@ -408,6 +415,14 @@ class AWSSection(DataCache):
     def region(self):
         return self._region
 
+    @property
+    def receivers(self):
+        """
+        Sections which receive the computed content of this section and therefore must not run
+        before this section has finished.
+        """
+        return [c for c in self._distributor.colleagues if c.name != self.name]
+
     @property
     def granularity(self) -> int:
         """
@@ -3797,20 +3812,27 @@ class WAFV2WebACL(AWSSectionCloudwatch):
 
 
 class AWSSections(abc.ABC):
-    def __init__(self, hostname, session, debug=False, config=None):
+    def __init__(self, hostname, session, debug=False, config=None, rate_limiter=None):
         self._hostname = hostname
         self._session = session
         self._debug = debug
         self._sections = []
+        self._results: Dict[AWSSection, AWSSectionResults] = {}
+        self._exceptions: Dict[AWSSection, Exception] = {}
+        self._rate_limiter = rate_limiter
         self.config = config
 
+    @property
+    def sections(self):
+        return list(self._sections)
+
     @abc.abstractmethod
     def init_sections(self, services, region, config, s3_limits_distributor=None):
         pass
 
     def _init_client(self, client_key):
         try:
-            return self._session.client(client_key, config=self.config)
+            client = self._session.client(client_key, config=self.config)
         except (ValueError, botocore.exceptions.ClientError,
                 botocore.exceptions.UnknownServiceError) as e:
             # If region name is not valid we get a ValueError
@@ -3822,23 +3844,38 @@ class AWSSections(abc.ABC):
             # - botocore.exceptions.EndpointConnectionError
             logging.info("Invalid region name or client key %s: %s", client_key, e)
             raise
+        if self._rate_limiter is not None:
+            client.meta.events.register('before-call', self._rate_limiter.wait)
+        return client
 
     def run(self, use_cache=True):
-        exceptions = []
+        for section in self._sections:
+            self.run_section(section, use_cache=use_cache)
+        self.write_output()
+
+    def run_section(self, section, use_cache=True):
+        try:
+            section_result = section.run(use_cache=use_cache)
+        except AssertionError as e:
+            logging.info(e)
+            if self._debug:
+                raise
+        except Exception as e:
+            logging.info("%s: %s", section.__class__.__name__, e)
+            if self._debug:
+                raise
+            self._exceptions[section] = e
+        else:
+            self._results[section] = section_result
+
+    def write_output(self):
+        # Sections may have been run concurrently, so we write the outcomes in the order in
+        # which the sections were registered.
+        exceptions = [self._exceptions[s] for s in self._sections if s in self._exceptions]
         results: Dict[Tuple[str, float, float], str] = {}
         for section in self._sections:
-            try:
-                section_result = section.run(use_cache=use_cache)
-            except AssertionError as e:
-                logging.info(e)
-                if self._debug:
-                    raise
-            except Exception as e:
-                logging.info("%s: %s", section.__class__.__name__, e)
-                if self._debug:
-                    raise
-                exceptions.append(e)
-            else:
+            section_result = self._results.get(section)
+            if section_result is not None:
                 results.setdefault(
                     (section.name, section_result.cache_timestamp, section.cache_interval),
                     section_result.results)
@@ -4202,6 +4239,75 @@ class AWSSectionsGeneric(AWSSections):
             self._sections.append(wafv2_web_acl)
 
 
+class RateLimiter:
+    """
+    Spaces out the API calls of all clients it is registered with, so that the agent does
+    not exceed the request rate limits of the AWS account when running sections concurrently.
+    """
+    def __init__(self,
+                 max_rate: float,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self._interval = 1.0 / max_rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, **_kwargs: Any) -> None:
+        # Registered as 'before-call' handler: returning anything else than None would be
+        # used by botocore as the response of the API call.
+        with self._lock:
+            now = self._clock()
+            scheduled = max(now, self._next_call)
+            self._next_call = scheduled + self._interval
+        if scheduled > now:
+            self._sleep(scheduled - now)
+
+
+def run_sections_concurrently(aws_sections: List[AWSSections], use_cache: bool,
+                              max_workers: int) -> None:
+    """
+    Run the sections of all regions in a thread pool. A section is started as soon as all
+    scheduled sections distributing their results to it have finished, e.g. the summary of a
+    service waits for its limits section and the S3 summaries of all regions wait for the
+    single S3 limits section. The output is the same as when running one region after another.
+    """
+    owners: Dict[AWSSection, AWSSections] = {
+        section: sections for sections in aws_sections for section in sections.sections
+    }
+    waiting_for: Dict[AWSSection, Set[AWSSection]] = {section: set() for section in owners}
+    for sender in owners:
+        for receiver in sender.receivers:
+            if receiver in waiting_for:
+                waiting_for[receiver].add(sender)
+
+    pending = list(owners)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running: Dict[concurrent.futures.Future, AWSSection] = {}
+        while pending or running:
+            for section in [s for s in pending if not waiting_for[s]]:
+                pending.remove(section)
+                future = executor.submit(owners[section].run_section, section, use_cache)
+                running[future] = section
+
+            if not running:
+                raise RuntimeError("Cyclic dependencies between sections: %s" %
+                                   ", ".join(s.name for s in pending))
+
+            done, _not_done = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                finished = running.pop(future)
+                for senders in waiting_for.values():
+                    senders.discard(finished)
+                # Exceptions are only raised in debug mode
+                future.result()
+
+    for sections in aws_sections:
+        sections.write_output()
+
+
 #.
 #   .--main----------------------------------------------------------------.
 #   |                                       _                              |
@@ -4344,6 +4450,16 @@ def parse_arguments(argv):
     parser.add_argument("--wafv2-cloudfront",
                         action="store_true",
                         help="Also monitor global WAFs in front of CloudFront resources.")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Maximum number of sections which are executed concurrently, across all regions.\n"
+        "By default, the sections and regions are executed one after another.")
+    parser.add_argument("--max-requests-per-second",
+                        type=float,
+                        default=0,
+                        help="Maximum number of API calls per second (default: no limit).")
     parser.add_argument("--hostname", required=True)
 
     for service in AWSServices:
@@ -4621,6 +4737,19 @@ def main(sys_argv=None):
     # Special distributor for S3 limits which distributes results across different regions
     s3_limits_distributor = ResultDistributorS3Limits()
 
+    rate_limiter = None
+    if args.max_requests_per_second > 0:
+        rate_limiter = RateLimiter(args.max_requests_per_second)
+
+    client_config = proxy_config
+    if args.max_workers > 1:
+        # Several sections may use the same client concurrently
+        pool_config = botocore.config.Config(max_pool_connections=max(10, args.max_workers))
+        client_config = pool_config if proxy_config is None else proxy_config.merge(pool_config)
+
+    # Only filled in concurrent mode, the sections are run after all regions are initialized
+    concurrent_sections: List[AWSSections] = []
+
     for aws_services, aws_regions, aws_sections in [
         (global_services, ["us-east-1"], AWSSectionsUSEast),
         (regional_services, args.regions, AWSSectionsGeneric),
@@ -4635,12 +4764,19 @@ def main(sys_argv=None):
                 else:
                     session = create_session(access_key_id, secret_access_key, region)
 
-                sections = aws_sections(hostname, session, debug=args.debug, config=proxy_config)
+                sections = aws_sections(hostname,
+                                        session,
+                                        debug=args.debug,
+                                        config=client_config,
+                                        rate_limiter=rate_limiter)
                 sections.init_sections(aws_services,
                                        region,
                                        aws_config,
                                        s3_limits_distributor=s3_limits_distributor)
-                sections.run(use_cache=use_cache)
+                if args.max_workers > 1:
+                    concurrent_sections.append(sections)
+                else:
+                    sections.run(use_cache=use_cache)
             except AwsAccessError as ae:
                 # can not access AWS, retreat
                 sys.stdout.write("<<<aws_exceptions>>>\n")
@@ -4654,6 +4790,19 @@ def main(sys_argv=None):
                 has_exceptions = True
                 if args.debug:
                     raise
+
+    if concurrent_sections:
+        try:
+            run_sections_concurrently(concurrent_sections, use_cache, args.max_workers)
+        except AssertionError:
+            if args.debug:
+                raise
+        except Exception as e:
+            logging.info(e)
+            has_exceptions = True
+            if args.debug:
+                raise
+
     if has_exceptions:
         return 1
     return 0
@@ -43,6 +43,9 @@ def parse_arguments(argv):
     parser.add_argument("--no-cert-check",
                         action="store_true",
                         help='''Skip SSL certificate verification (not recommended)''')
+    parser.add_argument("--bulk",
+                        action="store_true",
+                        help='''Send all reads and searches in a few bulk requests''')
 
     return parser.parse_args(argv)
 
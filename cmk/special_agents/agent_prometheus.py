@@ -10,11 +10,18 @@ import ast
 import sys
 import argparse
 import json
+import string
+import threading
 import time
 import logging
 import traceback
-from typing import List, Dict, Any, Mapping, DefaultDict, Optional, Iterator, Tuple, Callable, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import (List, Dict, Any, Mapping, DefaultDict, Optional, Iterator, Iterable, Tuple,
+                    Callable, Union)
 from collections import OrderedDict, defaultdict
+from cmk.utils.paths import tmp_dir
+from cmk.special_agents.utils import DataCache
 from cmk.special_agents.utils.request_helper import (
     create_api_connect_session,
     parse_api_url,
@@ -23,9 +30,19 @@ from cmk.special_agents.utils.request_helper import (
 import math
 from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
 
 PromQLMetric = Dict[str, Any]
 
+PROMETHEUS_CACHE_FILE_PATH = Path(tmp_dir) / "agents" / "agent_prometheus"
+
+# Results of these queries only change when the cluster is reconfigured. They are kept
+# between agent runs if a cache lifetime is configured.
+SLOW_CHANGING_PROMQL_QUERIES = {
+    "machine_memory_bytes",
+    "kube_storageclass_info",
+}
+
 LOGGER = logging.getLogger()  # root logger for now
 
 
@@ -130,6 +147,7 @@ class NodeExporter:
             self, promql_list: List[Tuple[str, str]]) -> Dict[str, Dict[str, FilesystemInfo]]:
         result: Dict[str, Dict[str, FilesystemInfo]] = {}
 
+        self.api_client.prefetch_promql(promql_query for _entity, promql_query in promql_list)
         for entity_name, promql_query in promql_list:
             for mountpoint_info in self.api_client.perform_multi_result_promql(
                     promql_query).promql_metrics:
@@ -188,6 +206,7 @@ class NodeExporter:
             diskstat_list: List[Tuple[str,
                                       str]]) -> Dict[str, Dict[str, Dict[str, Union[int, str]]]]:
         result: Dict[str, Dict[str, Dict[str, Union[int, str]]]] = {}
+        self.api_client.prefetch_promql(promql_query for _entity, promql_query in diskstat_list)
         for entity_name, promql_query in diskstat_list:
             for node_info in self.api_client.perform_multi_result_promql(
                     promql_query).promql_metrics:
@@ -256,6 +275,7 @@ class NodeExporter:
 
     def _generate_memory_stats(self, promql_list: List[Tuple[str, str]]) -> Dict[str, List[str]]:
         result: Dict[str, List[str]] = {}
+        self.api_client.prefetch_promql(promql_query for _entity, promql_query in promql_list)
         for entity_name, promql_query in promql_list:
             promql_result = self.api_client.perform_multi_result_promql(promql_query).promql_metrics
             for node_element in promql_result:
@@ -293,6 +313,7 @@ class NodeExporter:
             self, kernel_list: List[Tuple[str, str]]) -> Dict[str, Dict[str, Dict[str, int]]]:
         result: Dict[str, Dict[str, Dict[str, int]]] = {}
 
+        self.api_client.prefetch_promql(promql_query for _entity, promql_query in kernel_list)
         for entity_name, promql_query in kernel_list:
             for device_info in self.api_client.perform_multi_result_promql(
                     promql_query).promql_metrics:
@@ -411,6 +432,7 @@ class CAdvisorExporter:
 
         result: Dict[str, Dict[str, Union[str, Dict[str, str]]]] = {}
         associations = {}
+        self.api_client.prefetch_promql(promql_query for _stat, promql_query in memory_info)
         for memory_stat, promql_query in memory_info:
             for pod_memory_info in self.api_client.query_promql(promql_query):
                 pod_name = self._pod_name(pod_memory_info.labels)
@@ -487,11 +509,12 @@ class CAdvisorExporter:
             "memory_swap": 'container_memory_swap{container!=""}',
             "memory_cache": 'container_memory_cache{container!=""}',
         }
+        pod_usage_query = 'sum by (pod, namespace)(container_memory_usage_bytes{pod!="", container=""})'
+        self.api_client.prefetch_promql([pod_usage_query])
         result_temp = self._retrieve_cadvisor_info(memory_info, group_element="name")
 
         extra_result = {}
-        for pod_memory_info in self.api_client.query_promql(
-                'sum by (pod, namespace)(container_memory_usage_bytes{pod!="", container=""})'):
+        for pod_memory_info in self.api_client.query_promql(pod_usage_query):
             pod_name = self._pod_name(pod_memory_info.labels)
             for container_name in self.pod_containers[pod_name]:
                 extra_result[container_name] = {
@@ -519,6 +542,9 @@ class CAdvisorExporter:
 
         result = []
         group_element = "name" if group_element in ("name", "container") else "pod, namespace"
+        self.api_client.prefetch_promql(
+            self._prepare_query(entity_promql, group_element)
+            for entity_promql in entity_info.values())
         for entity_name, entity_promql in entity_info.items():
             promql_result = self.api_client.query_promql(
                 self._prepare_query(entity_promql, group_element))
@@ -576,6 +602,8 @@ class KubeStateExporter:
             ("requests", "memory", "sum(kube_pod_container_resource_requests_memory_bytes)"),
         ]
         result: Dict[str, Dict[str, Any]] = {}
+        self.api_client.prefetch_promql(
+            promql_query for _family, _type, promql_query in resources_list)
         for resource_family, resource_type, promql_query in resources_list:
             for cluster_info in self.api_client.query_promql(promql_query):
                 cluster_value = int(cluster_info.value()) if resource_type == "pods" else float(
@@ -657,6 +685,7 @@ class KubeStateExporter:
             "Ready": 'kube_node_status_condition{condition="Ready"}',
         }
         result: Dict[str, Dict[str, Any]] = {}
+        self.api_client.prefetch_promql(node_conditions_info.values())
         for entity_name, promql_query in node_conditions_info.items():
             # node_result: Dict[str, Dict[str, Any]] = {}
             for node_condition_info in self.api_client.query_promql(promql_query):
@@ -686,6 +715,8 @@ class KubeStateExporter:
             ("limits", "memory", "sum by (node)(kube_pod_container_resource_limits_memory_bytes)"),
         ]
 
+        self.api_client.prefetch_promql(
+            promql_query for _family, _type, promql_query in resources_list)
         node_valid_limits = self._nodes_limits()
         result: Dict[str, Dict[str, Any]] = {}
         for resource_family, resource_type, promql_query in resources_list:
@@ -715,6 +746,8 @@ class KubeStateExporter:
         ]
 
         node_pods: Dict[str, Dict[str, str]] = {}
+        self.api_client.prefetch_promql(
+            promql_query for _type, promql_query in pods_count_expressions)
         for pod_count_type, promql_query in pods_count_expressions:
             for count_result in self.api_client.query_promql(promql_query):
                 if not count_result.has_labels(["node"]):
@@ -749,6 +782,8 @@ class KubeStateExporter:
             ),
         ]
         result = []
+        self.api_client.prefetch_promql(
+            promql_query for _metric, promql_query in pod_conditions_info)
         for promql_metric, promql_query in pod_conditions_info:
             promql_result = self.api_client.query_promql(promql_query)
             if promql_metric == "ContainersReady":
@@ -779,6 +814,7 @@ class KubeStateExporter:
                 ("ready", "kube_pod_container_status_ready"),
                 ("terminated", "kube_pod_container_status_terminated")]
         pod_container_result = []
+        self.api_client.prefetch_promql(promql_query for _condition, promql_query in info)
         for condition, promql_query in info:
             temp_result: Dict[str, Dict[str, Any]] = {}
             for container_info in self.api_client.query_promql(promql_query):
@@ -808,11 +844,6 @@ class KubeStateExporter:
     def pod_resources_summary(self) -> List[Dict[str, Dict[str, Any]]]:
         logging.debug("Parsing kube pod resources")
 
-        pods_container_count = {
-            self._pod_name(pod_info.labels): pod_info.value() for pod_info in
-            self.api_client.query_promql("count by (pod, namespace)(kube_pod_container_info)")
-        }
-
         resources_list = [
             ("requests", "cpu",
              "sum by (pod, namespace)(kube_pod_container_resource_requests_cpu_cores)"),
@@ -821,6 +852,21 @@ class KubeStateExporter:
             ("limits", "memory", "kube_pod_container_resource_limits_memory_bytes")
         ]
 
+        promql_queries = ["count by (pod, namespace)(kube_pod_container_info)"]
+        for family, _type, query in resources_list:
+            if family == "requests":
+                promql_queries.append(query)
+            else:
+                promql_queries.extend([
+                    "sum by (pod, namespace)(%s)" % query,
+                    "count by (pod, namespace)(%s)" % query,
+                ])
+        self.api_client.prefetch_promql(promql_queries)
+        pods_container_count = {
+            self._pod_name(pod_info.labels): pod_info.value() for pod_info in
+            self.api_client.query_promql("count by (pod, namespace)(kube_pod_container_info)")
+        }
+
         def _process_resources(resource: str, query: str) -> Dict[str, Dict[str, Dict[str, float]]]:
             pod_resources: Dict[str, Dict[str, Dict[str, float]]] = {}
             resource_result = {
@@ -875,6 +921,7 @@ class KubeStateExporter:
             "number_unavailable": "kube_daemonset_status_number_unavailable"
         }
         result = []
+        self.api_client.prefetch_promql(daemon_pods_info.values())
         for entity_name, promql_query in daemon_pods_info.items():
             piggybacked_services = parse_piggybacked_values(
                 self.api_client.query_promql(promql_query),
@@ -1373,12 +1420,91 @@ class PrometheusServer:
         return json.loads(endpoint_result.content)['data']
 
 
+class PromQLCache(DataCache):
+    """Keeps the result of a slowly changing PromQL query between agent runs"""
+    def __init__(self, cache_dir: Path, promql: str, cache_interval: int) -> None:
+        valid_chars = "-_.() %s%s" % (string.ascii_letters, string.digits)
+        cache_file_name = ''.join(c if c in valid_chars else '_' for c in promql)
+        super(PromQLCache, self).__init__(cache_dir, cache_file_name)
+        self._cache_interval = cache_interval
+
+    @property
+    def cache_interval(self) -> int:
+        return self._cache_interval
+
+    def get_validity_from_args(self, *args: Any) -> bool:
+        return True
+
+    def get_live_data(self, *args: Any) -> Any:
+        perform_query, promql = args
+        return perform_query(promql)
+
+
+class PromQLQueryPlanner:
+    """Executes the PromQL queries of one agent run
+
+    Identical queries are only sent once per run. Queries announced with prefetch are
+    sent concurrently by a bounded pool of workers, the results of the slowly changing
+    queries are kept between agent runs for the configured cache interval.
+    """
+    def __init__(self,
+                 perform_query: Callable[[str], List[Dict[str, Any]]],
+                 max_workers: int = 1,
+                 cache_dir: Optional[Path] = None,
+                 cache_interval: int = 0) -> None:
+        self._perform_query = perform_query
+        self._executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        self._cache_dir = cache_dir
+        self._cache_interval = cache_interval
+        self._queries: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, promql_queries: Iterable[str]) -> None:
+        if self._executor is None:
+            return
+        with self._lock:
+            for promql in promql_queries:
+                if promql not in self._queries:
+                    self._queries[promql] = self._executor.submit(self._query, promql)
+
+    def result(self, promql: str) -> List[Dict[str, Any]]:
+        """The raw result of the query, exceptions of the query are raised here"""
+        with self._lock:
+            future = self._queries.get(promql)
+            if future is None:
+                future = self._queries[promql] = Future()
+                future.set_running_or_notify_cancel()
+            else:
+                return list(future.result())
+
+        try:
+            future.set_result(self._query(promql))
+        except Exception as exc:
+            future.set_exception(exc)
+        return list(future.result())
+
+    def _query(self, promql: str) -> List[Dict[str, Any]]:
+        if (self._cache_dir is None or self._cache_interval <= 0 or
+                promql not in SLOW_CHANGING_PROMQL_QUERIES):
+            return self._perform_query(promql)
+        cache = PromQLCache(self._cache_dir, promql, self._cache_interval)
+        return cache.get_data(self._perform_query, promql)
+
+
 class PrometheusAPI:
     """
     Realizes communication with the Prometheus API
     """
-    def __init__(self, session) -> None:
+    def __init__(self,
+                 session,
+                 max_workers: int = 1,
+                 cache_dir: Optional[Path] = None,
+                 cache_interval: int = 0) -> None:
         self.session = session
+        self.query_planner = PromQLQueryPlanner(self._request_promql_query,
+                                                max_workers=max_workers,
+                                                cache_dir=cache_dir,
+                                                cache_interval=cache_interval)
         self.scrape_targets_dict = self._connected_scrape_targets()
 
     def scrape_targets_attributes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
@@ -1411,6 +1537,9 @@ class PrometheusAPI:
 
         """
         result: Dict[str, Dict[str, Any]] = {}
+        self.prefetch_promql(metric["promql_query"]
+                             for service in custom_services
+                             for metric in service["metric_components"])
         for service in custom_services:
             # Per default assign resulting service to Prometheus Host
             host_name = service.get("host_name", "")
@@ -1470,7 +1599,18 @@ class PrometheusAPI:
             logging.exception(exc)
             return []
 
+    def prefetch_promql(self, promql_queries: Iterable[str]) -> None:
+        """Announces PromQL queries which are needed shortly after
+
+        The queries are sent concurrently if multiple workers are configured. Their results
+        are picked up by the following calls of query_promql and perform_multi_result_promql.
+        """
+        self.query_planner.prefetch(promql_queries)
+
     def _perform_promql_query(self, promql: str) -> List[Dict[str, Any]]:
+        return self.query_planner.result(promql)
+
+    def _request_promql_query(self, promql: str) -> List[Dict[str, Any]]:
         api_query_expression = "query?query=%s" % quote(promql)
         result = self._process_json_request(api_query_expression)["data"]["result"]
         return result
@@ -1940,9 +2080,18 @@ def main(argv=None):
         config = ast.literal_eval(sys.stdin.read())
         config_args = _extract_config_args(config)
         session = _generate_api_session(_extract_connection_args(config))
+        max_workers = config.get("max_workers", 1)
+        if max_workers > 1:
+            # the connection pool of requests keeps 10 connections per host by default, the
+            # main thread sends the queries which were not prefetched
+            for prefix in ("http://", "https://"):
+                session.mount(prefix, HTTPAdapter(pool_maxsize=max(10, max_workers + 1)))
         exporter_options = config_args["exporter_options"]
         # default cases always must be there
-        api_client = PrometheusAPI(session)
+        api_client = PrometheusAPI(session,
+                                   max_workers=max_workers,
+                                   cache_dir=PROMETHEUS_CACHE_FILE_PATH / config["host_name"],
+                                   cache_interval=config.get("cache_interval", 0))
         api_data = ApiData(api_client, exporter_options)
         print(api_data.prometheus_build_section())
         print(api_data.promql_section(config_args["custom_services"]))
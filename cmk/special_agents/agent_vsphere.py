@@ -7,16 +7,20 @@
 
 import argparse
 import collections
+import concurrent.futures
 import datetime
 import errno
 import json
 from pathlib import Path
+import queue
 import re
 import socket
 import sys
 import time
-from typing import Any, Counter, Dict, Iterable, List
+from typing import Any, Callable, Counter, Dict, Iterable, Iterator, List, Tuple
 from xml.dom import minidom  # type: ignore[import]
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape as xml_escape
 
 import requests
 import urllib3  # type: ignore[import]
@@ -990,6 +994,12 @@ def parse_arguments(argv):
         default=None,
         help="""Specify a hostname. This is neccessary if this is different from HOST.
         It is being used when outputting the hosts power state.""")
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=1,
+        help="""Maximum number of sessions used to query the performance counters of the host
+        systems concurrently. Default is 1, querying one host system after another.""")
 
     # optional arguments (from a coding point of view - should some of them be mandatory?)
     parser.add_argument("-u", "--user", default=None, help="""Username for vSphere login""")
@@ -1050,11 +1060,14 @@ class ESXSession(requests.Session):
             "User-Agent": "Checkmk special agent vsphere",
         })
 
-    def postsoap(self, request):
+    def postsoap(self, request, stream=False):
         soapdata = ESXSession.ENVELOPE % request
         # Watch out: we must provide the verify keyword to every individual request call!
         # Else it will be overwritten by the REQUESTS_CA_BUNDLE env variable
-        return super(ESXSession, self).post(self._post_url, data=soapdata, verify=self.verify)
+        return super(ESXSession, self).post(self._post_url,
+                                            data=soapdata,
+                                            verify=self.verify,
+                                            stream=stream)
 
 
 class ESXConnection:
@@ -1086,6 +1099,9 @@ class ESXConnection:
         self._perf_samples_path = AGENT_TMP_PATH / ("%s.timer" % address)
         self._perf_samples = None
 
+        self._address = address
+        self._port = port
+        self._no_cert_check = opt.no_cert_check
         self._session = ESXSession(address, port, opt.no_cert_check)
         self.system_info = self._fetch_systeminfo()
         self._soap_templates = SoapTemplates(self.system_info)
@@ -1141,6 +1157,41 @@ class ESXConnection:
 
         return "".join(response_data)
 
+    def iter_response_elements(self, method, session=None, **kwargs) -> Iterator[Any]:
+        """Parse the responses incrementally while they are received
+
+        Every element is yielded as soon as it is complete, with the namespace removed from its
+        tag. Continuation tokens are followed like in query_server. The caller may clear the
+        elements it has processed in order to keep the memory usage low.
+        """
+        if session is None:
+            session = self._session
+        payload = getattr(self._soap_templates, method) % kwargs
+
+        while payload:
+            response = session.postsoap(payload, stream=True)
+            parser = ElementTree.XMLPullParser(events=("end",))
+            token = None
+            for chunk in response.iter_content(chunk_size=65536):
+                parser.feed(chunk)
+                for _event, element in parser.read_events():
+                    element.tag = element.tag.rpartition("}")[2]
+                    if element.tag == "NotAuthenticatedFault":
+                        raise ESXCookieInvalid("No longer authenticated")
+                    if element.tag == "token":
+                        token = element.text
+                    yield element
+            parser.close()
+            payload = None if token is None else self._soap_templates.continuetoken % {
+                "token": token
+            }
+
+    def new_session(self):
+        """Create an additional session using the login cookie of this connection"""
+        session = ESXSession(self._address, self._port, self._no_cert_check)
+        session.headers["Cookie"] = self._session.headers["Cookie"]
+        return session
+
     @property
     def perf_samples(self):
         '''Return and cache the needed number of real-time samples
@@ -1200,38 +1251,72 @@ class ESXConnection:
 #   '----------------------------------------------------------------------'
 
 
-def fetch_available_counters(connection, hostsystems) -> Dict[str, Dict[str, List[str]]]:
-    counters_available_by_host: Dict[str, Dict[str, List[str]]] = {}
-    for host in hostsystems:
-        counter_avail_response = connection.query_server('perfcounteravail', esxhost=host)
-        elements = get_pattern("<counterId>([0-9]*)</counterId><instance>([^<]*)",
-                               counter_avail_response)
+def map_hosts(connection: "ESXConnection", function: Callable, hosts: Iterable[str],
+              max_sessions: int) -> List[Any]:
+    """Call function(connection, host, session) for all hosts
 
-        data = counters_available_by_host.setdefault(host, {})
-        for counter, instance in elements:
-            data.setdefault(counter, []).append(instance)
+    The function is called concurrently for different hosts, using at most max_sessions
+    sessions at a time. The results are returned in the order of the hosts.
+    """
+    hosts = list(hosts)
+    num_sessions = min(max_sessions, len(hosts))
+    if num_sessions <= 1:
+        return [function(connection, host) for host in hosts]
 
-    return counters_available_by_host
+    sessions: queue.Queue = queue.Queue()
+    for _idx in range(num_sessions):
+        sessions.put(connection.new_session())
 
+    def _call(host):
+        session = sessions.get()
+        try:
+            return function(connection, host, session=session)
+        finally:
+            sessions.put(session)
 
-def fetch_counters_syntax(connection, counter_ids):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_sessions) as executor:
+        return list(executor.map(_call, hosts))
+
+
+def fetch_available_counters_of_host(connection, host, session=None) -> Dict[str, List[str]]:
+    data: Dict[str, List[str]] = {}
+    for element in connection.iter_response_elements('perfcounteravail',
+                                                     session=session,
+                                                     esxhost=host):
+        if element.tag == "returnval":
+            data.setdefault(element.findtext("counterId", ""),
+                            []).append(element.findtext("instance", ""))
+            element.clear()
+    return data
 
-    counters_list = ["<ns1:counterId>%s</ns1:counterId>" % id_ for id_ in counter_ids]
 
-    response_text = connection.query_server('perfcountersyntax', counters="".join(counters_list))
+def fetch_available_counters(connection,
+                             hostsystems,
+                             max_sessions=1) -> Dict[str, Dict[str, List[str]]]:
+    return dict(
+        zip(hostsystems,
+            map_hosts(connection, fetch_available_counters_of_host, hostsystems, max_sessions)))
 
-    elements = get_pattern(
-        '<returnval><key>(.*?)</key>.*?<key>(.*?)</key>.*?'
-        '<key>(.*?)</key>.*?<key>(.*?)</key>.*?', response_text)
 
-    return {
-        id_: {
+def fetch_counters_syntax(connection, counter_ids):
+
+    counters_list = ["<ns1:counterId>%s</ns1:counterId>" % id_ for id_ in counter_ids]
+
+    counters_syntax = {}
+    for element in connection.iter_response_elements('perfcountersyntax',
+                                                     counters="".join(counters_list)):
+        if element.tag != "returnval":
+            continue
+        name = element.findtext("nameInfo/key", "")
+        group = element.findtext("groupInfo/key", "")
+        counters_syntax[element.findtext("key", "")] = {
             "key": ".".join((group, name)),
             "name": name,
             "group": group,
-            "unit": unit
-        } for id_, name, group, unit in elements
-    }
+            "unit": element.findtext("unitInfo/key", ""),
+        }
+        element.clear()
+    return counters_syntax
 
 
 def fetch_extra_interface_counters(connection, opt):
@@ -1261,38 +1346,37 @@ def fetch_extra_interface_counters(connection, opt):
     return net_extra_info
 
 
-def fetch_counters(connection, host, counters_selected):
+def fetch_counters(connection, host, counters_selected, session=None):
     counter_data: List[str] = []
     for entry, instances in counters_selected:
         counter_data.extend(
             "<ns1:metricId><ns1:counterId>%s</ns1:counterId><ns1:instance>%s</ns1:instance>"
             "</ns1:metricId>" % (entry, instance) for instance in instances)
 
-    response_text = connection.query_server('perfcounterdata',
-                                            esxhost=host,
-                                            counters="".join(counter_data),
-                                            samples=connection.perf_samples)
-
-    # Python regex only supports up to 100 match groups in a regex..
-    # We are only extracting the whole value line and split it later on
-    # This is a perfect candidate for "Catastrophic Backtracking" :)
-    # Someday we should replace all of these get_pattern calls with
-    # one of these new and fancy xml parsers I've heard from
-    elements = get_pattern(
-        "<id><counterId>(.*?)</counterId><instance>(.*?)</instance></id>(%s)" %
-        ("<value>.*?</value>" * connection.perf_samples), response_text)
     counters_value = []
-    for entry in elements:
-        id_, instance, valuestring = entry
-        values = get_pattern("<value>(.*?)</value>", valuestring)
-        counters_value.append((id_, instance, values))
+    # <value xsi:type="PerfMetricIntSeries"><id><counterId>..</counterId><instance>..</instance>
+    # </id><value>..</value><value>..</value>...</value>
+    for element in connection.iter_response_elements('perfcounterdata',
+                                                     session=session,
+                                                     esxhost=host,
+                                                     counters="".join(counter_data),
+                                                     samples=connection.perf_samples):
+        metric_id = element.find("id")
+        if element.tag != "value" or metric_id is None:
+            continue
+        counters_value.append((
+            metric_id.findtext("counterId", ""),
+            metric_id.findtext("instance", ""),
+            [value.text or "" for value in element.iterfind("value")],
+        ))
+        element.clear()
 
     return counters_value
 
 
 def get_section_counters(connection, hostsystems, datastores, opt):
     section_lines = []
-    counters_available_by_host = fetch_available_counters(connection, hostsystems)
+    counters_available_by_host = fetch_available_counters(connection, hostsystems, opt.max_sessions)
     counters_available_all = {
         counter  #
         for by_host in counters_available_by_host.values()  #
@@ -1302,17 +1386,21 @@ def get_section_counters(connection, hostsystems, datastores, opt):
     net_extra_info = fetch_extra_interface_counters(connection, opt)
     counters_description = fetch_counters_syntax(connection, counters_available_all)
 
-    for host in hostsystems:
-        counters_avail = counters_available_by_host[host]
+    counters_selected_by_host = {
+        host: [(id_, instances)
+               for id_, instances in counters_available_by_host[host].items()
+               if counters_description.get(id_, {}).get("key") in REQUESTED_COUNTERS_KEYS
+              ] for host in hostsystems
+    }
 
-        counters_selected = [
-            (id_, instances)
-            for id_, instances in counters_avail.items()
-            if counters_description.get(id_, {}).get("key") in REQUESTED_COUNTERS_KEYS
-        ]
+    def _fetch_counters(connection, host, session=None):
+        return fetch_counters(connection, host, counters_selected_by_host[host], session=session)
 
-        counters_value = fetch_counters(connection, host, counters_selected)
+    # Determine the number of samples once, before the hosts are queried concurrently
+    connection.perf_samples  # pylint: disable=pointless-statement
+    counters_values = map_hosts(connection, _fetch_counters, hostsystems, opt.max_sessions)
 
+    for host, counters_value in zip(hostsystems, counters_values):
         counters_output = {}
         for id_, instance, values in counters_value:
             desc = counters_description.get(id_)
@@ -1702,34 +1790,44 @@ def eval_datastores(info, datastores):
     return "@@".join(response)
 
 
+def _iter_property_objects(connection, method, **kwargs) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Yield the object and its properties for every object of a property response
+
+    Only properties with simple values are supported. The values are kept XML escaped, as they
+    were found in the response, because other sections still extract their values from the
+    responses using regular expressions.
+    """
+    for element in connection.iter_response_elements(method, **kwargs):
+        if element.tag != "objects":
+            continue
+        properties = {
+            prop.findtext("name", ""): xml_escape(prop.findtext("val", ""))
+            for prop in element.iterfind("propSet")
+        }
+        yield element.findtext("obj", ""), properties
+        element.clear()
+
+
 def fetch_host_systems(connection):
-    hostsystems_response = connection.query_server('hostsystems')
-    elements = get_pattern(
-        '<obj type="HostSystem">(.*?)</obj>.*?<val xsi:type="xsd:string">(.*?)</val>',
-        hostsystems_response)
+    hostsystems = {
+        obj: properties["name"]
+        for obj, properties in _iter_property_objects(connection, 'hostsystems')
+        if "name" in properties
+    }
 
     # On some ESX systems the cookie login does not work as expected, when the agent_vsphere
     # is called only once or twice a day. The cookie is somehow outdated, but there is no
     # authentification failed message. Instead, the query simply returns an empty data set..
     # We try to detect this here (there is always a hostsystem) and raise a MKQueryServerException
     # which forces a new login
-    if not elements:
+    if not hostsystems:
         raise ESXCookieInvalid("Login cookie is no longer valid")
 
-    return dict(elements)
+    return hostsystems
 
 
 def fetch_datastores(connection):
-    datastores_response = connection.query_server('datastores')
-    elements = get_pattern('<objects><obj type="Datastore">(.*?)</obj>(.*?)</objects>',
-                           datastores_response)
-    datastores: Dict[str, Dict[str, Any]] = {}
-    for datastore, content in elements:
-        entries = get_pattern('<name>(.*?)</name><val xsi:type.*?>(.*?)</val>', content)
-        datastores[datastore] = {}
-        for name, value in entries:
-            datastores[datastore][name] = value
-    return datastores
+    return dict(_iter_property_objects(connection, 'datastores'))
 
 
 def get_section_datastores(datastores):
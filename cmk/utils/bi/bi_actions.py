@@ -103,7 +103,7 @@ class BIStateOfHostAction(ABCBIAction, ABCWithSchema):
                 bi_searcher: ABCBISearcher) -> List[ABCBICompiledNode]:
         host_re = replace_macros(self.host_regex, search_result)
         host_matches, _match_groups = bi_searcher.get_host_name_matches(
-            list(bi_searcher.hosts.values()), host_re)
+            bi_searcher.get_all_hosts(), host_re)
 
         action_results: List[ABCBICompiledNode] = []
         for host_match in host_matches:
@@ -147,7 +147,7 @@ class BIStateOfServiceAction(ABCBIAction, ABCWithSchema):
         host_re = replace_macros(self.host_regex, search_result)
         service_re = replace_macros(self.service_regex, search_result)
         host_matches, _match_groups = bi_searcher.get_host_name_matches(
-            list(bi_searcher.hosts.values()), host_re)
+            bi_searcher.get_all_hosts(), host_re)
 
         action_results: List[ABCBICompiledNode] = []
         service_matches = bi_searcher.get_service_description_matches(host_matches, service_re)
@@ -196,7 +196,7 @@ class BIStateOfRemainingServicesAction(ABCBIAction, ABCWithSchema):
                 bi_searcher: ABCBISearcher) -> List[ABCBICompiledNode]:
         host_re = replace_macros(self.host_regex, search_result)
         host_matches, _match_groups = bi_searcher.get_host_name_matches(
-            list(bi_searcher.hosts.values()), host_re)
+            bi_searcher.get_all_hosts(), host_re)
         return [BIRemainingResult([x.name for x in host_matches])]
 
 
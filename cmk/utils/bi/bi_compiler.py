@@ -6,10 +6,12 @@
 
 import os
 import time
+import hashlib
 import cmk
 import marshal
 from pathlib import Path
 from typing import (
+    Callable,
     Dict,
     Set,
     Optional,
@@ -32,7 +34,9 @@ from cmk.utils.exceptions import MKGeneralException
 
 from cmk.utils.i18n import _
 from cmk.utils.bi.bi_trees import BICompiledAggregation, BICompiledAggregationSchema
-from cmk.utils.bi.bi_aggregation import BIAggregation
+from cmk.utils.bi.bi_aggregation import BIAggregation, BIAggregationSchema
+from cmk.utils.bi.bi_actions import BICallARuleAction
+from cmk.utils.bi.bi_rule import BIRuleSchema
 from cmk.utils.type_defs import HostName, ServiceName
 from cmk.utils.bi.bi_lib import SitesCallback
 
@@ -43,6 +47,18 @@ class ConfigStatus(TypedDict):
     online_sites: Set[SiteProgramStart]
 
 
+class AggregationDependencies(TypedDict):
+    pack_id: str
+    config_fingerprint: str
+    hosts: List[HostName]
+    scanned_all_hosts: bool
+
+
+# Compiled aggregations loaded by this process, by file path. A file is only loaded again if it
+# has been replaced. Keeping the instances also keeps the last computed results of their branches
+_loaded_aggregations: Dict[str, Tuple[Tuple[int, int], BICompiledAggregation]] = {}
+
+
 class BICompiler:
     def __init__(self, bi_configuration_file, sites_callback: SitesCallback):
         self._sites_callback = sites_callback
@@ -54,6 +70,7 @@ class BICompiler:
         self._path_compilation_timestamp = Path(get_cache_dir(), "last_compilation")
         self._path_compiled_aggregations = Path(get_cache_dir(), "compiled_aggregations")
         self._path_compiled_aggregations.mkdir(parents=True, exist_ok=True)
+        self._path_compilation_dependencies = Path(get_cache_dir(), "compilation_dependencies")
         self._part_of_aggregation_map: Dict[Tuple[HostName, Optional[ServiceName]],
                                             List[Tuple[str, str]]] = {}
 
@@ -71,25 +88,44 @@ class BICompiler:
     def cleanup(self) -> None:
         self._compiled_aggregations.clear()
 
-    def load_compiled_aggregations(self) -> None:
+    def load_compiled_aggregations(
+            self, compile_in_background: Optional[Callable[[], None]] = None) -> None:
+        """ Loads the compiled aggregations, compiles outdated aggregations beforehand
+
+        If compile_in_background is given, it is called instead of compiling in the
+        current process as long as only the site data has changed. The previously
+        compiled aggregations are used in the meantime."""
         try:
-            self._check_compilation_status()
+            self._check_compilation_status(compile_in_background)
         finally:
             self._load_compiled_aggregations()
 
-    def _load_compiled_aggregations(self) -> None:
+    def _load_compiled_aggregations(self, only_aggr_ids: Optional[Set[str]] = None) -> None:
         for path_object in self._path_compiled_aggregations.iterdir():
-            if path_object.is_dir():
+            if path_object.is_dir() or path_object.suffix == ".new":
                 continue
             aggr_id = path_object.name
             if aggr_id in self._compiled_aggregations:
                 continue
-            self._logger.debug("Loading cached aggregation results %s" % aggr_id)
-            aggr_data = self._marshal_load_data(str(path_object))
-            self._compiled_aggregations[aggr_id] = BIAggregation.create_trees_from_schema(aggr_data)
+            if only_aggr_ids is not None and aggr_id not in only_aggr_ids:
+                continue
+            self._compiled_aggregations[aggr_id] = self._load_compiled_aggregation(path_object)
 
         self._update_part_of_aggregation_map()
 
+    def _load_compiled_aggregation(self, path_object: Path) -> BICompiledAggregation:
+        stat_result = path_object.stat()
+        file_id = (stat_result.st_ino, stat_result.st_mtime_ns)
+        loaded = _loaded_aggregations.get(str(path_object))
+        if loaded is not None and loaded[0] == file_id:
+            return loaded[1]
+
+        self._logger.debug("Loading cached aggregation results %s" % path_object.name)
+        aggr_data = self._marshal_load_data(str(path_object))
+        compiled_aggregation = BIAggregation.create_trees_from_schema(aggr_data)
+        _loaded_aggregations[str(path_object)] = (file_id, compiled_aggregation)
+        return compiled_aggregation
+
     def used_in_aggregation(self, host_name: HostName, service_description: ServiceName) -> bool:
         return (host_name, service_description) in self._part_of_aggregation_map
 
@@ -102,12 +138,26 @@ class BICompiler:
                     self._part_of_aggregation_map.setdefault(key, [])
                     self._part_of_aggregation_map[key].append((aggr_id, branch.properties.title))
 
-    def _check_compilation_status(self) -> None:
+    def _check_compilation_status(
+            self, compile_in_background: Optional[Callable[[], None]] = None) -> None:
         current_configstatus = self.compute_current_configstatus()
         if not self._compilation_required(current_configstatus):
             self._logger.debug("No compilation required")
             return
 
+        if compile_in_background is not None and self._only_site_data_changed(
+                current_configstatus):
+            # The configuration is unchanged, only the monitoring cores have been restarted.
+            # The outdated aggregations are compiled in the background, this request works
+            # with the previous compilation result
+            self._logger.debug("Site data changed. Starting compilation in background")
+            compile_in_background()
+            return
+
+        self.update_compiled_aggregations()
+
+    def update_compiled_aggregations(self) -> None:
+        """ Compiles all aggregations which are affected by configuration or site data changes """
         with store.locked(self._path_compilation_lock):
             # Re-check compilation required after lock has been required
             # Another apache might have done the job
@@ -118,16 +168,44 @@ class BICompiler:
 
             self.prepare_for_compilation(current_configstatus["online_sites"])
 
+            dependencies = self._load_compilation_dependencies()
+            host_fingerprints = self._compute_host_fingerprints()
+            changed_hosts = self._get_changed_hosts(dependencies.get("hosts", {}),
+                                                    host_fingerprints)
+            aggregation_dependencies = dependencies.get("aggregations", {})
+            new_aggregation_dependencies: Dict[str, AggregationDependencies] = {}
+            compiled_aggr_ids = []
+
             # Compile the raw tree
             for aggregation in self._bi_packs.get_all_aggregations():
+                config_fingerprint = self._compute_config_fingerprint(aggregation)
+                known_dependencies = aggregation_dependencies.get(aggregation.id)
+                if (known_dependencies is not None and
+                        self._path_compiled_aggregations.joinpath(aggregation.id).exists() and
+                        not self._aggregation_outdated(known_dependencies, config_fingerprint,
+                                                       changed_hosts)):
+                    new_aggregation_dependencies[aggregation.id] = known_dependencies
+                    continue
+
                 start = time.time()
-                self._compiled_aggregations[aggregation.id] = aggregation.compile(self.bi_searcher)
+                self.bi_searcher.reset_dependency_tracking()
+                compiled_aggregation = aggregation.compile(self.bi_searcher)
+                self._compiled_aggregations[aggregation.id] = compiled_aggregation
+                compiled_aggr_ids.append(aggregation.id)
+                new_aggregation_dependencies[aggregation.id] = self._get_aggregation_dependencies(
+                    aggregation, config_fingerprint, compiled_aggregation)
                 self._logger.debug("Compilation of %s took %f" %
                                    (aggregation.id, time.time() - start))
 
+            self._logger.debug("Compiled %d of %d aggregations" %
+                               (len(compiled_aggr_ids), len(new_aggregation_dependencies)))
+
+            # The title check needs all aggregations, even the ones which were not recompiled
+            self._load_compiled_aggregations(set(new_aggregation_dependencies))
             self._verify_aggregation_title_uniqueness(self._compiled_aggregations)
 
-            for aggr_id, aggr in self._compiled_aggregations.items():
+            for aggr_id in compiled_aggr_ids:
+                aggr = self._compiled_aggregations[aggr_id]
                 start = time.time()
                 result = BICompiledAggregationSchema().dump(aggr)
                 self._logger.debug("Schema dump took config took %f (%d branches)" %
@@ -136,20 +214,106 @@ class BICompiler:
                 self._marshal_save_data(self._path_compiled_aggregations.joinpath(aggr_id), result)
                 self._logger.debug("Save dump to disk took %f" % (time.time() - start))
 
-        known_sites = {kv[0]: kv[1] for kv in current_configstatus.get("known_sites", set())}
-        self._cleanup_vanished_aggregations()
-        self._bi_structure_fetcher._cleanup_orphaned_files(known_sites)
+            self._marshal_save_data(
+                self._path_compilation_dependencies, {
+                    "hosts": host_fingerprints,
+                    "aggregations": new_aggregation_dependencies,
+                })
+
+            known_sites = {kv[0]: kv[1] for kv in current_configstatus.get("known_sites", set())}
+            self._cleanup_vanished_aggregations()
+            self._bi_structure_fetcher._cleanup_orphaned_files(known_sites)
+
+            self._path_compilation_timestamp.write_text(
+                str(current_configstatus["configfile_timestamp"]))
+
+    def _only_site_data_changed(self, current_configstatus: ConfigStatus) -> bool:
+        if not self._path_compilation_dependencies.exists():
+            return False
+        return current_configstatus["configfile_timestamp"] <= self._get_compilation_timestamp()
+
+    def _load_compilation_dependencies(self) -> Dict:
+        if not self._path_compilation_dependencies.exists():
+            return {}
+        return self._marshal_load_data(str(self._path_compilation_dependencies))
+
+    def _compute_config_fingerprint(self, aggregation: BIAggregation) -> str:
+        """ The fingerprint covers the aggregation and all rules it calls, directly or indirectly """
+        rule_ids: Set[str] = set()
+        if isinstance(aggregation.node.action, BICallARuleAction):
+            rule_ids = self._bi_packs.get_rule_ids_of_aggregation(aggregation.id)
+
+        config = [aggregation.pack_id, BIAggregationSchema().dump(aggregation)]
+        for rule_id in sorted(rule_ids):
+            config.append(BIRuleSchema().dump(self._bi_packs.get_rule_mandatory(rule_id)))
+        return hashlib.md5(repr(config).encode("utf-8")).hexdigest()
+
+    def _compute_host_fingerprints(self) -> Dict[HostName, str]:
+        fingerprints = {}
+        for host_name, host in self._bi_structure_fetcher.hosts.items():
+            # Sets and dicts are sorted, their order is not stable across processes
+            host_data = (
+                host.site_id,
+                sorted(host.tags),
+                sorted(host.labels.items()),
+                host.folder,
+                sorted((service_description, sorted(service.tags), sorted(service.labels.items()))
+                       for service_description, service in host.services.items()),
+                host.children,
+                host.parents,
+                host.alias,
+            )
+            fingerprints[host_name] = hashlib.md5(repr(host_data).encode("utf-8")).hexdigest()
+        return fingerprints
+
+    def _get_changed_hosts(self, old_fingerprints: Dict[HostName, str],
+                           new_fingerprints: Dict[HostName, str]) -> Set[HostName]:
+        changed_hosts = set(old_fingerprints).symmetric_difference(new_fingerprints)
+        for host_name, fingerprint in new_fingerprints.items():
+            if host_name in old_fingerprints and old_fingerprints[host_name] != fingerprint:
+                changed_hosts.add(host_name)
+        return changed_hosts
+
+    def _aggregation_outdated(self, dependencies: AggregationDependencies,
+                              config_fingerprint: str, changed_hosts: Set[HostName]) -> bool:
+        if dependencies["config_fingerprint"] != config_fingerprint:
+            return True
+
+        if not changed_hosts:
+            return False
 
-        self._path_compilation_timestamp.write_text(
-            str(current_configstatus["configfile_timestamp"]))
+        # Searches over all hosts may find new hosts or drop existing ones
+        if dependencies["scanned_all_hosts"]:
+            return True
+
+        return not changed_hosts.isdisjoint(dependencies["hosts"])
+
+    def _get_aggregation_dependencies(
+            self, aggregation: BIAggregation, config_fingerprint: str,
+            compiled_aggregation: BICompiledAggregation) -> AggregationDependencies:
+        hosts = set(self.bi_searcher.accessed_hosts)
+        for branch in compiled_aggregation.branches:
+            for _site, host_name, _service_description in branch.required_elements():
+                hosts.add(host_name)
+
+        return {
+            "pack_id": aggregation.pack_id,
+            "config_fingerprint": config_fingerprint,
+            "hosts": sorted(hosts),
+            "scanned_all_hosts": self.bi_searcher.scanned_all_hosts,
+        }
 
     def _cleanup_vanished_aggregations(self):
-        valid_aggregations = list(self._compiled_aggregations.keys())
+        valid_aggregations = [x.id for x in self._bi_packs.get_all_aggregations()]
+        for aggr_id in list(self._compiled_aggregations):
+            if aggr_id not in valid_aggregations:
+                del self._compiled_aggregations[aggr_id]
         for path_object in self._path_compiled_aggregations.iterdir():
             if path_object.is_dir():
                 continue
             if path_object.name not in valid_aggregations:
                 path_object.unlink(missing_ok=True)
+                _loaded_aggregations.pop(str(path_object), None)
 
     def _verify_aggregation_title_uniqueness(
             self, compiled_aggregations: Dict[str, BICompiledAggregation]) -> None:
@@ -246,9 +410,12 @@ class BICompiler:
         return latest_timestamp
 
     def _marshal_save_data(self, filepath, data) -> None:
-        with open(filepath, "wb") as f:
+        # Readers in other processes must never see a partially written file
+        tmp_path = "%s.new" % filepath
+        with open(tmp_path, "wb") as f:
             marshal.dump(data, f)
             os.fsync(f.fileno())
+        os.rename(tmp_path, filepath)
 
     def _marshal_load_data(self, filepath) -> Dict:
         try:
@@ -233,6 +233,14 @@ class BIStructureFetcher:
 #   |                                                                      |
 #   +----------------------------------------------------------------------+
 
+# The core slows down if the host filter gets too big. Beyond this number of hosts all hosts
+# of the required sites are fetched and the unneeded ones are dropped afterwards
+MAX_HOST_FILTER_SIZE = 1000
+
+# Status rows of the previous query of this process. Unchanged rows are replaced by their
+# previous instances, so that a plain identity check reveals unchanged hosts
+_last_status_rows: BIStatusInfo = {}
+
 
 class BIStatusFetcher(ABCBIStatusFetcher):
     def set_assumed_states(self, assumed_states) -> None:
@@ -245,10 +253,21 @@ class BIStatusFetcher(ABCBIStatusFetcher):
                 self.assumed_states[key] = state
 
     def update_states(self, required_elements: Set[RequiredBIElement]) -> None:
-        self.states = self._get_status_info(required_elements)
+        self.states = self._reuse_unchanged_rows(self._get_status_info(required_elements))
 
     def update_states_filtered(self, *args) -> None:
-        self.states = self._get_status_info_filtered(*args)
+        self.states = self._reuse_unchanged_rows(self._get_status_info_filtered(*args))
+
+    @staticmethod
+    def _reuse_unchanged_rows(states: BIStatusInfo) -> BIStatusInfo:
+        for host_spec, row in states.items():
+            last_row = _last_status_rows.get(host_spec)
+            if last_row is not None and last_row == row:
+                states[host_spec] = last_row
+        # Only keep the hosts of this query, e.g. deleted hosts must not stay forever
+        _last_status_rows.clear()
+        _last_status_rows.update(states)
+        return states
 
     def cleanup(self) -> None:
         self.states.clear()
@@ -264,16 +283,21 @@ class BIStatusFetcher(ABCBIStatusFetcher):
             req_hosts.add(host)
             req_sites.add(site)
 
-        # TODO: the cmc slows down if the host filter gets too big
-        #       fetch all hosts if the filter exceeds 1000 hosts
+        query = "GET hosts\nColumns: %s\n" % " ".join(self.get_status_columns())
+        if len(req_hosts) > MAX_HOST_FILTER_SIZE:
+            return self.create_bi_status_data([
+                row for row in self._sites_callback.query(query, list(req_sites))
+                if row[1] in req_hosts
+            ])
+
         host_filter = ""
         for host in req_hosts:
             host_filter += "Filter: name = %s\n" % host
         if len(req_hosts) > 1:
             host_filter += "Or: %d\n" % len(req_hosts)
 
-        query = "GET hosts\nColumns: %s\n" % " ".join(self.get_status_columns()) + host_filter
-        return self.create_bi_status_data(self._sites_callback.query(query, list(req_sites)))
+        return self.create_bi_status_data(
+            self._sites_callback.query(query + host_filter, list(req_sites)))
 
     # This variant of the function is configured not with a list of
     # hosts but with a livestatus filter header and a list of columns
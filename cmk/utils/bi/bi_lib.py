@@ -327,6 +327,13 @@ class ABCBISearcher(metaclass=abc.ABCMeta):
         self.hosts = {}
         self._host_regex_match_cache = {}
         self._host_regex_miss_cache = {}
+        # Dependency tracking, used for incremental compilation
+        self.accessed_hosts: Set[HostName] = set()
+        self.scanned_all_hosts = False
+
+    @abc.abstractmethod
+    def get_all_hosts(self) -> List[BIHostData]:
+        raise NotImplementedError()
 
     @abc.abstractmethod
     def search_hosts(self, conditions: Dict) -> List[BIHostSearchMatch]:
@@ -248,12 +248,11 @@ class BIAggregationPacks:
         return set()
 
     def _get_rule_ids_of_rule(self, rule_id: str) -> Set[str]:
-        rule_ids = [rule_id] + [
-            bi_node.action.rule_id
-            for bi_node in self.get_rule_mandatory(rule_id).get_nodes()
-            if isinstance(bi_node.action, BICallARuleAction)
-        ]
-        return set(rule_ids)
+        rule_ids = {rule_id}
+        for bi_node in self.get_rule_mandatory(rule_id).get_nodes():
+            if isinstance(bi_node.action, BICallARuleAction):
+                rule_ids.update(self._get_rule_ids_of_rule(bi_node.action.rule_id))
+        return rule_ids
 
     def rename_rule_id(self, old_id: str, new_id: str) -> None:
         # Rename the rule itself and all call_a_rule references in rules and aggregations
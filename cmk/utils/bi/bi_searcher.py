@@ -4,8 +4,11 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import bisect
+from typing import Dict, List, Optional, Set, Tuple
+
 from cmk.utils.regex import regex
-from typing import Dict, List, Tuple
+from cmk.utils.type_defs import HostName
 from cmk.utils.rulesets.ruleset_matcher import matches_labels, matches_tag_spec
 
 from cmk.utils.bi.bi_lib import (
@@ -36,10 +39,69 @@ from cmk.utils.bi.bi_lib import (
 #   +----------------------------------------------------------------------+
 
 
+_REGEX_META_CHARS = ".^$*+?{}[]\\|()"
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Returns the text every match of pattern starts with
+
+    The searcher uses re.match, so all matches are anchored at the beginning.
+
+    >>> _literal_prefix("CPU load")
+    'CPU load'
+    >>> _literal_prefix("Interface (.*)")
+    'Interface '
+    >>> _literal_prefix("Filesystems?")
+    'Filesystem'
+    >>> _literal_prefix("OMD|Interface")
+    ''
+    """
+    if "|" in pattern:
+        return ""
+    for idx, char in enumerate(pattern):
+        if char not in _REGEX_META_CHARS:
+            continue
+        if char in "*?{":
+            # The previous character is optional
+            return pattern[:max(idx - 1, 0)]
+        return pattern[:idx]
+    return pattern
+
+
+def _prefixed_positions(sorted_entries: List[Tuple[str, int]], prefix: str) -> List[int]:
+    """Returns the positions of all entries starting with prefix, in their original order"""
+    positions = []
+    idx = bisect.bisect_left(sorted_entries, (prefix,))
+    while idx < len(sorted_entries) and sorted_entries[idx][0].startswith(prefix):
+        positions.append(sorted_entries[idx][1])
+        idx += 1
+    return sorted(positions)
+
+
 class BISearcher(ABCBISearcher):
+    def __init__(self):
+        super().__init__()
+        # Indices over all hosts, built by set_hosts. The sorted lists contain
+        # the positions in _host_list, which keeps the order of the hosts
+        self._host_list: List[BIHostData] = []
+        self._sorted_host_names: List[Tuple[str, int]] = []
+        self._sorted_host_aliases: List[Tuple[str, int]] = []
+        self._host_tags_index: Dict[str, Set[HostName]] = {}
+        self._host_labels_index: Dict[Tuple[str, str], Set[HostName]] = {}
+        # Built on demand, per host
+        self._sorted_service_names: Dict[HostName, List[Tuple[str, int]]] = {}
+
+        # The regex results stay valid until the hosts change. They are shared
+        # between all aggregations of a compilation run
+        self._host_name_regex_results: Dict[str, Tuple[List[BIHostData], Dict]] = {}
+        self._host_alias_regex_results: Dict[str, Tuple[List[BIHostData], Dict]] = {}
+        self._service_regex_cache: Dict[str, Dict[HostName, List[Tuple[str, tuple]]]] = {}
+        self._literal_prefixes: Dict[str, str] = {}
+
     def set_hosts(self, hosts: Dict[str, BIHostData]) -> None:
         self.cleanup()
         self.hosts = hosts
+        self._build_host_indices()
 
     def cleanup(self) -> None:
         # Note: Do not call clear() on hosts
@@ -47,17 +109,63 @@ class BISearcher(ABCBISearcher):
         self.hosts = {}
         self._host_regex_match_cache.clear()
         self._host_regex_miss_cache.clear()
+        self._host_list = []
+        self._sorted_host_names = []
+        self._sorted_host_aliases = []
+        self._host_tags_index = {}
+        self._host_labels_index = {}
+        self._sorted_service_names = {}
+        self._host_name_regex_results = {}
+        self._host_alias_regex_results = {}
+        self._service_regex_cache = {}
+        self._literal_prefixes = {}
+        self.reset_dependency_tracking()
+
+    def _build_host_indices(self) -> None:
+        self._host_list = list(self.hosts.values())
+        for host in self._host_list:
+            for tag in host.tags:
+                self._host_tags_index.setdefault(tag, set()).add(host.name)
+            for label in host.labels.items():
+                self._host_labels_index.setdefault(label, set()).add(host.name)
+        self._sorted_host_names = sorted((x.name, idx) for idx, x in enumerate(self._host_list))
+        self._sorted_host_aliases = sorted((x.alias, idx) for idx, x in enumerate(self._host_list))
+
+    def _get_literal_prefix(self, pattern: str) -> str:
+        prefix = self._literal_prefixes.get(pattern)
+        if prefix is None:
+            prefix = self._literal_prefixes[pattern] = _literal_prefix(pattern)
+        return prefix
+
+    def get_all_hosts(self) -> List[BIHostData]:
+        # Note: This is not a copy, do not modify the list
+        return self._host_list
+
+    def _is_all_hosts(self, hosts: List[BIHostData]) -> bool:
+        # The given hosts are always taken from self.hosts
+        return len(hosts) == len(self.hosts)
+
+    def reset_dependency_tracking(self) -> None:
+        """ Starts a new recording of the hosts the following searches depend on
+
+        Explicitly named hosts are collected in accessed_hosts. As soon as a search
+        has to look at every known host (regex or alias matches), scanned_all_hosts
+        is set: the result may then change with any host on any site."""
+        self.accessed_hosts = set()
+        self.scanned_all_hosts = False
 
     def search_hosts(self, conditions: Dict) -> List[BIHostSearchMatch]:
-        matched_hosts, matched_re_groups = self.filter_host_choice(list(self.hosts.values()),
+        matched_hosts, matched_re_groups = self.filter_host_choice(self.get_all_hosts(),
                                                                    conditions["host_choice"])
         matched_hosts = self.filter_host_tags(matched_hosts, conditions["host_tags"])
         matched_hosts = self.filter_host_labels(matched_hosts, conditions["host_labels"])
+        self.accessed_hosts.update(x.name for x in matched_hosts)
         return [BIHostSearchMatch(x, matched_re_groups[x.name]) for x in matched_hosts]
 
     def filter_host_choice(self, hosts: List[BIHostData],
                            condition: Dict) -> Tuple[List[BIHostData], Dict]:
         if condition["type"] == "all_hosts" or condition["pattern"] == "(.*)":
+            self.scanned_all_hosts = True
             match_groups = {}
             for host in hosts:
                 match_groups[host.name] = (host.name,)
@@ -76,11 +184,23 @@ class BISearcher(ABCBISearcher):
 
         is_regex_match = '*' in pattern or '$' in pattern or '|' in pattern or '[' in pattern
         if not is_regex_match:
+            self.accessed_hosts.add(pattern)
             host = self.hosts.get(pattern)
             if host:
                 return [host], {pattern: (pattern,)}
             return [], {}
 
+        self.scanned_all_hosts = True
+        all_hosts = self._is_all_hosts(hosts)
+        if all_hosts and pattern in self._host_name_regex_results:
+            return self._host_name_regex_results[pattern]
+
+        prefix = self._get_literal_prefix(pattern)
+        if all_hosts:
+            hosts = [
+                self._host_list[x] for x in _prefixed_positions(self._sorted_host_names, prefix)
+            ]
+
         matched_hosts = []
         matched_re_groups = {}
         regex_pattern = regex(pattern)
@@ -91,48 +211,88 @@ class BISearcher(ABCBISearcher):
                 continue
 
             cached_match = pattern_match_cache.get(host.name)
-            if cached_match:
+            if cached_match is not None:
                 matched_hosts.append(host)
                 matched_re_groups[host.name] = cached_match
                 continue
 
-            match = regex_pattern.match(host.name)
+            match = regex_pattern.match(host.name) if host.name.startswith(prefix) else None
             if match is None:
                 pattern_miss_cache[host.name] = True
                 continue
             pattern_match_cache[host.name] = match.groups()
             matched_hosts.append(host)
             matched_re_groups[host.name] = pattern_match_cache[host.name]
+
+        if all_hosts:
+            self._host_name_regex_results[pattern] = (matched_hosts, matched_re_groups)
         return matched_hosts, matched_re_groups
 
     def get_host_alias_matches(self, hosts: List[BIHostData],
                                pattern: str) -> Tuple[List[BIHostData], Dict]:
-        # TODO: alias matches currently costs way more performmance than the host matches
-        #       requires alias lookup to fix
+        self.scanned_all_hosts = True
+        all_hosts = self._is_all_hosts(hosts)
+        if all_hosts and pattern in self._host_alias_regex_results:
+            return self._host_alias_regex_results[pattern]
+
+        # Use the alias index to look only at aliases starting with the literal prefix
+        prefix = self._get_literal_prefix(pattern)
+        if all_hosts:
+            hosts = [
+                self._host_list[x] for x in _prefixed_positions(self._sorted_host_aliases, prefix)
+            ]
+
         matched_hosts = []
         matched_re_groups = {}
         regex_pattern = regex(pattern)
         for host in hosts:
+            if not host.alias.startswith(prefix):
+                continue
             match = regex_pattern.match(host.alias)
             if match is None:
                 continue
             matched_hosts.append(host)
             matched_re_groups[host.name] = tuple(match.groups())
+
+        if all_hosts:
+            self._host_alias_regex_results[pattern] = (matched_hosts, matched_re_groups)
         return matched_hosts, matched_re_groups
 
     def get_service_description_matches(self, hosts: List[BIHostData],
                                         pattern: str) -> List[BIServiceSearchMatch]:
         matched_services = []
-        regex_pattern = regex(pattern)
+        self.accessed_hosts.update(x.name for x in hosts)
+        pattern_cache = self._service_regex_cache.setdefault(pattern, {})
         for host in hosts:
-            for service_description in host.services.keys():
-                match = regex_pattern.match(service_description)
-                if match is None:
-                    continue
+            host_matches = pattern_cache.get(host.name)
+            if host_matches is None:
+                host_matches = self._match_services_of_host(host, pattern)
+                pattern_cache[host.name] = host_matches
+
+            for service_description, match_groups in host_matches:
                 matched_services.append(
-                    BIServiceSearchMatch(host, service_description, tuple(match.groups())))
+                    BIServiceSearchMatch(host, service_description, match_groups))
         return matched_services
 
+    def _match_services_of_host(self, host: BIHostData,
+                                pattern: str) -> List[Tuple[str, tuple]]:
+        service_descriptions = list(host.services)
+        sorted_service_names = self._sorted_service_names.get(host.name)
+        if sorted_service_names is None:
+            sorted_service_names = sorted((x, idx) for idx, x in enumerate(service_descriptions))
+            self._sorted_service_names[host.name] = sorted_service_names
+
+        host_matches = []
+        regex_pattern = regex(pattern)
+        for position in _prefixed_positions(sorted_service_names,
+                                            self._get_literal_prefix(pattern)):
+            service_description = service_descriptions[position]
+            match = regex_pattern.match(service_description)
+            if match is None:
+                continue
+            host_matches.append((service_description, tuple(match.groups())))
+        return host_matches
+
     def search_services(self, conditions: Dict) -> List[BIServiceSearchMatch]:
         host_matches: List[BIHostSearchMatch] = self.search_hosts(conditions)
         service_matches = self.get_service_description_matches([x.host for x in host_matches],
@@ -141,8 +301,13 @@ class BISearcher(ABCBISearcher):
         return service_matches
 
     def filter_host_tags(self, hosts: List[BIHostData], condition: Dict) -> List[BIHostData]:
+        # Narrow down the hosts with the index of all explicitly required tags
+        candidates = self._get_indexed_candidates(
+            self._host_tags_index, [x for x in condition.values() if isinstance(x, str)])
         matched_hosts = []
         for host in hosts:
+            if candidates is not None and host.name not in candidates:
+                continue
             for tag_condition in condition.values():
                 if not matches_tag_spec(tag_condition, host.tags):
                     break
@@ -153,12 +318,29 @@ class BISearcher(ABCBISearcher):
     def filter_host_labels(self, hosts: List[BIHostData], required_labels):
         if not required_labels:
             return hosts
+        candidates = self._get_indexed_candidates(
+            self._host_labels_index,
+            [x for x in required_labels.items() if not isinstance(x[1], dict)])
         matched_hosts = []
         for host in hosts:
+            if candidates is not None and host.name not in candidates:
+                continue
             if matches_labels(host.labels, required_labels):
                 matched_hosts.append(host)
         return matched_hosts
 
+    def _get_indexed_candidates(self, index: Dict, required_keys: List) -> Optional[Set[HostName]]:
+        """Returns the hosts having all required keys, None in case nothing is required"""
+        if not required_keys:
+            return None
+        candidates = None
+        for key in sorted(required_keys, key=lambda x: len(index.get(x, ()))):
+            hosts_with_key = index.get(key, set())
+            candidates = hosts_with_key if candidates is None else candidates & hosts_with_key
+            if not candidates:
+                return set()
+        return candidates
+
     def filter_service_labels(self, services: List[BIServiceSearchMatch], required_labels):
         if not required_labels:
             return services
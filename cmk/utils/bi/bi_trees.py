@@ -229,6 +229,9 @@ class BICompiledRule(ABCBICompiledNode):
         self.properties = properties
         self.aggregation_function = aggregation_function
         self.node_visualization = node_visualization
+        self._required_host_specs: Optional[Tuple[BIHostSpec, ...]] = None
+        self._last_computation: Optional[Tuple[Tuple[Optional[BIHostStatusInfoRow], ...],
+                                               Optional[NodeResultBundle]]] = None
 
     def __str__(self):
         return "BICompiledRule[%s, %d rules, %d leaves %d remaining]" % (
@@ -283,6 +286,27 @@ class BICompiledRule(ABCBICompiledNode):
                                                            computation_options)
         return NodeResultBundle(actual_result, assumed_result, bundled_results, self)
 
+    def compute_incremental(
+            self, computation_options: BIAggregationComputationOptions,
+            bi_status_fetcher: ABCBIStatusFetcher) -> Optional[NodeResultBundle]:
+        """ Computes the branch, unless none of its host status rows changed since the last call
+
+        The status fetcher keeps the row instances of unchanged hosts, so comparing the
+        identity of the rows is sufficient"""
+        if self._required_host_specs is None:
+            self._required_host_specs = tuple(sorted(self.get_required_hosts()))
+
+        status_rows = tuple(
+            bi_status_fetcher.states.get(host_spec) for host_spec in self._required_host_specs)
+        if self._last_computation is not None:
+            last_status_rows, last_result = self._last_computation
+            if all(row is last_row for row, last_row in zip(status_rows, last_status_rows)):
+                return last_result
+
+        result = self.compute(computation_options, bi_status_fetcher)
+        self._last_computation = (status_rows, result)
+        return result
+
     def _process_node_compute_result(
             self, results: List[NodeComputeResult],
             computation_options: BIAggregationComputationOptions) -> NodeComputeResult:
@@ -413,11 +437,14 @@ class BICompiledAggregation:
         assumed_state_ids = set(bi_status_fetcher.assumed_states)
         aggregation_results = []
         for bi_compiled_branch in branches:
-            required_elements = bi_compiled_branch.required_elements()
-            compute_assumed_state = any(assumed_state_ids.intersection(required_elements))
-            result = bi_compiled_branch.compute(self.computation_options,
-                                                bi_status_fetcher,
-                                                use_assumed=compute_assumed_state)
+            if assumed_state_ids and assumed_state_ids.intersection(
+                    bi_compiled_branch.required_elements()):
+                result = bi_compiled_branch.compute(self.computation_options,
+                                                    bi_status_fetcher,
+                                                    use_assumed=True)
+            else:
+                result = bi_compiled_branch.compute_incremental(self.computation_options,
+                                                                bi_status_fetcher)
             if result is not None:
                 aggregation_results.append(result)
         return aggregation_results
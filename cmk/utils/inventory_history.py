@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Precomputed deltas of the HW/SW inventory history
+
+The history of a host consists of its archived inventory trees and the current one, each
+named by the modification time of the inventory file. The history view shows the deltas
+between each two consecutive trees. Computing them on demand requires to load all trees of
+the host, which takes long for hosts with many changes.
+
+The delta is computed when the inventory tree of a host changes, i.e. when the previous
+tree is archived. It is saved as "<previous timestamp>_<timestamp>" ("None" for the first
+tree of a host) in the delta cache directory of the host, which also holds a manifest with
+the number of new, changed and removed entries of all deltas. Readers can page through the
+history and only need to load the delta trees they show.
+
+The deltas are computed from the unfiltered trees. Delta files not listed in the manifest
+have been written by older versions from filtered trees, they are not used.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.exceptions import MKGeneralException
+from cmk.utils.structured_data import StructuredDataTree
+from cmk.utils.type_defs import HostName
+
+# Number of new, changed and removed entries
+DeltaCounts = Tuple[int, int, int]
+Delta = Tuple[int, int, int, StructuredDataTree]
+# Delta name -> counts
+Manifest = Dict[str, DeltaCounts]
+
+_MANIFEST_FILE = ".manifest"
+
+
+def delta_name(previous_timestamp: Optional[str], timestamp: str) -> str:
+    return "%s_%s" % (previous_timestamp, timestamp)
+
+
+def is_manifest_file(filename: str) -> bool:
+    return filename == _MANIFEST_FILE
+
+
+def _host_dir(host_name: HostName) -> Path:
+    return Path(cmk.utils.paths.inventory_delta_cache_dir, host_name)
+
+
+def load_manifest(host_name: HostName) -> Manifest:
+    try:
+        manifest = store.load_object_from_file(_host_dir(host_name) / _MANIFEST_FILE, default={})
+    except MKGeneralException:
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def load_delta(host_name: HostName, name: str) -> Optional[Delta]:
+    """The delta listed in the manifest, None in case it is not available"""
+    try:
+        data = store.load_object_from_file(_host_dir(host_name) / name)
+    except MKGeneralException:
+        return None
+
+    try:
+        new, changed, removed, raw_delta_tree = data
+    except (TypeError, ValueError):
+        return None
+    return new, changed, removed, StructuredDataTree().create_tree_from_raw_tree(raw_delta_tree)
+
+
+def save_delta(host_name: HostName, name: str, delta: Delta) -> None:
+    new, changed, removed, delta_tree = delta
+    host_dir = _host_dir(host_name)
+    store.makedirs(host_dir)
+    store.save_object_to_file(host_dir / name, (new, changed, removed, delta_tree.get_raw_tree()))
+
+    manifest_file = host_dir / _MANIFEST_FILE
+    with store.locked(manifest_file):
+        # Forget about the deltas removed by the housekeeping of the GUI
+        manifest = {
+            other_name: counts
+            for other_name, counts in load_manifest(host_name).items()
+            if os.path.exists(str(host_dir / other_name))
+        }
+        manifest[name] = (new, changed, removed)
+        store.save_object_to_file(manifest_file, manifest)
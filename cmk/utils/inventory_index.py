@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Site wide index of the attributes of the HW/SW inventory trees
+
+Views showing a few inventory attributes of many hosts, e.g. the OS version, would have to
+load the complete inventory tree of each host. The index has one table per path of an
+attributes node (e.g. "software.os") mapping the host names to the attributes of this node.
+The tables are updated together with the inventory trees of the hosts.
+
+The inventory trees stay the authoritative source. The index remembers the stamp of the
+inventory file it has been computed from. Readers compare it with the current file and have
+to load the inventory tree in case they differ, e.g. when the file has been restored or
+written by another program.
+
+Writers update the tables before the stamps and readers load them in the reverse order. A
+reader may see outdated stamps, but never a current stamp together with an outdated table.
+"""
+
+import marshal
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.type_defs import HostName
+
+# Inode, size and modification time of an inventory file
+FileStamp = Tuple[int, int, int]
+RawTree = Dict[str, Any]
+AttributesTable = Dict[HostName, Dict[str, Any]]
+# Table name -> attributes of a single host
+HostAttributes = Dict[str, Dict[str, Any]]
+# Host name -> (stamp of the indexed inventory file, names of the tables containing the host)
+HostStamps = Dict[HostName, Tuple[FileStamp, List[str]]]
+
+_STAMPS_FILE = ".stamps"
+
+
+def table_name(path: Iterable[str]) -> str:
+    """The name of the table holding the attributes of the node with the given path"""
+    return ".".join(path)
+
+
+def is_indexable_path(path: List[Any]) -> bool:
+    """Attributes below numerations and edges not usable as file name are not indexed"""
+    return bool(path) and all(
+        isinstance(edge, str) and edge and "." not in edge and "/" not in edge for edge in path)
+
+
+def get_attributes_tables(raw_tree: RawTree) -> HostAttributes:
+    """The attributes of all indexable nodes of a raw inventory tree, keyed by table name"""
+    tables: HostAttributes = {}
+    _collect_attributes(raw_tree, [], tables)
+    return tables
+
+
+def _collect_attributes(raw_node: RawTree, path: List[str], tables: HostAttributes) -> None:
+    # Sync this with StructuredDataTree._create_hierarchy_from_data()
+    attributes = {}
+    for key, value in raw_node.items():
+        if isinstance(value, dict):
+            if value and is_indexable_path([key]):
+                _collect_attributes(value, path + [key], tables)
+        elif not isinstance(value, list):
+            attributes[key] = value
+
+    if path and attributes:
+        tables[table_name(path)] = attributes
+
+
+def file_stamp(path: str) -> Optional[FileStamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _inventory_file(host_name: HostName) -> str:
+    return "%s/%s" % (cmk.utils.paths.inventory_output_dir, host_name)
+
+
+def _index_file(name: str) -> Path:
+    return Path(cmk.utils.paths.inventory_index_dir, name)
+
+
+def _load(path: Path) -> Dict:
+    try:
+        data = marshal.loads(store.load_bytes_from_file(path, default=marshal.dumps({})))
+    except (EOFError, ValueError, TypeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_stamps() -> HostStamps:
+    return _load(_index_file(_STAMPS_FILE))
+
+
+def load_table(name: str) -> AttributesTable:
+    return _load(_index_file(name))
+
+
+def update_host(host_name: HostName, raw_tree: RawTree) -> None:
+    """Index the current inventory tree of the host, which has already been saved"""
+    _update_host(host_name, get_attributes_tables(raw_tree), file_stamp(_inventory_file(host_name)))
+
+
+def remove_host(host_name: HostName) -> None:
+    _update_host(host_name, {}, None)
+
+
+def _update_host(host_name: HostName, tables: HostAttributes, stamp: Optional[FileStamp]) -> None:
+    stamps_file = _index_file(_STAMPS_FILE)
+    with store.locked(stamps_file):
+        stamps = load_stamps()
+        indexed = stamps.get(host_name)
+        if stamp is not None and indexed is not None and tuple(indexed[0]) == stamp:
+            return  # The inventory file has already been indexed
+        if stamp is None and indexed is None:
+            return
+
+        for name in set(indexed[1] if indexed else []).union(tables):
+            table = load_table(name)
+            attributes = tables.get(name)
+            if table.get(host_name) == attributes:
+                continue
+
+            if attributes is None:
+                del table[host_name]
+            else:
+                table[host_name] = attributes
+            store.save_bytes_to_file(_index_file(name), marshal.dumps(table))
+
+        if stamp is None:
+            stamps.pop(host_name, None)
+        else:
+            stamps[host_name] = (stamp, sorted(tables))
+        store.save_bytes_to_file(stamps_file, marshal.dumps(stamps))
+
+
+class InventoryIndex:
+    """Answers the attributes of the given tables for many hosts"""
+    def __init__(self, table_names: Iterable[str]) -> None:
+        super().__init__()
+        self._stamps = load_stamps()
+        self._tables = {name: load_table(name) for name in table_names}
+
+    def get_raw_tree(self, host_name: HostName) -> Optional[RawTree]:
+        """The part of the raw inventory tree of the host made of the indexed tables
+
+        None is returned in case the index does not reflect the current inventory file of the
+        host. The caller has to load the inventory tree in this case."""
+        stamp = file_stamp(_inventory_file(host_name))
+        if stamp is None:
+            return {}  # Nothing inventorized yet
+
+        indexed = self._stamps.get(host_name)
+        if indexed is None or tuple(indexed[0]) != stamp:
+            return None
+
+        raw_tree: RawTree = {}
+        for name, table in self._tables.items():
+            attributes = table.get(host_name)
+            if attributes is None:
+                continue
+
+            raw_node = raw_tree
+            for edge in name.split("."):
+                raw_node = raw_node.setdefault(edge, {})
+            raw_node.update(attributes)
+        return raw_tree
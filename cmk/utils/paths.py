@@ -63,9 +63,13 @@ nagios_binary = _omd_path("bin/nagios")
 apache_config_dir = _omd_path("etc/apache")
 htpasswd_file = _omd_path("etc/htpasswd")
 livestatus_unix_socket = _omd_path("tmp/run/live")
+check_helper_pool_socket = _omd_path("tmp/run/check-helper-pool")
+check_helper_pool_pid_file = _omd_path("tmp/run/check-helper-pool.pid")
 livebackendsdir = _omd_path("share/check_mk/livestatus")
 inventory_output_dir = _omd_path("var/check_mk/inventory")
 inventory_archive_dir = _omd_path("var/check_mk/inventory_archive")
+inventory_index_dir = _omd_path("var/check_mk/inventory_index")
+inventory_delta_cache_dir = _omd_path("var/check_mk/inventory_delta_cache")
 status_data_dir = _omd_path("tmp/check_mk/status_data")
 base_discovered_host_labels_dir = Path(_omd_path("var/check_mk/discovered_host_labels"))
 discovered_host_labels_dir = base_discovered_host_labels_dir
@@ -10,9 +10,13 @@ structured monitoring data of Check_MK.
 
 import io
 import gzip
+import marshal
+import os
 import re
 import pprint
-from typing import AnyStr, Dict, List, Optional
+import struct
+from contextlib import suppress
+from typing import Any, AnyStr, Dict, List, Optional, Sequence, Tuple
 
 from six import ensure_str
 
@@ -109,18 +113,31 @@ class StructuredDataTree:
     def save_to(self, path, filename, pretty=False):
         filepath = "%s/%s" % (path, filename)
         output = self.get_raw_tree()
-        store.save_object_to_file(filepath, output, pretty=pretty)
+        serialized = repr(output) + "\n"
+        if pretty:
+            store.save_object_to_file(filepath, output, pretty=pretty)
+        else:
+            store.save_text_to_file(filepath, serialized)
 
         buf = io.BytesIO()
         with gzip.GzipFile(fileobj=buf, mode="wb") as f:
-            f.write((repr(output) + "\n").encode("utf-8"))
+            f.write(serialized.encode("utf-8"))
         store.save_bytes_to_file(filepath + ".gz", buf.getvalue())
 
+        _save_binary_tree(filepath, output)
+
         # Inform Livestatus about the latest inventory update
         store.save_text_to_file("%s/.last" % path, u"")
 
-    def load_from(self, filepath):
-        raw_tree = store.load_object_from_file(filepath)
+    def load_from(self, filepath, tree_path=None):
+        """Load the tree or only the subtree below tree_path (a list of edges)
+
+        The binary file is used as long as it belongs to the current literal file."""
+        raw_tree = _load_binary_tree(filepath, tree_path)
+        if raw_tree is None:
+            raw_tree = store.load_object_from_file(filepath)
+            if raw_tree and tree_path:
+                raw_tree = _get_raw_subtree(raw_tree, tree_path)
         return self.create_tree_from_raw_tree(raw_tree)
 
     def create_tree_from_raw_tree(self, raw_tree):
@@ -956,6 +973,147 @@ class Node:
         return new_node
 
 
+#.
+#   .--Binary file---------------------------------------------------------.
+#   |                    ____  _                                           |
+#   |                   | __ )(_)_ __   __ _ _ __ _   _                    |
+#   |                   |  _ \| | '_ \ / _` | '__| | | |                   |
+#   |                   | |_) | | | | | (_| | |  | |_| |                   |
+#   |                   |____/|_|_| |_|\__,_|_|   \__, |                   |
+#   |                                             |___/                    |
+#   +----------------------------------------------------------------------+
+#   | Compact companion of the literal tree files: Loading it is much      |
+#   | faster than evaluating the literal and it allows to load only the    |
+#   | subtree below a path.                                                |
+#   '----------------------------------------------------------------------'
+
+# The literal file stays the authoritative source. It is still needed by Livestatus and may be
+# written by other programs, e.g. when replicating the inventory from remote sites. The binary
+# file records the stamp (inode, size, mtime) of the literal file it has been written for and is
+# only used while the literal file is unchanged.
+#
+# Layout: magic, length of the header (4 bytes), header, chunks. The header is the marshaled
+# tuple (stamp, table of contents). The table of contents lists (path, offset, length) of the
+# chunks in depth first order, so the chunks of a subtree are stored consecutively. Each dict
+# node has a chunk with its scalar values, each list (numeration) a chunk of its own. All chunks
+# are marshaled.
+_BINARY_MAGIC = b"CMKSDT1\n"
+_BINARY_HEADER_LENGTH = struct.Struct("!I")
+
+BinaryTableOfContents = List[Tuple[Tuple, int, int]]
+
+
+def _binary_filepath(filepath: str) -> str:
+    return filepath + ".bin"
+
+
+def _literal_file_stamp(filepath: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _save_binary_tree(filepath: str, raw_tree: Dict) -> None:
+    stamp = _literal_file_stamp(filepath)
+    try:
+        if stamp is None:
+            raise ValueError("The literal file is missing")
+        toc: BinaryTableOfContents = []
+        chunks: List[bytes] = []
+        _add_binary_chunks(raw_tree, (), toc, chunks, 0)
+        header = marshal.dumps((stamp, toc))
+    except ValueError:
+        # Values not supported by marshal. Only use the literal file.
+        with suppress(OSError):
+            os.remove(_binary_filepath(filepath))
+        return
+
+    store.save_bytes_to_file(
+        _binary_filepath(filepath),
+        b"".join([_BINARY_MAGIC, _BINARY_HEADER_LENGTH.pack(len(header)), header] + chunks))
+
+
+def _add_binary_chunks(raw_node: Dict, path: Tuple, toc: BinaryTableOfContents, chunks: List[bytes],
+                       offset: int) -> int:
+    node_chunk = marshal.dumps(
+        {k: v for k, v in raw_node.items() if not isinstance(v, (dict, list))})
+    toc.append((path, offset, len(node_chunk)))
+    chunks.append(node_chunk)
+    offset += len(node_chunk)
+
+    for edge, value in raw_node.items():
+        if isinstance(value, dict):
+            offset = _add_binary_chunks(value, path + (edge,), toc, chunks, offset)
+        elif isinstance(value, list):
+            list_chunk = marshal.dumps(value)
+            toc.append((path + (edge,), offset, len(list_chunk)))
+            chunks.append(list_chunk)
+            offset += len(list_chunk)
+    return offset
+
+
+def _load_binary_tree(filepath: str, tree_path: Optional[Sequence]) -> Optional[Dict]:
+    """Returns None in case the binary file can not be used"""
+    try:
+        with open(_binary_filepath(filepath), "rb") as f:
+            if f.read(len(_BINARY_MAGIC)) != _BINARY_MAGIC:
+                return None
+            header_length, = _BINARY_HEADER_LENGTH.unpack(f.read(_BINARY_HEADER_LENGTH.size))
+            stamp, toc = marshal.loads(f.read(header_length))
+            if tuple(stamp) != _literal_file_stamp(filepath):
+                return None
+
+            chunks_offset = f.tell()
+            path = tuple(tree_path or ())
+            raw_tree: Dict = {}
+            for chunk_path, offset, length in toc:
+                # The subtree below the path and the chunks on the way to it
+                if chunk_path[:len(path)] != path and path[:len(chunk_path)] != chunk_path:
+                    continue
+                f.seek(chunks_offset + offset)
+                _insert_binary_chunk(raw_tree, chunk_path, marshal.loads(f.read(length)))
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+    return _get_raw_subtree(raw_tree, path) if path else raw_tree
+
+
+def _insert_binary_chunk(raw_tree: Dict, path: Tuple, value: Any) -> None:
+    if not path:
+        raw_tree.update(value)
+        return
+
+    raw_node = raw_tree
+    for edge in path[:-1]:
+        raw_node = raw_node.setdefault(edge, {})
+
+    if isinstance(value, dict):
+        raw_node.setdefault(path[-1], {}).update(value)
+    else:
+        raw_node[path[-1]] = value
+
+
+def _get_raw_subtree(raw_tree: Dict, tree_path: Sequence) -> Dict:
+    """The raw tree reduced to the subtree below the path
+
+    Paths into numerations result in the whole numeration."""
+    raw_node: Any = raw_tree
+    found_path = []
+    for edge in tree_path:
+        if not isinstance(raw_node, dict):
+            break
+        if edge not in raw_node:
+            return {}
+        raw_node = raw_node[edge]
+        found_path.append(edge)
+
+    for edge in reversed(found_path):
+        raw_node = {edge: raw_node}
+    return raw_node
+
+
 #.
 #   .--helpers-------------------------------------------------------------.
 #   |                  _          _                                        |
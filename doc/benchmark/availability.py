@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2020 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Compares memory and time of the availability computation with and without timelines
+
+The statehist rows are generated. Run it as site user, to have a working GUI environment.
+
+Usage: python3 doc/benchmark/availability.py [NUM_SERVICES] [SPANS_PER_SERVICE]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import cmk.gui.availability as availability
+
+COLUMNS = [
+    "site",
+    "host_name",
+    "service_description",
+    "duration",
+    "from",
+    "until",
+    "state",
+    "host_down",
+    "in_downtime",
+    "in_host_downtime",
+    "in_notification_period",
+    "in_service_period",
+    "is_flapping",
+]
+
+
+def create_rows(num_services, spans_per_service):
+    rows = []
+    # statehist returns the spans of all objects in the order of time
+    for span_idx in range(spans_per_service):
+        for service_idx in range(num_services):
+            rows.append([
+                "site%d" % (service_idx % 3),
+                "host%05d" % (service_idx // 20),
+                "Service %d" % (service_idx % 20),
+                3600,
+                span_idx * 3600,
+                (span_idx + 1) * 3600,
+                (span_idx + service_idx) % 4,
+                0,
+                int(span_idx % 50 == 0),
+                0,
+                1,
+                1,
+                0,
+            ])
+    return rows
+
+
+def measure(title, function):
+    tracemalloc.start()
+    start = time.time()
+    av_data = function()
+    duration = time.time() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%s: %.3fs, peak memory %.1f MB (%d objects)" %
+          (title, duration, peak / 1024.0 / 1024.0, len(av_data)))
+
+
+def main(num_services, spans_per_service):
+    avoptions = availability.get_default_avoptions()
+    avoptions["range"] = ((0, spans_per_service * 3600), "")
+
+    def with_timelines():
+        rows = create_rows(num_services, spans_per_service)
+        spans = [dict(zip(COLUMNS, row)) for row in rows]
+        return availability.compute_availability("service", availability.spans_by_object(spans),
+                                                 avoptions)
+
+    def without_timelines():
+        rows = create_rows(num_services, spans_per_service)
+        spans = availability._iter_availability_spans(COLUMNS, rows, {}, avoptions)
+        return availability.compute_availability_of_spans("service", spans, avoptions)[1]
+
+    measure("With timelines", with_timelines)
+    measure("Without timelines", without_timelines)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+    )
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2020 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Measures the BI compilation of the sample configuration on a synthetic structure
+
+Usage: PYTHONPATH=. python3 doc/benchmark/bi_compile.py [NUM_HOSTS]
+"""
+
+import sys
+import time
+
+from cmk.utils.bi.bi_lib import BIHostData, BIServiceData
+from cmk.utils.bi.bi_packs import BIAggregationPacks
+from cmk.utils.bi.bi_sample_configs import bi_sample_config
+from cmk.utils.bi.bi_searcher import BISearcher
+
+SERVICES = [
+    "Check_MK",
+    "Check_MK Discovery",
+    "CPU load",
+    "CPU utilization",
+    "Memory",
+    "Uptime",
+    "Filesystem /",
+    "Filesystem /var",
+    "Filesystem /opt",
+    "Mount options of /",
+    "Disk IO SUMMARY",
+    "ORACLE Instance",
+    "proc httpd",
+    "NTP Time",
+    "TCP Connections",
+] + ["Interface %d" % idx for idx in range(1, 17)]
+
+
+def create_hosts(num_hosts):
+    hosts = {}
+    for idx in range(num_hosts):
+        host_name = "host%05d" % idx
+        hosts[host_name] = BIHostData(
+            "site%02d" % (idx % 40),
+            {"cmk-agent", "tcp", "prod" if idx % 3 else "test", "lan"},
+            {
+                "cmk/os_family": "linux" if idx % 4 else "windows",
+                "location": "dc%d" % (idx % 5),
+            },
+            "folder%d" % (idx % 50),
+            {x: BIServiceData(set(), {}) for x in SERVICES},
+            (),
+            ("router%02d" % (idx % 40),),
+            "Alias of %s" % host_name,
+            host_name,
+        )
+    return hosts
+
+
+def main(num_hosts):
+    bi_packs = BIAggregationPacks("")
+    bi_packs.load_config_from_schema(bi_sample_config)
+    hosts = create_hosts(num_hosts)
+    bi_searcher = BISearcher()
+
+    start = time.time()
+    bi_searcher.set_hosts(hosts)
+    print("Setting up %d hosts: %.3fs" % (num_hosts, time.time() - start))
+
+    total_start = time.time()
+    for aggregation in bi_packs.get_all_aggregations():
+        # The sample aggregation is disabled by default
+        aggregation.computation_options.disabled = False
+        start = time.time()
+        compiled_aggregation = aggregation.compile(bi_searcher)
+        print("Compiling %s: %.3fs (%d branches)" %
+              (aggregation.id, time.time() - start, len(compiled_aggregation.branches)))
+    print("Compiling all aggregations: %.3fs" % (time.time() - total_start))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
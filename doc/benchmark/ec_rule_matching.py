@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Measures the syslog message throughput of the Event Console on a synthetic rule set
+
+The rules are spread over several rule packs, most of them match a specific message text.
+Matching messages are dropped, so only the rule matching is measured, not the handling of
+the created events. The last measurement uses event processing workers, the time needed to
+start them is not included.
+
+Usage: PYTHONPATH=. python3 doc/benchmark/ec_rule_matching.py [NUM_RULES] [NUM_LINES] [NUM_WORKERS]
+"""
+
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+
+import cmk.ec.export as ec
+import cmk.ec.history
+import cmk.ec.main
+
+NUM_PACKS = 30
+APPLICATIONS = ["sshd", "kernel", "smartd", "CRON", "postfix/smtpd"]
+
+
+def create_rule_packs(num_rules):
+    rules_per_pack = num_rules // NUM_PACKS
+    rule_packs = []
+    for pack_idx in range(NUM_PACKS):
+        rules = []
+        for idx in range(pack_idx * rules_per_pack, (pack_idx + 1) * rules_per_pack):
+            rule = {"id": "rule%d" % idx, "state": 1, "drop": True}
+            kind = idx % 10
+            if kind < 5:
+                rule["match"] = "error %d occurred" % idx
+            elif kind < 8:
+                rule["match"] = "^component%d: (failed|timed out) after ([0-9]+)s" % idx
+                rule["match_application"] = APPLICATIONS[idx % len(APPLICATIONS)]
+            elif kind == 8:
+                rule["match"] = "Link (up|down) on port%d" % idx
+                rule["match_host"] = "switch%d" % (idx % 50)
+            else:
+                rule["match"] = "^[0-9]+ .* %d$" % idx
+            rules.append(rule)
+        rule_packs.append({"id": "pack%d" % pack_idx, "disabled": False, "rules": rules})
+    return rule_packs
+
+
+def create_lines(num_lines, num_rules):
+    lines = []
+    for idx in range(num_lines):
+        rule_idx = idx * 7 % (num_rules * 2)  # Every second message matches no rule
+        application = APPLICATIONS[rule_idx % len(APPLICATIONS)]
+        kind = rule_idx % 10
+        if kind < 5:
+            text = "Error %d occurred" % rule_idx
+        elif kind < 8:
+            text = "component%d: failed after 30s" % rule_idx
+        elif kind == 8:
+            text = "Link down on port%d" % rule_idx
+        else:
+            text = "42 some message %d" % rule_idx
+        lines.append("<%d>May 26 13:45:01 switch%d %s[1234]: %s" %
+                     (8 * (idx % 24) + idx % 8, rule_idx % 50, application, text))
+    return lines
+
+
+def create_event_server(omd_root):
+    settings = ec.settings("benchmark", omd_root, omd_root / "etc", ["mkeventd"])
+    config = ec.default_config()
+    logger = logging.getLogger("cmk.mkeventd")
+    history = cmk.ec.history.History(settings, config, logger,
+                                     cmk.ec.main.StatusTableEvents.columns,
+                                     cmk.ec.main.StatusTableHistory.columns)
+    perfcounters = cmk.ec.main.Perfcounters(logger)
+    event_status = cmk.ec.main.EventStatus(settings, config, perfcounters, history, logger)
+    return cmk.ec.main.EventServer(logger, settings, config,
+                                   cmk.ec.main.default_slave_status_master(), perfcounters,
+                                   cmk.ec.main.ECLock(logger), history, event_status,
+                                   cmk.ec.main.StatusTableEvents.columns, False)
+
+
+def measure(title, event_server, lines):
+    start = time.time()
+    for line in lines:
+        event_server.process_line(line, ("127.0.0.1", 514))
+    duration = time.time() - start
+    print("%-40s %8.3fs %10.1f lines/s" % (title, duration, len(lines) / duration))
+
+
+def measure_pipeline(title, event_server, lines):
+    # pylint: disable=protected-access
+    event_server._update_pipeline()
+    event_server.process_raw_lines(lines[0].encode("utf-8"), ("127.0.0.1", 514))
+    event_server._stop_pipeline()  # Wait for the workers to compile the rules
+    event_server._update_pipeline()
+
+    start = time.time()
+    for line in lines:
+        event_server.process_raw_lines(line.encode("utf-8"), ("127.0.0.1", 514))
+        event_server._pipeline.flush(wait_for_workers=True)
+        event_server.process_pipeline_results()
+    event_server._stop_pipeline()
+    duration = time.time() - start
+    print("%-40s %8.3fs %10.1f lines/s" % (title, duration, len(lines) / duration))
+
+
+def main(num_rules, num_lines, num_workers):
+    # pylint: disable=protected-access
+    logging.getLogger("cmk.mkeventd").setLevel(logging.WARNING)
+    rule_packs = create_rule_packs(num_rules)
+    lines = create_lines(num_lines, num_rules)
+    print("%d rules in %d rule packs, %d lines" % (num_rules, NUM_PACKS, num_lines))
+
+    with tempfile.TemporaryDirectory() as omd_root:
+        event_server = create_event_server(pathlib.Path(omd_root))
+        event_server._config["rule_packs"] = rule_packs
+        event_server.compile_rules([], rule_packs)
+        prefilter = event_server._rule_prefilter
+
+        event_server._rule_prefilter = None
+        measure("Facility/priority hash", event_server, lines)
+
+        event_server._rule_prefilter = prefilter
+        measure("Facility/priority hash and prefilter", event_server, lines)
+
+        event_server._config["event_processing_workers"] = num_workers
+        measure_pipeline("%d event processing workers" % num_workers, event_server, lines)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 4,
+    )
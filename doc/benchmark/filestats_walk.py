@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Measures the directory traversal of the mk_filestats agent plugin
+
+A spool directory with many subdirectories of files is counted as by a section with
+"output: count_only", once for all files and once filtered by a regular expression
+selecting one subdirectory. For comparison, the files are also found by recursive
+globbing with a stat call per entry.
+
+Usage: PYTHONPATH=. python3 doc/benchmark/filestats_walk.py [NUM_DIRS] [FILES_PER_DIR]
+"""
+
+import glob
+import importlib.machinery
+import os
+import stat
+import sys
+import tempfile
+import time
+
+mk_filestats = importlib.machinery.SourceFileLoader(  # pylint: disable=no-value-for-parameter,deprecated-method
+    "mk_filestats", "agents/plugins/mk_filestats.py").load_module()  # type: ignore[call-arg]
+
+
+def create_tree(directory, num_dirs, files_per_dir):
+    for dir_idx in range(num_dirs):
+        dir_path = os.path.join(directory, "queue%d" % dir_idx)
+        os.mkdir(dir_path)
+        for file_idx in range(files_per_dir):
+            open(os.path.join(dir_path, "msg%d.dat" % file_idx), "w").close()
+
+
+def glob_with_stat(pattern):
+    """Files found by globbing recursively, stat-ing every entry"""
+    for item in glob.iglob(pattern):
+        mode = os.stat(item).st_mode
+        if stat.S_ISREG(mode):
+            yield item
+        elif stat.S_ISDIR(mode):
+            for path in glob_with_stat(os.path.join(item, '*')):
+                yield path
+
+
+def count_only(config):
+    filters = mk_filestats.get_file_filters(config)
+    files_iter = mk_filestats.get_file_iterator(config, filters)
+    filtered_files = mk_filestats.iter_filtered_files(filters, files_iter)
+    return list(mk_filestats.output_aggregator_count_only("bench", filtered_files))[1]
+
+
+def measure(title, function):
+    start = time.time()
+    result = function()
+    print("%-45s %8.3fs  %s" % (title, time.time() - start, result))
+
+
+def main(num_dirs, files_per_dir):
+    with tempfile.TemporaryDirectory() as directory:
+        create_tree(directory, num_dirs, files_per_dir)
+        print("%d directories, %d files" % (num_dirs, num_dirs * files_per_dir))
+
+        measure("Globbing with a stat call per entry",
+                lambda: sum(1 for _path in glob_with_stat(directory)))
+        measure("PatternIterator, all files", lambda: count_only({"input_patterns": directory}))
+        measure(
+            "PatternIterator, regex for one directory", lambda: count_only({
+                "input_patterns": directory,
+                "filter_regex": os.path.join(directory, "queue0", r".*\.dat"),
+            }))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+    )
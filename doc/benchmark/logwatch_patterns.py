@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Measures the pattern matching and logfile processing of the mk_logwatch agent plugin
+
+The synthetic logfiles mostly contain lines matching none of the patterns, as usual for
+application logs. The logfiles are processed one after another and by worker processes.
+
+Usage: PYTHONPATH=. python3 doc/benchmark/logwatch_patterns.py [NUM_PATTERNS] [NUM_LINES] [NUM_FILES] [PROCESSES]
+"""
+
+import importlib.machinery
+import os
+import re
+import sys
+import tempfile
+import time
+
+mk_logwatch = importlib.machinery.SourceFileLoader(  # pylint: disable=no-value-for-parameter,deprecated-method
+    "mk_logwatch", "agents/plugins/mk_logwatch.py").load_module()  # type: ignore[call-arg]
+
+
+def create_patterns(num_patterns):
+    patterns = []
+    for idx in range(num_patterns):
+        kind = idx % 4
+        if kind == 0:
+            raw_pattern = "ORA-%05d" % idx
+        elif kind == 1:
+            raw_pattern = "Exception in thread .* component%d" % idx
+        elif kind == 2:
+            raw_pattern = "(failed|refused) connection to backend%d" % idx
+        else:
+            raw_pattern = "^.*job%d (aborted|timed out)" % idx
+        patterns.append(("CW"[idx % 2], raw_pattern, [], []))
+    return patterns
+
+
+def create_lines(num_lines, num_patterns):
+    lines = []
+    for idx in range(num_lines):
+        if idx % 50 == 0:
+            text = "ORA-%05d: end-of-file on communication channel" % (idx % num_patterns // 4 * 4)
+        elif idx % 50 == 25:
+            text = "batch job%d timed out" % (idx % num_patterns // 4 * 4 + 3)
+        else:
+            text = "INFO [worker-%d] request %d processed in %dms" % (idx % 8, idx, idx % 300)
+        lines.append("2021-05-26 13:45:01,%03d %s" % (idx % 1000, text))
+    return lines
+
+
+def sequential_match(compiled_patterns, text):
+    """The first matching pattern as found before the patterns were combined"""
+    for compiled_pattern in compiled_patterns:
+        matches = compiled_pattern[1].search(text)
+        if matches:
+            return compiled_pattern, matches
+    return None
+
+
+def measure(title, function, num_lines):
+    start = time.time()
+    function()
+    duration = time.time() - start
+    print("%-40s %8.3fs %10.1f lines/s" % (title, duration, num_lines / duration))
+
+
+def process_files(sections, state, processes):
+    for _section, process in mk_logwatch.process_logfiles(sections, state, False, processes):
+        process()
+
+
+def main(num_patterns, num_lines, num_files, processes):
+    patterns = create_patterns(num_patterns)
+    lines = create_lines(num_lines, num_patterns)
+    print("%d patterns, %d lines, %d files" % (num_patterns, num_lines, num_files))
+
+    compiled_patterns = [(level, re.compile(raw_pattern, re.UNICODE), cont, rewrite)
+                         for level, raw_pattern, cont, rewrite in patterns]
+    matcher = mk_logwatch.PatternMatcher(compiled_patterns)
+    measure("Patterns searched one after another",
+            lambda: [sequential_match(compiled_patterns, line) for line in lines], num_lines)
+    measure("Combined literal prefilter", lambda: [matcher.match(line) for line in lines],
+            num_lines)
+
+    with tempfile.TemporaryDirectory() as directory:
+        sections = []
+        for idx in range(num_files):
+            path = os.path.join(directory, "app%d.log" % idx)
+            with open(path, "w") as logfile:
+                logfile.write("\n".join(lines) + "\n")
+            section = mk_logwatch.LogfileSection((path, path))
+            section.patterns = patterns
+            sections.append(section)
+
+        for title, num_processes in [
+            ("%d files one after another" % num_files, 1),
+            ("%d files in %d processes" % (num_files, processes), processes),
+        ]:
+            state = mk_logwatch.State("void")
+            for section in sections:
+                state.get(section.name_fs)["offset"] = 0
+            measure(title, lambda: process_files(sections, state, num_processes),
+                    num_lines * num_files)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+        int(sys.argv[4]) if len(sys.argv) > 4 else 4,
+    )
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Measures the throughput of the rule based notifications on a synthetic rule set
+
+The events are analysed only, no notification is sent. Livestatus is replaced by a fake
+answering the contact group queries after the given latency, which should be in the range
+of a real livestatus query of the site.
+
+Usage: PYTHONPATH=. python3 doc/benchmark/notification_rules.py [NUM_RULES] [NUM_EVENTS]
+"""
+
+import logging
+import sys
+import time
+
+import livestatus
+
+import cmk.base.config as config
+import cmk.base.notify as notify
+
+LIVESTATUS_LATENCY = 0.0005
+NUM_GROUPS = 50
+
+
+class FakeConnection:
+    def _wait(self):
+        time.sleep(LIVESTATUS_LATENCY)
+
+    def query(self, query):
+        self._wait()
+        return [["group%d" % idx, ["user%d" % idx]] for idx in range(NUM_GROUPS)]
+
+    def query_column(self, query):
+        self._wait()
+        return [["user%d" % idx] for idx in range(query.count("Filter:"))]
+
+
+def create_rules(num_rules):
+    rules = []
+    for idx in range(num_rules):
+        rule = {
+            "description": "Rule %d" % idx,
+            "contact_groups": ["group%d" % (idx % NUM_GROUPS)],
+            "notify_plugin": ("sms", []),
+        }
+        kind = idx % 4
+        if kind == 0:
+            rule["match_hosts"] = ["host%05d" % x for x in range(idx, idx + 50)]
+        elif kind == 1:
+            rule["match_services"] = ["Interface %d$" % (idx % 16), "Filesystem /var"]
+            rule["match_service_event"] = ["?c", "?w", "?r"]
+        elif kind == 2:
+            rule["match_exclude_hosts"] = ["host%05d" % x for x in range(idx, idx + 20)]
+            rule["match_plugin_output"] = "CRIT"
+        else:
+            rule["match_hostlabels"] = {"os": "linux"}
+            rule["match_escalation"] = (1, 3)
+        rules.append(rule)
+    return rules
+
+
+def create_events(num_events):
+    return [{
+        "WHAT": "SERVICE",
+        "HOSTNAME": "host%05d" % (idx % 1000),
+        "SERVICEDESC": "Interface %d" % (idx % 16),
+        "SERVICEOUTPUT": "CRIT - link down",
+        "SERVICESTATE": "CRITICAL",
+        "PREVIOUSSERVICEHARDSTATE": "OK",
+        "SERVICENOTIFICATIONNUMBER": "1",
+        "NOTIFICATIONTYPE": "PROBLEM",
+        "HOSTLABEL_os": "linux",
+        "CONTACTS": "",
+    } for idx in range(num_events)]
+
+
+def legacy_rulebased(raw_context):
+    """The rule evaluation as done before the rules could be compiled"""
+    notifications: notify.Notifications = {}
+    rule_info: list = []
+    for rule in config.notification_rules + notify.user_notification_rules():
+        if notify.rbn_match_rule(rule, raw_context) is None:
+            notifications, rule_info = notify._create_notifications(  # pylint: disable=protected-access
+                raw_context, rule, notifications, rule_info)
+    return notifications
+
+
+def measure(title, function, events):
+    start = time.time()
+    for event in events:
+        function(event)
+    duration = time.time() - start
+    print("%-40s %8.3fs %10.1f events/s" % (title, duration, len(events) / duration))
+
+
+def main(num_rules, num_events):
+    logging.getLogger("cmk.base.notify").setLevel(logging.WARNING)
+    livestatus.LocalConnection = FakeConnection
+    config.notification_rules = create_rules(num_rules)
+    config.contacts = {"user%d" % idx: {"email": "user%d@localhost" % idx} for idx in range(100)}
+    events = create_events(num_events)
+    print("%d rules, %d events, livestatus latency %.1fms" %
+          (num_rules, num_events, LIVESTATUS_LATENCY * 1000))
+
+    measure("Without compiled rules", legacy_rulebased, events)
+
+    notify._compiled_rules = None  # pylint: disable=protected-access
+    measure("Rules compiled per event", lambda event: notify.notify_rulebased(event, analyse=True),
+            events)
+
+    notify._compiled_rules = notify.compile_notification_rules()  # pylint: disable=protected-access
+    measure("Rules compiled once (keepalive)",
+            lambda event: notify.notify_rulebased(event, analyse=True), events)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
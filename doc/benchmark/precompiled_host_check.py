@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Measures the startup of the precompiled host checks of the Nagios core
+
+Each precompiled host check is executed several times in a fresh interpreter and stopped as
+soon as it starts fetching the data of the host. This way only the startup (imports, loading
+of plugins and the configuration) is measured: No host is contacted and no result is sent
+to the core. The results are appended to a history file together with the Checkmk version
+to be able to compare them between releases.
+
+Has to be executed as site user after "cmk -U" has created the precompiled host checks.
+Choose hosts with different data sources (agent, SNMP, clusters) for representative results.
+
+Usage: python3 doc/benchmark/precompiled_host_check.py [-n RUNS] [--history FILE] HOST...
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import cmk.utils.paths
+import cmk.utils.version as cmk_version
+from cmk.utils.type_defs import LATEST_SERIAL
+
+from cmk.base.core_nagios import HostCheckStore
+
+# Executes the host check and reports the time when the first fetch starts. The additional
+# command line argument keeps the host check from handing over to the check helper pool.
+DRIVER = """
+import os
+import runpy
+import sys
+import time
+
+import cmk.base.sources as sources
+
+
+def fetch_all(*args, **kwargs):
+    sys.stdout.write("%f\\n" % time.time())
+    sys.stdout.flush()
+    os._exit(0)
+
+
+sources.fetch_all = fetch_all
+sys.argv = [sys.argv[1], "--benchmark"]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def measure_interpreter(runs: int) -> float:
+    durations = []
+    for _unused in range(runs):
+        start = time.time()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        durations.append(time.time() - start)
+    return statistics.median(durations)
+
+
+def measure_host_check(host_name: str, runs: int) -> Optional[float]:
+    path = str(HostCheckStore.host_check_file_path(LATEST_SERIAL, host_name))
+    durations = []
+    for _unused in range(runs):
+        start = time.time()
+        completed = subprocess.run([sys.executable, "-c", DRIVER, path],
+                                   stdout=subprocess.PIPE,
+                                   check=False)
+        try:
+            durations.append(float(completed.stdout.splitlines()[-1]) - start)
+        except (IndexError, ValueError):
+            sys.stderr.write("%s: Did not start fetching (exit code %d)\n" %
+                             (host_name, completed.returncode))
+            return None
+    return statistics.median(durations)
+
+
+def load_history(path: str) -> List[Dict]:
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def previous_result(history: List[Dict], host_name: str) -> Optional[Dict]:
+    """The latest result of the host measured with another Checkmk version"""
+    for entry in reversed(history):
+        if entry["host_name"] == host_name and entry["version"] != cmk_version.__version__:
+            return entry
+    return None
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Executions per host")
+    parser.add_argument("--history",
+                        default=os.path.join(cmk.utils.paths.var_dir,
+                                             "precompiled_host_check_benchmark.jsonl"),
+                        help="File to append the results to")
+    parser.add_argument("host_names", nargs="+", metavar="HOST")
+    options = parser.parse_args(args)
+
+    history = load_history(options.history)
+    interpreter = measure_interpreter(options.runs)
+    print("Checkmk %s, interpreter startup: %.3fs" % (cmk_version.__version__, interpreter))
+    print("%-30s %12s %12s" % ("Host", "First fetch", "Previous"))
+
+    results = []
+    for host_name in options.host_names:
+        first_fetch = measure_host_check(host_name, options.runs)
+        if first_fetch is None:
+            continue
+
+        previous = previous_result(history, host_name)
+        print("%-30s %11.3fs %12s" % (
+            host_name,
+            first_fetch,
+            "%.3fs (%s)" % (previous["first_fetch"], previous["version"]) if previous else "-",
+        ))
+        results.append({
+            "time": time.time(),
+            "version": cmk_version.__version__,
+            "host_name": host_name,
+            "interpreter": interpreter,
+            "first_fetch": first_fetch,
+        })
+
+    with open(options.history, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    return 0 if len(results) == len(options.host_names) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -82,6 +82,33 @@ TableEventConsoleStatus::TableEventConsoleStatus(MonitoringCore *mc)
     addColumn(ECRow::makeDoubleColumn("status_average_rule_hit_rate",
                                       "The average rule hit rate", offsets));
 
+    addColumn(ECRow::makeIntColumn(
+        "status_datagrams",
+        "The number of datagrams received by the builtin syslog server since startup of the Event Console",
+        offsets));
+    addColumn(ECRow::makeDoubleColumn("status_datagram_rate",
+                                      "The datagram rate", offsets));
+    addColumn(ECRow::makeDoubleColumn("status_average_datagram_rate",
+                                      "The average datagram rate", offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_datagram_reads",
+        "The number of times pending datagrams were read by the builtin syslog server since startup of the Event Console",
+        offsets));
+    addColumn(ECRow::makeDoubleColumn("status_datagram_read_rate",
+                                      "The datagram read rate", offsets));
+    addColumn(ECRow::makeDoubleColumn("status_average_datagram_read_rate",
+                                      "The average datagram read rate",
+                                      offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_datagram_drops",
+        "The number of datagrams dropped due to a full receive buffer of the builtin syslog server since startup of the Event Console",
+        offsets));
+    addColumn(ECRow::makeDoubleColumn("status_datagram_drop_rate",
+                                      "The datagram drop rate", offsets));
+    addColumn(ECRow::makeDoubleColumn("status_average_datagram_drop_rate",
+                                      "The average datagram drop rate",
+                                      offsets));
+
     addColumn(ECRow::makeDoubleColumn(
         "status_average_processing_time",
         "The average incoming message processing time", offsets));
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access,redefined-outer-name
+import collections
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import pytest  # type: ignore[import]
+from utils import import_module
+
+pytestmark = pytest.mark.skipif(sys.version_info[0] < 3, reason="stub server needs Python 3")
+
+CONTAINERS = {
+    "a" * 64: ("web", "running"),
+    "b" * 64: ("db", "running"),
+    "c" * 64: ("batch", "exited"),
+    "d" * 64: ("gone", "running"),  # removed between listing and inspecting
+}
+
+IMAGE_ID = "sha256:" + "f" * 64
+
+
+def _inspect(container_id):
+    name, status = CONTAINERS[container_id]
+    return {
+        "Id": container_id,
+        "Name": "/" + name,
+        "Image": IMAGE_ID,
+        "State": {
+            "Status": status,
+            "Running": status == "running"
+        },
+        "Config": {
+            "Labels": {
+                "app": name
+            }
+        },
+        "HostConfig": {},
+        "NetworkSettings": {
+            "IPAddress": "172.17.0.2"
+        },
+    }
+
+
+def _stats():
+    return {"memory_stats": {"usage": 42}, "cpu_stats": {"online_cpus": 1}, "blkio_stats": {}}
+
+
+class StubDockerAPI:
+    '''answers the requests of the docker library, counting requests and concurrent calls'''
+    def __init__(self):
+        self.requests = collections.Counter()
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._lock = threading.Lock()
+
+    def answer(self, url):
+        # e.g. "/v1.41/containers/json?limit=-1&all=1" becomes "/containers/json?all=1"
+        path, _sep, query = re.sub(r"^/v[0-9.]+", "", url).partition("?")
+        params = [p.replace("False", "0") for p in query.split("&")]
+        path = "?".join([path] + [p for p in params if p in ("all=1", "stream=0")])
+        with self._lock:
+            self.requests[path] += 1
+            self._concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self._concurrent)
+        try:
+            time.sleep(0.01)
+            return self._answer(path)
+        finally:
+            with self._lock:
+                self._concurrent -= 1
+
+    @staticmethod
+    def _answer(path):
+        if path == "/version":
+            return 200, {"ApiVersion": "1.41", "Version": "20.10.6"}
+        if path == "/info":
+            return 200, {"Name": "dockerhost"}
+        if path == "/containers/json?all=1":
+            return 200, [{"Id": container_id} for container_id in sorted(CONTAINERS)]
+        if path == "/images/json?all=1":
+            return 200, [{"Id": IMAGE_ID, "RepoTags": ["nginx:latest", "<none>:<none>"]}]
+        match = re.match(r"^/containers/(\w+)/(json|stats\?stream=0)$", path)
+        if match and CONTAINERS.get(match.group(1), ("gone",))[0] != "gone":
+            if match.group(2) == "json":
+                return 200, _inspect(match.group(1))
+            return 200, _stats()
+        return 404, {"message": "No such container"}
+
+
+@pytest.fixture
+def stub_api(tmp_path):
+    import http.server  # pylint: disable=import-outside-toplevel
+    import socketserver  # pylint: disable=import-outside-toplevel
+
+    api = StubDockerAPI()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def address_string(self):
+            return "stub"
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            code, answer = api.answer(self.path)
+            body = json.dumps(answer).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    socket_path = str(tmp_path / "docker.sock")
+    server = Server(socket_path, Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield api, "unix://" + socket_path
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(scope="module")
+def mk_docker(tmp_path_factory):
+    pytest.importorskip("docker")
+    # The plugin terminates on hosts without docker
+    bin_dir = tmp_path_factory.mktemp("bin")
+    fake_docker = bin_dir / "docker"
+    fake_docker.write_text(u"#!/bin/sh\n")
+    fake_docker.chmod(0o755)
+    path = os.environ["PATH"]
+    os.environ["PATH"] = "%s%s%s" % (bin_dir, os.pathsep, path)
+    try:
+        return import_module("mk_docker.py")
+    finally:
+        os.environ["PATH"] = path
+
+
+@pytest.fixture
+def config(mk_docker, stub_api, tmp_path):
+    cfg_file = tmp_path / "docker.cfg"
+    cfg_file.write_text(u"[DOCKER]\n"
+                        u"base_url: %s\n"
+                        u"container_id: name\n"
+                        u"skip_sections: docker_container_agent\n"
+                        u"max_workers: 2\n" % stub_api[1])
+    return mk_docker.get_config(str(cfg_file))
+
+
+def test_get_config_max_workers(mk_docker, config):
+    assert config["max_workers"] == 2
+    assert mk_docker.get_config("/no/such/file")["max_workers"] == 32
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_map_bounded(mk_docker, max_workers):
+    assert mk_docker.map_bounded(lambda x: x * 2, range(10), max_workers) == list(range(0, 20, 2))
+
+
+def test_client_snapshot(mk_docker, stub_api, config):
+    api, _base_url = stub_api
+    client = mk_docker.MKDockerClient(config)
+
+    assert sorted(client.all_containers) == ["batch", "db", "web"]
+    assert api.requests["/containers/json?all=1"] == 1
+    for container_id in CONTAINERS:
+        assert api.requests["/containers/%s/json" % container_id] == 1
+    assert client.image_tags(IMAGE_ID) == ["nginx:latest"]
+    assert client.image_tags(IMAGE_ID) == ["nginx:latest"]
+    assert api.requests["/images/json?all=1"] == 1
+    with pytest.raises(KeyError):
+        client.image_tags("sha256:unknown")
+
+
+def test_call_container_sections(mk_docker, stub_api, config, capsys, monkeypatch):
+    # docker.version is a module instead of a string in recent versions of the library
+    monkeypatch.setitem(mk_docker.Section.version_info, "DockerPyVersion", "stub")
+    api, _base_url = stub_api
+    client = mk_docker.MKDockerClient(config)
+    api.max_concurrent = 0
+
+    mk_docker.call_container_sections(client, config)
+
+    output = capsys.readouterr().out
+    assert "Plugin exception" not in output
+    for name in ("web", "db", "batch"):
+        assert output.count("<<<<%s>>>>" % name) == (7 if name != "batch" else 4)
+    assert output.count('"ImageTags": ["nginx:latest"]') == 3
+    assert api.requests["/images/json?all=1"] == 1
+    assert api.requests["/containers/%s/stats?stream=0" % ("a" * 64)] == 1
+    assert api.requests["/containers/%s/stats?stream=0" % ("b" * 64)] == 1
+    assert api.requests["/containers/%s/stats?stream=0" % ("c" * 64)] == 0
+    assert 1 <= api.max_concurrent <= config["max_workers"]
@@ -145,3 +145,78 @@ def test_output_aggregator_single_file_servicename(mk_filestats, lazyfile, group
 
     actual = mk_filestats.output_aggregator_single_file(group_name, [lazyfile])
     assert expected == list(actual)[0]
+
+
+@pytest.mark.parametrize("reg_pat,prefix", [
+    (r'/var/spool/app/.*\.dat', '/var/spool/app/'),
+    (r'^/var/log/', '/var/log/'),
+    (r'/tmp/foo\.d/bar', '/tmp/foo.d/bar'),
+    (r'/tmp/fo?o', '/tmp/f'),
+    (r'/tmp/fo+o', '/tmp/fo'),
+    (r'/tmp/\d+', '/tmp/'),
+    (r'/tmp/(a|b)', ''),
+    (r'(?i)/tmp/', ''),
+    (r'.*\.aix', ''),
+])
+def test_literal_prefix(mk_filestats, reg_pat, prefix):
+    assert mk_filestats.literal_prefix(reg_pat) == prefix
+
+
+@pytest.mark.parametrize("dir_path,result", [
+    ("/", True),
+    ("/var", True),
+    ("/var/spool/app", True),
+    ("/var/spool/app/incoming", True),
+    ("/var/spool/apple", False),
+    ("/usr", False),
+])
+def test_regex_filter_may_match_within(mk_filestats, dir_path, result):
+    assert mk_filestats.RegexFilter(r'/var/spool/app/.*\.dat').may_match_within(dir_path) is result
+    assert mk_filestats.InverseRegexFilter(r'/var/spool/app/.*').may_match_within(dir_path)
+
+
+@pytest.fixture
+def file_tree(tmpdir):
+    for path in ("a/1.dat", "a/2.tmp", "a/sub/3.dat", "a/.hidden", "b/4.dat", "5.dat"):
+        tmpdir.join(path).ensure()
+    tmpdir.join("a", "broken").mksymlinkto(tmpdir.join("a", "missing"))
+    return str(tmpdir)
+
+
+@pytest.mark.parametrize("pattern,expected", [
+    ("", ["a/1.dat", "a/2.tmp", "a/sub/3.dat", "a/broken", "b/4.dat", "5.dat"]),
+    ("a", ["a/1.dat", "a/2.tmp", "a/sub/3.dat", "a/broken"]),
+    ("*.dat", ["5.dat"]),
+    ("a/*.dat", ["a/1.dat"]),
+    ("*/*.dat", ["a/1.dat", "b/4.dat"]),
+    ("a/.*", ["a/.hidden"]),
+    ("[ab]", ["a/1.dat", "a/2.tmp", "a/sub/3.dat", "a/broken", "b/4.dat"]),
+])
+def test_pattern_iterator(mk_filestats, file_tree, pattern, expected):
+    iterator = mk_filestats.PatternIterator([os.path.join(file_tree, pattern)])
+    found = sorted(os.path.relpath(f.path, file_tree) for f in iterator)
+    assert found == sorted(expected)
+
+    statuses = dict((os.path.relpath(f.path, file_tree), f.stat_status) for f in iterator)
+    assert statuses.pop("a/broken", "file vanished") == "file vanished"
+    assert set(statuses.values()) <= set(["ok"])
+
+
+def test_pattern_iterator_prunes_directories(mk_filestats, file_tree, monkeypatch):
+    read_dirs = []
+    listdir, scandir = os.listdir, getattr(os, "scandir", None)
+    monkeypatch.setattr(os, "listdir", lambda p: read_dirs.append(p) or listdir(p))
+    if scandir is not None:
+        monkeypatch.setattr(os, "scandir", lambda p: read_dirs.append(p) or scandir(p))
+
+    filters = mk_filestats.get_file_filters(
+        {"filter_regex": os.path.join(file_tree, "a", r".*\.dat")})
+    iterator = mk_filestats.get_file_iterator({"input_patterns": file_tree}, filters)
+    found = list(mk_filestats.iter_filtered_files(filters, iterator))
+
+    assert sorted(os.path.relpath(f.path, file_tree) for f in found) == ["a/1.dat", "a/sub/3.dat"]
+    assert os.path.join(file_tree, "b") not in read_dirs
+    if hasattr(os, "scandir"):
+        # the files are filtered by their paths before their stat data is needed. Without
+        # os.scandir, the files are told from directories by stat calls.
+        assert not any(f._stat_done for f in found)
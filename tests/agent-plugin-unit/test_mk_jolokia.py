@@ -5,6 +5,14 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 # pylint: disable=protected-access,redefined-outer-name
+import json
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer  # type: ignore[import,no-redef]
+
 import pytest  # type: ignore[import]
 from utils import import_module
 
@@ -143,3 +151,108 @@ def test_jolokia_validate_response_skip_instance(mk_jolokia):
 ])
 def test_jolokia_validate_response_ok(mk_jolokia, data):
     assert data == mk_jolokia.validate_response(_MockHttpResponse(200, **data))
+
+
+class _JolokiaStub(object):  # pylint: disable=useless-object-inheritance
+    """Answers version, search and read requests like a Jolokia agent of a tomcat"""
+    def __init__(self, bulk_answer="ok"):
+        self.bulk_answer = bulk_answer
+        self.posts = []
+
+    @staticmethod
+    def _answer(request):
+        if request["type"] == "version":
+            return {"status": 200, "value": {"agent": "1.6.2", "info": {"product": "tomcat"}}}
+        if request["type"] == "search":
+            if request["mbean"] == "*:type=Manager,*":
+                value = ["Catalina:context=/app,host=localhost,type=Manager"]
+            else:
+                value = []
+            return {"status": 200, "value": value}
+        if "Manager" in request["mbean"]:
+            return {"status": 200, "value": {"activeSessions": 3, "maxActiveSessions": 10}}
+        if request["mbean"].startswith("java.lang:"):
+            return {"status": 200, "value": {request["mbean"]: {"Uptime": 42}}}
+        return {"status": 404, "error": "javax.management.InstanceNotFoundException"}
+
+    def answer(self, data):
+        self.posts.append(data)
+        if isinstance(data, list):
+            if self.bulk_answer == "http_error":
+                return 400, {"error": "bulk requests not supported"}
+            if self.bulk_answer == "not_json":
+                return 200, b"<html><body>Proxy error</body></html>"
+            return 200, [self._answer(request) for request in data]
+        return 200, self._answer(data)
+
+
+@pytest.fixture
+def jolokia_server():
+    servers = []
+
+    def start(stub):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                code, answer = stub.answer(data)
+                body = answer if isinstance(answer, bytes) else json.dumps(answer).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _query(mk_jolokia, port, capsys, bulk):
+    config = mk_jolokia.get_default_config_dict()
+    config.update({
+        "server": "127.0.0.1",
+        "port": port,
+        "instance": "tomcat",
+        "mode": None,
+        "bulk": bulk,
+        "custom_vars": [("java.lang:type=Runtime", "Uptime", "Uptime", [], False, "number")],
+    })
+    mk_jolokia.main([config])
+    return capsys.readouterr()[0]
+
+
+@pytest.mark.parametrize("bulk_answer", ["ok", "http_error", "not_json"])
+def test_jolokia_bulk_requests(mk_jolokia, jolokia_server, capsys, bulk_answer):
+    single_stub = _JolokiaStub()
+    single_output = _query(mk_jolokia, jolokia_server(single_stub), capsys, bulk=False)
+    assert all(isinstance(post, dict) for post in single_stub.posts)
+    assert "activeSessions" in single_output
+    assert "Uptime" in single_output
+
+    bulk_stub = _JolokiaStub(bulk_answer)
+    bulk_output = _query(mk_jolokia, jolokia_server(bulk_stub), capsys, bulk=True)
+    assert bulk_output == single_output
+
+    bulk_posts = [post for post in bulk_stub.posts if isinstance(post, list)]
+    if bulk_answer == "ok":
+        # version, the searches and the reads
+        assert len(bulk_stub.posts) == 3
+        assert len(bulk_posts) == 2
+        # identical searches of several vars are sent only once
+        distinct = set(json.dumps(post, sort_keys=True) for post in single_stub.posts[1:])
+        assert sum(len(post) for post in bulk_posts) == len(distinct)
+    else:
+        # the failed bulk requests and all requests one by one
+        assert len(bulk_stub.posts) == len(single_stub.posts) + len(bulk_posts)
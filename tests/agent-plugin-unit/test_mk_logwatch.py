@@ -510,6 +510,9 @@ class MockStdout(object):  # pylint: disable=useless-object-inheritance
     def isatty(self):
         return False
 
+    def flush(self):
+        pass
+
 
 @pytest.mark.parametrize(
     "logfile, patterns, opt_raw, state, expected_output",
@@ -591,6 +594,148 @@ def test_process_logfile(mk_logwatch, monkeypatch, logfile, patterns, opt_raw, s
         assert state['offset'] >= 15000  # about the size of this file
 
 
+@pytest.mark.parametrize("raw_pattern, literal", [
+    (u"disk failure", u"disk failure"),
+    (u"^kernel: .*panic", u"kernel: "),
+    (u"disk (failure|error) on (sd[a-z]+)", u"disk "),
+    (u"time(out)?s", u"time"),
+    (u"ORA-0+600", u"ORA-0"),
+    (u"x?yz", u"yz"),
+    (u"[]x]y\\.conf", u"y.conf"),
+    (u"[^]x]y", u"y"),
+    (u"[\\]a]", None),
+    (u"foo[^\\]]bar", u"foo"),
+    (u"[a\\]]bar", u"bar"),
+    (u"a{2,3}b", u"b"),
+    (u"ERROR{2}x", u"ERRO"),
+    (u"a{,2}bc{", u"bc"),
+    (u"Exception {|FATAL", None),
+    (u"ERROR{|FATAL", None),
+    (u"(?i)disk failure", None),
+    (u"error|warning", None),
+    (u"\\d+", None),
+])
+def test_required_literal(mk_logwatch, raw_pattern, literal):
+    assert mk_logwatch._required_literal(re.compile(raw_pattern, re.UNICODE)) == literal
+
+
+@pytest.mark.parametrize("text", [
+    u"",
+    u"nothing to see here",
+    u"disk failure on sda",
+    u"sda: disk failure on sdb",
+    u"kernel: panic after disk error on sdc",
+    u"kernel: ok",
+    u"Connection TIMEOUT",
+    u"aa timeout",
+    u"öö",
+])
+def test_pattern_matcher(mk_logwatch, text):
+    compiled_patterns = [(level, re.compile(raw_pattern, re.UNICODE), [], [])
+                         for level, raw_pattern in [
+                             ('C', u"^kernel: .*panic"),
+                             ('W', u"(a)\\1 timeout"),
+                             ('C', u"(?i)timeout"),
+                             ('W', u"disk (failure|error) on (sd[a-z]+)"),
+                             ('C', u"disk failure"),
+                             ('W', u"(?P<user>sd[a-z]):"),
+                             ('O', u"ö+"),
+                             ('I', u"kernel"),
+                         ]]
+    matcher = mk_logwatch.PatternMatcher(compiled_patterns)
+
+    found = matcher.match(text)
+    for compiled_pattern in compiled_patterns:
+        expected_match = compiled_pattern[1].search(text)
+        if expected_match:
+            assert found[0] is compiled_pattern
+            assert found[1].span() == expected_match.span()
+            assert found[1].groups() == expected_match.groups()
+            break
+    else:
+        assert found is None
+
+
+@pytest.mark.parametrize("raw_pattern, text", [
+    (u"[\\]a]", u"]"),
+    (u"foo[^\\]]bar", u"foo_bar"),
+])
+def test_pattern_matcher_escaped_bracket_in_class(mk_logwatch, raw_pattern, text):
+    compiled_pattern = ('C', re.compile(raw_pattern, re.UNICODE), [], [])
+    found = mk_logwatch.PatternMatcher([compiled_pattern]).match(text)
+    assert found is not None
+    assert found[0] is compiled_pattern
+
+
+@pytest.mark.parametrize("raw_pattern", [
+    u"Exception {|FATAL",
+    u"ERROR{|FATAL",
+    u"ERROR{1,|FATAL",
+    u"(ERROR|FATAL){1,2}: disk",
+    u"[{|]FATAL",
+    u"disk{2}|gone",
+    u"\\{FATAL\\}",
+])
+def test_pattern_matcher_never_dismisses_matching_lines(mk_logwatch, raw_pattern):
+    compiled_pattern = ('C', re.compile(raw_pattern, re.UNICODE), [], [])
+    matcher = mk_logwatch.PatternMatcher([compiled_pattern])
+    for line in [
+            u"FATAL: disk gone",
+            u"Exception {",
+            u"ERROR{",
+            u"ERRORR: disk",
+            u"{FATAL}",
+            u"|FATAL",
+            u"diskk",
+            u"nothing",
+    ]:
+        assert (matcher.match(line) is not None) == bool(compiled_pattern[1].search(line))
+
+
+@pytest.mark.parametrize("raw_processes, processes", [
+    (None, 1),
+    ("", 1),
+    ("4", 4),
+    ("0", 1),
+    ("four", 1),
+])
+def test_parse_processes(mk_logwatch, raw_processes, processes):
+    assert mk_logwatch.parse_processes(raw_processes) == processes
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_process_logfiles(mk_logwatch, tmpdir, monkeypatch, processes):
+    sections = []
+    state = mk_logwatch.State("void")
+    for idx in range(3):
+        log_path = os.path.join(str(tmpdir), "log%d" % idx)
+        with open(log_path, "wb") as log_file:
+            log_file.write(b"error %d\nerror\nok\n" % idx)
+        section = mk_logwatch.LogfileSection((log_path, log_path))
+        section.patterns = [('C', u"error %d" % (idx % 2), [], []), ('W', u"error", [], [])]
+        state.get(log_path)['offset'] = 0
+        sections.append(section)
+    sections.append(mk_logwatch.LogfileSection(("locked door", "locked door")))
+    monkeypatch.setattr(sys, 'stdout', MockStdout())
+
+    results = []
+    for section, process in mk_logwatch.process_logfiles(sections, state, False, processes):
+        try:
+            results.append(process())
+        except Exception as exc:
+            results.append(str(exc))
+
+    assert results == [
+        (u"[[[%s]]]\n" % sections[0].name_write, [u"C error 0\n", u"W error\n", u". ok\n"]),
+        (u"[[[%s]]]\n" % sections[1].name_write, [u"C error 1\n", u"W error\n", u". ok\n"]),
+        (u"[[[%s]]]\n" % sections[2].name_write, [u"W error 2\n", u"W error\n", u". ok\n"]),
+        (u"[[[locked door:cannotopen]]]\n", []),
+    ]
+    for section in sections[:3]:
+        assert state.get(section.name_fs)['offset'] == 17
+        assert state.get(section.name_fs)['inode'] == os.stat(section.name_fs).st_ino
+
+
 @pytest.mark.parametrize("input_lines, before, after, expected_output",
                          [([], 2, 3, []),
                           (["0", "1", "2", "C 3", "4", "5", "6", "7", "8", "9", "W 10"
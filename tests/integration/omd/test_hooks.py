@@ -14,6 +14,7 @@ def test_hooks(site):
         "APACHE_TCP_ADDR",
         "APACHE_TCP_PORT",
         "AUTOSTART",
+        "CHECK_HELPER_POOL",
         "CORE",
         "LIVESTATUS_TCP",
         "LIVESTATUS_TCP_ONLY_FROM",
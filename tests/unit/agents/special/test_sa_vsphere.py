@@ -6,6 +6,8 @@
 
 # pylint: disable=redefined-outer-name
 
+import contextlib
+
 import pytest  # type: ignore[import]
 
 from cmk.special_agents import agent_vsphere
@@ -17,6 +19,7 @@ DEFAULT_AGRS = {
     "timeout": 60,
     "port": 443,
     "hostname": None,
+    "max_sessions": 1,
     "skip_placeholder_vm": False,
     "host_pwr_display": None,
     "vm_pwr_display": None,
@@ -66,6 +69,9 @@ DEFAULT_AGRS = {
     (['-H', 'myHost'], {
         "hostname": 'myHost'
     }),
+    (['--max-sessions', '4'], {
+        "max_sessions": 4
+    }),
     (['-P'], {
         "skip_placeholder_vm": True
     }),
@@ -125,6 +131,8 @@ def test_parse_arguments(argv, expected_non_default_args):
     ['--vm_pwr_display', 'whoopdeedoo'],
     ['--vm_piggyname', 'MissPiggy'],
 ])
-def test_parse_arguments_invalid(invalid_argv):
+def test_parse_arguments_invalid(invalid_argv, monkeypatch):
+    # The trace file would be used for all following requests of the test session
+    monkeypatch.setattr("vcr.VCR.use_cassette", lambda *args, **kwargs: contextlib.nullcontext())
     with pytest.raises(SystemExit):
         agent_vsphere.parse_arguments(invalid_argv)
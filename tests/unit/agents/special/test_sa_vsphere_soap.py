@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import datetime
+import http.server
+import re
+import socketserver
+import ssl
+import threading
+import time
+
+import pytest  # type: ignore[import]
+
+from cmk.special_agents import agent_vsphere
+
+ENVELOPE = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<soapenv:Envelope xmlns:soapenc="http://schemas.xmlsoap.org/soap/encoding/"'
+            ' xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"'
+            ' xmlns:xsd="http://www.w3.org/2001/XMLSchema"'
+            ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n'
+            '<soapenv:Body>\n%s\n</soapenv:Body>\n</soapenv:Envelope>')
+
+HOSTS = {
+    "host-10": "esx1.example.com",
+    "host-11": "esx2.example.com",
+    "host-12": "esx3.example.com"
+}
+
+# Responses as recorded from a vCenter, reduced to a few objects and counters
+SYSTEMINFO = ('<RetrieveServiceContentResponse xmlns="urn:vim25"><returnval>'
+              '<rootFolder type="Folder">group-d1</rootFolder>'
+              '<propertyCollector type="PropertyCollector">propertyCollector</propertyCollector>'
+              '<about><name>VMware vCenter Server</name><version>6.7.0</version>'
+              '<build>15976728</build><apiVersion>6.7.3</apiVersion></about>'
+              '<sessionManager type="SessionManager">SessionManager</sessionManager>'
+              '<perfManager type="PerformanceManager">PerfMgr</perfManager>'
+              '<licenseManager type="LicenseManager">LicenseManager</licenseManager>'
+              '</returnval></RetrieveServiceContentResponse>')
+
+NOT_AUTHENTICATED = ('<soapenv:Fault><faultcode>ServerFaultCode</faultcode>'
+                     '<faultstring>The session is not authenticated.</faultstring><detail>'
+                     '<NotAuthenticatedFault xmlns="urn:vim25" xsi:type="NotAuthenticated">'
+                     '<object type="Folder">group-d1</object><privilegeId>System.View</privilegeId>'
+                     '</NotAuthenticatedFault></detail></soapenv:Fault>')
+
+
+def _host_objects(hosts):
+    return "".join('<objects><obj type="HostSystem">%s</obj><propSet><name>name</name>'
+                   '<val xsi:type="xsd:string">%s</val></propSet></objects>' % host
+                   for host in hosts)
+
+
+# The host systems are split into two pages to check the continuation of the query
+HOSTSYSTEMS = ('<RetrievePropertiesExResponse xmlns="urn:vim25"><returnval><token>0</token>%s'
+               '</returnval></RetrievePropertiesExResponse>' %
+               _host_objects(sorted(HOSTS.items())[:2]))
+HOSTSYSTEMS_CONTINUED = ('<ContinueRetrievePropertiesExResponse xmlns="urn:vim25"><returnval>%s'
+                         '</returnval></ContinueRetrievePropertiesExResponse>' %
+                         _host_objects(sorted(HOSTS.items())[2:]))
+
+DATASTORES = (
+    '<RetrievePropertiesExResponse xmlns="urn:vim25"><returnval>'
+    '<objects><obj type="Datastore">datastore-20</obj>'
+    '<propSet><name>name</name><val xsi:type="xsd:string">Backup &amp; Restore</val></propSet>'
+    '<propSet><name>summary.accessible</name><val xsi:type="xsd:boolean">true</val></propSet>'
+    '<propSet><name>summary.capacity</name><val xsi:type="xsd:long">499826819072</val></propSet>'
+    '</objects></returnval></RetrievePropertiesExResponse>')
+
+AVAILABLE_COUNTERS = ('<QueryAvailablePerfMetricResponse xmlns="urn:vim25">'
+                      '<returnval><counterId>6</counterId><instance></instance></returnval>'
+                      '<returnval><counterId>143</counterId><instance></instance></returnval>'
+                      '<returnval><counterId>143</counterId><instance>vmnic0</instance></returnval>'
+                      '<returnval><counterId>155</counterId><instance></instance></returnval>'
+                      '</QueryAvailablePerfMetricResponse>')
+
+
+def _counter_info(counter_id, name, group, unit):
+    return ('<returnval><key>%s</key>'
+            '<nameInfo><label>%s</label><summary>%s</summary><key>%s</key></nameInfo>'
+            '<groupInfo><label>%s</label><summary>%s</summary><key>%s</key></groupInfo>'
+            '<unitInfo><label>%s</label><summary>%s</summary><key>%s</key></unitInfo>'
+            '<rollupType>average</rollupType><statsType>rate</statsType><level>1</level>'
+            '</returnval>' % (counter_id, name, name, name, group, group, group, unit, unit, unit))
+
+
+COUNTERS_SYNTAX = ('<QueryPerfCounterResponse xmlns="urn:vim25">%s%s%s</QueryPerfCounterResponse>' %
+                   (_counter_info(6, "usagemhz", "cpu", "megaHertz"),
+                    _counter_info(143, "usage", "net", "kiloBytesPerSecond"),
+                    _counter_info(155, "uptime", "sys", "second")))
+
+
+def _perf_data(host):
+    offset = int(host.split("-")[1])
+    series = [("143", "", (10, 20, 30)), ("143", "vmnic0", (1, 2, 3)),
+              ("155", "", (offset, offset + 20, offset + 40))]
+    return ('<QueryPerfResponse xmlns="urn:vim25"><returnval xsi:type="PerfEntityMetric">'
+            '<entity type="HostSystem">%s</entity>'
+            '<sampleInfo><timestamp>2021-06-01T10:00:00Z</timestamp><interval>20</interval>'
+            '</sampleInfo>%s</returnval></QueryPerfResponse>' %
+            (host, "".join('<value xsi:type="PerfMetricIntSeries"><id><counterId>%s</counterId>'
+                           '<instance>%s</instance></id>%s</value>' %
+                           (counter_id, instance, "".join("<value>%d</value>" % v
+                                                          for v in values))
+                           for counter_id, instance, values in series)))
+
+
+class StubVSphere:
+    '''answers the SOAP requests of the agent, counting requests and concurrent calls'''
+    def __init__(self):
+        self.requests = []
+        self.authenticated = True
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._lock = threading.Lock()
+
+    def answer(self, request):
+        method = re.search(r"<ns1:(\w+) ", request).group(1)
+        with self._lock:
+            self.requests.append(method)
+            self._concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self._concurrent)
+        try:
+            time.sleep(0.01)
+            return ENVELOPE % self._answer(method, request)
+        finally:
+            with self._lock:
+                self._concurrent -= 1
+
+    def _answer(self, method, request):
+        if method == "RetrieveServiceContent":
+            return SYSTEMINFO
+        if not self.authenticated:
+            return NOT_AUTHENTICATED
+        if method == "RetrievePropertiesEx":
+            return DATASTORES if "<ns1:type>Datastore</ns1:type>" in request else HOSTSYSTEMS
+        if method == "ContinueRetrievePropertiesEx":
+            return HOSTSYSTEMS_CONTINUED
+        if method == "QueryAvailablePerfMetric":
+            return AVAILABLE_COUNTERS
+        if method == "QueryPerfCounter":
+            return COUNTERS_SYNTAX
+        if method == "QueryPerf":
+            return _perf_data(re.search(r'type="HostSystem">([^<]*)<', request).group(1))
+        raise NotImplementedError(method)
+
+
+def _create_certificate(tmp_path):
+    crypto = pytest.importorskip("cryptography")
+    from cryptography import x509  # pylint: disable=import-outside-toplevel
+    from cryptography.hazmat.backends import default_backend  # pylint: disable=import-outside-toplevel
+    from cryptography.hazmat.primitives import hashes, serialization  # pylint: disable=import-outside-toplevel
+    from cryptography.hazmat.primitives.asymmetric import rsa  # pylint: disable=import-outside-toplevel
+    from cryptography.x509.oid import NameOID  # pylint: disable=import-outside-toplevel
+    assert crypto
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u"localhost")])
+    now = datetime.datetime.utcnow()
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        key.public_key()).serial_number(1).not_valid_before(now).not_valid_after(
+            now + datetime.timedelta(days=1)).sign(key, hashes.SHA256(), default_backend()))
+
+    cert_file = tmp_path / "stub.pem"
+    cert_file.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.
+                          TraditionalOpenSSL, serialization.NoEncryption()) +
+        certificate.public_bytes(serialization.Encoding.PEM))
+    return str(cert_file)
+
+
+@pytest.fixture
+def stub_vsphere(tmp_path):
+    stub = StubVSphere()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            request = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+            body = stub.answer(request).encode("utf-8")
+            self.send_response(500 if "soapenv:Fault" in body.decode("utf-8") else 200)
+            self.send_header("Content-Type", "text/xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(_create_certificate(tmp_path))
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield stub, server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def connect(stub_vsphere):
+    _stub, port = stub_vsphere
+
+    def _connect(*args):
+        opt = agent_vsphere.parse_arguments(
+            ["--no-cert-check", "--port",
+             str(port), *args, "127.0.0.1"])
+        connection = agent_vsphere.ESXConnection(opt.host_address, opt.port, opt)
+        connection._session.headers["Cookie"] = "vmware_soap_session=stub"
+        connection._perf_samples = 3
+        return connection, opt
+
+    return _connect
+
+
+def test_fetch_host_systems(stub_vsphere, connect):
+    stub, _port = stub_vsphere
+    connection, _opt = connect()
+
+    assert connection.system_info["rootFolder"] == "group-d1"
+    assert agent_vsphere.fetch_host_systems(connection) == HOSTS
+    assert stub.requests[-2:] == ["RetrievePropertiesEx", "ContinueRetrievePropertiesEx"]
+
+
+def test_fetch_datastores(connect):
+    connection, _opt = connect()
+    assert agent_vsphere.fetch_datastores(connection) == {
+        "datastore-20": {
+            # The values stay escaped, like the values parsed from the VM details
+            "name": "Backup &amp; Restore",
+            "summary.accessible": "true",
+            "summary.capacity": "499826819072",
+        },
+    }
+
+
+def test_not_authenticated(stub_vsphere, connect):
+    stub, _port = stub_vsphere
+    connection, _opt = connect()
+    stub.authenticated = False
+    with pytest.raises(agent_vsphere.ESXCookieInvalid):
+        agent_vsphere.fetch_host_systems(connection)
+
+
+@pytest.mark.parametrize("max_sessions", ["1", "3"])
+def test_get_section_counters(stub_vsphere, connect, max_sessions):
+    stub, _port = stub_vsphere
+    connection, opt = connect("--max-sessions", max_sessions)
+    datastores = agent_vsphere.fetch_datastores(connection)
+
+    lines = agent_vsphere.get_section_counters(connection, HOSTS, datastores, opt)
+
+    expected = []
+    for host, name in sorted(HOSTS.items()):
+        offset = int(host.split("-")[1])
+        expected += [
+            "<<<<%s>>>>" % name,
+            "<<<esx_vsphere_counters:sep(124)>>>",
+            "datastore.name|datastore-20|Backup &amp; Restore|string",
+            "net.usage||10#20#30|kiloBytesPerSecond",
+            "net.usage|vmnic0|1#2#3|kiloBytesPerSecond",
+            "sys.uptime||%d#%d#%d|second" % (offset, offset + 20, offset + 40),
+        ]
+    assert lines == expected + ["<<<<>>>>"]
+    assert stub.requests.count("QueryAvailablePerfMetric") == len(HOSTS)
+    assert stub.requests.count("QueryPerf") == len(HOSTS)
+    assert 1 <= stub.max_concurrent <= int(max_sessions)
@@ -68,6 +68,43 @@ pytestmark = pytest.mark.checks
                 }),
             ),
         ),
+        (
+            {
+                'access_key_id': 'strawberry',
+                'secret_access_key': ('password', 'strawberry098'),
+                'assume_role': {},
+                'global_services': {},
+                'regions': ['eu-central-1', 'us-west-2'],
+                'services': {
+                    'glacier': {
+                        'selection': 'all',
+                    },
+                },
+                'concurrency': {
+                    'max_workers': 8,
+                    'max_requests_per_second': 20.0,
+                },
+            },
+            SpecialAgentConfiguration(
+                [
+                    "--regions",
+                    "eu-central-1",
+                    "us-west-2",
+                    "--services",
+                    "glacier",
+                    "--max-workers",
+                    "8",
+                    "--max-requests-per-second",
+                    "20.0",
+                    "--hostname",
+                    "testhost",
+                ],
+                json.dumps({
+                    'access_key_id': 'strawberry',
+                    'secret_access_key': 'strawberry098',
+                }),
+            ),
+        ),
     ],
 )
 @pytest.mark.usefixtures("config_load_all_checks")
@@ -26,6 +26,9 @@ pytestmark = pytest.mark.checks
         "--server", "address", "--port", "8080", "--user", "userID", "--password", "password",
         "--mode", "basic"
     ]),
+    ({
+        'bulk': True
+    }, ["--server", "address", "--bulk"]),
 ])
 @pytest.mark.usefixtures("config_load_all_checks")
 def test_jolokia_argument_parsing(params, expected_args):
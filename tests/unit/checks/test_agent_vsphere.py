@@ -42,6 +42,17 @@ pytestmark = pytest.mark.checks
         "hostsystem,virtualmachine,datastore,counters", "--direct", "--hostname", "host", "-P",
         "--spaces", "cut", "--vm_piggyname", "alias", "--no-cert-check", "address"
     ]),
+    ({
+        'direct': False,
+        'ssl': True,
+        'secret': 'secret',
+        'user': 'username',
+        'max_sessions': 8,
+        'infos': ['hostsystem', 'counters']
+    }, [
+        "-u", "username", "-s", "secret", "-i", "hostsystem,counters", "-P", "--max-sessions", "8",
+        "host"
+    ]),
 ])
 @pytest.mark.usefixtures("config_load_all_checks")
 def test_vsphere_argument_parsing(params, expected_args):
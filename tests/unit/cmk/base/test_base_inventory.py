@@ -5,8 +5,13 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 # pylint: disable=protected-access
+import os
 from typing import List, Union
 
+import cmk.utils.inventory_history as inventory_history
+import cmk.utils.paths
+from cmk.utils.structured_data import StructuredDataTree
+
 from cmk.base import inventory
 from cmk.base.api.agent_based.inventory_classes import Attributes, TableRow
 
@@ -22,3 +27,38 @@ def test_aggregator_raises_collision():
     assert isinstance(result, TypeError)
     assert str(result) == (
         "Cannot create TableRow at path ['a', 'b', 'c']: this is a Attributes node.")
+
+
+def test_save_inventory_tree_delta_chain(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "inventory_output_dir", str(tmp_path / "inventory"))
+    monkeypatch.setattr(cmk.utils.paths, "inventory_archive_dir",
+                        str(tmp_path / "inventory_archive"))
+    monkeypatch.setattr(cmk.utils.paths, "inventory_index_dir", str(tmp_path / "inventory_index"))
+    monkeypatch.setattr(cmk.utils.paths, "inventory_delta_cache_dir",
+                        str(tmp_path / "inventory_delta_cache"))
+
+    inventory._save_inventory_tree(
+        "heute",
+        StructuredDataTree().create_tree_from_raw_tree({"software": {
+            "os": {
+                "version": "10"
+            }
+        }}))
+    first_timestamp = "%d" % os.stat(str(tmp_path / "inventory" / "heute")).st_mtime
+    assert inventory_history.load_manifest("heute") == {"None_%s" % first_timestamp: (1, 0, 0)}
+
+    os.utime(str(tmp_path / "inventory" / "heute"), (1000, 1000))
+    inventory._save_inventory_tree(
+        "heute",
+        StructuredDataTree().create_tree_from_raw_tree({"software": {
+            "os": {
+                "version": "11"
+            }
+        }}))
+    timestamp = "%d" % os.stat(str(tmp_path / "inventory" / "heute")).st_mtime
+    assert os.path.exists(str(tmp_path / "inventory_archive" / "heute" / "1000"))
+    assert inventory_history.load_manifest("heute")["1000_%s" % timestamp] == (0, 1, 0)
+
+    delta = inventory_history.load_delta("heute", "1000_%s" % timestamp)
+    assert delta is not None
+    assert delta[3].get_raw_tree() == {"software": {"os": {"version": ("10", "11")}}}
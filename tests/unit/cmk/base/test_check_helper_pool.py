@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import socket
+
+import pytest  # type: ignore[import]
+
+import cmk.base.check_helper_pool as check_helper_pool
+import cmk.base.checking as checking
+import cmk.base.config as config
+
+
+@pytest.fixture
+def pool():
+    return check_helper_pool.CheckHelperPool(
+        serial="42",
+        num_helpers=1,
+        timeout=10,
+        max_requests=10,
+    )
+
+
+@pytest.fixture
+def checked_hosts(monkeypatch):
+    checked = []
+
+    def do_check(hostname, ipaddress):
+        checked.append((hostname, config.ipaddresses, config.ipv6addresses))
+        print("OK - Agent version 2.0.0")
+        return 0
+
+    monkeypatch.setattr(checking, "do_check", do_check)
+    return checked
+
+
+def _communicate(pool, request):
+    client, server = socket.socketpair()
+    with client, server:
+        client.sendall(request)
+        client.shutdown(socket.SHUT_WR)
+        may_continue = pool.handle_connection(server)
+        server.close()
+        return may_continue, b"".join(iter(lambda: client.recv(4096), b""))
+
+
+def test_handle_connection(monkeypatch, pool, checked_hosts):
+    monkeypatch.setattr(config, "ipaddresses", {})
+    request = check_helper_pool.make_request("heute", "42", {"heute": "127.0.0.1"}, {})
+
+    assert _communicate(pool, request) == (True, b"0\nOK - Agent version 2.0.0\n")
+    assert checked_hosts == [("heute", {"heute": "127.0.0.1"}, {})]
+    # The addresses are only valid for the single request
+    assert config.ipaddresses == {}
+
+
+def test_handle_connection_other_serial(pool, checked_hosts):
+    request = check_helper_pool.make_request("heute", "43", {}, {})
+
+    assert _communicate(pool, request) == (False, b"-1\n")
+    assert not checked_hosts
+
+
+def test_handle_connection_invalid_request(pool, checked_hosts):
+    assert _communicate(pool, b"__import__('os')\n") == (True, b"")
+    assert not checked_hosts
+
+
+def test_handle_connection_exception(monkeypatch, pool):
+    def do_check(hostname, ipaddress):
+        raise Exception("Kaputt")
+
+    monkeypatch.setattr(checking, "do_check", do_check)
+    request = check_helper_pool.make_request("heute", "42", {}, {})
+
+    assert _communicate(pool, request) == (
+        True,
+        b"3\nUNKNOWN - Exception in precompiled check: Kaputt\n",
+    )
+
+
+def test_run_loads_config_of_reported_serial(monkeypatch, tmp_path):
+    monkeypatch.setattr(check_helper_pool, "current_serial", lambda: "42")
+    monkeypatch.setattr("cmk.utils.paths.check_helper_pool_pid_file",
+                        str(tmp_path / "check-helper-pool.pid"))
+    monkeypatch.setattr(config, "load_all_agent_based_plugins", lambda get_check_api_context: None)
+    loaded_serials = []
+    monkeypatch.setattr(config, "load_packed_config", lambda serial: loaded_serials.append(serial))
+
+    def open_listener(path):
+        raise RuntimeError("stop")
+
+    monkeypatch.setattr(check_helper_pool, "_open_listener", open_listener)
+
+    with pytest.raises(RuntimeError, match="stop"):
+        check_helper_pool.run(num_helpers=1, timeout=10, max_requests=10, foreground=True)
+    assert loaded_serials == ["42"]
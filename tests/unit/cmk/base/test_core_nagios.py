@@ -259,6 +259,28 @@ def test_dump_precompiled_hostcheck(monkeypatch, serial):
     host_check = core_nagios._dump_precompiled_hostcheck(config_cache, serial, "localhost")
     assert host_check is not None
     assert host_check.startswith("#!/usr/bin/env python3")
+    # The rulesets only need to be evaluated for the checked host
+    assert "set_all_processed_hosts({'localhost'})" in host_check
+
+
+def test_dump_precompiled_hostcheck_uses_check_helper_pool(monkeypatch, serial):
+    ts = Scenario().add_host("localhost")
+    config_cache = ts.apply(monkeypatch)
+
+    monkeypatch.setattr(
+        core_nagios,
+        "_get_needed_plugin_names",
+        lambda c: ([], [CheckPluginName("uptime")], []),
+    )
+
+    host_check = core_nagios._dump_precompiled_hostcheck(config_cache, serial, "localhost")
+    assert host_check is not None
+    assert "_pool.connect(%r)" % paths.check_helper_pool_socket in host_check
+    assert "'serial': %r" % serial in host_check
+
+    # The pool is tried before the Checkmk modules are imported
+    assert host_check.index("_pool.connect") < host_check.index("import cmk.base.config")
+    compile(host_check, "localhost", "exec")
 
 
 def test_dump_precompiled_hostcheck_without_check_mk_service(monkeypatch, serial):
@@ -5,10 +5,16 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import io
+import logging
 import os
+import signal
+import subprocess
+import time
 
 import pytest  # type: ignore[import]
 
+import livestatus
+
 from cmk.base import notify
 
 
@@ -75,3 +81,254 @@ def test_raw_context_from_env_pipe_decoding(monkeypatch, environ, expected):
 def test_raw_context_from_stdin(monkeypatch, context, expected):
     monkeypatch.setattr('sys.stdin', io.StringIO(context))
     assert notify.raw_context_from_stdin() == expected
+
+
+RULES = [
+    {
+        "description": "Disabled",
+        "disabled": True,
+        "match_hosts": ["heute"],
+    },
+    {
+        "description": "Hosts",
+        "match_hosts": ["heute", "morgen"],
+        "match_exclude_hosts": ["morgen"],
+    },
+    {
+        "description": "Services",
+        "match_services": ["CPU", "Memory$"],
+        "match_exclude_services": ["CPU load"],
+        "match_service_event": ["?c"],
+    },
+    {
+        "description": "Labels",
+        "match_hostlabels": {
+            "os": "linux"
+        },
+        "match_plugin_output": "CRIT",
+    },
+    {
+        "description": "All",
+    },
+]
+
+CONTEXTS = [
+    {
+        "WHAT": "HOST",
+        "HOSTNAME": "heute",
+        "HOSTOUTPUT": "CRIT - down",
+        "HOSTSTATE": "DOWN",
+        "PREVIOUSHOSTHARDSTATE": "UP",
+        "NOTIFICATIONTYPE": "PROBLEM",
+        "HOSTLABEL_os": "linux",
+    },
+    {
+        "WHAT": "SERVICE",
+        "HOSTNAME": "morgen",
+        "SERVICEDESC": "CPU utilization",
+        "SERVICEOUTPUT": "OK",
+        "SERVICESTATE": "CRITICAL",
+        "PREVIOUSSERVICEHARDSTATE": "OK",
+        "NOTIFICATIONTYPE": "PROBLEM",
+    },
+    {
+        "WHAT": "SERVICE",
+        "HOSTNAME": "heute",
+        "SERVICEDESC": "CPU load",
+        "SERVICEOUTPUT": "CRIT - load",
+        "SERVICESTATE": "WARNING",
+        "PREVIOUSSERVICEHARDSTATE": "OK",
+        "NOTIFICATIONTYPE": "PROBLEM",
+        "HOSTLABEL_os": "windows",
+    },
+]
+
+
+@pytest.mark.parametrize("rule", RULES)
+@pytest.mark.parametrize("context", CONTEXTS)
+def test_compile_rbn_rule_matchers(rule, context):
+    assert notify.events.apply_matchers(notify.compile_rbn_rule_matchers(rule), rule,
+                                        context) == notify.rbn_match_rule(rule, context)
+
+
+def test_compile_rbn_rule_matchers_only_configured_conditions():
+    assert notify.compile_rbn_rule_matchers({"description": "All"}) == []
+    assert notify.compile_rbn_rule_matchers({
+        "match_notification_comment": "foo",
+        "match_site": ["heute"],
+    }) == [notify.events.event_match_site, notify.rbn_match_notification_comment]
+
+
+def test_compiled_rules_contactgroup_members(monkeypatch):
+    queries = []
+
+    class FakeConnection:
+        def query(self, query):
+            queries.append(query)
+            return [["admins", ["hh", "ll"]], ["ops", ["aa"]]]
+
+    monkeypatch.setattr(notify.livestatus, "LocalConnection", FakeConnection)
+    compiled_rules = notify.CompiledNotificationRules([])
+    rule = {"contact_groups": ["admins", "ops", "unknown"]}
+    context = {"HOSTNAME": "heute"}
+
+    assert notify.rbn_rule_contacts(rule, context, compiled_rules) == {"hh", "ll", "aa"}
+    assert notify.rbn_rule_contacts(rule, context, compiled_rules) == {"hh", "ll", "aa"}
+    assert len(queries) == 1
+
+
+@pytest.fixture
+def bulkdir(monkeypatch, tmp_path):
+    monkeypatch.setattr(notify, "notification_bulkdir", str(tmp_path / "bulk"))
+    monkeypatch.setattr(notify, "_last_bulk_spool_scan", 0.0)
+    return tmp_path / "bulk"
+
+
+def _spool_bulk_notification(bulk, host_name="heute"):
+    notify.do_bulk_notify("mail", {}, {
+        "WHAT": "HOST",
+        "CONTACTNAME": "hh",
+        "HOSTNAME": host_name,
+    }, dict(bulk, groupby=["host"]))
+
+
+def test_find_bulks_interval(bulkdir):
+    bulk_dir = str(bulkdir / "hh" / "mail" / "3600,3,host,heute")
+    for _idx in range(2):
+        _spool_bulk_notification({"interval": 3600, "count": 3})
+
+    assert notify.find_bulks(only_ripe=True) == []
+    assert notify.load_bulk_index()[bulk_dir][0] == 2
+
+    _spool_bulk_notification({"interval": 3600, "count": 3})
+    bulks = notify.find_bulks(only_ripe=True)
+    assert [(bulk[0], bulk[2], bulk[4], len(bulk[5])) for bulk in bulks] == [(bulk_dir, 3600, 3, 3)]
+
+    for _mtime, notify_uuid in bulks[0][5]:
+        os.remove(os.path.join(bulk_dir, notify_uuid))
+    os.rmdir(bulk_dir)
+    assert notify.find_bulks(only_ripe=True) == []
+    assert notify.load_bulk_index() == {}
+
+
+def test_find_bulks_changed_without_index(bulkdir):
+    bulk_dir = bulkdir / "hh" / "mail" / "3600,2,host,heute"
+    _spool_bulk_notification({"interval": 3600, "count": 2})
+    assert notify.find_bulks(only_ripe=True) == []
+
+    # Written by an older version
+    (bulk_dir / "4ded0fa2-f0cd-4b6a-9812-54374a04069f").write_text("({}, {})\n")
+    assert len(notify.find_bulks(only_ripe=True)[0][5]) == 2
+
+
+def test_find_bulks_unknown_dir(monkeypatch, bulkdir):
+    bulk_dir = bulkdir / "hh" / "mail" / "3600,1"
+    bulk_dir.mkdir(parents=True)
+    (bulk_dir / "4ded0fa2-f0cd-4b6a-9812-54374a04069f").write_text("({}, {})\n")
+
+    # Found with the next complete scan of the spool
+    monkeypatch.setattr(notify, "_last_bulk_spool_scan", time.time())
+    assert notify.find_bulks(only_ripe=True) == []
+    assert [bulk[0] for bulk in notify.find_bulks(only_ripe=False)] == [str(bulk_dir)]
+
+
+@pytest.mark.parametrize("response,expected_ripe", [
+    ([["night", 0]], 2),
+    ([["night", 1]], 0),
+    (None, 0),
+])
+def test_find_bulks_timeperiods(monkeypatch, bulkdir, response, expected_ripe):
+    queries = []
+
+    class FakeConnection:
+        def query(self, query):
+            queries.append(query)
+            if response is None:
+                raise livestatus.MKLivestatusSocketError("Connection refused")
+            return response
+
+    monkeypatch.setattr(notify.livestatus, "LocalConnection", FakeConnection)
+    notify.cmk.base.core.cleanup_timeperiod_caches()
+    for host_name in ["heute", "morgen"]:
+        _spool_bulk_notification({"timeperiod": "night", "count": 100}, host_name)
+
+    assert len(notify.find_bulks(only_ripe=True)) == expected_ripe
+    assert len(queries) == 1
+
+
+@pytest.fixture
+def notification_script(monkeypatch, tmp_path):
+    script = tmp_path / "plugin"
+    script.write_text("#!/bin/sh\n"
+                      "echo \"$NOTIFY_HOSTNAME start\" >> %s\n"
+                      "sleep ${NOTIFY_SLEEP:-0.5}\n"
+                      "echo \"$NOTIFY_HOSTNAME end\" >> %s\n"
+                      "echo \"sent to $NOTIFY_CONTACTNAME\"\n" %
+                      (tmp_path / "calls", tmp_path / "calls"))
+    script.chmod(0o755)
+    monkeypatch.setattr(notify, "path_to_notification_script", lambda plugin_name: str(script))
+    monkeypatch.setattr(notify, "_log_to_history", lambda message: None)
+    return tmp_path / "calls"
+
+
+def test_execute_notification_script_timeout(monkeypatch, notification_script):
+    monkeypatch.setattr(notify.config, "notification_plugin_timeouts", {"slow": 1})
+    log_lines = []
+    start = time.time()
+    assert notify._execute_notification_script(  # pylint: disable=protected-access
+        "slow", {
+            "HOSTNAME": "heute",
+            "SLEEP": "5"
+        }, log_lines.append, lambda line: None) == 1
+    assert time.time() - start < 4
+    assert log_lines[-2:] == [
+        "Notification plugin did not finish within 1 seconds. Terminating.",
+        "Plugin exited with code 1",
+    ]
+
+
+@pytest.mark.parametrize("ignore_sigterm", [False, True])
+def test_execute_notification_script_timeout_reaps_plugin(monkeypatch, tmp_path, ignore_sigterm):
+    script = tmp_path / "plugin"
+    script.write_text("#!/bin/sh\n%sexec sleep 5\n" % ("trap '' TERM\n" if ignore_sigterm else ""))
+    script.chmod(0o755)
+    monkeypatch.setattr(notify, "path_to_notification_script", lambda plugin_name: str(script))
+    monkeypatch.setattr(notify.config, "notification_plugin_timeouts", {"slow": 1})
+    monkeypatch.setattr(notify, "_plugin_terminate_timeout", 0.5)
+    processes = []
+    popen = subprocess.Popen
+
+    def record_popen(*args, **kwargs):
+        processes.append(popen(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(notify.subprocess, "Popen", record_popen)
+
+    start = time.time()
+    assert notify._execute_notification_script(  # pylint: disable=protected-access
+        "slow", {}, lambda line: None, lambda line: None) == 1
+    assert time.time() - start < 4
+    assert processes[0].returncode == (-signal.SIGKILL if ignore_sigterm else -signal.SIGTERM)
+
+
+def test_notification_dispatcher(monkeypatch, caplog, notification_script):
+    monkeypatch.setattr(notify.config, "notification_plugin_concurrency", {"ticket": 2})
+    caplog.set_level(logging.INFO, logger="cmk.base.notify")
+    dispatcher = notify.NotificationDispatcher()
+    start = time.time()
+    for host_name in ["heute", "morgen", "heute"]:
+        dispatcher.submit(
+            "ticket", {
+                "CONTACTNAME": "hh",
+                "HOSTNAME": host_name,
+                "HOSTSTATE": "DOWN",
+                "HOSTOUTPUT": "Packet received via smart PING",
+            })
+    dispatcher.wait()
+
+    # Both hosts in parallel, the notifications about heute one after the other
+    assert time.time() - start < 1.4
+    calls = notification_script.read_text().splitlines()
+    assert [call for call in calls if call.startswith("heute")] == ["heute start", "heute end"] * 2
+    assert sorted(calls) == ["heute end"] * 2 + ["heute start"] * 2 + ["morgen end", "morgen start"]
+    assert caplog.messages.count("     Output: sent to hh") == 3
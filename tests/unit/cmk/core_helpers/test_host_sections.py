@@ -13,7 +13,7 @@ import pytest  # type: ignore[import]
 from cmk.utils.type_defs import SectionName
 
 from cmk.core_helpers.cache import ABCRawDataSection, PersistedSections, SectionStore
-from cmk.core_helpers.host_sections import HostSections
+from cmk.core_helpers.host_sections import HostSections, LazySections
 
 
 class MockStore(SectionStore):
@@ -140,3 +140,40 @@ class TestPersistentSectionHandling:
         )
 
         assert not host_sections.sections
+
+
+class TestLazySections:
+    @pytest.fixture
+    def loaded(self):
+        return []
+
+    @pytest.fixture
+    def sections(self, loaded):
+        def load(section_name):
+            loaded.append(section_name)
+            return [[str(section_name)]]
+
+        sections: LazySections[ABCRawDataSection] = LazySections()
+        for name in ("a", "b"):
+            sections.set_loader(SectionName(name), lambda name=name: load(SectionName(name)))
+        return sections
+
+    def test_load_on_access(self, sections, loaded):
+        assert list(sections) == [SectionName("a"), SectionName("b")]
+        assert not loaded
+
+        assert sections[SectionName("b")] == [["b"]]
+        assert sections[SectionName("b")] == [["b"]]
+        assert loaded == [SectionName("b")]
+        assert sections.is_loaded(SectionName("b"))
+        assert not sections.is_loaded(SectionName("a"))
+
+    def test_filter_and_add_do_not_load(self, sections, loaded):
+        host_sections = HostSections(sections).filter({SectionName("a")})
+        combined = HostSections()
+        combined.add(host_sections)
+        assert list(combined.sections) == [SectionName("a")]
+        assert not loaded
+
+        assert combined.sections[SectionName("a")] == [["a"]]
+        assert loaded == [SectionName("a")]
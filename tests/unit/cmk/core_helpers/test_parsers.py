@@ -123,6 +123,28 @@ class TestAgentParser:
         assert ahs.cache_info == {}
         assert ahs.piggybacked_raw_data == {}
 
+    @pytest.mark.usefixtures("scenario")
+    def test_only_selected_sections_are_parsed(self, parser):
+        raw_data = AgentRawData(b"\n".join((
+            b"<<<a_section>>>",
+            b"first line",
+            b"<<<another_section>>>",
+            b"first line <<<no_header>>>",
+            b"<<<a_section:sep(59)>>>",
+            b"second;line",
+        )))
+
+        ahs = parser.parse(raw_data, selection={SectionName("a_section")})
+
+        assert list(ahs.sections) == [SectionName("a_section")]
+        assert not ahs.sections.is_loaded(SectionName("a_section"))
+        assert ahs.sections[SectionName("a_section")] == [["first", "line"], ["second", "line"]]
+
+        ahs = parser.parse(raw_data, selection=NO_SELECTION)
+        assert ahs.sections[SectionName("another_section")] == [
+            ["first", "line", "<<<no_header>>>"],
+        ]
+
     @pytest.mark.usefixtures("scenario")
     def test_piggyback_populates_piggyback_raw_data(self, parser, monkeypatch):
         time_time = 1000
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import cmk.ec.main
+
+RULE_PACKS = [
+    {
+        "id": "first",
+        "disabled": False,
+        "rules": [
+            {
+                "id": "skip",
+                "state": 1,
+                "drop": "skip_pack",
+                "match": "disk",
+            },
+            {
+                "id": "skipped",
+                "state": 2,
+                "match": "failure",
+            },
+        ],
+    },
+    {
+        "id": "second",
+        "disabled": False,
+        "rules": [
+            {
+                "id": "drop",
+                "state": 0,
+                "drop": True,
+                "match": "debug",
+            },
+            {
+                "id": "failure",
+                "state": 2,
+                "sl": {
+                    "value": 10,
+                    "precedence": "message",
+                },
+                "match": "(disk|fan) failure on (.*)$",
+            },
+        ],
+    },
+]
+
+LINE = "<11>Jan 24 10:04:57 heute smartd[1234]: Disk failure on sda"
+
+
+def test_match_line(event_server):
+    event_server.compile_rules([], RULE_PACKS)
+
+    matched_line = event_server.match_line(LINE, ("127.0.0.1", 514))
+    assert matched_line.event["host"] == "heute"
+    assert matched_line.event["text"] == "Disk failure on sda"
+    # The rule "drop" is skipped by the prefilter
+    assert matched_line.tries == 2
+    assert [hit[:3] for hit in matched_line.hits] == [
+        ("first", "skip", False),
+        ("second", "failure", False),
+    ]
+    assert matched_line.hits[1][3]["match_groups_message"] == ("Disk", "sda")
+    assert matched_line.error == ""
+
+
+def test_process_matched_line(event_server, event_status):
+    event_server.compile_rules([], RULE_PACKS)
+
+    event_server.process_matched_line(event_server.match_line(LINE, None))
+    event_server.process_matched_line(
+        event_server.match_line(LINE.replace("Disk failure", "debug message"), None))
+
+    assert [(event["rule_id"], event["state"], event["sl"], event["match_groups"])
+            for event in event_status.events()] == [("failure", 2, 10, ("Disk", "sda"))]
+
+
+def test_process_matched_line_reloaded_rules(event_server, event_status):
+    event_server.compile_rules([], RULE_PACKS)
+    matched_line = event_server.match_line(LINE, None)
+    event_server.compile_rules([], RULE_PACKS[1:])
+
+    event_server.process_matched_line(matched_line)
+
+    assert [event["rule_id"] for event in event_status.events()] == ["failure"]
+
+
+def test_event_pipeline(settings, config, slave_status, event_server):
+    config["rule_packs"] = RULE_PACKS
+    event_server.compile_rules([], RULE_PACKS)
+    lines = [LINE.replace("sda", "sd%d" % idx) for idx in range(1200)] + ["", "no match"]
+
+    pipeline = cmk.ec.main.EventPipeline(settings, config, slave_status, 2)
+    try:
+        for line in lines:
+            pipeline.add(line.encode("utf-8") + b"\n", None)
+        pipeline.flush()
+        results = list(pipeline.results(wait=True))
+    finally:
+        pipeline.close()
+
+    assert not pipeline.has_pending()
+    assert [(result.event["text"], result.tries, result.hits) for result in results
+           ] == [(expected.event["text"], expected.tries, expected.hits)
+                 for expected in (event_server.match_line(line, None) for line in lines if line)]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import itertools
+import logging
+
+import pytest  # type: ignore[import]
+
+from cmk.ec.main import EventServer, RuleMatcher
+from cmk.ec.rule_prefilter import LiteralMatcher, RulePrefilter, required_literals, rule_conditions
+
+
+def _compile_rule(rule):
+    return {
+        key: EventServer._compile_matching_value(key, value) if key.startswith(
+            ("match", "cancel_application")) else value for key, value in rule.items()
+    }
+
+
+@pytest.mark.parametrize("pattern, result", [
+    (None, None),
+    ("disk failure", {"disk failure"}),
+    ("ab", None),
+    ("Disk failure on (sd[a-z])", {"disk failure on "}),
+    ("^sshd.*(Accepted|Failed) password", {" password"}),
+    ("(Accepted|Failed) pass", {"accepted", "failed"}),
+    ("(Accepted|no) pass", {" pass"}),
+    ("(Accepted|no)", None),
+    ("(foo)+bar?", {"foo"}),
+    ("x*y+z", None),
+    ("kernel: [0-9]+ äöü", {"kernel: "}),
+    ("äöü", None),
+])
+def test_required_literals(pattern, result):
+    compiled = pattern if pattern is None else EventServer._compile_matching_value("match", pattern)
+    assert required_literals(compiled) == (None if result is None else frozenset(result))
+
+
+def test_literal_matcher():
+    matcher = LiteralMatcher(["she", "he", "hers", "his", "xyz"])
+    assert matcher.find("ushers") == {"she", "he", "hers"}
+    assert matcher.find("this") == {"his"}
+    assert matcher.find("") == set()
+
+
+@pytest.mark.parametrize("rule, result", [
+    ({
+        "match": "disk failure",
+        "match_host": "srv",
+    }, [("text", {"disk failure"}), ("host", {"srv"})]),
+    ({
+        "match": "disk failure",
+        "invert_matching": True,
+    }, []),
+    ({
+        "match": "disk failure",
+        "match_ok": "disk ok",
+        "match_application": "smartd",
+    }, [("text", {"disk failure", "disk ok"})]),
+    ({
+        "match": "disk failure",
+        "cancel_priority": (5, 7),
+    }, []),
+    ({
+        "match": "disk failure",
+        "match_application": "smartd",
+    }, [("text", {"disk failure"}), ("application", {"smartd"})]),
+])
+def test_rule_conditions(rule, result):
+    assert rule_conditions(_compile_rule(rule)) == [
+        (field, frozenset(literals)) for field, literals in result
+    ]
+
+
+def _event(text, host="srv01", application="kernel"):
+    return {
+        "text": text,
+        "host": host,
+        "application": application,
+        "ipaddress": "127.0.0.1",
+        "facility": 1,
+        "priority": 2,
+        "core_host": None,
+    }
+
+
+def test_candidates():
+    rules = [
+        _compile_rule(rule) for rule in [
+            {
+                "id": "a",
+                "match": "disk failure",
+            },
+            {
+                "id": "b",
+                "match": "^(.*)$",
+            },
+            {
+                "id": "c",
+                "match": "disk failure",
+                "match_host": "other",
+            },
+            {
+                "id": "d",
+                "match": "Link (down|up)",
+            },
+            {
+                "id": "e",
+                "match": "disk failure",
+                "invert_matching": True,
+            },
+        ]
+    ]
+    prefilter = RulePrefilter(rules)
+
+    def candidates(rule_list, event):
+        return [rule["id"] for rule in prefilter.candidates(rule_list, event)]
+
+    assert candidates(rules, _event("DISK FAILURE on sda")) == ["a", "b", "e"]
+    assert candidates(rules, _event("Link down", host="other")) == ["b", "d", "e"]
+    assert candidates(rules[3:], _event("link up")) == ["d", "e"]
+    # Events with non ASCII characters are checked against all rules
+    assert candidates(rules, _event("Lınk down")) == ["a", "b", "c", "d", "e"]
+
+
+def test_candidates_match_rule_matcher():
+    patterns = [
+        "disk failure", "Disk (failure|error) on (sd[a-z]+)", "error", "sshd.*(Accepted|Failed)",
+        "^link (up|down)$", "temperature [0-9]+ C", "(?i)UPS on battery", None
+    ]
+    rules = []
+    for idx, (match_value, match_ok, host, application) in enumerate(
+            itertools.product(patterns, [None, "disk ok", "recovered"], [None, "srv01", "srv.*"],
+                              [None, "smartd", "ssh"])):
+        rule = {"id": idx, "pack": "default", "state": 0}
+        for key, value in [("match", match_value), ("match_ok", match_ok), ("match_host", host),
+                           ("match_application", application)]:
+            if value is not None:
+                rule[key] = value
+        rules.append(_compile_rule(rule))
+    prefilter = RulePrefilter(rules)
+    matcher = RuleMatcher(logging.getLogger("cmk.mkeventd"), {"debug_rules": False})
+    num_expected = num_candidates = 0
+
+    events = [
+        _event(text, host, application) for text, host, application in itertools.product([
+            "Disk failure on sda", "disk error on sdb", "sshd[123]: Failed password", "Link down",
+            "link up", "Temperature 42 C", "ups ON BATTERY", "disk ok", "recovered", ""
+        ], ["srv01", "srv02", "other"], ["smartd", "sshd", ""])
+    ]
+    for event in events:
+        expected = [rule for rule in rules if matcher.event_rule_matches_non_inverted(rule, event)]
+        candidates = prefilter.candidates(rules, event)
+        assert all(rule in candidates for rule in expected)
+        num_expected += len(expected)
+        num_candidates += len(candidates)
+
+    assert 0 < num_expected <= num_candidates < len(rules) * len(events) // 2
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import select
+
+import pytest  # type: ignore[import]
+
+from cmk.ec.spool import SpoolWatcher
+
+
+@pytest.fixture(name="spool")
+def fixture_spool(tmp_path):
+    spool = SpoolWatcher(tmp_path / "spool", logging.getLogger("cmk.mkeventd"))
+    yield spool
+    spool.close()
+
+
+def _spool_file(path, name, content):
+    (path / (".%s" % name)).write_text(content)
+    (path / (".%s" % name)).rename(path / name)
+
+
+def _readable(spool):
+    return bool(select.select([spool.fileno()], [], [], 0)[0])
+
+
+def test_next_file_initially(tmp_path):
+    (tmp_path / "spool").mkdir()
+    _spool_file(tmp_path / "spool", "spooled", "message\n")
+    spool = SpoolWatcher(tmp_path / "spool", logging.getLogger("cmk.mkeventd"))
+    try:
+        assert spool.next_file() == tmp_path / "spool" / "spooled"
+    finally:
+        spool.close()
+
+
+def test_next_file_after_notification(tmp_path, spool):
+    assert spool.fileno() is not None
+    assert spool.next_file() is None
+    assert not _readable(spool)
+
+    # Hidden files are not complete yet
+    (tmp_path / "spool" / ".incomplete").write_text("message\n")
+    _spool_file(tmp_path / "spool", "spooled", "message\n")
+    # Nothing is looked up until the notification has been handled
+    assert spool.next_file() is None
+
+    assert _readable(spool)
+    spool.handle_readable()
+    assert not _readable(spool)
+
+    spooled = spool.next_file()
+    assert spooled == tmp_path / "spool" / "spooled"
+    spooled.unlink()
+    assert spool.next_file() is None
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import socket
+import struct
+
+import pytest  # type: ignore[import]
+
+import cmk.ec.main
+from cmk.ec.settings import PortNumber
+
+
+@pytest.fixture(name="syslog_server")
+def fixture_syslog_server(monkeypatch, settings, event_server):
+    event_server.settings = settings._replace(options=settings.options._replace(
+        syslog_udp=PortNumber(0)))
+    event_server.open_syslog()
+    received = []
+    monkeypatch.setattr(event_server, "process_raw_lines",
+                        lambda data, address: received.append(data))
+    yield event_server, received
+    event_server._syslog.close()
+
+
+def _send(event_server, datagrams):
+    port = event_server._syslog.getsockname()[1]
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+        for datagram in datagrams:
+            client.sendto(datagram, ("127.0.0.1", port))
+
+
+def test_read_syslog_datagrams(syslog_server, perfcounters):
+    event_server, received = syslog_server
+    datagrams = [b"<11>message %d" % idx for idx in range(10)] + [b"x" * 20000]
+    _send(event_server, datagrams)
+
+    event_server.read_syslog_datagrams()
+    assert received == datagrams
+    # Nothing left, the socket does not block
+    event_server.read_syslog_datagrams()
+    assert received == datagrams
+
+    assert perfcounters._counters["datagrams"] == 11
+    assert perfcounters._counters["datagram_reads"] == 2
+
+
+def test_read_syslog_datagrams_limited(monkeypatch, syslog_server):
+    monkeypatch.setattr(cmk.ec.main, "_MAX_DATAGRAMS_PER_READ", 3)
+    event_server, received = syslog_server
+    _send(event_server, [b"<11>message %d" % idx for idx in range(5)])
+
+    event_server.read_syslog_datagrams()
+    assert len(received) == 3
+    event_server.read_syslog_datagrams()
+    assert len(received) == 5
+
+
+def test_count_datagram_drops(event_server, perfcounters):
+    def ancdata(dropped):
+        return [(socket.SOL_SOCKET, cmk.ec.main._SO_RXQ_OVFL, struct.pack("=I", dropped))]
+
+    event_server._count_datagram_drops([])
+    event_server._count_datagram_drops(ancdata(5))
+    event_server._count_datagram_drops(ancdata(7))
+    assert perfcounters._counters["datagram_drops"] == 7
+
+    # The kernel counter wraps around
+    event_server._count_datagram_drops(ancdata(2**32 - 1))
+    event_server._count_datagram_drops(ancdata(1))
+    assert perfcounters._counters["datagram_drops"] == 2**32 + 1
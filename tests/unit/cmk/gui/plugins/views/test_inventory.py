@@ -5,10 +5,19 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 # No stub file
+import os
+
 import pytest  # type: ignore[import]
 
+import cmk.utils.inventory_history as inventory_history
+import cmk.utils.inventory_index as inventory_index
+from cmk.utils.structured_data import StructuredDataTree
+
 import cmk.gui.inventory
 import cmk.gui.plugins.views.inventory as inventory
+from cmk.gui.plugins.views.utils import SorterEntry, sorter_registry
+from cmk.gui.plugins.visuals.filters import FilterText
+from cmk.gui.plugins.visuals.inventory import FilterInvtableText
 
 RAW_ROWS = [('this_site', 'this_hostname')]
 RAW_ROWS2 = [('this_site', 'this_hostname', 'foobar')]
@@ -150,6 +159,48 @@ def test_query_row_table_inventory_history_add_columns(monkeypatch):
         assert set(row) == set(EXPECTED_INV_HIST_KEYS + ['host_foo'])
 
 
+class _FakeView:
+    def __init__(self, sorters):
+        self.sorters = [
+            SorterEntry(sorter=sorter_registry[ident](), negate=negate, join_key=None)
+            for ident, negate in sorters
+        ]
+
+
+@pytest.mark.parametrize("view, filters, expected_limit", [
+    (None, [], None),
+    (_FakeView([("invhist_time", False)]), [], 3),
+    (_FakeView([("invhist_time", True)]), [], None),
+    (_FakeView([("invhist_changed", False)]), [], None),
+    (_FakeView([("invhist_changed", False), ("invhist_time", False)]), [], None),
+    (_FakeView([("invhist_time", False)]), [
+        FilterText(ident="hostregex",
+                   title="Hostname",
+                   sort_index=100,
+                   info="host",
+                   column="host_name",
+                   htmlvar="host_regex",
+                   op="~~")
+    ], 3),
+    (_FakeView([
+        ("invhist_time", False)
+    ]), [FilterInvtableText(inv_info="invswpacs", ident="invswpacs_name", title="Name")], None),
+])
+def test_query_row_table_inventory_history_limit(monkeypatch, register_builtin_html, view, filters,
+                                                 expected_limit):
+    row_table = inventory.RowTableInventoryHistory()
+    monkeypatch.setattr(row_table, "_get_raw_data", lambda only_sites, query: RAW_ROWS)
+    limits = []
+
+    def get_history_deltas(hostname, search_timestamp=None, limit=None):
+        limits.append(limit)
+        return [], []
+
+    monkeypatch.setattr(cmk.gui.inventory, "get_history_deltas", get_history_deltas)
+    row_table.query(view, [], None, None, 2, filters)
+    assert limits == [expected_limit]
+
+
 def test_query_row_multi_table_inventory(monkeypatch):
     sources = list(zip(["invtesttable1", "invtesttable2"], [".foo.bar:", "foo.baz:"]))
     row_table = inventory.RowMultiTableInventory(sources, ["sid"], [])
@@ -192,3 +243,99 @@ def test__cmp_inventory_node(monkeypatch, val_a, val_b, result):
     monkeypatch.setattr(cmk.gui.inventory, "get_inventory_data", lambda val, path: val)
     assert inventory._cmp_inventory_node({"host_inventory": val_a}, {"host_inventory": val_b},
                                          "any-path") == result
+
+
+def test_load_filtered_and_merged_tree_from_index(monkeypatch, tmp_path, register_builtin_html):
+    monkeypatch.setattr("cmk.utils.paths.var_dir", str(tmp_path))
+    monkeypatch.setattr("cmk.utils.paths.inventory_output_dir", str(tmp_path / "inventory"))
+    monkeypatch.setattr("cmk.utils.paths.inventory_index_dir", str(tmp_path / "inventory_index"))
+    raw_tree = {
+        "hardware": {
+            "cpu": {
+                "cores": 4
+            }
+        },
+        "software": {
+            "os": {
+                "name": "Debian"
+            }
+        },
+    }
+    StructuredDataTree().create_tree_from_raw_tree(raw_tree).save_to(str(tmp_path / "inventory"),
+                                                                     "heute")
+    inventory_index.update_host("heute", raw_tree)
+
+    index = cmk.gui.inventory.get_inventory_index([".software.os.name"])
+    assert index is not None
+    tree = cmk.gui.inventory.load_filtered_and_merged_tree({"host_name": "heute"}, index)
+    assert tree.get_raw_tree() == {"software": {"os": {"name": "Debian"}}}
+
+    # Outdated index: Load the whole tree
+    StructuredDataTree().create_tree_from_raw_tree(raw_tree).save_to(str(tmp_path / "inventory"),
+                                                                     "heute")
+    tree = cmk.gui.inventory.load_filtered_and_merged_tree({"host_name": "heute"}, index)
+    assert tree.get_raw_tree() == raw_tree
+
+
+def test_get_inventory_index_whole_tree_needed():
+    assert cmk.gui.inventory.get_inventory_index(None) is None
+    assert cmk.gui.inventory.get_inventory_index([".software.packages:"]) is None
+    assert cmk.gui.inventory.get_inventory_index([".software.os."]) is None
+
+
+def _save_history_tree(path, raw_tree, timestamp):
+    # Archived trees are renamed inventory files without the companion files
+    path.write_text(repr(raw_tree))
+    os.utime(str(path), (timestamp, timestamp))
+
+
+def test_get_history_deltas(monkeypatch, tmp_path, register_builtin_html):
+    monkeypatch.setattr("cmk.utils.paths.var_dir", str(tmp_path))
+    monkeypatch.setattr("cmk.utils.paths.inventory_delta_cache_dir",
+                        str(tmp_path / "inventory_delta_cache"))
+    monkeypatch.setattr(cmk.gui.inventory, "_get_permitted_inventory_paths", lambda: None)
+    archive_dir = tmp_path / "inventory_archive" / "heute"
+    archive_dir.mkdir(parents=True)
+    (tmp_path / "inventory").mkdir()
+    for timestamp, version in [(100, "8"), (200, "9"), (300, "10")]:
+        _save_history_tree(archive_dir / str(timestamp), {"software": {
+            "os": {
+                "version": version
+            }
+        }}, timestamp)
+    _save_history_tree(tmp_path / "inventory" / "heute", {"software": {
+        "os": {
+            "version": "11"
+        }
+    }}, 400)
+
+    # Precomputed by the inventory
+    inventory_history.save_delta(
+        "heute", "300_400",
+        StructuredDataTree().create_tree_from_raw_tree({
+            "software": {
+                "os": {
+                    "version": "10"
+                }
+            }
+        }).compare_with(StructuredDataTree().create_tree_from_raw_tree(
+            {"software": {
+                "os": {
+                    "version": "9"
+                }
+            }})))
+
+    delta_history, corrupted_files = cmk.gui.inventory.get_history_deltas("heute", limit=2)
+    assert corrupted_files == []
+    assert [(timestamp, delta[:3]) for timestamp, delta in delta_history] == [
+        ("300", (0, 1, 0)),
+        ("400", (0, 1, 0)),
+    ]
+    assert delta_history[1][1][3].get_raw_tree() == {"software": {"os": {"version": ("9", "10")}}}
+
+    # Missing deltas are computed once
+    assert set(inventory_history.load_manifest("heute")) == {"200_300", "300_400"}
+    delta_history, corrupted_files = cmk.gui.inventory.get_history_deltas("heute")
+    assert [timestamp for timestamp, _delta in delta_history] == ["100", "200", "300", "400"]
+    assert set(
+        inventory_history.load_manifest("heute")) == {"None_100", "100_200", "200_300", "300_400"}
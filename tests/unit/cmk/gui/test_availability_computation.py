@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2020 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import copy
+
+import pytest  # type: ignore[import]
+
+import cmk.gui.availability as availability
+
+
+def _span(host_name, service_description, from_time, until_time, state, **kwargs):
+    span = {
+        "site": "heute",
+        "host_name": host_name,
+        "service_description": service_description,
+        "duration": until_time - from_time,
+        "from": from_time,
+        "until": until_time,
+        "state": state,
+        "host_down": 0,
+        "in_downtime": 0,
+        "in_host_downtime": 0,
+        "in_notification_period": 1,
+        "in_service_period": 1,
+        "is_flapping": 0,
+    }
+    span.update(kwargs)
+    return span
+
+
+SPANS = [
+    _span("heute", "CPU load", 0, 100, 0),
+    _span("heute", "Memory", 0, 50, 2),
+    _span("heute", "CPU load", 100, 150, 0),
+    _span("heute", "CPU load", 150, 160, 1),
+    _span("heute", "Memory", 50, 60, 2, in_downtime=1),
+    _span("heute", "CPU load", 160, 200, 0, is_flapping=1),
+    _span("heute", "Memory", 60, 200, 3),
+    _span("other", "CPU load", 0, 120, 2, host_down=1),
+    _span("other", "CPU load", 120, 180, None),
+    _span("other", "CPU load", 180, 200, -1),
+]
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {
+        "dont_merge": True
+    },
+    {
+        "outage_statistics": (["min", "max", "avg", "cnt"], ["ok", "crit"])
+    },
+    {
+        "grouping": "host",
+        "downtimes": {
+            "include": "exclude",
+            "exclude_ok": False
+        },
+    },
+])
+@pytest.mark.parametrize("annotations", [
+    {},
+    {
+        ("heute", "heute", "CPU load"): [{
+            "service_state": 2,
+            "from": 120,
+            "until": 155,
+            "downtime": None,
+        }],
+    },
+])
+def test_compute_availability_of_spans(monkeypatch, options, annotations):
+    monkeypatch.setattr(availability, "load_annotations", lambda: annotations)
+    avoptions = availability.get_default_avoptions()
+    avoptions["range"] = ((0, 200), "")
+    avoptions.update(options)
+
+    expected = availability.compute_availability(
+        "service", availability.spans_by_object(copy.deepcopy(SPANS)), avoptions)
+    av_rawdata, av_data = availability.compute_availability_of_spans(
+        "service", iter(copy.deepcopy(SPANS)), avoptions)
+
+    assert av_rawdata == {
+        ("heute", "heute"): {
+            "CPU load": [],
+            "Memory": [],
+        },
+        ("heute", "other"): {
+            "CPU load": [],
+        },
+    }
+    for entry in expected:
+        entry["timeline"] = []
+    assert av_data == expected
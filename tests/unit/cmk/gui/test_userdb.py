@@ -490,6 +490,29 @@ def test_check_credentials_local_user_create_htpasswd_user_ad_hoc():
     assert str(user_id) in _load_users_uncached(lock=False)
 
 
+def test_load_users_from_cache_file(monkeypatch, user_id):
+    # The cache file has been written by save_users() while creating the user
+    assert userdb._users_cache_file().exists()
+    monkeypatch.setattr(userdb, "_merged_users", None)
+
+    def merge_user_sources():
+        raise Exception("Not using the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(userdb, "_merge_user_sources", merge_user_sources)
+        users = _load_users_uncached(lock=False)
+        assert user_id in users
+
+        # Each load creates new profiles
+        users[user_id]["alias"] = "modified"
+        assert _load_users_uncached(lock=False)[user_id]["alias"] != "modified"
+
+    # A changed source is read again
+    contacts_mk = Path(userdb._root_dir(), "contacts.mk")
+    contacts_mk.write_text(contacts_mk.read_text().replace(user_id, "renamed"))
+    assert "renamed" in _load_users_uncached(lock=False)
+
+
 def test_check_credentials_local_user_disallow_locked(with_user):
     user_id, password = with_user
     assert userdb.check_credentials(user_id, password) == user_id
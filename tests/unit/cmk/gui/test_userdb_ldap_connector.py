@@ -518,3 +518,37 @@ def test_get_group_memberships_nested(mocked_ldap):
 
     for needed_group_dn, needed_group in needed_groups:
         assert memberships[needed_group_dn] == needed_group
+
+
+def test_get_group_memberships_nested_queries(mocked_ldap):
+    assert mocked_ldap.get_group_memberships(["top-level", "loop1"], nested=True) == {
+        u'cn=top-level,ou=groups,dc=check-mk,dc=org': {
+            'cn': u'top-level',
+            'members': [
+                u"cn=admin,ou=users,dc=check-mk,dc=org",
+                u"cn=härry,ou=users,dc=check-mk,dc=org",
+                u"cn=sync-user,ou=users,dc=check-mk,dc=org",
+            ],
+        },
+        u'cn=loop1,ou=groups,dc=check-mk,dc=org': {
+            'cn': u'loop1',
+            'members': [
+                u"cn=admin,ou=users,dc=check-mk,dc=org",
+                u"cn=härry,ou=users,dc=check-mk,dc=org",
+            ],
+        },
+    }
+    # One query for the group DNs and one per nesting level
+    assert mocked_ldap._num_queries == 4
+
+    # The sub groups are already known
+    assert mocked_ldap.get_group_memberships(["level1"], nested=True) == {
+        u'cn=level1,ou=groups,dc=check-mk,dc=org': {
+            'cn': u'level1',
+            'members': [
+                u"cn=admin,ou=users,dc=check-mk,dc=org",
+                u"cn=härry,ou=users,dc=check-mk,dc=org",
+            ],
+        },
+    }
+    assert mocked_ldap._num_queries == 5
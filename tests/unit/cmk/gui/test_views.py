@@ -5761,6 +5761,20 @@ def test_get_needed_join_columns(view):
     assert sorted(columns) == sorted(expected_columns)
 
 
+def test_get_needed_inventory_paths(view):
+    view_spec = copy.deepcopy(view.spec)
+    view_spec["painters"].append(PainterSpec('inv_software_os_name'))
+    view = cmk.gui.views.View(view.name, view_spec, view_spec.get("context", {}))
+    assert cmk.gui.views._get_needed_inventory_paths(
+        view.group_cells, view.row_cells, view.sorters, []) == {".software.os.name"}
+
+    # The tree painter needs the whole tree
+    view_spec["painters"].append(PainterSpec('inventory_tree'))
+    view = cmk.gui.views.View(view.name, view_spec, view_spec.get("context", {}))
+    assert cmk.gui.views._get_needed_inventory_paths(
+        view.group_cells, view.row_cells, view.sorters, []) is None
+
+
 def test_create_view_basics():
     view_name = "allhosts"
     view_spec = cmk.gui.views.multisite_builtin_views[view_name]
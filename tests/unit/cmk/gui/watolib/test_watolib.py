@@ -100,6 +100,7 @@ def test_registered_configvars():
         'enable_sounds',
         'escape_plugin_output',
         'event_limit',
+        'event_processing_workers',
         'eventsocket_queue_len',
         'failed_notification_horizon',
         'hard_query_limit',
@@ -129,7 +130,9 @@ def test_registered_configvars():
         'notification_bulk_interval',
         'notification_fallback_email',
         'notification_logging',
+        'notification_plugin_concurrency',
         'notification_plugin_timeout',
+        'notification_plugin_timeouts',
         'page_heading',
         'pagetitle_date_format',
         'password_policy',
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import io
+import threading
+
+import pytest  # type: ignore[import]
+
+from agent_aws_fake_clients import (
+    FakeCloudwatchClient,
+    GlacierListVaultsIB,
+    S3ListBucketsIB,
+)
+
+from cmk.special_agents import agent_aws
+from cmk.special_agents.agent_aws import (
+    AWSSections,
+    RateLimiter,
+)
+
+REGIONS = ['eu-central-1', 'eu-west-1', 'us-east-2']
+
+# The instance builders create random values, but the outputs of the sequential and the
+# concurrent run must be comparable.
+VAULTS = GlacierListVaultsIB.create_instances(amount=2)
+BUCKETS = S3ListBucketsIB.create_instances(amount=2)
+ALARMS = FakeCloudwatchClient().describe_alarms()
+
+
+class FakeGlacierClient:
+    def list_vaults(self):
+        return {'VaultList': VAULTS, 'Marker': 'string'}
+
+    def list_tags_for_vault(self, vaultName=''):
+        return {}
+
+
+class FakeS3Client:
+    def list_buckets(self):
+        return {'Buckets': BUCKETS, 'Owner': {}}
+
+    def get_bucket_location(self, Bucket=''):
+        return {'LocationConstraint': REGIONS[int(Bucket.split('-')[-1])]}
+
+    def get_bucket_tagging(self, Bucket=''):
+        return {}
+
+
+class FakeAlarmsClient(FakeCloudwatchClient):
+    def describe_alarms(self, AlarmNames=None):
+        return ALARMS
+
+
+class FakeSession:
+    def client(self, client_key, config=None):
+        return {
+            'cloudwatch': FakeAlarmsClient(),
+            'glacier': FakeGlacierClient(),
+            's3': FakeS3Client(),
+        }.get(client_key, object())
+
+
+@pytest.fixture
+def section_runs(monkeypatch):
+    """Records when each section starts and finishes"""
+    events = []
+    lock = threading.Lock()
+    run_section = AWSSections.run_section
+
+    def _run_section(self, section, use_cache=True):
+        with lock:
+            events.append(("start", section))
+        run_section(self, section, use_cache=use_cache)
+        with lock:
+            events.append(("finish", section))
+
+    monkeypatch.setattr(AWSSections, "run_section", _run_section)
+    monkeypatch.setattr(agent_aws, "create_session", lambda *args: FakeSession())
+    return events
+
+
+def _run_agent(monkeypatch, capsys, *args):
+    monkeypatch.setattr("sys.stdin", io.StringIO())
+    assert agent_aws.main([
+        "--access-key-id",
+        "key",
+        "--secret-access-key",
+        "secret",
+        "--no-cache",
+        "--regions",
+        *REGIONS,
+        "--services",
+        "glacier",
+        "s3",
+        "cloudwatch_alarms",
+        "--glacier-limits",
+        "--s3-limits",
+        "--cloudwatch_alarms-limits",
+        "--cloudwatch-alarms",
+        "--hostname",
+        "hostname",
+        *args,
+    ]) == 0
+    return capsys.readouterr().out
+
+
+def test_concurrent_output_equals_sequential_output(section_runs, monkeypatch, capsys):
+    sequential_output = _run_agent(monkeypatch, capsys)
+    section_runs.clear()
+    concurrent_output = _run_agent(monkeypatch, capsys, "--max-workers", "4")
+
+    assert "<<<aws_s3_limits" in sequential_output
+    assert "<<<aws_glacier:" in sequential_output
+    assert "<<<aws_cloudwatch_alarms" in sequential_output
+    assert sequential_output.count("<<<aws_exceptions>>>") == len(REGIONS)
+    assert concurrent_output == sequential_output
+
+
+def test_concurrent_sections_respect_dependencies(section_runs, monkeypatch, capsys):
+    _run_agent(monkeypatch, capsys, "--max-workers", "8")
+
+    started = [s for e, s in section_runs if e == "start"]
+    finished = [s for e, s in section_runs if e == "finish"]
+    # Three glacier, two cloudwatch alarms and two S3 sections per region, but only one
+    # S3 limits section for all regions
+    assert len(started) == len(finished) == 7 * len(REGIONS) + 1
+    s3_limits = [s for s in started if s.name == "s3_limits"]
+    assert len(s3_limits) == 1
+
+    num_dependencies = 0
+    for sender in started:
+        for receiver in sender.receivers:
+            if receiver in started:
+                num_dependencies += 1
+                assert (section_runs.index(("finish", sender)) < section_runs.index(
+                    ("start", receiver)))
+    # Per region: glacier limits -> summary -> details, cloudwatch alarms limits -> details,
+    # S3 summary -> details and the S3 limits -> S3 summary across regions
+    assert num_dependencies == 5 * len(REGIONS)
+
+
+def test_rate_limiter():
+    now = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+    for _call in range(3):
+        assert limiter.wait(event_name="before-call.glacier.ListVaults") is None
+    assert sleeps == [0.25, 0.25]
+
+    now[0] += 10
+    limiter.wait()
+    assert sleeps == [0.25, 0.25]
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import collections
+import http.server
+import io
+import json
+import socketserver
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest  # type: ignore[import]
+import requests
+
+from cmk.special_agents import agent_prometheus
+from cmk.special_agents.agent_prometheus import (
+    KubeStateExporter,
+    PrometheusAPI,
+)
+from cmk.special_agents.utils.request_helper import create_api_connect_session
+
+# Every query is answered with one sample carrying all labels the exporters look for
+LABELS = {
+    "job": "node",
+    "instance": "node1:9100",
+    "node": "node1",
+    "namespace": "default",
+    "pod": "pod1",
+    "container": "container1",
+    "name": "k8s_container1",
+    "id": "/docker/" + "a" * 64,
+    "device": "sda",
+    "fstype": "ext4",
+    "mountpoint": "/",
+    "phase": "Active",
+    "condition": "true",
+    "status": "true",
+    "storageclass": "standard",
+    "reclaimPolicy": "Delete",
+    "provisioner": "kubernetes.io/gce-pd",
+    "daemonset": "daemon1",
+    "service": "service1",
+    "cluster_ip": "10.0.0.1",
+    "version": "2.26.0",
+}
+
+
+class StubPrometheusAPI:
+    """answers the requests of the special agent, counting queries and concurrent requests"""
+    def __init__(self):
+        self.queries = collections.Counter()
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._lock = threading.Lock()
+
+    def answer(self, url):
+        parsed_url = urlparse(url)
+        if parsed_url.path == "/api/v1/targets":
+            return 200, {
+                "data": {
+                    "activeTargets": [{
+                        "labels": {k: LABELS[k] for k in ("job", "instance")},
+                        "health": "up",
+                        "lastScrape": "2021-05-26T13:45:01Z"
+                    }]
+                }
+            }
+        if parsed_url.path != "/api/v1/query":
+            return 404, {"status": "error"}
+
+        promql = parse_qs(parsed_url.query)["query"][0]
+        with self._lock:
+            self.queries[promql] += 1
+            self._concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self._concurrent)
+        try:
+            time.sleep(0.02)
+            if promql.startswith("invalid"):
+                return 400, {"status": "error", "errorType": "bad_data"}
+            return 200, {
+                "status": "success",
+                "data": {
+                    "resultType": "vector",
+                    "result": [{
+                        "metric": dict(LABELS),
+                        "value": [1622036701.0, "1"]
+                    }],
+                },
+            }
+        finally:
+            with self._lock:
+                self._concurrent -= 1
+
+
+@pytest.fixture
+def stub_api():
+    api = StubPrometheusAPI()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            code, answer = api.answer(self.path)
+            body = json.dumps(answer).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield api, "127.0.0.1:%d" % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _api_client(address, **kwargs):
+    session = create_api_connect_session("http://%s/api/v1/" % address)
+    return PrometheusAPI(session, **kwargs)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_identical_queries_are_sent_once(stub_api, max_workers):
+    api, address = stub_api
+    exporter = KubeStateExporter(_api_client(address, max_workers=max_workers),
+                                 {"cluster_name": "cluster"})
+
+    # both summaries retrieve the node limits
+    cluster_resources = exporter.cluster_resources_summary()
+    node_resources = exporter.node_resources()
+
+    assert cluster_resources[0]["cluster"]["limits"] == {"cpu": 1.0, "memory": 1.0}
+    assert node_resources[0]["node1"]["limits"] == {"cpu": 1.0, "memory": 1.0}
+    assert api.queries["count by (node)(kube_pod_info)"] == 1
+    assert set(api.queries.values()) == {1}
+    if max_workers == 1:
+        assert api.max_concurrent == 1
+    else:
+        assert 1 < api.max_concurrent <= max_workers
+
+
+def test_failed_query_is_sent_once(stub_api):
+    api, address = stub_api
+    api_client = _api_client(address, max_workers=2)
+
+    api_client.prefetch_promql(["invalid(", "up"])
+    for _call in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            api_client.query_promql("invalid(")
+    assert len(api_client.query_promql("up")) == 1
+    assert api.queries == {"invalid(": 1, "up": 1}
+
+
+@pytest.mark.parametrize("cache_interval, expected_queries", [
+    (0, 2),
+    (600, 1),
+])
+def test_slowly_changing_queries_are_cached(stub_api, tmp_path, cache_interval, expected_queries):
+    api, address = stub_api
+    for _run in range(2):
+        api_client = _api_client(address, cache_dir=tmp_path, cache_interval=cache_interval)
+        assert api_client.query_promql("machine_memory_bytes")[0].value() == 1.0
+        assert api_client.query_promql("up")[0].value() == 1.0
+
+    assert api.queries["machine_memory_bytes"] == expected_queries
+    assert api.queries["up"] == 2
+
+
+def _run_agent(monkeypatch, capsys, address, **options):
+    config = {
+        "connection": ("url_custom", {
+            "url_address": address
+        }),
+        "protocol": "http",
+        "host_address": "127.0.0.1",
+        "host_name": "prometheus",
+        "exporter": [
+            ("cadvisor", {
+                "entity_level": ("both", {
+                    "container_id": "short",
+                    "prepend_namespaces": "omit_namespace",
+                }),
+                "entities": ["diskio", "cpu", "df", "if", "memory"],
+            }),
+            ("kube_state", {
+                "cluster_name": "cluster",
+                "prepend_namespaces": "omit_namespace",
+                "entities": ["cluster", "nodes", "services", "pods", "daemon_sets"],
+            }),
+            ("node_exporter", {
+                "entities": ["df", "mem"],
+            }),
+        ],
+        "promql_checks": [{
+            "service_description": "Custom",
+            "metric_components": [{
+                "metric_label": "Up",
+                "promql_query": "up",
+            }],
+        }],
+    }
+    config.update(options)
+    monkeypatch.setattr("sys.stdin", io.StringIO(repr(config)))
+    assert agent_prometheus.main(["--debug"]) == 0
+    return capsys.readouterr().out
+
+
+def test_concurrent_output_equals_sequential_output(stub_api, monkeypatch, capsys, tmp_path):
+    api, address = stub_api
+    monkeypatch.setattr(agent_prometheus, "PROMETHEUS_CACHE_FILE_PATH", tmp_path)
+
+    sequential_output = _run_agent(monkeypatch, capsys, address)
+    sequential_queries = api.queries.copy()
+    api.queries.clear()
+    api.max_concurrent = 0
+    concurrent_output = _run_agent(monkeypatch, capsys, address, max_workers=4)
+
+    assert "<<<k8s_resources:sep(0)>>>" in sequential_output
+    assert "<<<cadvisor_memory:sep(0)>>>" in sequential_output
+    assert "<<<mem>>>" in sequential_output
+    assert concurrent_output == sequential_output
+    assert api.queries == sequential_queries
+    assert set(api.queries.values()) == {1}
+    assert 1 < api.max_concurrent <= 4
+
+
+@pytest.mark.parametrize("max_workers, pool_maxsize", [
+    (4, 10),
+    (12, 13),
+])
+def test_connection_pool_fits_all_workers(stub_api, monkeypatch, capsys, tmp_path, max_workers,
+                                          pool_maxsize):
+    _api, address = stub_api
+    monkeypatch.setattr(agent_prometheus, "PROMETHEUS_CACHE_FILE_PATH", tmp_path)
+    pool_maxsizes = []
+
+    class RecordingHTTPAdapter(agent_prometheus.HTTPAdapter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pool_maxsizes.append(kwargs["pool_maxsize"])
+
+    monkeypatch.setattr(agent_prometheus, "HTTPAdapter", RecordingHTTPAdapter)
+    _run_agent(monkeypatch, capsys, address, max_workers=max_workers)
+    assert pool_maxsizes == [pool_maxsize, pool_maxsize]
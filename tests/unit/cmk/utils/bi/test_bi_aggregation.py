@@ -6,9 +6,13 @@
 
 # pylint: disable=redefined-outer-name
 
+import copy
+
 import pytest
 from cmk.utils.bi.bi_aggregation import BIAggregation
 from cmk.utils.bi.bi_actions import BICallARuleAction
+from cmk.utils.bi.bi_data_fetcher import BIStatusFetcher
+from cmk.utils.bi.bi_lib import SitesCallback
 import bi_test_data.sample_config as sample_config
 
 
@@ -64,3 +68,63 @@ def test_compute_aggregation(bi_packs_sample_config, bi_structure_fetcher, bi_se
     assert actual_result.acknowledged == expected_acknowledgment
     assert actual_result.downtime_state == expected_downtime_state
     assert actual_result.in_service_period == expected_service_period
+
+
+def test_compute_aggregation_incremental(monkeypatch, bi_packs_sample_config,
+                                         bi_structure_fetcher, bi_searcher):
+    monkeypatch.setattr("cmk.utils.bi.bi_data_fetcher._last_status_rows", {})
+    bi_structure_fetcher.add_site_data("heute", sample_config.bi_structure_states)
+    bi_searcher.set_hosts(bi_structure_fetcher.hosts)
+    bi_aggregation = bi_packs_sample_config.get_aggregation("default_aggregation")
+    compiled_aggregation = bi_aggregation.compile(bi_searcher)
+    required_elements = {
+        element for branch in compiled_aggregation.branches
+        for element in branch.required_elements()
+    }
+
+    status_rows = copy.deepcopy(sample_config.bi_status_rows)
+    bi_status_fetcher = BIStatusFetcher(
+        SitesCallback(lambda: None, lambda query, only_sites: copy.deepcopy(status_rows)))
+
+    bi_status_fetcher.update_states(required_elements)
+    first_results = compiled_aggregation.compute_branches(compiled_aggregation.branches,
+                                                          bi_status_fetcher)
+
+    # Unchanged states: The previous results are reused
+    bi_status_fetcher.update_states(required_elements)
+    second_results = compiled_aggregation.compute_branches(compiled_aggregation.branches,
+                                                           bi_status_fetcher)
+    assert [id(x) for x in second_results] == [id(x) for x in first_results]
+
+    # Only the branch of the changed host is computed again
+    status_rows[1][5] = "Changed output"
+    bi_status_fetcher.update_states(required_elements)
+    third_results = compiled_aggregation.compute_branches(compiled_aggregation.branches,
+                                                          bi_status_fetcher)
+    assert third_results[0] is first_results[0]
+    assert third_results[1] is not first_results[1]
+    assert third_results[1].actual_result == first_results[1].actual_result
+
+    # Assumed states are never taken from previous results
+    bi_status_fetcher.set_assumed_states({("heute", "heute"): 2})
+    assumed_results = compiled_aggregation.compute_branches(compiled_aggregation.branches,
+                                                            bi_status_fetcher)
+    assert assumed_results[0] is not first_results[0]
+    assert assumed_results[0].assumed_result.state == 2
+
+
+def test_last_status_rows_only_keep_last_query(monkeypatch):
+    last_status_rows = {}
+    monkeypatch.setattr("cmk.utils.bi.bi_data_fetcher._last_status_rows", last_status_rows)
+    status_rows = copy.deepcopy(sample_config.bi_status_rows)
+    bi_status_fetcher = BIStatusFetcher(
+        SitesCallback(lambda: None, lambda query, only_sites: copy.deepcopy(status_rows)))
+
+    bi_status_fetcher.update_states(set())
+    assert len(last_status_rows) == len(sample_config.bi_status_rows) > 1
+
+    # e.g. all other hosts have been deleted
+    del status_rows[1:]
+    bi_status_fetcher.update_states(set())
+    assert list(last_status_rows) == list(bi_status_fetcher.states)
+    assert len(last_status_rows) == 1
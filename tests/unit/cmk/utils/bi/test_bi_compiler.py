@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2020 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import copy
+
+import pytest
+
+from cmk.utils.bi.bi_aggregation import BIAggregation
+from cmk.utils.bi.bi_compiler import BICompiler
+from cmk.utils.bi.bi_lib import SitesCallback
+import bi_test_data.sample_config as sample_config
+
+
+@pytest.fixture(scope="function")
+def bi_compiler(monkeypatch, tmp_path, bi_packs_sample_config):
+    monkeypatch.setattr("cmk.utils.paths.tmp_dir", str(tmp_path))
+    compiler = BICompiler("", SitesCallback(lambda: {}, lambda *args: []))
+    compiler._bi_packs = bi_packs_sample_config
+
+    structure_states = copy.deepcopy(sample_config.bi_structure_states)
+
+    def prepare_for_compilation(online_sites):
+        compiler._bi_structure_fetcher.cleanup()
+        compiler._bi_structure_fetcher.add_site_data("heute", structure_states)
+        compiler.bi_searcher.set_hosts(compiler._bi_structure_fetcher.hosts)
+
+    monkeypatch.setattr(compiler, "prepare_for_compilation", prepare_for_compilation)
+    monkeypatch.setattr(compiler, "compute_current_configstatus", lambda: {
+        "configfile_timestamp": 0.0,
+        "online_sites": {("heute", 1)},
+        "known_sites": {("heute", 1)},
+    })
+    compiler.structure_states = structure_states
+    yield compiler
+
+
+@pytest.fixture(scope="function")
+def compiled_aggr_ids(monkeypatch):
+    compiled = []
+    compile_aggregation = BIAggregation.compile
+
+    def compile_and_record(self, bi_searcher):
+        compiled.append(self.id)
+        return compile_aggregation(self, bi_searcher)
+
+    monkeypatch.setattr(BIAggregation, "compile", compile_and_record)
+    yield compiled
+
+
+def test_compile_only_outdated_aggregations(bi_compiler, compiled_aggr_ids):
+    bi_compiler.update_compiled_aggregations()
+    assert compiled_aggr_ids == ["default_aggregation"]
+
+    # Unchanged host data and configuration: Nothing to do
+    del compiled_aggr_ids[:]
+    bi_compiler.update_compiled_aggregations()
+    assert compiled_aggr_ids == []
+
+    # The aggregation searches all hosts, so any changed host is relevant
+    bi_compiler.structure_states["heute"] = bi_compiler.structure_states["heute"][:-2] + (
+        "new alias",
+        "heute",
+    )
+    bi_compiler.update_compiled_aggregations()
+    assert compiled_aggr_ids == ["default_aggregation"]
+
+
+def test_compile_aggregation_on_config_change(bi_compiler, compiled_aggr_ids):
+    bi_compiler.update_compiled_aggregations()
+    del compiled_aggr_ids[:]
+
+    aggregation = bi_compiler._bi_packs.get_aggregation_mandatory("default_aggregation")
+    aggregation.computation_options.escalate_downtimes_as_warn = True
+    bi_compiler.update_compiled_aggregations()
+    assert compiled_aggr_ids == ["default_aggregation"]
+
+
+def test_reuse_loaded_aggregations(bi_compiler):
+    bi_compiler.update_compiled_aggregations()
+    bi_compiler.cleanup()
+    bi_compiler.load_compiled_aggregations()
+    loaded_aggregation = bi_compiler.compiled_aggregations["default_aggregation"]
+
+    # The file is unchanged, the same instance is used
+    bi_compiler.cleanup()
+    bi_compiler.load_compiled_aggregations()
+    assert bi_compiler.compiled_aggregations["default_aggregation"] is loaded_aggregation
+
+    aggregation = bi_compiler._bi_packs.get_aggregation_mandatory("default_aggregation")
+    aggregation.computation_options.escalate_downtimes_as_warn = True
+    bi_compiler.update_compiled_aggregations()
+    bi_compiler.cleanup()
+    bi_compiler.load_compiled_aggregations()
+    assert bi_compiler.compiled_aggregations["default_aggregation"] is not loaded_aggregation
+
+
+def test_searcher_dependency_tracking(bi_searcher_with_sample_config):
+    bi_searcher_with_sample_config.reset_dependency_tracking()
+    bi_searcher_with_sample_config.get_host_name_matches([], "heute")
+    assert bi_searcher_with_sample_config.accessed_hosts == {"heute"}
+    assert not bi_searcher_with_sample_config.scanned_all_hosts
+
+    bi_searcher_with_sample_config.get_host_name_matches(
+        list(bi_searcher_with_sample_config.hosts.values()), "heu.*")
+    assert bi_searcher_with_sample_config.scanned_all_hosts
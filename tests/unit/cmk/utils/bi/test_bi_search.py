@@ -163,3 +163,42 @@ def test_service_search(service_regex, host_regex, expected_matches,
     search = BIServiceSearch(schema_config)
     results = search.execute({}, bi_searcher_with_sample_config)
     assert len(results) == expected_matches
+
+
+@pytest.mark.parametrize("pattern, expected_services", [
+    ("Interface", ["Interface 2", "Interface 3", "Interface 4"]),
+    ("Interfaces?", ["Interface 2", "Interface 3", "Interface 4"]),
+    ("OMD heute (apache|performance)", ["OMD heute apache", "OMD heute performance"]),
+    (".*Console", ["OMD heute Event Console"]),
+    ("Missing", []),
+])
+def test_service_description_matches_keep_order(pattern, expected_services,
+                                                bi_searcher_with_sample_config):
+    host = bi_searcher_with_sample_config.hosts["heute"]
+    matches = bi_searcher_with_sample_config.get_service_description_matches([host], pattern)
+    assert [x.service_description for x in matches] == expected_services
+
+    # The second lookup is answered from the regex cache
+    assert bi_searcher_with_sample_config.get_service_description_matches([host],
+                                                                          pattern) == matches
+
+
+def test_host_index_searches(bi_searcher_with_sample_config):
+    all_hosts = list(bi_searcher_with_sample_config.hosts.values())
+    matched_hosts, _match_groups = bi_searcher_with_sample_config.get_host_name_matches(
+        all_hosts, "heute.*")
+    assert [x.name for x in matched_hosts] == ["heute", "heute_clone"]
+
+    tagged_hosts = bi_searcher_with_sample_config.filter_host_tags(all_hosts,
+                                                                   {"cmk-agent": "clone-tag"})
+    assert [x.name for x in tagged_hosts] == ["heute_clone"]
+    assert bi_searcher_with_sample_config.filter_host_tags(all_hosts, {"cmk-agent": "missing"}) == []
+
+    labeled_hosts = bi_searcher_with_sample_config.filter_host_labels(
+        all_hosts, {"cmk/check_mk_server": "yes"})
+    assert [x.name for x in labeled_hosts] == ["heute"]
+    negated_hosts = bi_searcher_with_sample_config.filter_host_labels(
+        all_hosts, {"cmk/check_mk_server": {
+            "$ne": "yes"
+        }})
+    assert [x.name for x in negated_hosts] == ["heute_clone"]
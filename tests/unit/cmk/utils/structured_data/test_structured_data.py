@@ -548,6 +548,52 @@ def test_structured_data_StructuredDataTree_is_equal_save_and_load(tree, tmp_pat
         shutil.rmtree(str(tmp_path))
 
 
+@pytest.mark.parametrize("tree", trees)
+def test_structured_data_StructuredDataTree_load_binary(tree, tmp_path):
+    tree.save_to(str(tmp_path), "foo")
+    assert (tmp_path / "foo.bin").exists()
+
+    loaded_tree = StructuredDataTree().load_from(str(tmp_path / "foo"))
+    assert loaded_tree.get_raw_tree() == tree.get_raw_tree()
+
+
+@pytest.mark.parametrize("tree_path", [
+    [],
+    ["hardware"],
+    ["hardware", "memory"],
+    ["hardware", "memory", "arrays"],
+    ["networking", "addresses"],
+    ["networking", "addresses", 0],
+    ["unknown"],
+])
+def test_structured_data_StructuredDataTree_load_subtree(tree_path, tmp_path):
+    tree_new_addresses_arrays_memory.save_to(str(tmp_path), "foo")
+    from_binary = StructuredDataTree().load_from(str(tmp_path / "foo"), tree_path)
+
+    (tmp_path / "foo.bin").unlink()
+    from_literal = StructuredDataTree().load_from(str(tmp_path / "foo"), tree_path)
+
+    assert from_binary.get_raw_tree() == from_literal.get_raw_tree()
+    if tree_path == ["unknown"]:
+        assert from_binary.is_empty()
+    elif tree_path:
+        assert from_binary.get_children([tree_path[0]])
+        assert all(edge in tree_path[:1] for edge, _path, _child in from_binary.get_children())
+
+
+def test_structured_data_StructuredDataTree_load_outdated_binary(tmp_path):
+    StructuredDataTree().create_tree_from_raw_tree({
+        "node": {
+            "foo": 1
+        }
+    }).save_to(str(tmp_path), "heute")
+    # E.g. replicated from a remote site or written by an older version
+    (tmp_path / "heute").write_text(u"{'node': {'foo': 2}}\n")
+
+    loaded_tree = StructuredDataTree().load_from(str(tmp_path / "heute"))
+    assert loaded_tree.get_raw_tree() == {"node": {"foo": 2}}
+
+
 @pytest.mark.parametrize("tree,result",
                          list(zip(trees, [
                              21,
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import cmk.utils.inventory_history as inventory_history
+from cmk.utils.structured_data import StructuredDataTree
+
+OLD_TREE = {
+    "hardware": {
+        "cpu": {
+            "cores": 2,
+            "model": "Intel(R) Xeon(R)",
+        },
+    },
+    "software": {
+        "packages": [{
+            "name": "bash",
+            "version": "5.0",
+        }, {
+            "name": "vim",
+            "version": "8.1",
+        }],
+    },
+}
+
+NEW_TREE = {
+    "hardware": {
+        "cpu": {
+            "cores": 4,
+            "model": "Intel(R) Xeon(R)",
+            "threads": 8,
+        },
+    },
+    "software": {
+        "packages": [{
+            "name": "bash",
+            "version": "5.1",
+        }],
+    },
+}
+
+
+def _delta():
+    return StructuredDataTree().create_tree_from_raw_tree(NEW_TREE).compare_with(
+        StructuredDataTree().create_tree_from_raw_tree(OLD_TREE))
+
+
+def test_save_delta(monkeypatch, tmp_path):
+    monkeypatch.setattr("cmk.utils.paths.inventory_delta_cache_dir", str(tmp_path))
+    new, changed, removed, delta_tree = _delta()
+
+    inventory_history.save_delta("heute", "None_100", _delta())
+    inventory_history.save_delta("heute", "100_200", _delta())
+    assert inventory_history.load_manifest("heute") == {
+        "None_100": (new, changed, removed),
+        "100_200": (new, changed, removed),
+    }
+    delta = inventory_history.load_delta("heute", "100_200")
+    assert delta is not None
+    assert delta[:3] == (new, changed, removed)
+    assert delta[3].get_raw_tree() == delta_tree.get_raw_tree()
+    assert inventory_history.load_delta("heute", "200_300") is None
+
+    # Deltas removed by the housekeeping are dropped from the manifest
+    (tmp_path / "heute" / "None_100").unlink()
+    inventory_history.save_delta("heute", "200_300", _delta())
+    assert set(inventory_history.load_manifest("heute")) == {"100_200", "200_300"}
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2021 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import pytest  # type: ignore[import]
+
+import cmk.utils.inventory_index as inventory_index
+from cmk.utils.structured_data import StructuredDataTree
+
+RAW_TREE = {
+    "hardware": {
+        "cpu": {
+            "cores": 4,
+            "model": "Intel(R) Xeon(R)",
+        },
+    },
+    "networking": {
+        "total_interfaces": 2,
+        "interfaces": [{
+            "index": 1
+        }, {
+            "index": 2
+        }],
+    },
+    "software": {
+        "os": {
+            "name": "Debian",
+            "version": "10",
+        },
+        "packages": [{
+            "name": "bash",
+        }],
+        "applications": {
+            "docker": {
+                "images": {
+                    0: {
+                        "id": "abc"
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+@pytest.fixture
+def inventory_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr("cmk.utils.paths.inventory_output_dir", str(tmp_path / "inventory"))
+    monkeypatch.setattr("cmk.utils.paths.inventory_index_dir", str(tmp_path / "inventory_index"))
+    (tmp_path / "inventory").mkdir()
+    return tmp_path / "inventory"
+
+
+def _save_tree(inventory_dir, host_name, raw_tree):
+    StructuredDataTree().create_tree_from_raw_tree(raw_tree).save_to(str(inventory_dir), host_name)
+    inventory_index.update_host(host_name, raw_tree)
+
+
+def test_get_attributes_tables():
+    assert inventory_index.get_attributes_tables(RAW_TREE) == {
+        "hardware.cpu": {
+            "cores": 4,
+            "model": "Intel(R) Xeon(R)",
+        },
+        "networking": {
+            "total_interfaces": 2,
+        },
+        "software.os": {
+            "name": "Debian",
+            "version": "10",
+        },
+    }
+
+
+def test_get_raw_tree(inventory_dir):
+    _save_tree(inventory_dir, "heute", RAW_TREE)
+
+    index = inventory_index.InventoryIndex(["software.os", "networking"])
+    assert index.get_raw_tree("heute") == {
+        "networking": {
+            "total_interfaces": 2,
+        },
+        "software": {
+            "os": {
+                "name": "Debian",
+                "version": "10",
+            },
+        },
+    }
+    # Not inventorized yet
+    assert index.get_raw_tree("morgen") == {}
+
+
+def test_get_raw_tree_changed_file(inventory_dir):
+    _save_tree(inventory_dir, "heute", RAW_TREE)
+    # Written without updating the index, e.g. synchronized from another site
+    StructuredDataTree().create_tree_from_raw_tree({
+        "software": {
+            "os": {
+                "version": "11"
+            }
+        }
+    }).save_to(str(inventory_dir), "heute")
+
+    assert inventory_index.InventoryIndex(["software.os"]).get_raw_tree("heute") is None
+
+
+def test_update_host(inventory_dir):
+    _save_tree(inventory_dir, "heute", RAW_TREE)
+    _save_tree(inventory_dir, "morgen", RAW_TREE)
+    _save_tree(inventory_dir, "heute", {"software": {"os": {"version": "11"}}})
+
+    assert inventory_index.load_table("hardware.cpu") == {
+        "morgen": {
+            "cores": 4,
+            "model": "Intel(R) Xeon(R)",
+        },
+    }
+    index = inventory_index.InventoryIndex(["software.os", "hardware.cpu"])
+    assert index.get_raw_tree("heute") == {"software": {"os": {"version": "11"}}}
+
+    inventory_index.remove_host("morgen")
+    assert inventory_index.load_table("hardware.cpu") == {}
+    assert set(inventory_index.load_stamps()) == {"heute"}